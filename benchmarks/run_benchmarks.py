@@ -0,0 +1,155 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import argparse
+import json
+from benchmarks.synthetic_hospital import generate_hospital
+from repositories.memory_repository import InMemoryRepository
+from repositories.mongo_repository import MongoRepository
+from schedule_state import ScheduleState
+from scheduling_optimizer import TabuSearchScheduler
+from utils.profiling import Profiler
+
+DEFAULT_SIZES = (50, 500, 5000)
+BENCHMARK_DATABASE = "scheduler_benchmark"
+COLLECTIONS = ("operating_rooms", "surgeons", "equipment", "surgeries", "patients")
+
+
+def make_repository(hospital, backend, monitor=None):
+    """
+    Loads a generated hospital into a repository.
+
+    "memory" uses the indexed InMemoryRepository; "mongomock" wraps a mongomock database in
+    a MongoRepository, exercising the same query path as production without a MongoDB server.
+    "mongodb" loads a scratch database on the server at MONGO_URI; with a QueryMonitor its
+    commands are recorded, starting after the data has been inserted.
+    """
+    collections = {name: hospital[name] for name in COLLECTIONS}
+    if backend == "memory":
+        return InMemoryRepository(collections)
+    if backend == "mongomock":
+        import mongomock
+        db = mongomock.MongoClient().benchmark
+    else:
+        from pymongo import MongoClient
+        client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"),
+                             event_listeners=[monitor] if monitor is not None else [])
+        db = client[BENCHMARK_DATABASE]
+        for name in COLLECTIONS:
+            db.drop_collection(name)
+    for name, documents in collections.items():
+        db[name].insert_many([dict(document) for document in documents])
+    if monitor is not None:
+        monitor.reset()
+    return MongoRepository(db)
+
+
+def run_benchmark(num_surgeries, iterations=500, time_limit=None, seed=0, backend="memory", repeat=1,
+                  profile=False, capture=None, monitor=None):
+    """
+    Generates a hospital of the given size and runs the Tabu Search on it.
+
+    With `profile` (or a `capture` mode) the run is instrumented and the result also holds
+    the profiler report; throughput numbers then include the instrumentation overhead. With a
+    QueryMonitor (mongodb backend only) the result holds its report under "queries".
+
+    Returns:
+        dict: Size, instance shape and the best run's iterations/sec, neighbors/sec,
+        time-to-first-feasible and final score.
+    """
+    hospital = generate_hospital(num_surgeries, seed=seed)
+    results = []
+    for run in range(repeat):
+        repository = make_repository(hospital, backend, monitor)
+        state = ScheduleState.from_repository(
+            repository, horizon_start=hospital["horizon_start"], horizon_days=hospital["horizon_days"]
+        )
+        profiler = Profiler(enabled=profile, capture=capture) if profile or capture else None
+        scheduler = TabuSearchScheduler(repository, profiler=profiler)
+        scheduler.run(state, max_iterations=iterations, time_limit=time_limit, seed=seed + run)
+        stats = scheduler.stats
+        elapsed = stats["elapsed"] or 1e-9
+        results.append({
+            "surgeries": num_surgeries,
+            "rooms": len(hospital["operating_rooms"]),
+            "surgeons": len(hospital["surgeons"]),
+            "horizon_days": hospital["horizon_days"],
+            "iterations": stats["iterations"],
+            "iterations_per_sec": stats["iterations"] / elapsed,
+            "neighbors_per_sec": stats["neighbors_evaluated"] / elapsed,
+            "time_to_first_feasible": stats["time_to_first_feasible"],
+            "initial_score": stats["initial_score"],
+            "final_score": state.recompute_score(),
+            "unscheduled": stats["unscheduled"],
+            "elapsed": stats["elapsed"],
+        })
+        if "profile" in stats:
+            results[-1]["profile"] = stats["profile"]
+        if monitor is not None:
+            results[-1]["queries"] = monitor.report()
+    return max(results, key=lambda result: result["iterations_per_sec"])
+
+
+def format_table(results):
+    header = (f"{'surgeries':>9} {'rooms':>5} {'iter/s':>9} {'neigh/s':>11} {'first feasible':>14} "
+              f"{'initial':>12} {'final':>12} {'unsched':>7}")
+    lines = [header, "-" * len(header)]
+    for r in results:
+        feasible = f"{r['time_to_first_feasible']:.3f}s" if r["time_to_first_feasible"] is not None else "never"
+        lines.append(f"{r['surgeries']:>9} {r['rooms']:>5} {r['iterations_per_sec']:>9.1f} "
+                     f"{r['neighbors_per_sec']:>11.0f} {feasible:>14} {r['initial_score']:>12.1f} "
+                     f"{r['final_score']:>12.1f} {r['unscheduled']:>7}")
+    return "\n".join(lines)
+
+
+def format_profile(profile):
+    """Per-phase totals of a profiler report, slowest first, followed by the counters and capture output."""
+    timers = sorted(profile["timers"].items(), key=lambda item: item[1]["total"], reverse=True)
+    lines = [f"    {name:<24} {t['count']:>10} calls {t['total']:>9.3f}s {t['mean'] * 1e6:>9.2f}us/call"
+             for name, t in timers]
+    lines.extend(f"    {name:<24} {value:>10}" for name, value in profile["counters"].items())
+    if profile["capture"]:
+        lines.append(profile["capture"])
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Tabu Search scheduler on synthetic hospitals.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Surgery counts to run")
+    parser.add_argument("--iterations", type=int, default=500, help="Tabu Search iterations per run")
+    parser.add_argument("--time-limit", type=float, default=None, help="Seconds per run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per size; the fastest is reported")
+    parser.add_argument("--backend", choices=["memory", "mongomock", "mongodb"], default="memory")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    parser.add_argument("--profile", action="store_true", help="Time optimizer phases and feasibility checks")
+    parser.add_argument("--capture", choices=["cprofile", "pyinstrument"], help="Also profile each run")
+    parser.add_argument("--monitor-queries", action="store_true",
+                        help="Record MongoDB commands per call site (mongodb backend only)")
+    args = parser.parse_args(argv)
+    if args.monitor_queries and args.backend != "mongodb":
+        parser.error("--monitor-queries requires --backend mongodb")
+
+    monitor = None
+    if args.monitor_queries:
+        from utils.query_monitor import QueryMonitor
+        monitor = QueryMonitor()
+
+    results = []
+    for size in args.sizes:
+        results.append(run_benchmark(size, args.iterations, args.time_limit, args.seed, args.backend, args.repeat,
+                                     args.profile, args.capture, monitor))
+        print(format_table(results[-1:]).splitlines()[-1] if len(results) > 1 else format_table(results), flush=True)
+        if results[-1].get("profile"):
+            print(format_profile(results[-1]["profile"]), flush=True)
+        if monitor is not None:
+            print(monitor.format_report(), flush=True)
+
+    if args.json_path:
+        with open(args.json_path, "w") as handle:
+            json.dump(results, handle, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import math
+import random
+from datetime import datetime, timedelta
+from schedule_state import WEEKDAYS
+
+# Surgery types per specialization with (mean, std dev) duration in minutes
+SPECIALIZATIONS = {
+    "General Surgery": {"Appendectomy": (75, 20), "Cholecystectomy": (100, 25), "Hernia Repair": (90, 20)},
+    "Orthopedic Surgery": {"Knee Replacement": (120, 30), "Hip Replacement": (140, 30), "ACL Repair": (100, 20)},
+    "Cardiothoracic Surgery": {"CABG": (240, 45), "Valve Replacement": (210, 40)},
+    "Neurosurgery": {"Craniotomy": (200, 50), "Spinal Fusion": (180, 40)},
+}
+URGENCY_DISTRIBUTION = [("High", 0.15), ("Medium", 0.35), ("Low", 0.5)]
+EQUIPMENT_TYPES = ["Imaging", "Anesthesia", "Laser", "Robot", "Endoscope", "Microscope"]
+ROOM_DAY_MINUTES = 10 * 60  # Usable minutes per room and weekday when sizing the horizon
+
+
+def default_sizes(num_surgeries):
+    """Rooms, surgeons and equipment items for a hospital handling num_surgeries in the horizon."""
+    num_rooms = max(3, round(math.sqrt(num_surgeries) * 0.6))
+    num_surgeons = max(4, num_surgeries // 30)
+    num_equipment = max(5, num_rooms)
+    return num_rooms, num_surgeons, num_equipment
+
+
+def generate_hospital(num_surgeries, num_rooms=None, num_surgeons=None, num_equipment=None, seed=0,
+                      start_date=datetime(2024, 1, 1), slack=1.4, specializations=None, id_prefix=""):
+    """
+    Generates a reproducible synthetic hospital as MongoDB-shaped documents.
+
+    Args:
+        num_surgeries (int): Number of surgeries to schedule.
+        num_rooms (int, optional): Operating rooms; sized from num_surgeries by default.
+        num_surgeons (int, optional): Surgeons; sized from num_surgeries by default.
+        num_equipment (int, optional): Equipment items; sized from the number of rooms by default.
+        seed (int): Random seed; the same arguments always produce the same hospital.
+        start_date (datetime): First day of the scheduling horizon (a Monday is a good choice).
+        slack (float): Room capacity over demand used to size the horizon.
+        specializations (list, optional): Subset of SPECIALIZATIONS the hospital offers; all by default.
+        id_prefix (str): Prefix of every generated id, so several hospitals (e.g. separate wings
+            that share nothing) can be loaded together.
+
+    Returns:
+        dict: Collection name -> list of documents (operating_rooms, surgeons, equipment,
+        surgeries, patients), plus "horizon_start" and "horizon_days".
+    """
+    rng = random.Random(seed)
+    default_rooms, default_surgeons, default_equipment = default_sizes(num_surgeries)
+    num_rooms = num_rooms or default_rooms
+    num_surgeons = num_surgeons or default_surgeons
+    num_equipment = num_equipment or default_equipment
+    specializations = list(specializations or SPECIALIZATIONS)
+
+    operating_rooms = []
+    for n in range(num_rooms):
+        # Every specialization gets at least one room; others accept one or two specializations
+        accepted = {specializations[n % len(specializations)]}
+        if rng.random() < 0.4:
+            accepted.add(rng.choice(specializations))
+        operating_rooms.append({
+            "room_id": f"{id_prefix}OR{n + 1:03d}",
+            "location": f"Building {n // 10 + 1} - Room {n % 10 + 1:02d}",
+            "equipment_list": [],
+            "surgery_types": sorted(t for s in accepted for t in SPECIALIZATIONS[s]),
+        })
+
+    surgeons = []
+    for n in range(num_surgeons):
+        specialization = specializations[n % len(specializations)]
+        days = sorted(rng.sample(range(5), rng.randint(3, 5)))
+        start_hour = rng.choice([7, 8, 9])
+        suitable = [room["room_id"] for room in operating_rooms
+                    if next(iter(SPECIALIZATIONS[specialization])) in room["surgery_types"]]
+        surgeons.append({
+            "surgeon_id": f"{id_prefix}SG{n + 1:04d}",
+            "name": f"Dr. Surgeon {n + 1}",
+            "contact_info": {"email": f"surgeon{n + 1}@example.com", "phone": f"555-{n:04d}"},
+            "specialization": specialization,
+            "credentials": [f"Board Certified in {specialization}"],
+            "availability": [{"day": WEEKDAYS[day], "start": f"{start_hour:02d}:00",
+                              "end": f"{start_hour + rng.choice([8, 9, 10]):02d}:00"} for day in days],
+            "surgeon_preferences": {"preferred_operating_room": rng.choice(suitable)},
+        })
+
+    surgeries = []
+    patients = []
+    for n in range(num_surgeries):
+        surgeon = surgeons[rng.randrange(num_surgeons)]
+        surgery_type, (mean, std_dev) = rng.choice(list(SPECIALIZATIONS[surgeon["specialization"]].items()))
+        duration = max(30, int(round(rng.gauss(mean, std_dev) / 15)) * 15)
+        urgency = rng.choices([u for u, _ in URGENCY_DISTRIBUTION], [w for _, w in URGENCY_DISTRIBUTION])[0]
+        equipment_count = rng.choices([0, 1, 2], [0.3, 0.5, 0.2])[0]
+        patient_id = f"{id_prefix}P{n + 1:06d}"
+        patients.append({"patient_id": patient_id, "name": f"Patient {n + 1}", "dob": "1980-01-01",
+                         "contact_info": {}, "medical_history": [], "privacy_consent": True})
+        surgeries.append({
+            "surgery_id": f"{id_prefix}SUR{n + 1:06d}",
+            "patient_id": patient_id,
+            "surgeon_id": surgeon["surgeon_id"],
+            "room_id": None,
+            "scheduled_date": start_date,
+            "surgery_type": surgery_type,
+            "urgency_level": urgency,
+            "duration": duration,
+            "status": "Scheduled",
+            "start_time": None,
+            "end_time": None,
+            "required_equipment_ids": [f"{id_prefix}EQ{k + 1:03d}" for k in rng.sample(range(num_equipment), equipment_count)],
+        })
+
+    # Size the horizon so that every specialization's rooms and every surgeon have `slack` spare capacity
+    weeks = 1
+    surgeon_demand = {}
+    type_demand = {}
+    for surgery in surgeries:
+        surgeon_demand[surgery["surgeon_id"]] = surgeon_demand.get(surgery["surgeon_id"], 0) + surgery["duration"]
+        type_demand[surgery["surgery_type"]] = type_demand.get(surgery["surgery_type"], 0) + surgery["duration"]
+    for types in (SPECIALIZATIONS[specialization] for specialization in specializations):
+        demand = sum(type_demand.get(t, 0) for t in types)
+        rooms = sum(1 for room in operating_rooms if next(iter(types)) in room["surgery_types"])
+        weeks = max(weeks, math.ceil(demand * slack / (rooms * 5 * ROOM_DAY_MINUTES)))
+    for surgeon in surgeons:
+        weekly = sum(int(slot["end"][:2]) * 60 - int(slot["start"][:2]) * 60 for slot in surgeon["availability"])
+        weeks = max(weeks, math.ceil(surgeon_demand.get(surgeon["surgeon_id"], 0) * slack / weekly))
+    horizon_days = weeks * 7
+
+    equipment = []
+    for n in range(num_equipment):
+        windows = []
+        for _ in range(rng.randint(0, 2)):
+            start = start_date + timedelta(days=rng.randrange(horizon_days), hours=rng.choice([6, 12, 18]))
+            windows.append({"start_time": start, "end_time": start + timedelta(hours=rng.randint(4, 8))})
+        equipment.append({
+            "equipment_id": f"{id_prefix}EQ{n + 1:03d}",
+            "name": f"{EQUIPMENT_TYPES[n % len(EQUIPMENT_TYPES)]} unit {n + 1}",
+            "type": EQUIPMENT_TYPES[n % len(EQUIPMENT_TYPES)],
+            "availability": True,
+            "maintenance_windows": windows,
+        })
+
+    return {
+        "operating_rooms": operating_rooms,
+        "surgeons": surgeons,
+        "equipment": equipment,
+        "surgeries": surgeries,
+        "patients": patients,
+        "horizon_start": start_date,
+        "horizon_days": horizon_days,
+    }
+
+
+if __name__ == "__main__":
+    hospital = generate_hospital(50, seed=42)
+    for name, value in hospital.items():
+        print(f"{name}: {len(value) if isinstance(value, list) else value}")
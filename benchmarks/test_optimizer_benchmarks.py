@@ -0,0 +1,46 @@
+# pytest-benchmark suite for the optimizer; skipped when pytest-benchmark is not installed.
+#
+#   python -m pytest benchmarks/test_optimizer_benchmarks.py --benchmark-only
+#
+# Add --benchmark-autosave to keep a run and --benchmark-compare to check a later one against it.
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks.run_benchmarks import DEFAULT_SIZES, make_repository
+from benchmarks.synthetic_hospital import generate_hospital
+from schedule_state import ScheduleState
+from scheduling_optimizer import TabuSearchScheduler
+
+ITERATIONS = 200
+
+
+@pytest.fixture(scope="module", params=DEFAULT_SIZES, ids=lambda size: f"{size}-surgeries")
+def hospital(request):
+    return generate_hospital(request.param, seed=0)
+
+
+def load_state(repository, hospital):
+    return ScheduleState.from_repository(repository, horizon_start=hospital["horizon_start"],
+                                        horizon_days=hospital["horizon_days"])
+
+
+def test_load_state(benchmark, hospital):
+    repository = make_repository(hospital, "memory")
+    state = benchmark(load_state, repository, hospital)
+    assert len(state.surgeries) == len(hospital["surgeries"])
+
+
+def test_tabu_search(benchmark, hospital):
+    def setup():
+        repository = make_repository(hospital, "memory")
+        return (TabuSearchScheduler(repository), load_state(repository, hospital)), {}
+
+    def run(scheduler, state):
+        scheduler.run(state, max_iterations=ITERATIONS, seed=0)
+        return scheduler, state
+
+    scheduler, state = benchmark.pedantic(run, setup=setup, rounds=3)
+    benchmark.extra_info["final_score"] = round(state.recompute_score(), 1)
+    benchmark.extra_info["neighbors_evaluated"] = scheduler.stats["neighbors_evaluated"]
+    assert scheduler.stats["iterations"] <= ITERATIONS
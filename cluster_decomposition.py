@@ -0,0 +1,189 @@
+# Decomposition of a scheduling instance into independent resource clusters.
+#
+# Two surgeries interact only through a shared resource: a surgeon, an equipment item, a staff
+# member or a room both may use. Surgeries connected by no chain of shared resources can be
+# optimized separately, e.g. the cardiothoracic and orthopedic wings of a hospital with their
+# own operating room suites, and their results simply merged.
+
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from repositories.mongo_repository import MongoRepository
+from schedule_state import ScheduleState, DEFAULT_HORIZON_DAYS
+from scheduling_optimizer import TabuSearchScheduler
+
+logger = logging.getLogger(__name__)
+
+
+def resource_clusters(state):
+    """
+    Connected components of the surgery-resource graph of a ScheduleState.
+
+    Every surgery is linked to its surgeon, equipment items and pools, staff members and eligible rooms;
+    the components are found with a union-find over the resources.
+
+    Returns:
+        list: Lists of surgery positions, largest cluster first.
+    """
+    parent = {}
+
+    def find(key):
+        root = key
+        while parent[root] != root:
+            root = parent[root]
+        while parent[key] != root:  # Path compression
+            parent[key], key = root, parent[key]
+        return root
+
+    roots = []
+    for i in range(len(state.surgeries)):
+        keys = list(state.resources[i]) + [("room", room_id) for room_id in state.eligible_rooms[i]]
+        keys.extend(("pool", pool_id) for pool_id, _ in state.pool_needs[i])
+        keys.append(("surgery", i))  # Keeps a surgery without any resource in a cluster of its own
+        for key in keys:
+            parent.setdefault(key, key)
+        root = find(keys[0])
+        for key in keys[1:]:
+            other = find(key)
+            if other != root:
+                parent[other] = root
+        roots.append(keys[0])
+
+    clusters = {}
+    for i, key in enumerate(roots):
+        clusters.setdefault(find(key), []).append(i)
+    return sorted(clusters.values(), key=len, reverse=True)
+
+
+def pack_clusters(clusters, bins):
+    """Groups clusters into at most `bins` jobs of similar size (largest first, into the smallest job)."""
+    jobs = [[] for _ in range(min(bins, len(clusters)))]
+    for cluster in sorted(clusters, key=len, reverse=True):
+        min(jobs, key=len).extend(cluster)
+    return [job for job in jobs if job]
+
+
+class ClusterDecompositionScheduler:
+    """
+    Optimizes each independent resource cluster of the schedule separately, in parallel.
+
+    The clusters are packed into jobs of similar size (a few per process, so a large cluster
+    does not leave the other processes idle) and every job runs TabuSearchScheduler on its own
+    surgeries in a process pool, with a share of the iteration budget proportional to its size.
+    Since jobs share no surgeon, room, equipment item or staff member, their placements never
+    conflict and are merged as they are. The only interaction left is through the room balance
+    term's global mean, which barely changes with a job's placements.
+
+    Args:
+        repository (Repository, optional): Source of the schedule when run() gets no state.
+        processes (int, optional): Worker processes; defaults to one per CPU, 1 runs the
+            clusters one after the other in this process, without packing.
+        jobs_per_process (int): Jobs created per process to balance the load.
+        min_iterations (int): Iterations given to even the smallest job.
+    """
+    def __init__(self, repository=None, processes=None, jobs_per_process=2, min_iterations=50):
+        self.repository = repository if repository is not None else MongoRepository()
+        self.processes = processes or os.cpu_count() or 1
+        self.jobs_per_process = jobs_per_process
+        self.min_iterations = min_iterations
+        self.stats = {}
+
+    def run(self, state=None, max_iterations=1000, time_limit=None, seed=None, horizon_start=None,
+            horizon_days=DEFAULT_HORIZON_DAYS):
+        """
+        Optimizes every cluster and merges the results into `state`.
+
+        Args:
+            state (ScheduleState, optional): Instance to optimize; loaded from the repository if omitted.
+            max_iterations (int): Iterations shared by the jobs in proportion to their size.
+            time_limit (float, optional): Seconds per job.
+            seed (int, optional): Seed of the first job; job k uses seed + k.
+            horizon_start (datetime, optional): First day when loading the state.
+            horizon_days (int): Days of the horizon when loading the state.
+
+        Returns:
+            ScheduleState: The merged state. self.stats holds the cluster sizes, per-job
+            statistics, elapsed time, final score and number of unscheduled surgeries.
+        """
+        if state is None:
+            state = ScheduleState.from_repository(self.repository, horizon_start=horizon_start,
+                                                  horizon_days=horizon_days)
+        started = time.perf_counter()
+        clusters = resource_clusters(state)
+        jobs = pack_clusters(clusters, self.processes * self.jobs_per_process) if self.processes > 1 else clusters
+        total = len(state.surgeries) or 1
+        settings = [{"iterations": max(self.min_iterations, round(max_iterations * len(job) / total)),
+                     "time_limit": time_limit, "seed": None if seed is None else seed + k}
+                    for k, job in enumerate(jobs)]
+        logger.info(f"{len(clusters)} resource clusters (largest {len(clusters[0]) if clusters else 0} surgeries) "
+                    f"in {len(jobs)} jobs")
+
+        if self.processes > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(min(self.processes, len(jobs)), initializer=_init_worker,
+                                     initargs=(state,)) as pool:
+                results = list(pool.map(_run_job, jobs, settings))
+            for job, (placements, _) in zip(jobs, results):
+                for i in job:
+                    state.unassign(i)
+                for i, placement in placements.items():
+                    state.place(i, *placement)
+        else:
+            scheduler = TabuSearchScheduler(self.repository)
+            results = []
+            for job, job_settings in zip(jobs, settings):
+                scheduler.run(state, max_iterations=job_settings["iterations"], time_limit=time_limit,
+                              seed=job_settings["seed"], movable=job)
+                results.append((None, dict(scheduler.stats, movable=len(job))))
+
+        self.stats = {
+            "clusters": [len(cluster) for cluster in clusters],
+            "jobs": [stats for _, stats in results],
+            "elapsed": time.perf_counter() - started,
+            "best_score": state.recompute_score(),
+            "unscheduled": state.unscheduled,
+        }
+        return state
+
+
+# State of the process pool's worker, sent once per process by _init_worker
+_worker_state = None
+
+
+def _init_worker(state):
+    global _worker_state
+    _worker_state = state
+
+
+def _run_job(job, settings):
+    """Optimizes one job's surgeries on the worker's copy of the state; returns their placements and stats."""
+    state = _worker_state
+    before = state.assignment(job)
+    scheduler = TabuSearchScheduler()  # Its repository is never connected: run() gets the state
+    scheduler.run(state, max_iterations=settings["iterations"], time_limit=settings["time_limit"],
+                  seed=settings["seed"], movable=job)
+    placements = {i: (state.room_of[i], state.start_of[i]) for i in job if state.room_of[i] is not None}
+    state.restore(before)  # Put the copy back as received for the worker's next job
+    return placements, dict(scheduler.stats, movable=len(job))
+
+
+if __name__ == "__main__":
+    from benchmarks.synthetic_hospital import generate_hospital
+    from repositories.memory_repository import InMemoryRepository
+
+    logging.basicConfig(level=logging.INFO)
+    # Four wings that share no surgeon, room or equipment item
+    wings = [generate_hospital(600, seed=n, specializations=[specialization], id_prefix=f"W{n}-")
+             for n, specialization in enumerate(["General Surgery", "Orthopedic Surgery", "Cardiothoracic Surgery",
+                                                 "Neurosurgery"])]
+    collections = {name: [document for wing in wings for document in wing[name]]
+                   for name in ("operating_rooms", "surgeons", "equipment", "surgeries")}
+    repository = InMemoryRepository(collections)
+    horizon_days = max(wing["horizon_days"] for wing in wings)
+    for processes in (1, os.cpu_count() or 1):
+        state = ScheduleState.from_repository(repository, horizon_start=wings[0]["horizon_start"],
+                                              horizon_days=horizon_days)
+        scheduler = ClusterDecompositionScheduler(repository, processes=processes)
+        scheduler.run(state, max_iterations=2000, seed=0)
+        print(f"processes={processes}: clusters {scheduler.stats['clusters']}, {scheduler.stats['elapsed']:.2f}s, "
+              f"score {scheduler.stats['best_score']:.1f}, unscheduled {scheduler.stats['unscheduled']}")
@@ -1,5 +1,5 @@
 # daily_notifications.py
-from services.notification_service import notification_service
+from services.notification_coalescer import get_notification_coalescer
 
 def fetch_recipients_for_daily_notification():
     """
@@ -10,12 +10,21 @@ def fetch_recipients_for_daily_notification():
     return ["user1@example.com", "user2@example.com"]
 
 def send_daily_notifications():
+    """
+    Sends the daily update through the notification coalescer.
+
+    Schedule changes still waiting for their digest go out in the same email as the daily
+    update, so nobody gets a separate message for each.
+    """
     recipients = fetch_recipients_for_daily_notification()
+    coalescer = get_notification_coalescer()
     for recipient_email in recipients:
         subject = "Your Daily Update"
         body = "Here's your daily notification with important information."
-        notification_service.send_notification(recipient_email, subject, body)
-        print(f"Notification sent to {recipient_email}")
+        coalescer.add(recipient_email, "daily-update", subject, body)
+    digests = coalescer.flush()
+    coalescer.dispatcher.flush(timeout=60)
+    print(f"Daily notifications sent: {digests} digests.")
 
 if __name__ == "__main__":
     send_daily_notifications()
@@ -1,20 +1,28 @@
-from pymongo import MongoClient
 import os
 from contextlib import contextmanager
-from mongodb_transaction_manager import MongoDBClient  # Make sure to import your MongoDBClient class
+from mongodb_transaction_manager import MongoDBClient, LazyDatabase  # Make sure to import your MongoDBClient class
 
-# Define collections based on the models
-db = MongoDBClient.get_db()  # Use the singleton to access the database
-equipment_collection = db.equipment
-operating_rooms_collection = db.operating_rooms
-patients_collection = db.patients
-staff_collection = db.staff
-surgeons_collection = db.surgeons
-surgeries_collection = db.surgeries
-surgery_appointments_collection = db.surgery_appointments
-surgery_equipment_usage_collection = db.surgery_equipment_usage
-surgery_room_assignments_collection = db.surgery_room_assignments
-surgery_staff_assignments_collection = db.surgery_staff_assignments
+# The database connects on first use, never at import time
+db = LazyDatabase()
+
+# Define collections based on the models; resolved lazily through __getattr__ below
+_COLLECTIONS = {
+    "equipment_collection": "equipment",
+    "operating_rooms_collection": "operating_rooms",
+    "patients_collection": "patients",
+    "staff_collection": "staff",
+    "surgeons_collection": "surgeons",
+    "surgeries_collection": "surgeries",
+    "surgery_appointments_collection": "surgery_appointments",
+    "surgery_equipment_usage_collection": "surgery_equipment_usage",
+    "surgery_room_assignments_collection": "surgery_room_assignments",
+    "surgery_staff_assignments_collection": "surgery_staff_assignments",
+}
+
+def __getattr__(name):
+    if name in _COLLECTIONS:
+        return db[_COLLECTIONS[name]]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 @contextmanager
 def mongodb_transaction():
@@ -30,12 +38,3 @@ def mongodb_transaction():
     finally:
         session.end_session()
 
-    @classmethod
-    def get_db(cls):
-        if cls._db is None:
-            # Adjust these values as necessary
-            MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-            DATABASE_NAME = os.getenv("MONGO_DATABASE_NAME", "your_database_name")
-            cls._client = MongoClient(MONGO_URI)
-            cls._db = cls._client[DATABASE_NAME]
-        return cls._db
\ No newline at end of file
@@ -0,0 +1,494 @@
+# Exact optimization of small scheduling instances and bounds for large ones.
+#
+# The Tabu Search finds good schedules but cannot tell how good. ExactScheduler formulates the
+# same hard constraints and score as ScheduleState as a CP-SAT model, which solves a few days
+# (or a few dozen surgeries) to optimality and otherwise still proves a bound on the best
+# possible score. relaxation_bound() gives a cheaper bound from a linear relaxation for
+# instances too large for CP-SAT. Both need OR-Tools (pip install ortools), imported on first use.
+
+import logging
+import time
+from utils.lazy_import import lazy_import
+from repositories.mongo_repository import MongoRepository
+from schedule_state import ScheduleState, DEFAULT_HORIZON_DAYS, MINUTES_PER_DAY, SETUP_MINUTES, CLEANUP_MINUTES
+
+cp_model = lazy_import("ortools.sat.python.cp_model")
+pywraplp = lazy_import("ortools.linear_solver.pywraplp")
+
+logger = logging.getLogger(__name__)
+
+
+def optimality_gap(score, bound):
+    """Relative distance between a score and a bound on the best score, e.g. 0.05 for 5%."""
+    return max(0.0, bound - score) / max(abs(score), 1.0)
+
+
+def busy_minutes(index, low, high):
+    """Minutes of [low, high) covered by the intervals of an IntervalIndex, counted once per interval."""
+    if index is None:
+        return 0
+    busy = 0
+    for k in index.covering(low, high):
+        busy += max(0, min(index.ends[k], high) - max(index.starts[k], low))
+    return busy
+
+
+def linear_gain(state, i, room_id, start):
+    """
+    The part of placement_delta that does not depend on the other placements: the unscheduled
+    penalty avoided, the preferred room and stability rewards and the urgency delay. The room
+    balance and compactness terms it leaves out can only lower the score.
+    """
+    weights = state.weights
+    gain = weights["unscheduled"] * state.urgency[i]
+    if room_id == state.preferred_room[i]:
+        gain += weights["preference"]
+    if state.anchors.get(i) == (room_id, start):
+        gain += weights["stability"]
+    return gain - weights["urgency_delay"] * state.urgency[i] * (start - state.horizon_start) / MINUTES_PER_DAY
+
+
+def candidate_windows(state, i, days):
+    """(room_id, day, earliest start, latest start) of every room and day surgery i may be placed in."""
+    candidates = []
+    for day in days:
+        domain = state.start_domain(i, day)
+        if not domain:
+            continue
+        for room_id in state.eligible_rooms[i]:
+            candidates.append((room_id, day, domain[0][0], domain[-1][1]))
+    return candidates
+
+
+class ExactScheduler:
+    """
+    Solves part of a schedule exactly with the OR-Tools CP-SAT solver.
+
+    The surgeries in `movable` get a choice of room and day among `days` and an integer start
+    time; every other surgery, maintenance window, room closure and surgeon absence is a fixed
+    interval. Rooms (with setup and cleanup buffers), surgeons, equipment items and staff
+    members each get a no-overlap constraint, equipment pools a cumulative one. The objective
+    is ScheduleState's score itself, including the quadratic room balance variance and the
+    surgeons' idle time, so the solver's optimum is the best schedule the Tabu Search could
+    reach and its bound is a true bound.
+
+    The current placements of the movable surgeries are given to the solver as a hint, and
+    the result is left in the state, so the two searches can warm-start each other: solve()
+    a Tabu Search schedule to polish it, or run TabuSearchScheduler.run() on a solved state
+    with `bound` set to report the optimality gap and stop once it is small enough.
+
+    Args:
+        repository (Repository, optional): Source of the schedule when solve() gets no state.
+        time_limit (float): Default seconds per solve.
+        workers (int): CP-SAT search workers.
+    """
+    def __init__(self, repository=None, time_limit=10.0, workers=8):
+        self.repository = repository if repository is not None else MongoRepository()
+        self.time_limit = time_limit
+        self.workers = workers
+        self.stats = {}
+
+    def solve(self, state=None, movable=None, days=None, time_limit=None, seed=None, horizon_start=None,
+              horizon_days=DEFAULT_HORIZON_DAYS):
+        """
+        Places the movable surgeries optimally, or as well as the time limit allows.
+
+        Args:
+            state (ScheduleState, optional): Instance to solve; loaded from the repository if omitted.
+            movable (iterable, optional): Positions that may be placed or moved. Defaults to the
+                unscheduled surgeries and those placed in `days`.
+            days (range, optional): Horizon days they may be placed in; all by default.
+            time_limit (float, optional): Seconds for this solve; defaults to self.time_limit.
+            seed (int, optional): Solver seed.
+            horizon_start (datetime, optional): First day when loading the state.
+            horizon_days (int): Days of the horizon when loading the state.
+
+        Returns:
+            ScheduleState: The state with the solver's placements, or unchanged if the solver
+            found nothing better. self.stats holds the solver status, whether the result is
+            optimal, the score, the proven bound on the score and the gap between them.
+        """
+        if state is None:
+            state = ScheduleState.from_repository(self.repository, horizon_start=horizon_start,
+                                                  horizon_days=horizon_days)
+        started = time.perf_counter()
+        days = days if days is not None else range(state.horizon_days)
+        if movable is None:
+            movable = [i for i, room_id in enumerate(state.room_of)
+                       if room_id is None or state.day_of(state.start_of[i]) in days]
+        movable = sorted(movable)
+        before = state.assignment(movable)
+        score_before = state.score
+        for i in movable:
+            state.unassign(i)
+
+        model = _CpModel(state, movable, days)
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = self.time_limit if time_limit is None else time_limit
+        solver.parameters.num_workers = self.workers
+        if seed is not None:
+            solver.parameters.random_seed = seed
+        model.hint(before)
+        status = solver.Solve(model.model)
+
+        solved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        if solved:
+            for i in movable:
+                placement = model.placement(solver, i)
+                if placement is None:
+                    continue
+                if state.can_place(i, *placement):
+                    state.place(i, *placement)
+                else:
+                    logger.warning(f"Exact solver placement of {state.surgery_ids[i]} is infeasible; "
+                                   f"left unscheduled.")
+        if not solved or state.score < score_before:
+            state.restore(before)
+        bound = model.offset + solver.BestObjectiveBound() if solved else None
+        self.stats = {
+            "status": solver.StatusName(status),
+            "optimal": status == cp_model.OPTIMAL,
+            "movable": len(movable),
+            "elapsed": time.perf_counter() - started,
+            "best_score": state.score,
+            "bound": bound,
+            "gap": optimality_gap(state.score, bound) if bound is not None else None,
+            "unscheduled": state.unscheduled,
+        }
+        logger.info(f"Exact solver {self.stats['status']} for {len(movable)} surgeries in "
+                    f"{self.stats['elapsed']:.2f}s with score {state.score:.2f}")
+        return state
+
+    def solve_days(self, state=None, days_per_solve=1, time_limit_per_solve=None, seed=None):
+        """
+        Polishes a schedule a few days at a time, each solve re-optimizing the surgeries in its
+        days and trying to place those still unscheduled. Start from a constructed or Tabu
+        Search schedule: its placements are the solver's hints, while a solve facing hundreds
+        of unscheduled surgeries rarely finds a good solution within its time limit.
+
+        Returns:
+            ScheduleState: The state; self.stats["solves"] holds each solve's statistics.
+        """
+        if state is None:
+            state = ScheduleState.from_repository(self.repository)
+        solves = []
+        for first in range(0, state.horizon_days, days_per_solve):
+            days = range(first, min(first + days_per_solve, state.horizon_days))
+            self.solve(state, days=days, time_limit=time_limit_per_solve, seed=seed)
+            solves.append(dict(self.stats, days=(days.start, days.stop)))
+        self.stats = {"solves": solves, "best_score": state.score, "unscheduled": state.unscheduled}
+        return state
+
+    def relaxation_bound(self, state, movable=None, days=None, cut_rounds=20):
+        """
+        Upper bound on the best score reachable by moving `movable` within `days`, from the LP
+        relaxation of an assignment model.
+
+        Each movable surgery is assigned (fractionally) to a room and day, gaining at most its
+        linear_gain at the earliest start the day allows. The minutes each room, surgeon,
+        equipment item and staff member can work on a day are capacities. The room load
+        variance is convex, so it is bounded from below by its tangent planes: the linear
+        program is solved again with a tangent at each solution's room loads (Kelley's cutting
+        planes) until it no longer moves. The compactness term is dropped, which can only raise
+        the bound. The bound is weaker than CP-SAT's but the linear program solves in seconds
+        even for thousands of surgeries.
+
+        Args:
+            state (ScheduleState): Instance; the surgeries outside `movable` count as placed.
+            movable (iterable, optional): Positions to relax; all surgeries by default.
+            days (range, optional): Horizon days they may be placed in; all by default.
+            cut_rounds (int): Most tangents added to the room balance term.
+
+        Returns:
+            float: The bound, or None if the linear program could not be solved.
+        """
+        days = days if days is not None else range(state.horizon_days)
+        movable = set(range(len(state.surgeries)) if movable is None else movable)
+        before = state.assignment(movable)
+        for i in movable:
+            state.unassign(i)
+        try:
+            offset = -state.weights["unscheduled"] * sum(state.urgency)
+            offset += sum(linear_gain(state, i, room_id, state.start_of[i])
+                          for i, room_id in enumerate(state.room_of) if room_id is not None)
+
+            solver = pywraplp.Solver.CreateSolver("GLOP")
+            # Dual simplex re-optimizes from the previous basis after each added tangent
+            solver.SetSolverSpecificParametersAsString("use_dual_simplex: true")
+            objective = solver.Objective()
+            objective.SetMaximization()
+            room_terms = {room_id: [] for room_id in state.room_ids}
+            rows = {}  # (kind, resource id, day) -> [earliest start, latest end, [(variable, minutes)]]
+
+            def use(key, variable, minutes, low, high):
+                row = rows.setdefault(key, [low, high, []])
+                row[0], row[1] = min(row[0], low), max(row[1], high)
+                row[2].append((variable, minutes))
+
+            for i in movable:
+                variables = []
+                duration = state.durations[i]
+                for room_id, day, earliest, latest in candidate_windows(state, i, days):
+                    variable = solver.NumVar(0.0, 1.0, "")
+                    variables.append(variable)
+                    gain = linear_gain(state, i, room_id, earliest)
+                    anchor = state.anchors.get(i)
+                    if anchor is not None and anchor[0] == room_id and state.day_of(anchor[1]) == day:
+                        gain = max(gain, linear_gain(state, i, room_id, anchor[1]))
+                    objective.SetCoefficient(variable, gain)
+                    room_terms[room_id].append((variable, duration))
+                    use(("room", room_id, day), variable, duration + SETUP_MINUTES + CLEANUP_MINUTES,
+                        earliest - SETUP_MINUTES, latest + duration + CLEANUP_MINUTES)
+                    for key in state.resources[i]:
+                        use(key + (day,), variable, duration, earliest, latest + duration)
+                    for pool_id, units in state.pool_needs[i]:
+                        transfer = state.equipment_pools.transfer_minutes(room_id)
+                        use(("pool", pool_id, day), variable, units * (duration + 2 * transfer),
+                            earliest - transfer, latest + duration + transfer)
+                if variables:
+                    constraint = solver.Constraint(0.0, 1.0)
+                    for variable in variables:
+                        constraint.SetCoefficient(variable, 1.0)
+
+            # Whatever a resource does on a day fits between the earliest start and latest end
+            # its candidate placements allow, minus the time it is already busy there; an
+            # equipment pool has that much time per unit
+            for (kind, resource_id, day), (low, high, terms) in rows.items():
+                if kind == "pool":
+                    capacity = state.pool_indexes[resource_id].capacity * (high - low) \
+                        - busy_minutes(state.pool_indexes[resource_id], low, high)
+                else:
+                    capacity = high - low - busy_minutes(state.indexes.get((kind, resource_id)), low, high) \
+                        - busy_minutes(state.blocked.get((kind, resource_id)), low, high)
+                constraint = solver.Constraint(0.0, max(0.0, capacity))
+                for variable, minutes in terms:
+                    constraint.SetCoefficient(variable, minutes)
+
+            rooms = len(state.room_ids)
+
+            def variance(loads):
+                mean = sum(loads.values()) / rooms
+                return sum((load - mean) ** 2 for load in loads.values()) / rooms
+
+            # Room loads and their variance, in hours to keep the tangents' coefficients well scaled
+            room_loads = {}
+            for room_id, terms in room_terms.items():
+                load = room_loads[room_id] = solver.NumVar(0.0, solver.infinity(), "")
+                constraint = solver.Constraint(state.room_load[room_id] / 60, state.room_load[room_id] / 60)
+                constraint.SetCoefficient(load, 1.0)
+                for variable, duration in terms:
+                    constraint.SetCoefficient(variable, -duration / 60)
+            spread = solver.NumVar(0.0, solver.infinity(), "")
+            objective.SetCoefficient(spread, -state.weights["room_balance"])
+            for round_number in range(cut_rounds + 1):
+                status = solver.Solve()
+                if status != pywraplp.Solver.OPTIMAL:
+                    logger.error(f"Relaxation could not be solved (status {status}).")
+                    return None
+                bound = offset + objective.Value()
+                loads = {room_id: load.solution_value() for room_id, load in room_loads.items()}
+                value = variance(loads)
+                if round_number == cut_rounds or value <= spread.solution_value() + 1e-6 * max(1.0, value):
+                    break
+                # Tangent at these loads: spread >= value + sum of slope * (load - current load)
+                mean = sum(loads.values()) / rooms
+                slopes = {room_id: 2 * (load - mean) / rooms for room_id, load in loads.items()}
+                constraint = solver.Constraint(value - sum(slopes[room_id] * load for room_id, load in loads.items()),
+                                               solver.infinity())
+                constraint.SetCoefficient(spread, 1.0)
+                for room_id, load in room_loads.items():
+                    constraint.SetCoefficient(load, -slopes[room_id])
+            return bound
+        finally:
+            state.restore(before)
+
+
+class _CpModel:
+    """CP-SAT model of placing `movable` (all unassigned in `state`) within `days`."""
+    def __init__(self, state, movable, days):
+        self.state = state
+        self.model = model = cp_model.CpModel()
+        weights = state.weights
+        rooms = len(state.room_ids)
+        first_minute = state.horizon_start + days.start * MINUTES_PER_DAY - SETUP_MINUTES
+        last_minute = state.horizon_start + days.stop * MINUTES_PER_DAY + CLEANUP_MINUTES
+
+        self.choices = {}  # position -> [(room_id, day, literal)]
+        self.starts = {}
+        objective = []
+        room_intervals = {room_id: [] for room_id in state.room_ids}
+        room_block_intervals = {}
+        room_loads = {room_id: [] for room_id in state.room_ids}
+        resource_intervals = {}
+        pool_intervals = {}  # pool id -> [(interval, units)]
+        surgeon_days = {}  # (surgeon_id, day) -> [(position, literal)]
+        for i in movable:
+            candidates = candidate_windows(state, i, days)
+            if not candidates:
+                continue
+            duration = state.durations[i]
+            start = model.NewIntVar(min(c[2] for c in candidates), max(c[3] for c in candidates), "")
+            choices = []
+            by_room = {}
+            for room_id, day, earliest, latest in candidates:
+                literal = model.NewBoolVar("")
+                model.Add(start >= earliest).OnlyEnforceIf(literal)
+                model.Add(start <= latest).OnlyEnforceIf(literal)
+                choices.append((room_id, day, literal))
+                by_room.setdefault(room_id, []).append(literal)
+                if state.surgeon_ids[i]:
+                    surgeon_days.setdefault((state.surgeon_ids[i], day), []).append((i, literal))
+            placed = model.NewBoolVar("")
+            model.Add(sum(literal for _, _, literal in choices) == placed)
+            self.choices[i] = choices
+            self.starts[i] = start
+
+            for room_id, literals in by_room.items():
+                in_room = literals[0] if len(literals) == 1 else model.NewBoolVar("")
+                if len(literals) > 1:
+                    model.Add(sum(literals) == in_room)
+                room_intervals[room_id].append(model.NewOptionalFixedSizeIntervalVar(
+                    start - SETUP_MINUTES, duration + SETUP_MINUTES + CLEANUP_MINUTES, in_room, ""))
+                if ("room", room_id) in state.blocked:
+                    room_block_intervals.setdefault(room_id, []).append(
+                        model.NewOptionalFixedSizeIntervalVar(start, duration, in_room, ""))
+                room_loads[room_id].append(duration * in_room)
+                if state.pool_needs[i]:
+                    transfer = state.equipment_pools.transfer_minutes(room_id)
+                    usage = model.NewOptionalFixedSizeIntervalVar(start - transfer, duration + 2 * transfer,
+                                                                  in_room, "")
+                    for pool_id, units in state.pool_needs[i]:
+                        pool_intervals.setdefault(pool_id, []).append((usage, units))
+            for key in state.resources[i]:
+                resource_intervals.setdefault(key, []).append(
+                    model.NewOptionalFixedSizeIntervalVar(start, duration, placed, ""))
+
+            # Linear terms of the score: placement, preferred room, stability and urgency delay
+            objective.append(weights["unscheduled"] * state.urgency[i] * placed)
+            objective.extend(weights["preference"] * literal for room_id, _, literal in choices
+                             if room_id == state.preferred_room[i])
+            anchor = state.anchors.get(i)
+            kept = [literal for room_id, day, literal in choices
+                    if anchor is not None and room_id == anchor[0] and day == state.day_of(anchor[1])]
+            if kept:
+                stable = model.NewBoolVar("")
+                model.AddImplication(stable, kept[0])
+                model.Add(start == anchor[1]).OnlyEnforceIf(stable)
+                objective.append(weights["stability"] * stable)
+            delay = model.NewIntVar(0, max(0, max(c[3] for c in candidates) - state.horizon_start), "")
+            model.Add(delay == start - state.horizon_start).OnlyEnforceIf(placed)
+            model.Add(delay == 0).OnlyEnforceIf(placed.Not())
+            objective.append(-weights["urgency_delay"] * state.urgency[i] / MINUTES_PER_DAY * delay)
+
+        # Fixed intervals of the frozen surgeries, maintenance windows, closures and absences
+        for room_id, intervals in room_intervals.items():
+            if intervals:
+                intervals.extend(self._fixed(state.indexes.get(("room", room_id)), first_minute, last_minute))
+                model.AddNoOverlap(intervals)
+        for room_id, intervals in room_block_intervals.items():
+            intervals.extend(self._fixed(state.blocked[("room", room_id)], first_minute, last_minute))
+            model.AddNoOverlap(intervals)
+        for key, intervals in resource_intervals.items():
+            intervals.extend(self._fixed(state.indexes.get(key), first_minute, last_minute))
+            intervals.extend(self._fixed(state.blocked.get(key), first_minute, last_minute))
+            model.AddNoOverlap(intervals)
+        # Equipment pools: at most `capacity` uses at a time, maintenance taking one unit each
+        for pool_id, uses in pool_intervals.items():
+            index = state.pool_indexes[pool_id]
+            fixed = self._fixed(index, first_minute - MINUTES_PER_DAY, last_minute + MINUTES_PER_DAY)
+            model.AddCumulative([interval for interval, _ in uses] + fixed,
+                                [units for _, units in uses] + [1] * len(fixed), index.capacity)
+
+        # Room balance: variance of the room loads, frozen surgeries included
+        load_squares = []
+        loads = []
+        most_total = 0
+        for room_id in state.room_ids:
+            frozen = state.room_load[room_id]
+            most = frozen + sum(state.durations[i] for i in movable if room_id in state.eligible_rooms[i])
+            load = model.NewIntVar(frozen, most, "")
+            model.Add(load == frozen + sum(room_loads[room_id]))
+            square = model.NewIntVar(frozen * frozen, most * most, "")
+            model.AddMultiplicationEquality(square, [load, load])
+            loads.append(load)
+            load_squares.append(square)
+            most_total += most
+        total = model.NewIntVar(state.total_load, most_total, "")
+        model.Add(total == sum(loads))
+        total_square = model.NewIntVar(state.total_load ** 2, most_total ** 2, "")
+        model.AddMultiplicationEquality(total_square, [total, total])
+        balance = weights["room_balance"] / 3600
+        objective.extend(-balance / rooms * square for square in load_squares)
+        objective.append(balance / rooms ** 2 * total_square)
+
+        # Compactness: a surgeon's idle time on a day is the span of their surgeries minus the busy time
+        frozen_idle = 0
+        for (surgeon_id, day), members in surgeon_days.items():
+            day_start = state.horizon_start + day * MINUTES_PER_DAY
+            first = model.NewIntVar(day_start, day_start + MINUTES_PER_DAY, "")
+            last = model.NewIntVar(day_start, day_start + MINUTES_PER_DAY, "")
+            model.Add(first <= last)
+            index = state.indexes.get(("surgeon", surgeon_id))
+            low, high = index.span(day_start, day_start + MINUTES_PER_DAY) if index is not None else (0, 0)
+            if low < high:
+                model.Add(first <= index.starts[low])
+                model.Add(last >= index.ends[high - 1])
+            else:
+                model.Add(first == last).OnlyEnforceIf([literal.Not() for _, literal in members])
+            for i, literal in members:
+                model.Add(first <= self.starts[i]).OnlyEnforceIf(literal)
+                model.Add(last >= self.starts[i] + state.durations[i]).OnlyEnforceIf(literal)
+            busy = state.surgeon_day_busy.get((surgeon_id, day), 0) + \
+                sum(state.durations[i] * literal for i, literal in members)
+            objective.append(-weights["compactness"] / 60 * (last - first - busy))
+            frozen_idle += state._surgeon_idle(surgeon_id, day)  # Re-counted by the model's idle term
+
+        model.Maximize(sum(objective))
+        # Score of the frozen surgeries without the terms the model recomputes
+        variance = state.load_squares / rooms - (state.total_load / rooms) ** 2
+        self.offset = state.score + balance * variance + weights["compactness"] * frozen_idle / 60
+
+    def _fixed(self, index, low, high):
+        if index is None:
+            return []
+        return [self.model.NewFixedSizeIntervalVar(index.starts[k], index.ends[k] - index.starts[k], "")
+                for k in index.covering(low, high) if index.ends[k] > low]
+
+    def hint(self, assignment):
+        """Suggests the given placements of the movable surgeries as the solver's first solution."""
+        for i, choices in self.choices.items():
+            room_id, start = assignment.get(i, (None, None))
+            day = self.state.day_of(start) if room_id is not None else None
+            for choice_room, choice_day, literal in choices:
+                self.model.AddHint(literal, choice_room == room_id and choice_day == day)
+            if room_id is not None:
+                self.model.AddHint(self.starts[i], start)
+
+    def placement(self, solver, i):
+        """(room_id, start) the solver chose for surgery i, or None."""
+        for room_id, _, literal in self.choices.get(i, ()):
+            if solver.BooleanValue(literal):
+                return room_id, solver.Value(self.starts[i])
+        return None
+
+
+if __name__ == "__main__":
+    from benchmarks.synthetic_hospital import generate_hospital
+    from repositories.memory_repository import InMemoryRepository
+    from scheduling_optimizer import TabuSearchScheduler
+
+    logging.basicConfig(level=logging.INFO)
+    hospital = generate_hospital(50, seed=0)
+    repository = InMemoryRepository({name: hospital[name] for name in ("operating_rooms", "surgeons", "equipment",
+                                                                      "surgeries")})
+    state = ScheduleState.from_repository(repository, horizon_start=hospital["horizon_start"],
+                                          horizon_days=hospital["horizon_days"])
+    exact = ExactScheduler(repository, time_limit=30.0)
+    bound = exact.relaxation_bound(state)
+    tabu = TabuSearchScheduler(repository)
+    tabu.run(state, max_iterations=200, seed=0, bound=bound)
+    print(f"Tabu Search score {state.score:.1f}, LP relaxation bound {bound:.1f}, gap {tabu.stats['gap']:.1%}")
+    exact.solve(state)  # Warm-started from the Tabu Search schedule
+    bound = min(bound, exact.stats["bound"])
+    print(f"CP-SAT {exact.stats['status']}: score {exact.stats['best_score']:.1f}, bound {exact.stats['bound']:.1f}, "
+          f"gap {optimality_gap(state.score, bound):.1%}")
@@ -1,8 +1,6 @@
 from mongodb_transaction_manager import MongoDBClient
 import logging
 
-# Setup basic logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def find_and_handle_duplicates_for_collection(db, collection_name, unique_field):
@@ -63,4 +61,6 @@ def main():
     logger.info("Cleanup completed.")
 
 if __name__ == "__main__":
+    # Setup basic logging
+    logging.basicConfig(level=logging.INFO)
     main()
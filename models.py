@@ -1,3 +1,4 @@
+from array import array
 import datetime
 
 class OperatingRoom:
@@ -342,4 +343,405 @@ class SurgeryAppointment:
             "room_id": self.room_id,
             "start_time": self.start_time,
             "end_time": self.end_time
-        }
\ No newline at end of file
+        }
+
+# ---------------------------------------------------------------------------
+# Memory-compact variants
+#
+# The classes above keep one __dict__ per instance and store times as strings, which is
+# fine for single documents but expensive for a year of history. The records below use
+# __slots__ and keep times as integer minutes since the Unix epoch (naive UTC), parsed
+# once at load time. SurgeryTable goes further and stores a whole set of surgeries as
+# parallel typed arrays.
+# ---------------------------------------------------------------------------
+
+EPOCH = datetime.datetime(1970, 1, 1)
+ONE_MINUTE = datetime.timedelta(minutes=1)
+MISSING_MINUTE = -1  # Sentinel for "no time" in integer and array columns
+
+
+def to_epoch_minutes(value):
+    """Converts a datetime, date or ISO string to minutes since the epoch; MISSING_MINUTE if absent."""
+    if type(value) is datetime.datetime and value.tzinfo is None:  # the common case for BSON dates
+        return (value - EPOCH) // ONE_MINUTE
+    if value is None or value == "":
+        return MISSING_MINUTE
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    elif not isinstance(value, datetime.datetime):  # a plain date
+        value = datetime.datetime(value.year, value.month, value.day)
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // ONE_MINUTE
+
+
+def from_epoch_minutes(minutes):
+    """Inverse of to_epoch_minutes; returns None for MISSING_MINUTE."""
+    if minutes == MISSING_MINUTE:
+        return None
+    return EPOCH + datetime.timedelta(minutes=minutes)
+
+
+class SlottedRecord:
+    """Base for the compact records: value equality and a readable repr over __slots__."""
+    __slots__ = ()
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._values() == other._values()
+
+    def __hash__(self):
+        return hash(self._values())
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class SurgeryRecord(SlottedRecord):
+    __slots__ = ("surgery_id", "patient_id", "surgeon_id", "room_id", "scheduled_minute", "surgery_type",
+                 "urgency_level", "duration", "status", "start_minute", "end_minute", "required_equipment_ids")
+
+    def __init__(self, surgery_id, patient_id, surgeon_id, room_id, scheduled_minute, surgery_type, urgency_level,
+                 duration, status, start_minute, end_minute, required_equipment_ids=()):
+        self.surgery_id = surgery_id
+        self.patient_id = patient_id
+        self.surgeon_id = surgeon_id
+        self.room_id = room_id
+        self.scheduled_minute = scheduled_minute
+        self.surgery_type = surgery_type
+        self.urgency_level = urgency_level
+        self.duration = duration
+        self.status = status
+        self.start_minute = start_minute
+        self.end_minute = end_minute
+        self.required_equipment_ids = tuple(required_equipment_ids)
+
+    @property
+    def start_time(self):
+        return from_epoch_minutes(self.start_minute)
+
+    @property
+    def end_time(self):
+        return from_epoch_minutes(self.end_minute)
+
+    @staticmethod
+    def from_document(document):
+        """Creates a SurgeryRecord from a MongoDB document, parsing the times once."""
+        return SurgeryRecord(
+            surgery_id=document.get("surgery_id"),
+            patient_id=document.get("patient_id"),
+            surgeon_id=document.get("surgeon_id"),
+            room_id=document.get("room_id"),
+            scheduled_minute=to_epoch_minutes(document.get("scheduled_date")),
+            surgery_type=document.get("surgery_type"),
+            urgency_level=document.get("urgency_level"),
+            duration=document.get("duration"),
+            status=document.get("status"),
+            start_minute=to_epoch_minutes(document.get("start_time")),
+            end_minute=to_epoch_minutes(document.get("end_time")),
+            required_equipment_ids=document.get("required_equipment_ids", ())
+        )
+
+    @staticmethod
+    def from_model(surgery):
+        """Converts a Surgery instance into its compact form."""
+        return SurgeryRecord.from_document(surgery.to_document())
+
+    def to_document(self):
+        """Converts the record into a MongoDB document with native datetimes."""
+        return {
+            "surgery_id": self.surgery_id,
+            "patient_id": self.patient_id,
+            "surgeon_id": self.surgeon_id,
+            "room_id": self.room_id,
+            "scheduled_date": from_epoch_minutes(self.scheduled_minute),
+            "surgery_type": self.surgery_type,
+            "urgency_level": self.urgency_level,
+            "duration": self.duration,
+            "status": self.status,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "required_equipment_ids": list(self.required_equipment_ids),
+        }
+
+
+class SurgeryRoomAssignmentRecord(SlottedRecord):
+    __slots__ = ("assignment_id", "surgery_id", "room_id", "start_minute", "end_minute")
+
+    def __init__(self, assignment_id, surgery_id, room_id, start_minute, end_minute):
+        self.assignment_id = assignment_id
+        self.surgery_id = surgery_id
+        self.room_id = room_id
+        self.start_minute = start_minute
+        self.end_minute = end_minute
+
+    @staticmethod
+    def from_document(document):
+        """Creates a SurgeryRoomAssignmentRecord from a MongoDB document."""
+        return SurgeryRoomAssignmentRecord(
+            assignment_id=document.get("assignment_id"),
+            surgery_id=document.get("surgery_id"),
+            room_id=document.get("room_id"),
+            start_minute=to_epoch_minutes(document.get("start_time")),
+            end_minute=to_epoch_minutes(document.get("end_time")),
+        )
+
+    def to_document(self):
+        """Converts the record into a MongoDB document with native datetimes."""
+        return {
+            "assignment_id": self.assignment_id,
+            "surgery_id": self.surgery_id,
+            "room_id": self.room_id,
+            "start_time": from_epoch_minutes(self.start_minute),
+            "end_time": from_epoch_minutes(self.end_minute),
+        }
+
+
+class SurgeryEquipmentUsageRecord(SlottedRecord):
+    __slots__ = ("usage_id", "surgery_id", "equipment_id", "start_minute", "end_minute")
+
+    def __init__(self, usage_id, surgery_id, equipment_id, start_minute=MISSING_MINUTE, end_minute=MISSING_MINUTE):
+        self.usage_id = usage_id
+        self.surgery_id = surgery_id
+        self.equipment_id = equipment_id
+        self.start_minute = start_minute
+        self.end_minute = end_minute
+
+    @staticmethod
+    def from_document(document):
+        """Creates a SurgeryEquipmentUsageRecord from a MongoDB document."""
+        return SurgeryEquipmentUsageRecord(
+            usage_id=document.get("usage_id"),
+            surgery_id=document.get("surgery_id"),
+            equipment_id=document.get("equipment_id"),
+            start_minute=to_epoch_minutes(document.get("start_time")),
+            end_minute=to_epoch_minutes(document.get("end_time")),
+        )
+
+    def to_document(self):
+        """Converts the record into a MongoDB document; times are only written when known."""
+        document = {
+            "usage_id": self.usage_id,
+            "surgery_id": self.surgery_id,
+            "equipment_id": self.equipment_id,
+        }
+        if self.start_minute != MISSING_MINUTE:
+            document["start_time"] = from_epoch_minutes(self.start_minute)
+            document["end_time"] = from_epoch_minutes(self.end_minute)
+        return document
+
+
+class SurgeryStaffAssignmentRecord(SlottedRecord):
+    __slots__ = ("assignment_id", "surgery_id", "staff_id", "role")
+
+    def __init__(self, assignment_id, surgery_id, staff_id, role):
+        self.assignment_id = assignment_id
+        self.surgery_id = surgery_id
+        self.staff_id = staff_id
+        self.role = role
+
+    @staticmethod
+    def from_document(document):
+        """Creates a SurgeryStaffAssignmentRecord from a MongoDB document."""
+        return SurgeryStaffAssignmentRecord(
+            assignment_id=document.get("assignment_id"),
+            surgery_id=document.get("surgery_id"),
+            staff_id=document.get("staff_id"),
+            role=document.get("role")
+        )
+
+    def to_document(self):
+        return {
+            "assignment_id": self.assignment_id,
+            "surgery_id": self.surgery_id,
+            "staff_id": self.staff_id,
+            "role": self.role
+        }
+
+
+class SurgeryAppointmentRecord(SlottedRecord):
+    """Compact SurgeryAppointment; staff assignments are (staff_id, role) tuples, not objects."""
+    __slots__ = ("appointment_id", "surgery_id", "patient_id", "staff_assignments", "room_id", "start_minute", "end_minute")
+
+    def __init__(self, appointment_id, surgery_id, patient_id, staff_assignments, room_id, start_minute, end_minute):
+        self.appointment_id = appointment_id
+        self.surgery_id = surgery_id
+        self.patient_id = patient_id
+        self.staff_assignments = tuple(staff_assignments)
+        self.room_id = room_id
+        self.start_minute = start_minute
+        self.end_minute = end_minute
+
+    @property
+    def staff_ids(self):
+        return tuple(staff_id for staff_id, _ in self.staff_assignments)
+
+    @staticmethod
+    def from_document(document):
+        """Creates a SurgeryAppointmentRecord from a MongoDB document."""
+        return SurgeryAppointmentRecord(
+            appointment_id=document.get("appointment_id"),
+            surgery_id=document.get("surgery_id"),
+            patient_id=document.get("patient_id"),
+            staff_assignments=[(sa.get("staff_id"), sa.get("role")) for sa in document.get("staff_assignments", ())],
+            room_id=document.get("room_id"),
+            start_minute=to_epoch_minutes(document.get("start_time")),
+            end_minute=to_epoch_minutes(document.get("end_time")),
+        )
+
+    def to_document(self):
+        return {
+            "appointment_id": self.appointment_id,
+            "surgery_id": self.surgery_id,
+            "patient_id": self.patient_id,
+            "staff_assignments": [{"staff_id": staff_id, "role": role} for staff_id, role in self.staff_assignments],
+            "room_id": self.room_id,
+            "start_time": from_epoch_minutes(self.start_minute),
+            "end_time": from_epoch_minutes(self.end_minute),
+        }
+
+
+class Codebook:
+    """Dictionary encoding for a low-cardinality column: each distinct value gets a small int code."""
+    __slots__ = ("values", "codes")
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def decode(self, code):
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class SurgeryTable:
+    """
+    Column store for a large set of surgeries.
+
+    Numeric fields live in typed `array` columns and low-cardinality strings (surgeon, room,
+    type, urgency, status) are dictionary-encoded into int codes, so a row costs a few dozen
+    bytes instead of a Surgery object with its own __dict__ and string timestamps. Equipment
+    lists use an offsets + values layout. Rows can still be read back as SurgeryRecord.
+    """
+    ENCODED_COLUMNS = ("surgeon_id", "room_id", "surgery_type", "urgency_level", "status")
+
+    def __init__(self):
+        self.surgery_ids = []
+        self.patient_ids = []
+        self.codebooks = {column: Codebook() for column in self.ENCODED_COLUMNS}
+        self.codes = {column: array('i') for column in self.ENCODED_COLUMNS}
+        self.durations = array('i')
+        self.scheduled_minutes = array('q')
+        self.start_minutes = array('q')
+        self.end_minutes = array('q')
+        self.equipment_offsets = array('i', [0])
+        self.equipment_codes = array('i')
+        self.equipment_codebook = Codebook()
+        self._row_by_surgery_id = None
+
+    def append(self, surgery_id, patient_id, surgeon_id, room_id, scheduled_minute, surgery_type, urgency_level,
+               duration, status, start_minute, end_minute, required_equipment_ids=()):
+        """Appends one row; times must already be epoch minutes (see to_epoch_minutes)."""
+        self.surgery_ids.append(surgery_id)
+        self.patient_ids.append(patient_id)
+        codebooks, codes = self.codebooks, self.codes
+        codes["surgeon_id"].append(codebooks["surgeon_id"].encode(surgeon_id))
+        codes["room_id"].append(codebooks["room_id"].encode(room_id))
+        codes["surgery_type"].append(codebooks["surgery_type"].encode(surgery_type))
+        codes["urgency_level"].append(codebooks["urgency_level"].encode(urgency_level))
+        codes["status"].append(codebooks["status"].encode(status))
+        self.durations.append(duration or 0)
+        self.scheduled_minutes.append(scheduled_minute)
+        self.start_minutes.append(start_minute)
+        self.end_minutes.append(end_minute)
+        encode_equipment = self.equipment_codebook.encode
+        self.equipment_codes.extend(encode_equipment(equipment_id) for equipment_id in required_equipment_ids)
+        self.equipment_offsets.append(len(self.equipment_codes))
+        self._row_by_surgery_id = None
+
+    def append_record(self, record):
+        self.append(record.surgery_id, record.patient_id, record.surgeon_id, record.room_id, record.scheduled_minute,
+                    record.surgery_type, record.urgency_level, record.duration, record.status,
+                    record.start_minute, record.end_minute, record.required_equipment_ids)
+
+    @staticmethod
+    def from_documents(documents):
+        """Builds a table from an iterable of surgery documents (e.g. a cursor)."""
+        table = SurgeryTable()
+        for document in documents:
+            table.append_record(SurgeryRecord.from_document(document))
+        return table
+
+    def __len__(self):
+        return len(self.surgery_ids)
+
+    def value(self, column, row):
+        """Decoded value of an encoded column (surgeon_id, room_id, ...) at a row."""
+        return self.codebooks[column].decode(self.codes[column][row])
+
+    def column(self, column):
+        """Decoded values of an encoded column, one per row, without building any records."""
+        values = self.codebooks[column].values
+        return [values[code] for code in self.codes[column]]
+
+    def equipment_ids(self, row):
+        decode = self.equipment_codebook.decode
+        start, end = self.equipment_offsets[row], self.equipment_offsets[row + 1]
+        return tuple(decode(code) for code in self.equipment_codes[start:end])
+
+    def record(self, row):
+        """Materialises one row as a SurgeryRecord."""
+        return SurgeryRecord(
+            self.surgery_ids[row], self.patient_ids[row], self.value("surgeon_id", row), self.value("room_id", row),
+            self.scheduled_minutes[row], self.value("surgery_type", row), self.value("urgency_level", row),
+            self.durations[row], self.value("status", row), self.start_minutes[row], self.end_minutes[row],
+            self.equipment_ids(row)
+        )
+
+    def __getitem__(self, row):
+        return self.record(row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.record(row)
+
+    def row_of(self, surgery_id):
+        """Row index of a surgery_id, or None; the index is built on first lookup."""
+        if self._row_by_surgery_id is None:
+            self._row_by_surgery_id = {surgery_id: row for row, surgery_id in enumerate(self.surgery_ids)}
+        return self._row_by_surgery_id.get(surgery_id)
+
+    def rows_overlapping(self, start_minute, end_minute):
+        """Rows whose [start, end) interval overlaps the given window."""
+        starts, ends = self.start_minutes, self.end_minutes
+        return [row for row in range(len(self)) if starts[row] < end_minute and ends[row] > start_minute
+                and starts[row] != MISSING_MINUTE]
+
+    def minutes_by(self, column):
+        """Sums scheduled minutes (end - start) per decoded value of an encoded column."""
+        totals = {}
+        starts, ends, codes = self.start_minutes, self.end_minutes, self.codes[column]
+        for row in range(len(self)):
+            if starts[row] != MISSING_MINUTE and ends[row] != MISSING_MINUTE:
+                code = codes[row]
+                totals[code] = totals.get(code, 0) + ends[row] - starts[row]
+        decode = self.codebooks[column].decode
+        return {decode(code): minutes for code, minutes in totals.items()}
+
+    def nbytes(self):
+        """Approximate bytes held by the numeric columns (id strings are not counted)."""
+        arrays = [self.durations, self.scheduled_minutes, self.start_minutes, self.end_minutes,
+                  self.equipment_offsets, self.equipment_codes] + list(self.codes.values())
+        return sum(column.itemsize * len(column) for column in arrays)
@@ -0,0 +1,130 @@
+import os
+
+# Client roles: "oltp" serves bookings and other writes, "analytics" serves KPI and reporting
+# reads. Each role gets its own MongoClient and therefore its own connection pool, so a long
+# report can never hold the connections the booking path is waiting for.
+OLTP = "oltp"
+ANALYTICS = "analytics"
+
+ROLE_DEFAULTS = {
+    OLTP: {
+        "max_pool_size": 50,
+        "min_pool_size": 5,
+        "max_idle_time_ms": 300000,
+        "server_selection_timeout_ms": 5000,
+        "read_preference": "primary",
+        "write_concern": "majority",
+        "retry_writes": True,
+        "retry_reads": True,
+        "compressors": "",
+    },
+    ANALYTICS: {
+        "max_pool_size": 10,
+        "min_pool_size": 0,
+        "max_idle_time_ms": 60000,
+        "server_selection_timeout_ms": 5000,
+        "read_preference": "secondaryPreferred",
+        "write_concern": None,
+        "retry_writes": True,
+        "retry_reads": True,
+        "compressors": "",
+    },
+}
+READ_PREFERENCES = ("primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest")
+
+
+def _parse_bool(value):
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class ClientSettings:
+    """
+    Connection settings for one client role.
+
+    Values come from the environment with the role's defaults as fallback. The OLTP role reads
+    MONGO_<NAME> (e.g. MONGO_MAX_POOL_SIZE); other roles read MONGO_<ROLE>_<NAME> first, then
+    MONGO_<NAME> for the URI, database and compressors, which are usually shared.
+
+    Args:
+        role (str): OLTP or ANALYTICS.
+        uri (str): MongoDB connection string.
+        database (str): Database name.
+        **options: Any of the keys in ROLE_DEFAULTS.
+    """
+    SHARED = ("uri", "database_name", "compressors")
+
+    def __init__(self, role, uri, database, **options):
+        if role not in ROLE_DEFAULTS:
+            raise ValueError(f"Unknown client role: {role}")
+        settings = dict(ROLE_DEFAULTS[role])
+        unknown = set(options) - set(settings)
+        if unknown:
+            raise ValueError(f"Unknown client settings: {sorted(unknown)}")
+        settings.update(options)
+        if settings["read_preference"] not in READ_PREFERENCES:
+            raise ValueError(f"Unknown read preference: {settings['read_preference']}")
+        self.role = role
+        self.uri = uri
+        self.database = database
+        for name, value in settings.items():
+            setattr(self, name, value)
+
+    @classmethod
+    def from_env(cls, role=OLTP, environ=None):
+        """Builds the settings of a role from environment variables."""
+        environ = os.environ if environ is None else environ
+
+        def lookup(name):
+            keys = [f"MONGO_{name.upper()}"]
+            if role != OLTP:
+                role_key = f"MONGO_{role.upper()}_{name.upper()}"
+                keys = [role_key] + keys if name in cls.SHARED else [role_key]
+            for key in keys:
+                if environ.get(key, "") != "":
+                    return environ[key]
+            return None
+
+        options = {}
+        for name, default in ROLE_DEFAULTS[role].items():
+            value = lookup(name)
+            if value is None:
+                continue
+            if isinstance(default, bool):
+                value = _parse_bool(value)
+            elif isinstance(default, int):
+                value = int(value)
+            options[name] = value
+        return cls(
+            role,
+            lookup("uri") or "mongodb://localhost:27017",
+            lookup("database_name") or "myappdb",
+            **options
+        )
+
+    def client_kwargs(self):
+        """Keyword arguments for pymongo.MongoClient."""
+        kwargs = {
+            "appname": f"surgery-scheduler-{self.role}",
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "readPreference": self.read_preference,
+            "retryWrites": self.retry_writes,
+            "retryReads": self.retry_reads,
+        }
+        if self.write_concern:
+            kwargs["w"] = int(self.write_concern) if str(self.write_concern).isdigit() else self.write_concern
+        compressors = [name.strip() for name in self.compressors.split(",") if name.strip()]
+        if compressors:
+            # zstd needs the zstandard package and snappy python-snappy; zlib is built in
+            kwargs["compressors"] = ",".join(compressors)
+        return kwargs
+
+    def __repr__(self):
+        return f"ClientSettings(role={self.role!r}, database={self.database!r}, {self.client_kwargs()})"
+
+
+if __name__ == "__main__":
+    for role in (OLTP, ANALYTICS):
+        print(ClientSettings.from_env(role))
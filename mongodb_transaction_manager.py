@@ -1,10 +1,12 @@
-from pymongo import MongoClient
 from contextlib import contextmanager
 import os
-from dotenv import load_dotenv
 
 class MongoDBClient:
     _instance = None
+    # QueryMonitor attached to the clients when command monitoring is enabled
+    command_monitor = None
+    # Clients of the roles other than OLTP (see mongo_settings.py): role -> (MongoClient, Database)
+    _role_clients = {}
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
@@ -16,37 +18,96 @@ class MongoDBClient:
             self._initialize_client()
 
     def _initialize_client(self):
+        from mongo_settings import OLTP
+
+        self.client, self.db = MongoDBClient._connect(OLTP)
+        if self.client is not None:
+            self.initialized = True  # Mark as initialized only if connection succeeds
+
+    @staticmethod
+    def _connect(role):
+        """Creates the MongoClient of a role; returns (client, db), or (None, None) if the server is unreachable."""
+        # Imported here so that importing this module never pays for the driver
+        from pymongo import MongoClient
+        from dotenv import load_dotenv
+        from mongo_settings import ClientSettings
+
         load_dotenv()  # Load environment variables from .env file
-        MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-        DATABASE_NAME = os.getenv("MONGO_DATABASE_NAME", "myappdb")
-        
+        settings = ClientSettings.from_env(role)
+
+        if MongoDBClient.command_monitor is None and os.getenv("MONGO_COMMAND_MONITORING", "").lower() in ("1", "true", "yes"):
+            MongoDBClient.enable_command_monitoring()
+        event_listeners = [MongoDBClient.command_monitor] if MongoDBClient.command_monitor is not None else []
+
         try:
-            # Configuring MongoClient with connection pooling parameters
-            self.client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000, maxPoolSize=50)
-            self.db = self.client[DATABASE_NAME]
+            client = MongoClient(settings.uri, event_listeners=event_listeners, **settings.client_kwargs())
             # Perform a quick operation to check the connection is valid
-            self.client.server_info()
+            client.server_info()
         except Exception as e:
-            print(f"Error connecting to MongoDB: {e}")
-            self.client = None
-            self.db = None
-        else:
-            self.initialized = True  # Mark as initialized only if connection succeeds
+            print(f"Error connecting to MongoDB ({role}): {e}")
+            return None, None
+        return client, client[settings.database]
 
     @classmethod
-    def get_client(cls):
+    def get_client(cls, role="oltp"):
+        """Returns the MongoClient of a role ("oltp" for bookings, "analytics" for reporting reads)."""
+        if role != "oltp":
+            return cls._role_connection(role)[0]
         # Ensure MongoDBClient is initialized before returning the client
         if not cls._instance:
             cls()
         return cls._instance.client
 
     @classmethod
-    def get_db(cls):
+    def get_db(cls, role="oltp"):
+        """Returns the database handle of a role; each role has its own connection pool."""
+        if role != "oltp":
+            return cls._role_connection(role)[1]
         # Ensure MongoDBClient is initialized before returning the db
         if not cls._instance:
             cls()
         return cls._instance.db
 
+    @classmethod
+    def _role_connection(cls, role):
+        connection = cls._role_clients.get(role)
+        if connection is None:
+            connection = cls._connect(role)
+            if connection[0] is not None:
+                cls._role_clients[role] = connection
+        return connection
+
+    @classmethod
+    def enable_command_monitoring(cls, monitor=None):
+        """
+        Records every command the client sends (see utils/query_monitor.py).
+
+        Must be called before the first connection, or set MONGO_COMMAND_MONITORING=1;
+        listeners cannot be added to a MongoClient that already exists.
+
+        Returns:
+            QueryMonitor: The monitor collecting the per-call-site statistics.
+        """
+        if cls.command_monitor is None or monitor is not None:
+            from utils.query_monitor import QueryMonitor
+            cls.command_monitor = monitor if monitor is not None else QueryMonitor()
+        if cls._instance is not None and getattr(cls._instance, "client", None) is not None:
+            print("Command monitoring enabled after connecting; the existing client is not monitored.")
+        return cls.command_monitor
+
+class LazyDatabase:
+    """
+    Stand-in for the pymongo Database that connects on first use.
+
+    Lets modules keep `from db_config import db` at the top without opening a connection
+    (and running server_info()) at import time.
+    """
+    def __getattr__(self, name):
+        return getattr(MongoDBClient.get_db(), name)
+
+    def __getitem__(self, name):
+        return MongoDBClient.get_db()[name]
+
 # MongoDB Transaction Manager
 class MongoDBTransactionManager:
     @staticmethod
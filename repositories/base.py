@@ -0,0 +1,229 @@
+from contextlib import asynccontextmanager, contextmanager
+import threading
+from utils.bulk_decoder import BulkDecoder, SURGERY_FIELDS
+
+
+def period_query(start_date=None, end_date=None):
+    """Builds the surgeries filter for an analysis period; an open period matches everything."""
+    query = {}
+    if start_date is not None:
+        query["start_time"] = {"$gte": start_date}
+    if end_date is not None:
+        query["end_time"] = {"$lte": end_date}
+    return query
+
+
+class RepositoryError(Exception):
+    """Raised by repositories when the storage backend fails (wraps e.g. PyMongoError)."""
+
+
+class DuplicateKeyError(RepositoryError):
+    """Raised when a write would store a second document with the same _id (or unique key)."""
+
+
+class BulkWriteError(RepositoryError):
+    """
+    Raised by the bulk writes when some operations failed.
+
+    With an unordered bulk write every other operation has been applied; with an ordered one
+    the operations after the first failure were not attempted.
+
+    Args:
+        message (str): Error message.
+        failures (dict): {operation index: error message} of the failed operations.
+    """
+    def __init__(self, message, failures):
+        super().__init__(message)
+        self.failures = failures
+
+
+class Repository:
+    """
+    Storage interface used by the services, the KPI calculators and the optimizer.
+
+    Documents are plain dicts shaped like the MongoDB collections (see models.py). Queries use
+    the MongoDB filter syntax; the in-memory implementation supports equality, dotted paths,
+    $gt/$gte/$lt/$lte/$ne/$in/$exists/$elemMatch and $or/$and/$nor, and updates with
+    $set/$setOnInsert/$unset/$inc/$push/$pull. Anything scheduling-specific (overlap checks, usage
+    aggregates) has its own method so each backend can answer it with its best index.
+    """
+
+    def find(self, collection, query=None, projection=None, sort=None, limit=0, batch_size=None):
+        """
+        Returns an iterable of the documents matching `query`.
+
+        Args:
+            collection (str): Collection name.
+            query (dict, optional): MongoDB-style filter.
+            projection (dict, optional): Fields to include (1) or exclude (0).
+            sort (list, optional): (field, direction) pairs, direction 1 or -1.
+            limit (int): Maximum number of documents, 0 for no limit.
+            batch_size (int, optional): Hint for backends that stream results.
+        """
+        raise NotImplementedError
+
+    def find_one(self, collection, query, projection=None):
+        """Returns the first document matching `query`, or None."""
+        raise NotImplementedError
+
+    def count(self, collection, query=None):
+        """Returns the number of documents matching `query`."""
+        raise NotImplementedError
+
+    def insert_one(self, collection, document):
+        """Inserts a document and returns its _id."""
+        raise NotImplementedError
+
+    def insert_many(self, collection, documents, ordered=True):
+        """
+        Inserts several documents in one batch and returns their _ids.
+
+        Args:
+            collection (str): Collection name.
+            documents (list): Documents to insert.
+            ordered (bool): Stop at the first failure; with False every document is attempted.
+
+        Raises:
+            BulkWriteError: Some documents could not be inserted (e.g. duplicate keys).
+        """
+        raise NotImplementedError
+
+    def update_one(self, collection, query, update, upsert=False):
+        """Applies `update` to the first matching document; returns True if a document was modified or upserted."""
+        raise NotImplementedError
+
+    def bulk_update(self, collection, operations):
+        """
+        Applies several update_one() operations in one unordered batch.
+
+        Args:
+            collection (str): Collection name.
+            operations (list): (query, update, upsert) tuples.
+
+        Raises:
+            BulkWriteError: Some operations failed; all the others have been applied. An upsert
+                whose query includes _id fails with a duplicate key when the document exists but
+                does not match, so for such operations "not failed" means "applied".
+        """
+        raise NotImplementedError
+
+    def delete_one(self, collection, query):
+        """Deletes the first matching document; returns True if one was deleted."""
+        raise NotImplementedError
+
+    def document_id(self, value):
+        """Converts an external id (e.g. a hex string) to the backend's _id type."""
+        return value
+
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager making the writes of its block atomic: all are kept, or none if it raises.
+
+        Calls from the same thread inside the block take part in the transaction; a nested
+        transaction() joins the outer one. The base implementation gives no atomicity.
+        """
+        yield self
+
+    def list_collection_names(self):
+        raise NotImplementedError
+
+    def find_overlapping(self, collection, start_time, end_time, field=None, value=None):
+        """
+        Returns the documents whose [start_time, end_time) interval overlaps the given one.
+
+        Args:
+            collection (str): Collection with start_time/end_time fields.
+            start_time (datetime): Start of the interval.
+            end_time (datetime): End of the interval.
+            field (str, optional): Resource field to filter on, e.g. "room_id" or
+                "staff_assignments.staff_id".
+            value (optional): Value the resource field must have.
+        """
+        raise NotImplementedError
+
+    def count_overlapping(self, collection, start_time, end_time, field=None, value=None):
+        """Number of documents returned by find_overlapping()."""
+        return len(self.find_overlapping(collection, start_time, end_time, field, value))
+
+    def room_usage_hours(self, start_date=None, end_date=None, status=None):
+        """Returns {room_id: hours} of surgeries in the period, optionally filtered by status."""
+        raise NotImplementedError
+
+    def equipment_usage_hours(self, start_date=None, end_date=None, status=None):
+        """Returns {equipment_id: hours} of surgeries in the period (by required_equipment_ids)."""
+        raise NotImplementedError
+
+    def surgery_table(self, query=None):
+        """
+        Returns the matching surgeries as a models.SurgeryTable, e.g. to load a ScheduleState.
+
+        The base implementation fills the table from find(); backends that can fetch raw
+        batches decode them straight into the table instead.
+        """
+        return BulkDecoder.fill_surgery_table(self.find("surgeries", query, SURGERY_FIELDS.projection()))
+
+
+class service_entry_point:
+    """
+    Decorator for a service method that may also be called on the class itself.
+
+    The services used to be collections of static methods (PatientService.get_patient("P1"));
+    they now take a repository, and these calls keep working: called on the class, the method
+    runs on a shared instance of it built with the default MongoRepository, created on first use.
+    Called on an instance, it is an ordinary method.
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, function):
+        self.function = function
+        self.__doc__ = function.__doc__
+        self.__name__ = function.__name__
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            instance = self.default_instance(owner)
+        return self.function.__get__(instance, owner)
+
+    @classmethod
+    def default_instance(cls, owner):
+        """The shared default-repository instance of a service class."""
+        instance = owner.__dict__.get("_default_instance")
+        if instance is None:
+            with cls._lock:
+                instance = owner.__dict__.get("_default_instance")
+                if instance is None:
+                    instance = owner()
+                    owner._default_instance = instance
+        return instance
+
+
+class AsyncRepositoryAdapter:
+    """
+    Exposes a synchronous Repository through the coroutine interface of AsyncMongoRepository.
+
+    Meant for backends that never block, such as InMemoryRepository, so the async services can
+    run on in-memory data; every call completes inline. find() returns a list, like the async
+    Mongo implementation, and document_id() stays synchronous. transaction() wraps the
+    repository's own; since no call inside it ever suspends, no other task's writes can land in
+    the transaction's undo log.
+    """
+    SYNC_METHODS = ("document_id",)
+
+    def __init__(self, repository):
+        self.repository = repository
+
+    def __getattr__(self, name):
+        method = getattr(self.repository, name)
+        if name in self.SYNC_METHODS or not callable(method):
+            return method
+
+        async def call(*args, **kwargs):
+            result = method(*args, **kwargs)
+            return list(result) if name == "find" else result
+        return call
+
+    @asynccontextmanager
+    async def transaction(self):
+        with self.repository.transaction():
+            yield self
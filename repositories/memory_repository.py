@@ -0,0 +1,467 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import copy
+import itertools
+import operator
+import threading
+from contextlib import contextmanager
+from models import to_epoch_minutes, MISSING_MINUTE
+from repositories.base import Repository, RepositoryError, DuplicateKeyError, BulkWriteError, period_query
+from utils.interval_index import TimeIndex
+
+COMPARISONS = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le}
+
+
+def resolve(document, path):
+    """Values found at a dotted path; arrays of sub-documents are traversed like MongoDB does."""
+    current = [document]
+    for part in path.split("."):
+        found = []
+        for value in current:
+            if isinstance(value, dict):
+                if part in value:
+                    found.append(value[part])
+            elif isinstance(value, list):
+                found.extend(item[part] for item in value if isinstance(item, dict) and part in item)
+        current = found
+    return current
+
+
+def _candidates(values):
+    for value in values:
+        yield value
+        if isinstance(value, list):
+            yield from value
+
+
+def _compare(compare, value, argument):
+    try:
+        return value is not None and compare(value, argument)
+    except TypeError:  # Different BSON types never match a range query
+        return False
+
+
+def _matches_condition(values, condition):
+    if not (isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition)):
+        return any(value == condition for value in _candidates(values))
+    for op, argument in condition.items():
+        if op in COMPARISONS:
+            matched = any(_compare(COMPARISONS[op], value, argument) for value in _candidates(values))
+        elif op == "$ne":
+            matched = all(value != argument for value in _candidates(values))
+        elif op == "$in":
+            matched = any(value in argument for value in _candidates(values))
+        elif op == "$exists":
+            matched = bool(values) == bool(argument)
+        elif op == "$elemMatch":
+            matched = any(isinstance(item, dict) and matches(item, argument)
+                          for value in values if isinstance(value, list) for item in value)
+        else:
+            raise RepositoryError(f"Unsupported query operator {op}")
+        if not matched:
+            return False
+    return True
+
+
+def matches(document, query):
+    """True if a document satisfies a MongoDB-style filter (see Repository for the supported subset)."""
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, sub_query) for sub_query in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, sub_query) for sub_query in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(document, sub_query) for sub_query in condition):
+                return False
+        elif not _matches_condition(resolve(document, key), condition):
+            return False
+    return True
+
+
+def _positional_index(array, prefix, query):
+    """Index of the first array element matched by the query conditions on `prefix` (the `$` operator)."""
+    sub_query = {key[len(prefix) + 1:]: condition for key, condition in query.items() if key.startswith(prefix + ".")}
+    for index, item in enumerate(array):
+        if isinstance(item, dict) and matches(item, sub_query):
+            return index
+    raise RepositoryError(f"The positional operator did not find the match needed from the query on {prefix}")
+
+
+def _parent(document, path, query):
+    """Returns (container, key) for the last element of a dotted path, creating sub-documents as needed."""
+    parts = path.split(".")
+    container = document
+    for position, part in enumerate(parts[:-1]):
+        if part == "$":
+            part = _positional_index(container, ".".join(parts[:position]), query)
+        if isinstance(container, list):
+            container = container[int(part)]
+        else:
+            container = container.setdefault(part, {})
+    last = parts[-1]
+    if last == "$":
+        last = _positional_index(container, ".".join(parts[:-1]), query)
+    elif isinstance(container, list):
+        last = int(last)
+    return container, last
+
+
+def apply_update(document, update, query, inserting=False):
+    """Applies $set/$setOnInsert/$unset/$inc/$push/$pull to a document in place."""
+    for op, fields in update.items():
+        if op == "$setOnInsert" and not inserting:
+            continue
+        for path, value in fields.items():
+            container, key = _parent(document, path, query)
+            if op in ("$set", "$setOnInsert"):
+                container[key] = value
+            elif op == "$unset":
+                if isinstance(container, dict):
+                    container.pop(key, None)
+            elif op == "$inc":
+                container[key] = container.get(key, 0) + value
+            elif op == "$push":
+                container.setdefault(key, []).append(value)
+            elif op == "$pull":
+                array = container.get(key, [])
+                if isinstance(value, dict):
+                    container[key] = [item for item in array if not (isinstance(item, dict) and matches(item, value))]
+                else:
+                    container[key] = [item for item in array if item != value]
+            else:
+                raise RepositoryError(f"Unsupported update operator {op}")
+
+
+def project(document, projection):
+    if not projection:
+        return dict(document)
+    included = {field for field, flag in projection.items() if flag and field != "_id"}
+    if included:
+        result = {field: document[field] for field in included if field in document}
+        if projection.get("_id", 1) and "_id" in document:
+            result["_id"] = document["_id"]
+        return result
+    excluded = {field for field, flag in projection.items() if not flag}
+    return {field: value for field, value in document.items() if field not in excluded}
+
+
+class InMemoryRepository(Repository):
+    """
+    Repository that keeps every collection in process memory.
+
+    Lookups by a collection's id field go through a hash index and overlap queries through
+    per-resource TimeIndex structures, which are built on first use and kept up to date on
+    every write. Returned documents are shallow copies; nested values are shared and must
+    be treated as read-only. Stored documents are never modified in place (an update stores
+    a new copy), which makes fork() a cheap copy-on-write snapshot. Each write holds a lock, so a
+    conditional update_one is atomic like in MongoDB even with several threads, and reads take the
+    same lock while they walk the collection and its indexes, so a concurrent write never changes
+    a dict under an iterating reader. transaction() keeps an undo log of the writes
+    in its block and replays it if the block raises. Like MongoRepository's session the undo log
+    belongs to the thread that opened the transaction, so other threads' writes are neither
+    rolled back with it nor isolated from it.
+    """
+    # Hash-indexed lookup field of each collection. Like the fields they stand for in MongoDB
+    # these are not unique (e.g. equipment_id repeats across usages), so each value maps to the
+    # set of documents carrying it; uniqueness is up to the unique indexes of setup_database.py.
+    ID_FIELDS = {
+        "surgeries": "surgery_id",
+        "operating_rooms": "room_id",
+        "patients": "patient_id",
+        "staff": "staff_id",
+        "surgeons": "surgeon_id",
+        "equipment": "equipment_id",
+        "surgery_equipment": "equipment_id",
+        "surgery_appointments": "appointment_id",
+        "surgery_room_assignments": "assignment_id",
+        "surgery_staff_assignments": "assignment_id",
+        "surgery_equipment_usage": "usage_id",
+    }
+
+    def __init__(self, collections=None):
+        self._documents = {}      # collection -> {key: document}
+        self._id_indexes = {}     # collection -> {id value: {keys}}
+        self._primary_keys = {}   # collection -> {_id: key}
+        self._time_indexes = {}   # (collection, field) -> {value: TimeIndex}
+        self._local = threading.local()  # .journal: [(collection, key, document before)] of this thread's transaction
+        self._write_lock = threading.RLock()
+        self._keys = itertools.count()
+        for name, documents in (collections or {}).items():
+            self.insert_many(name, documents)
+
+    @classmethod
+    def from_repository(cls, repository, collections):
+        """Snapshot of some collections of another repository, e.g. the production MongoDB."""
+        return cls({name: repository.find(name, None, {"_id": 0}) for name in collections})
+
+    def fork(self):
+        """
+        Returns an independent copy of this repository that shares the stored documents.
+
+        Only the collection and index maps are copied, not the documents: since writes
+        replace documents instead of modifying them, the fork and the original never see
+        each other's changes. Overlap indexes are rebuilt by the fork on first use.
+        """
+        with self._write_lock:
+            fork = InMemoryRepository()
+            fork._documents = {name: dict(documents) for name, documents in self._documents.items()}
+            fork._id_indexes = {name: {value: set(keys) for value, keys in index.items()}
+                                for name, index in self._id_indexes.items()}
+            fork._primary_keys = {name: dict(keys) for name, keys in self._primary_keys.items()}
+            fork._keys = itertools.count(next(self._keys))
+            return fork
+
+    # ------------------------------------------------------------------ indexing
+
+    def _index(self, collection, key, document):
+        id_field = self.ID_FIELDS.get(collection)
+        if id_field is not None and document.get(id_field) is not None:
+            self._id_indexes.setdefault(collection, {}).setdefault(document[id_field], set()).add(key)
+        for (indexed_collection, field), indexes in self._time_indexes.items():
+            if indexed_collection == collection:
+                self._add_to_time_index(indexes, field, key, document)
+
+    def _unindex(self, collection, key, document):
+        id_field = self.ID_FIELDS.get(collection)
+        if id_field is not None:
+            keys = self._id_indexes.get(collection, {}).get(document.get(id_field))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._id_indexes[collection][document.get(id_field)]
+        for (indexed_collection, _), indexes in self._time_indexes.items():
+            if indexed_collection == collection:
+                for index in indexes.values():
+                    if key in index.spans:
+                        index.remove(key)
+
+    @staticmethod
+    def _add_to_time_index(indexes, field, key, document):
+        start = to_epoch_minutes(document.get("start_time"))
+        end = to_epoch_minutes(document.get("end_time"))
+        if start == MISSING_MINUTE or end == MISSING_MINUTE:
+            return
+        values = {None} if field is None else set(_candidates(resolve(document, field)))
+        for value in values:
+            indexes.setdefault(value, TimeIndex()).add(key, start, end)
+
+    def _time_index(self, collection, field):
+        indexes = self._time_indexes.get((collection, field))
+        if indexes is None:
+            indexes = self._time_indexes[(collection, field)] = {}
+            for key, document in self._documents.get(collection, {}).items():
+                self._add_to_time_index(indexes, field, key, document)
+        return indexes
+
+    def _matching_keys(self, collection, query):
+        documents = self._documents.get(collection, {})
+        id_field = self.ID_FIELDS.get(collection)
+        if "_id" in query and not isinstance(query["_id"], dict):
+            key = self._primary_keys.get(collection, {}).get(query["_id"])
+            if key is not None and matches(documents[key], query):
+                yield key
+            return
+        if id_field is not None and id_field in query and not isinstance(query[id_field], dict):
+            # Sorted keys are insertion order, the order a full scan returns
+            for key in sorted(self._id_indexes.get(collection, {}).get(query[id_field], ())):
+                if matches(documents[key], query):
+                    yield key
+            return
+        for key, document in documents.items():
+            if matches(document, query):
+                yield key
+
+    # ------------------------------------------------------------------ transactions
+
+    def _record(self, collection, key, before):
+        journal = getattr(self._local, "journal", None)
+        if journal is not None:
+            journal.append((collection, key, before))
+
+    def _restore(self, collection, key, before):
+        """Puts back the document a key had before a write (None: it did not exist)."""
+        documents = self._documents.setdefault(collection, {})
+        primary_keys = self._primary_keys.setdefault(collection, {})
+        current = documents.pop(key, None)
+        if current is not None:
+            primary_keys.pop(current["_id"], None)
+            self._unindex(collection, key, current)
+        if before is not None:
+            documents[key] = before
+            primary_keys[before["_id"]] = key
+            self._index(collection, key, before)
+
+    @contextmanager
+    def transaction(self):
+        if getattr(self._local, "journal", None) is not None:
+            yield self  # Already inside a transaction; join it
+            return
+        journal = self._local.journal = []
+        try:
+            yield self
+        except BaseException:
+            self._local.journal = None
+            with self._write_lock:
+                for collection, key, before in reversed(journal):
+                    self._restore(collection, key, before)
+            raise
+        self._local.journal = None
+
+    # ------------------------------------------------------------------ Repository
+
+    def find(self, collection, query=None, projection=None, sort=None, limit=0, batch_size=None):
+        with self._write_lock:
+            documents = self._documents.get(collection, {})
+            results = [documents[key] for key in self._matching_keys(collection, query or {})]
+        for field, direction in reversed(sort or []):
+            results.sort(key=lambda document: self._sort_key(document, field), reverse=direction < 0)
+        if limit:
+            results = results[:limit]
+        return [project(document, projection) for document in results]
+
+    @staticmethod
+    def _sort_key(document, field):
+        values = resolve(document, field)
+        value = values[0] if values else None
+        return (value is not None, value)
+
+    def find_one(self, collection, query, projection=None):
+        with self._write_lock:
+            key = next(self._matching_keys(collection, query or {}), None)
+            document = None if key is None else self._documents[collection][key]
+        return None if document is None else project(document, projection)
+
+    def count(self, collection, query=None):
+        with self._write_lock:
+            return sum(1 for _ in self._matching_keys(collection, query or {}))
+
+    def insert_one(self, collection, document):
+        with self._write_lock:
+            return self._insert_one(collection, document)
+
+    def _insert_one(self, collection, document):
+        document = copy.deepcopy(document)
+        key = next(self._keys)
+        document.setdefault("_id", key)
+        primary_keys = self._primary_keys.setdefault(collection, {})
+        if document["_id"] in primary_keys:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {collection} _id: {document['_id']!r}")
+        primary_keys[document["_id"]] = key
+        self._documents.setdefault(collection, {})[key] = document
+        self._index(collection, key, document)
+        self._record(collection, key, None)
+        return document["_id"]
+
+    def insert_many(self, collection, documents, ordered=True):
+        ids, failures = [], {}
+        for index, document in enumerate(documents):
+            try:
+                ids.append(self.insert_one(collection, document))
+            except DuplicateKeyError as e:
+                failures[index] = str(e)
+                if ordered:
+                    break
+        if failures:
+            raise BulkWriteError(f"{len(failures)} inserts into {collection} failed", failures)
+        return ids
+
+    def update_one(self, collection, query, update, upsert=False):
+        with self._write_lock:
+            return self._update_one(collection, query, update, upsert)
+
+    def _update_one(self, collection, query, update, upsert):
+        key = next(self._matching_keys(collection, query), None)
+        if key is None:
+            if not upsert:
+                return False
+            document = {field: value for field, value in query.items()
+                        if not field.startswith("$") and not isinstance(value, dict)}
+            apply_update(document, update, query, inserting=True)
+            self.insert_one(collection, document)
+            return True
+        before = self._documents[collection][key]
+        document = copy.deepcopy(before)
+        apply_update(document, update, query)
+        self._unindex(collection, key, before)
+        self._documents[collection][key] = document
+        self._index(collection, key, document)
+        self._record(collection, key, before)
+        return document != before
+
+    def bulk_update(self, collection, operations):
+        failures = {}
+        for index, (query, update, upsert) in enumerate(operations):
+            try:
+                self.update_one(collection, query, update, upsert=upsert)
+            except RepositoryError as e:
+                failures[index] = str(e)
+        if failures:
+            raise BulkWriteError(f"{len(failures)} updates of {collection} failed", failures)
+
+    def delete_one(self, collection, query):
+        with self._write_lock:
+            return self._delete_one(collection, query)
+
+    def _delete_one(self, collection, query):
+        key = next(self._matching_keys(collection, query), None)
+        if key is None:
+            return False
+        document = self._documents[collection].pop(key)
+        self._primary_keys[collection].pop(document["_id"], None)
+        self._unindex(collection, key, document)
+        self._record(collection, key, document)
+        return True
+
+    def list_collection_names(self):
+        with self._write_lock:
+            return list(self._documents)
+
+    def find_overlapping(self, collection, start_time, end_time, field=None, value=None):
+        with self._write_lock:
+            index = self._time_index(collection, field).get(value if field is not None else None)
+            if index is None:
+                return []
+            documents = self._documents[collection]
+            keys = index.overlapping(to_epoch_minutes(start_time), to_epoch_minutes(end_time))
+            found = [documents[key] for key in keys]
+        return [dict(document) for document in found]
+
+    def _usage_hours(self, start_date, end_date, status, field):
+        query = period_query(start_date, end_date)
+        if status is not None:
+            query["status"] = status
+        with self._write_lock:
+            surgeries = [self._documents["surgeries"][key] for key in self._matching_keys("surgeries", query)]
+        usage = {}
+        for surgery in surgeries:
+            start = to_epoch_minutes(surgery.get("start_time"))
+            end = to_epoch_minutes(surgery.get("end_time"))
+            if start == MISSING_MINUTE or end == MISSING_MINUTE:
+                continue
+            hours = (end - start) / 60
+            values = [surgery.get(field)] if field == "room_id" else surgery.get(field) or []
+            for value in values:
+                usage[value] = usage.get(value, 0.0) + hours
+        return usage
+
+    def room_usage_hours(self, start_date=None, end_date=None, status=None):
+        return self._usage_hours(start_date, end_date, status, "room_id")
+
+    def equipment_usage_hours(self, start_date=None, end_date=None, status=None):
+        return self._usage_hours(start_date, end_date, status, "required_equipment_ids")
+
+
+if __name__ == "__main__":
+    from datetime import datetime
+    repository = InMemoryRepository({
+        "surgery_appointments": [
+            {"appointment_id": "APPT001", "room_id": "OR001", "staff_assignments": [{"staff_id": "S1", "role": "Nurse"}],
+             "start_time": datetime(2023, 8, 1, 9), "end_time": datetime(2023, 8, 1, 11)},
+        ]
+    })
+    print(repository.count_overlapping("surgery_appointments", datetime(2023, 8, 1, 10), datetime(2023, 8, 1, 12),
+                                       "room_id", "OR001"))
+    print(repository.find_one("surgery_appointments", {"staff_assignments.staff_id": "S1"}))
@@ -0,0 +1,191 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import functools
+import threading
+from contextlib import contextmanager
+from mongodb_transaction_manager import MongoDBClient
+from repositories.base import Repository, RepositoryError, DuplicateKeyError, BulkWriteError, period_query
+from utils.bulk_decoder import BulkDecoder
+from utils.lazy_import import lazy_import, optional_exceptions
+
+pymongo = lazy_import("pymongo")
+errors = optional_exceptions("pymongo.errors")
+objectid = lazy_import("bson.objectid")
+
+
+def bulk_write_error(error):
+    """Converts a pymongo BulkWriteError into ours, keeping the index of every failed operation."""
+    failures = {item["index"]: item.get("errmsg", "") for item in error.details.get("writeErrors", [])}
+    return BulkWriteError(str(error), failures)
+
+
+def translate_errors(method):
+    """Re-raises PyMongoError from a repository method as RepositoryError."""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except errors.DuplicateKeyError as e:
+            raise DuplicateKeyError(str(e)) from e
+        except errors.BulkWriteError as e:
+            raise bulk_write_error(e) from e
+        except errors.PyMongoError as e:
+            raise RepositoryError(str(e)) from e
+    return wrapper
+
+
+class MongoRepository(Repository):
+    """
+    Repository backed by a MongoDB database (or a compatible handle such as mongomock).
+
+    Args:
+        db (Database, optional): Handle to use; defaults to MongoDBClient.get_db(role) on first use.
+        role (str): Client role of the default handle, "oltp" or "analytics" (see mongo_settings.py).
+    """
+
+    def __init__(self, db=None, role="oltp"):
+        self._db = db
+        self.role = role
+        self._local = threading.local()
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = MongoDBClient.get_db(self.role)
+        return self._db
+
+    def _session(self):
+        """Keyword arguments that put a call in the current thread's transaction, if there is one."""
+        session = getattr(self._local, "session", None)
+        return {"session": session} if session is not None else {}
+
+    @contextmanager
+    def transaction(self):
+        if getattr(self._local, "session", None) is not None:
+            yield self  # Already inside a transaction; join it
+            return
+        try:
+            session = self.db.client.start_session()
+            session.start_transaction()
+        except errors.PyMongoError as e:
+            raise RepositoryError(str(e)) from e
+        self._local.session = session
+        try:
+            yield self
+            session.commit_transaction()
+        except errors.PyMongoError as e:
+            if session.in_transaction:
+                session.abort_transaction()
+            raise RepositoryError(str(e)) from e
+        except BaseException:
+            if session.in_transaction:
+                session.abort_transaction()
+            raise
+        finally:
+            self._local.session = None
+            session.end_session()
+
+    def find(self, collection, query=None, projection=None, sort=None, limit=0, batch_size=None):
+        cursor = self.db[collection].find(query or {}, projection, **self._session())
+        if batch_size:
+            cursor = cursor.batch_size(batch_size)
+        if sort:
+            cursor = cursor.sort(sort)
+            if hasattr(cursor, "allow_disk_use"):
+                cursor = cursor.allow_disk_use(True)
+        if limit:
+            cursor = cursor.limit(limit)
+        return self._iterate(cursor)
+
+    @staticmethod
+    def _iterate(cursor):
+        # Errors can surface while the cursor fetches later batches, not only on find()
+        try:
+            yield from cursor
+        except errors.PyMongoError as e:
+            raise RepositoryError(str(e)) from e
+
+    @translate_errors
+    def surgery_table(self, query=None):
+        # Raw BSON batches decoded straight into the table's columns (see utils/bulk_decoder.py)
+        return BulkDecoder(self.db).decode_surgeries(query, getattr(self._local, "session", None))
+
+    @translate_errors
+    def find_one(self, collection, query, projection=None):
+        return self.db[collection].find_one(query, projection, **self._session())
+
+    @translate_errors
+    def count(self, collection, query=None):
+        return self.db[collection].count_documents(query or {}, **self._session())
+
+    @translate_errors
+    def insert_one(self, collection, document):
+        return self.db[collection].insert_one(document, **self._session()).inserted_id
+
+    @translate_errors
+    def insert_many(self, collection, documents, ordered=True):
+        return self.db[collection].insert_many(list(documents), ordered=ordered, **self._session()).inserted_ids
+
+    @translate_errors
+    def update_one(self, collection, query, update, upsert=False):
+        result = self.db[collection].update_one(query, update, upsert=upsert, **self._session())
+        return result.modified_count > 0 or result.upserted_id is not None
+
+    @translate_errors
+    def bulk_update(self, collection, operations):
+        requests = [pymongo.UpdateOne(query, update, upsert=upsert) for query, update, upsert in operations]
+        if requests:
+            self.db[collection].bulk_write(requests, ordered=False, **self._session())
+
+    @translate_errors
+    def delete_one(self, collection, query):
+        return self.db[collection].delete_one(query, **self._session()).deleted_count > 0
+
+    def document_id(self, value):
+        return objectid.ObjectId(value) if isinstance(value, str) else value
+
+    @translate_errors
+    def list_collection_names(self):
+        return self.db.list_collection_names()
+
+    @staticmethod
+    def overlap_query(start_time, end_time, field=None, value=None):
+        query = {"start_time": {"$lt": end_time}, "end_time": {"$gt": start_time}}
+        if field is not None:
+            query[field] = value
+        return query
+
+    @translate_errors
+    def find_overlapping(self, collection, start_time, end_time, field=None, value=None):
+        return list(self.db[collection].find(self.overlap_query(start_time, end_time, field, value), **self._session()))
+
+    @translate_errors
+    def count_overlapping(self, collection, start_time, end_time, field=None, value=None):
+        return self.db[collection].count_documents(self.overlap_query(start_time, end_time, field, value),
+                                                  **self._session())
+
+    def _usage_pipeline(self, start_date, end_date, status, unwind=None):
+        match = period_query(start_date, end_date)
+        if status is not None:
+            match["status"] = status
+        pipeline = [{"$match": match}]
+        if unwind:
+            pipeline.append({"$unwind": f"${unwind}"})
+        pipeline.append({"$group": {
+            "_id": f"${unwind or 'room_id'}",
+            "used_hours": {"$sum": {
+                "$divide": [{"$subtract": ["$end_time", "$start_time"]}, 3600000]  # Milliseconds to hours
+            }}
+        }})
+        return pipeline
+
+    @translate_errors
+    def room_usage_hours(self, start_date=None, end_date=None, status=None):
+        pipeline = self._usage_pipeline(start_date, end_date, status)
+        return {usage["_id"]: usage["used_hours"] for usage in self.db.surgeries.aggregate(pipeline, **self._session())}
+
+    @translate_errors
+    def equipment_usage_hours(self, start_date=None, end_date=None, status=None):
+        pipeline = self._usage_pipeline(start_date, end_date, status, unwind="required_equipment_ids")
+        return {usage["_id"]: usage["used_hours"] for usage in self.db.surgeries.aggregate(pipeline, **self._session())}
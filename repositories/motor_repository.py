@@ -0,0 +1,161 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import contextvars
+import functools
+from contextlib import asynccontextmanager
+from mongodb_transaction_manager import MongoDBClient
+from repositories.base import RepositoryError, DuplicateKeyError
+from repositories.mongo_repository import MongoRepository, bulk_write_error
+from utils.lazy_import import lazy_import, optional_exceptions
+
+motor_asyncio = lazy_import("motor.motor_asyncio")
+pymongo = lazy_import("pymongo")
+errors = optional_exceptions("pymongo.errors")
+objectid = lazy_import("bson.objectid")
+
+
+def translate_async_errors(method):
+    """Re-raises PyMongoError from a repository coroutine as RepositoryError."""
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await method(*args, **kwargs)
+        except errors.DuplicateKeyError as e:
+            raise DuplicateKeyError(str(e)) from e
+        except errors.BulkWriteError as e:
+            raise bulk_write_error(e) from e
+        except errors.PyMongoError as e:
+            raise RepositoryError(str(e)) from e
+    return wrapper
+
+
+class AsyncMongoRepository:
+    """
+    Coroutine counterpart of MongoRepository built on Motor.
+
+    Methods have the same names, arguments and return values as the Repository interface but
+    must be awaited; find() returns a list. One Motor client (and pool) is shared per client
+    role, configured like the synchronous clients (see mongo_settings.py), so many requests
+    can wait on the database concurrently from a single event loop. transaction() runs a block
+    in a Motor session; like MongoRepository's per-thread session it belongs to the task that
+    opened it (a context variable), so concurrent bookings on one loop never share one.
+
+    Args:
+        db (AsyncIOMotorDatabase, optional): Handle to use; defaults to the shared client of `role`.
+        role (str): Client role of the default handle, "oltp" or "analytics".
+    """
+    _clients = {}  # role -> (AsyncIOMotorClient, database name)
+
+    def __init__(self, db=None, role="oltp"):
+        self._db = db
+        self.role = role
+        self._current_session = contextvars.ContextVar(f"motor_session_{id(self)}", default=None)
+
+    @classmethod
+    def get_db(cls, role="oltp"):
+        if role not in cls._clients:
+            from dotenv import load_dotenv
+            from mongo_settings import ClientSettings
+
+            load_dotenv()
+            settings = ClientSettings.from_env(role)
+            listeners = [MongoDBClient.command_monitor] if MongoDBClient.command_monitor is not None else []
+            client = motor_asyncio.AsyncIOMotorClient(settings.uri, event_listeners=listeners,
+                                                      **settings.client_kwargs())
+            cls._clients[role] = (client, settings.database)
+        client, database = cls._clients[role]
+        return client[database]
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = AsyncMongoRepository.get_db(self.role)
+        return self._db
+
+    def _session(self):
+        """Keyword arguments that put a call in the current task's transaction, if there is one."""
+        session = self._current_session.get()
+        return {"session": session} if session is not None else {}
+
+    @asynccontextmanager
+    async def transaction(self):
+        if self._current_session.get() is not None:
+            yield self  # Already inside a transaction; join it
+            return
+        try:
+            session = await self.db.client.start_session()
+            session.start_transaction()
+        except errors.PyMongoError as e:
+            raise RepositoryError(str(e)) from e
+        token = self._current_session.set(session)
+        try:
+            yield self
+            await session.commit_transaction()
+        except errors.PyMongoError as e:
+            if session.in_transaction:
+                await session.abort_transaction()
+            raise RepositoryError(str(e)) from e
+        except BaseException:
+            if session.in_transaction:
+                await session.abort_transaction()
+            raise
+        finally:
+            self._current_session.reset(token)
+            await session.end_session()
+
+    @translate_async_errors
+    async def find(self, collection, query=None, projection=None, sort=None, limit=0, batch_size=None):
+        cursor = self.db[collection].find(query or {}, projection, **self._session())
+        if batch_size:
+            cursor = cursor.batch_size(batch_size)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+
+    @translate_async_errors
+    async def find_one(self, collection, query, projection=None):
+        return await self.db[collection].find_one(query, projection, **self._session())
+
+    @translate_async_errors
+    async def count(self, collection, query=None):
+        return await self.db[collection].count_documents(query or {}, **self._session())
+
+    @translate_async_errors
+    async def insert_one(self, collection, document):
+        return (await self.db[collection].insert_one(document, **self._session())).inserted_id
+
+    @translate_async_errors
+    async def insert_many(self, collection, documents, ordered=True):
+        return (await self.db[collection].insert_many(list(documents), ordered=ordered, **self._session())).inserted_ids
+
+    @translate_async_errors
+    async def update_one(self, collection, query, update, upsert=False):
+        result = await self.db[collection].update_one(query, update, upsert=upsert, **self._session())
+        return result.modified_count > 0 or result.upserted_id is not None
+
+    @translate_async_errors
+    async def bulk_update(self, collection, operations):
+        requests = [pymongo.UpdateOne(query, update, upsert=upsert) for query, update, upsert in operations]
+        if requests:
+            await self.db[collection].bulk_write(requests, ordered=False, **self._session())
+
+    @translate_async_errors
+    async def delete_one(self, collection, query):
+        return (await self.db[collection].delete_one(query, **self._session())).deleted_count > 0
+
+    def document_id(self, value):
+        return objectid.ObjectId(value) if isinstance(value, str) else value
+
+    @translate_async_errors
+    async def find_overlapping(self, collection, start_time, end_time, field=None, value=None):
+        cursor = self.db[collection].find(MongoRepository.overlap_query(start_time, end_time, field, value),
+                                          **self._session())
+        return await cursor.to_list(length=None)
+
+    @translate_async_errors
+    async def count_overlapping(self, collection, start_time, end_time, field=None, value=None):
+        query = MongoRepository.overlap_query(start_time, end_time, field, value)
+        return await self.db[collection].count_documents(query, **self._session())
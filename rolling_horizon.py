@@ -0,0 +1,208 @@
+# Rolling-horizon driver for the Tabu Search optimizer.
+#
+# Instead of searching the whole planning period at once, the period is cut into windows of a
+# few days. Each window is optimized on its own and its first days are then fixed, so every
+# search only sees the surgeries and days of one window and the total cost grows linearly with
+# the length of the horizon.
+
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from models import MISSING_MINUTE
+from repositories.mongo_repository import MongoRepository
+from schedule_state import ScheduleState, DEFAULT_HORIZON_DAYS
+from scheduling_optimizer import TabuSearchScheduler
+
+logger = logging.getLogger(__name__)
+
+
+def release_day(state, i):
+    """First horizon day surgery i is considered for: its current day if placed, else its scheduled date."""
+    if state.room_of[i] is not None:
+        minute = state.start_of[i]
+    else:
+        minute = state.scheduled_minutes[i]
+    if minute == MISSING_MINUTE:
+        return 0
+    return min(max(state.day_of(minute), 0), state.horizon_days - 1)
+
+
+class RollingHorizonScheduler:
+    """
+    Optimizes a long horizon window by window with TabuSearchScheduler.
+
+    Sequentially, window k covers days [k * step_days, k * step_days + window_days). Its
+    search may place or move every surgery not fixed yet whose release day (scheduled date,
+    or current day if placed) falls before the window's end, within the window's days. Then
+    the placements in the first step_days days are fixed and the others go back to the pool
+    for the next window, which overlaps this one by window_days - step_days days.
+
+    With processes > 1 a greedy construction first places every surgery, and the horizon is
+    cut into non-overlapping blocks of step_days. Each block's surgeries are then improved
+    independently in a process pool, moving only within the block's days, so the results can
+    be combined without conflicts. Surgeries still unplaced get a final sequential pass over
+    the rest of the horizon. This is faster but never moves a surgery to another block.
+
+    Args:
+        repository (Repository, optional): Source of the schedule when run() gets no state.
+        window_days (int): Days optimized together.
+        step_days (int): Days fixed after each window; also the block length in parallel mode.
+        iterations_per_window (int): Tabu Search iterations per window.
+        time_limit_per_window (float, optional): Seconds per window.
+        processes (int): Worker processes; 1 runs the sequential rolling horizon.
+        scheduler (TabuSearchScheduler, optional): Search used per window (sequential mode and
+            the final pass).
+    """
+    def __init__(self, repository=None, window_days=7, step_days=5, iterations_per_window=300,
+                 time_limit_per_window=None, processes=1, scheduler=None):
+        if not 0 < step_days <= window_days:
+            raise ValueError("step_days must be between 1 and window_days")
+        self.repository = repository if repository is not None else MongoRepository()
+        self.window_days = window_days
+        self.step_days = step_days
+        self.iterations_per_window = iterations_per_window
+        self.time_limit_per_window = time_limit_per_window
+        self.processes = processes
+        self.scheduler = scheduler if scheduler is not None else TabuSearchScheduler(self.repository)
+        self.stats = {}
+
+    def run(self, state=None, horizon_start=None, horizon_days=DEFAULT_HORIZON_DAYS, seed=None):
+        """
+        Optimizes the schedule window by window.
+
+        Args:
+            state (ScheduleState, optional): Instance to optimize; loaded from the repository if omitted.
+            horizon_start (datetime, optional): First day when loading the state.
+            horizon_days (int): Days of the horizon when loading the state.
+            seed (int, optional): Seed of the first window; window k uses seed + k.
+
+        Returns:
+            ScheduleState: The optimized state. self.stats holds the per-window statistics,
+            elapsed time, final score and number of unscheduled surgeries.
+        """
+        if state is None:
+            state = ScheduleState.from_repository(self.repository, horizon_start=horizon_start,
+                                                  horizon_days=horizon_days)
+        started = time.perf_counter()
+        if self.processes > 1:
+            windows = self._run_blocks(state, seed)
+        else:
+            windows = self._run_rolling(state, seed)
+        self.stats = {
+            "windows": windows,
+            "elapsed": time.perf_counter() - started,
+            "best_score": state.recompute_score(),
+            "unscheduled": state.unscheduled,
+        }
+        logger.info(f"Rolling horizon finished {len(windows)} windows in {self.stats['elapsed']:.2f}s "
+                    f"with score {state.score:.2f}")
+        return state
+
+    def _search(self, state, movable, days, seed):
+        self.scheduler.run(state, max_iterations=self.iterations_per_window, time_limit=self.time_limit_per_window,
+                           seed=seed, movable=movable, days=days)
+        return dict(self.scheduler.stats, days=(days.start, days.stop), movable=len(movable))
+
+    def _run_rolling(self, state, seed):
+        releases = [release_day(state, i) for i in range(len(state.surgeries))]
+        by_release = sorted(range(len(state.surgeries)), key=releases.__getitem__)
+        pool = set()
+        released = 0
+        windows = []
+        for k, first in enumerate(range(0, state.horizon_days, self.step_days)):
+            end = min(first + self.window_days, state.horizon_days)
+            while released < len(by_release) and releases[by_release[released]] < end:
+                pool.add(by_release[released])
+                released += 1
+            if not pool:
+                continue
+            windows.append(self._search(state, pool, range(first, end), None if seed is None else seed + k))
+            fixed_until = first + self.step_days
+            last = fixed_until >= state.horizon_days
+            for i in list(pool):
+                if state.room_of[i] is not None and (last or state.day_of(state.start_of[i]) < fixed_until):
+                    pool.discard(i)
+                elif state.room_of[i] is not None:
+                    state.unassign(i)  # Placed in the overlap: reconsidered by the next window
+        return windows
+
+    def _run_blocks(self, state, seed):
+        # The greedy construction decides which block each surgery belongs to, so blocks are
+        # balanced even when every surgery has the same release day
+        self.scheduler.build_initial_schedule(state)
+        blocks = {}
+        for i in range(len(state.surgeries)):
+            blocks.setdefault(release_day(state, i) // self.step_days, []).append(i)
+        settings = {"iterations": self.iterations_per_window, "time_limit": self.time_limit_per_window,
+                    "step_days": self.step_days}
+        jobs = [(k, positions, None if seed is None else seed + k) for k, positions in sorted(blocks.items())]
+        with ProcessPoolExecutor(min(self.processes, len(jobs) or 1), initializer=_init_worker,
+                                 initargs=(state,)) as pool:
+            results = list(pool.map(_run_block, jobs, [settings] * len(jobs)))
+
+        windows = []
+        leftovers = []
+        for (_, positions, _), (placements, stats) in zip(jobs, results):
+            windows.append(stats)
+            # Blocks cover disjoint days, so a block's placements cannot collide with another's
+            for i in positions:
+                state.unassign(i)
+            for i in positions:
+                placement = placements.get(i)
+                if placement is not None and state.can_place(i, *placement):
+                    state.place(i, *placement)
+                else:
+                    leftovers.append(i)
+        if leftovers:
+            first = min(release_day(state, i) for i in leftovers)
+            windows.append(self._search(state, leftovers, range(first, state.horizon_days),
+                                        None if seed is None else seed + len(jobs)))
+        return windows
+
+
+# State of the process pool's worker, sent once per process by _init_worker
+_worker_state = None
+
+
+def _init_worker(state):
+    global _worker_state
+    _worker_state = state
+
+
+def _run_block(job, settings):
+    """Optimizes one block of the worker's copy of the state; returns the block's placements and stats."""
+    k, positions, seed = job
+    state = _worker_state
+    first = k * settings["step_days"]
+    days = range(first, min(first + settings["step_days"], state.horizon_days))
+    before = state.assignment(positions)
+    # Room balance is a variance over the whole horizon: if every block saw the same global
+    # imbalance they would all correct it and together overshoot, so each balances only itself
+    state.even_out_room_load(positions)
+    scheduler = TabuSearchScheduler()  # Its repository is never connected: run() gets the state
+    scheduler.run(state, max_iterations=settings["iterations"], time_limit=settings["time_limit"], seed=seed,
+                  movable=positions, days=days)
+    placements = {i: (state.room_of[i], state.start_of[i]) for i in positions
+                  if state.room_of[i] is not None and state.day_of(state.start_of[i]) in days}
+    state.restore(before)  # Put the copy back as received for the worker's next block
+    state.recompute_score()
+    return placements, dict(scheduler.stats, days=(days.start, days.stop), movable=len(positions))
+
+
+if __name__ == "__main__":
+    from benchmarks.synthetic_hospital import generate_hospital
+    from repositories.memory_repository import InMemoryRepository
+
+    logging.basicConfig(level=logging.INFO)
+    hospital = generate_hospital(2000, seed=0)
+    repository = InMemoryRepository({name: hospital[name] for name in ("operating_rooms", "surgeons", "equipment",
+                                                                      "surgeries")})
+    for processes in (1, os.cpu_count() or 1):
+        state = ScheduleState.from_repository(repository, horizon_start=hospital["horizon_start"],
+                                              horizon_days=hospital["horizon_days"])
+        scheduler = RollingHorizonScheduler(repository, processes=processes)
+        scheduler.run(state, seed=0)
+        print(f"processes={processes}: {len(scheduler.stats['windows'])} windows, "
+              f"{scheduler.stats['elapsed']:.2f}s, score {scheduler.stats['best_score']:.1f}, "
+              f"unscheduled {scheduler.stats['unscheduled']}")
@@ -0,0 +1,678 @@
+# In-memory scheduling state used by the Tabu Search optimizer.
+#
+# All times are integer minutes since the epoch (see models.to_epoch_minutes). Every resource
+# (room, surgeon, equipment item, staff member) keeps its busy intervals in a sorted
+# IntervalIndex, so feasibility checks are a couple of bisects instead of database queries,
+# and the score is maintained incrementally as surgeries are placed and removed. Equipment
+# pools of several interchangeable units keep theirs in a CumulativeIndex instead.
+
+from bisect import bisect_left, bisect_right
+from models import SurgeryTable, to_epoch_minutes, from_epoch_minutes, MISSING_MINUTE
+from solution import (weight_preference_satisfaction, weight_surgeon_schedule_compactness,
+                      weight_room_utilization_efficiency)
+from utils.equipment_capacity import peak_usage, EquipmentCapacityModel
+from utils.interval_index import IntervalIndex
+
+SETUP_MINUTES = 15
+CLEANUP_MINUTES = 15
+MINUTES_PER_DAY = 1440
+EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DEFAULT_WINDOW = (8 * 60, 18 * 60)  # Used for every weekday when a surgeon has no availability on record
+DEFAULT_HORIZON_DAYS = 14
+URGENCY_WEIGHTS = {"High": 3, "Medium": 2, "Low": 1}
+
+DEFAULT_WEIGHTS = {
+    "unscheduled": 100.0,
+    "preference": weight_preference_satisfaction,
+    "room_balance": weight_room_utilization_efficiency,
+    "compactness": weight_surgeon_schedule_compactness,
+    "urgency_delay": 1.0,
+    "stability": 10.0,  # Per surgery kept at its anchored placement; only used after anchor_current()
+}
+
+
+def room_assignment_id(surgery_id):
+    """assignment_id of a surgery's surgery_room_assignments document; a surgery has at most one."""
+    return f"RA-{surgery_id}"
+
+
+def parse_clock(value):
+    """Converts 'HH:MM' into minutes after midnight."""
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def merge_windows(documents):
+    """Sorted, non-overlapping (start, end) minutes of {start_time, end_time} documents."""
+    windows = sorted((to_epoch_minutes(window["start_time"]), to_epoch_minutes(window["end_time"]))
+                     for window in documents or ())
+    merged = []
+    for start, end in windows:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class CumulativeIndex(IntervalIndex):
+    """
+    Usage [start, end) intervals of a resource with `capacity` interchangeable units.
+
+    Intervals may overlap, so their ends are not sorted: a conflict check gathers the
+    intervals that can overlap the candidate (none starting more than the longest interval's
+    length before it) and, only if there are at least `capacity` of them, sweeps them for the
+    peak number of units in use during the candidate.
+    """
+    __slots__ = ("capacity", "longest")
+
+    def __init__(self, capacity):
+        super().__init__()
+        self.capacity = capacity
+        self.longest = 0
+
+    def conflicts(self, start, end, units=1):
+        """True if `units` more units cannot be used throughout [start, end)."""
+        ends = self.ends
+        overlapping = [(self.starts[k], ends[k]) for k in self.covering(start, end) if ends[k] > start]
+        if len(overlapping) + units <= self.capacity:
+            return False
+        return peak_usage(overlapping, start, end)[0] + units > self.capacity
+
+    def add(self, start, end, owner):
+        super().add(start, end, owner)
+        if end - start > self.longest:
+            self.longest = end - start
+
+    def covering(self, low, high):
+        return range(bisect_right(self.starts, low - self.longest), bisect_left(self.starts, high))
+
+
+class ScheduleState:
+    """
+    A scheduling instance plus the current assignment of surgeries to rooms and start times.
+
+    Hard constraints (checked by can_place): room eligibility for the surgery type, surgeon
+    and assigned staff availability windows on the day, no overlap per room (with setup/cleanup buffers), per
+    surgeon, per equipment item (including maintenance windows) and per staff member, no more
+    concurrent uses of an equipment pool than it has units in service (equipment_pools, an
+    EquipmentCapacityModel; each use holds a unit for the room's transfer time before and
+    after), and nothing placed in a blocked window (room closures, surgeon absences).
+
+    The score (higher is better) is kept up to date by place()/unassign():
+        - unscheduled surgeries, weighted by urgency
+        + surgeries placed in the surgeon's preferred room
+        - urgency-weighted delay in days from the start of the horizon
+        - variance of room load in hours
+        - surgeon idle hours between the first and last surgery of each day
+        + surgeries still at their anchored (previously committed) placement, if anchored
+    """
+    def __init__(self, surgeries, room_ids, horizon_start, horizon_days=DEFAULT_HORIZON_DAYS,
+                 room_surgery_types=None, surgeon_windows=None, preferred_rooms=None,
+                 maintenance_windows=None, staff_by_surgery=None, weights=None, blocked_windows=None,
+                 staff_windows=None, equipment_pools=None):
+        # A SurgeryTable stays a column store: rows are only materialised on state.surgeries[i]
+        self.surgeries = surgeries if isinstance(surgeries, SurgeryTable) else list(surgeries)
+        self.room_ids = list(room_ids)
+        self.horizon_start = horizon_start - horizon_start % MINUTES_PER_DAY
+        self.horizon_days = horizon_days
+        self.surgeon_windows = surgeon_windows or {}
+        self.staff_windows = staff_windows or {}
+        self.maintenance_windows = maintenance_windows or {}
+        self.equipment_pools = equipment_pools
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.anchors = {}  # position -> (room_id, start) the stability term rewards keeping
+        # Unlike maintenance windows these stay out of the busy indexes, so they do not count as
+        # room load or surgeon working time: {("room" or "surgeon", id): IntervalIndex}
+        self.blocked = {}
+        for key, windows in (blocked_windows or {}).items():
+            index = self.blocked[key] = IntervalIndex()
+            for start, end in windows:
+                index.add(start, end, None)
+        room_surgery_types = room_surgery_types or {}
+        preferred_rooms = preferred_rooms or {}
+        staff_by_surgery = staff_by_surgery or {}
+
+        self.position = {}
+        self.durations = []
+        self.urgency = []
+        self.preferred_room = []
+        self.resources = []
+        self.pool_needs = []  # Per surgery: ((pool id, units), ...) of the equipment pools it uses
+        self.eligible_rooms = []
+        self.day_windows = []  # Per surgery: weekday -> (open, close) minutes after midnight
+        shared_windows = {}
+        if isinstance(self.surgeries, SurgeryTable):
+            table = self.surgeries
+            self.surgery_ids = list(table.surgery_ids)
+            self.surgeon_ids = table.column("surgeon_id")
+            self.scheduled_minutes = table.scheduled_minutes
+            columns = zip(table.durations, table.column("urgency_level"), table.column("surgery_type"),
+                          map(table.equipment_ids, range(len(table))))
+        else:
+            self.surgery_ids = [surgery.surgery_id for surgery in self.surgeries]
+            self.surgeon_ids = [surgery.surgeon_id for surgery in self.surgeries]
+            self.scheduled_minutes = [surgery.scheduled_minute for surgery in self.surgeries]
+            columns = ((surgery.duration, surgery.urgency_level, surgery.surgery_type, surgery.required_equipment_ids)
+                       for surgery in self.surgeries)
+        for i, (duration, urgency_level, surgery_type, equipment_ids) in enumerate(columns):
+            surgery_id, surgeon_id = self.surgery_ids[i], self.surgeon_ids[i]
+            self.position[surgery_id] = i
+            self.durations.append(duration or 0)
+            self.urgency.append(URGENCY_WEIGHTS.get(urgency_level, 1))
+            self.preferred_room.append(preferred_rooms.get(surgeon_id))
+            resources = [("surgeon", surgeon_id)] if surgeon_id else []
+            needs = {}
+            for equipment_id in equipment_ids:
+                pool_id = equipment_pools.pool_of(equipment_id) if equipment_pools is not None else None
+                if pool_id is None:
+                    resources.append(("equipment", equipment_id))
+                else:
+                    needs[pool_id] = needs.get(pool_id, 0) + 1
+            resources.extend(("staff", staff_id) for staff_id in staff_by_surgery.get(surgery_id, ()))
+            self.resources.append(tuple(resources))
+            self.pool_needs.append(needs)
+            team = (surgeon_id,) + tuple(key[1] for key in resources
+                                         if key[0] == "staff" and key[1] in self.staff_windows)
+            if team not in shared_windows:
+                shared_windows[team] = self._team_windows(team)
+            self.day_windows.append(shared_windows[team])
+            self.eligible_rooms.append(tuple(
+                room_id for room_id in self.room_ids
+                if not room_surgery_types.get(room_id) or surgery_type in room_surgery_types[room_id]
+            ))
+        # A specific unit of a pool that some surgery requests by type also takes one of the
+        # pool's units while in use, or the type's users could be given the same unit
+        requested = {pool_id for needs in self.pool_needs for pool_id in needs}
+        for i, needs in enumerate(self.pool_needs):
+            for key in self.resources[i]:
+                pool_id = equipment_pools.unit_pool.get(key[1]) if key[0] == "equipment" and requested else None
+                if pool_id in requested:
+                    needs[pool_id] = needs.get(pool_id, 0) + 1
+            self.pool_needs[i] = tuple(needs.items())
+        self.domains = {}  # (position, day) -> start_domain(), filled by reduce_domains() or on first use
+        self.domain_days = {}  # position -> horizon days with a non-empty start domain
+        self._reset()
+
+    def _team_windows(self, team):
+        """Weekday windows in which a surgeon and the given staff members are all available."""
+        windows = self.surgeon_windows.get(team[0])
+        if windows is None:
+            windows = {weekday: DEFAULT_WINDOW for weekday in range(5)}
+        for staff_id in team[1:]:
+            staff = self.staff_windows[staff_id]
+            windows = {weekday: (max(window[0], staff[weekday][0]), min(window[1], staff[weekday][1]))
+                       for weekday, window in windows.items()
+                       if weekday in staff and max(window[0], staff[weekday][0]) < min(window[1], staff[weekday][1])}
+        return windows
+
+    def _reset(self):
+        """Clears every placement and rebuilds the empty indexes and aggregates."""
+        self.room_of = [None] * len(self.surgeries)
+        self.start_of = [MISSING_MINUTE] * len(self.surgeries)
+        self.indexes = {("room", room_id): IntervalIndex() for room_id in self.room_ids}
+        for equipment_id, windows in self.maintenance_windows.items():
+            index = self.indexes.setdefault(("equipment", equipment_id), IntervalIndex())
+            for start, end in windows:
+                index.add(start, end, None)
+        self.pool_indexes = {}
+        for needs in self.pool_needs:
+            for pool_id, _ in needs:
+                if pool_id not in self.pool_indexes:
+                    index = self.pool_indexes[pool_id] = CumulativeIndex(self.equipment_pools.capacity[pool_id])
+                    for start, end in self.equipment_pools.maintenance(pool_id):
+                        index.add(start, end, None)  # Each window takes one unit out of service
+        self.room_load = dict.fromkeys(self.room_ids, 0)
+        self.total_load = 0
+        self.load_squares = 0
+        self.surgeon_day_busy = {}
+        self.scheduled = 0
+        self.preference_hits = 0
+        self.score = -self.weights["unscheduled"] * sum(self.urgency)
+
+    # ------------------------------------------------------------------ loading
+
+    @staticmethod
+    def from_documents(surgeries, operating_rooms, surgeons=(), equipment=(), staff_assignments=(),
+                       horizon_start=None, horizon_days=DEFAULT_HORIZON_DAYS, keep_current=True, weights=None,
+                       staff=()):
+        """
+        Builds a state from MongoDB-shaped documents.
+
+        Args:
+            surgeries (iterable): Surgery documents (see models.Surgery), or a models.SurgeryTable.
+            operating_rooms (iterable): Room documents; an optional `surgery_types` list restricts
+                the surgery types a room accepts.
+            surgeons (iterable): Surgeon documents with `availability` windows and
+                `surgeon_preferences.preferred_operating_room`.
+            equipment (iterable): Equipment documents with optional `maintenance_windows`
+                ({start_time, end_time}). Units of the same `type`, and documents with a
+                `quantity` above one, form pools a surgery may require by type or id (see
+                utils.equipment_capacity.EquipmentCapacityModel); rooms may give the
+                `equipment_transfer_minutes` a unit needs to reach them and leave.
+            Rooms may also have `closures` and surgeons `absences`, both {start_time, end_time}
+            lists; nothing is placed in those windows.
+            staff_assignments (iterable): surgery_staff_assignments documents.
+            staff (iterable): Staff documents; an `availability_schedule` (or `availability`) of
+                {day, start, end} slots limits the surgeries they are assigned to.
+            horizon_start (datetime, optional): First day of the horizon; defaults to the earliest
+                scheduled date.
+            horizon_days (int): Number of days surgeries may be placed in.
+            keep_current (bool): Keep the surgeries' existing room/start times when they are feasible.
+
+        Returns:
+            ScheduleState: The loaded state.
+        """
+        table = surgeries if isinstance(surgeries, SurgeryTable) else SurgeryTable.from_documents(surgeries)
+        if horizon_start is None:
+            known = [minute for minute in table.scheduled_minutes if minute != MISSING_MINUTE]
+            known += [minute for minute in table.start_minutes if minute != MISSING_MINUTE]
+            horizon_start = min(known) if known else 0
+        else:
+            horizon_start = to_epoch_minutes(horizon_start)
+
+        rooms = list(operating_rooms)
+        equipment = list(equipment)
+        surgeon_windows = {}
+        preferred_rooms = {}
+        blocked_windows = {}
+        for room in rooms:
+            closures = merge_windows(room.get("closures"))
+            if closures:
+                blocked_windows[("room", room["room_id"])] = closures
+        for surgeon in surgeons:
+            windows = {}
+            for slot in surgeon.get("availability") or ():
+                windows[WEEKDAYS.index(slot["day"])] = (parse_clock(slot["start"]), parse_clock(slot["end"]))
+            if windows:
+                surgeon_windows[surgeon["surgeon_id"]] = windows
+            preferred = (surgeon.get("surgeon_preferences") or {}).get("preferred_operating_room")
+            if preferred:
+                preferred_rooms[surgeon["surgeon_id"]] = preferred
+            absences = merge_windows(surgeon.get("absences"))
+            if absences:
+                blocked_windows[("surgeon", surgeon["surgeon_id"])] = absences
+
+        maintenance_windows = {}
+        for item in equipment:
+            merged = merge_windows(item.get("maintenance_windows"))
+            if merged:
+                maintenance_windows[item["equipment_id"]] = merged
+
+        staff_windows = {}
+        for member in staff:
+            slots = member.get("availability_schedule") or member.get("availability")
+            if isinstance(slots, list) and slots:
+                staff_windows[member["staff_id"]] = {WEEKDAYS.index(slot["day"]): (parse_clock(slot["start"]),
+                                                                                   parse_clock(slot["end"]))
+                                                     for slot in slots}
+
+        staff_by_surgery = {}
+        for assignment in staff_assignments:
+            staff_by_surgery.setdefault(assignment["surgery_id"], []).append(assignment["staff_id"])
+
+        state = ScheduleState(
+            table, [room["room_id"] for room in rooms], horizon_start, horizon_days,
+            room_surgery_types={room["room_id"]: set(room["surgery_types"])
+                                for room in rooms if room.get("surgery_types")},
+            surgeon_windows=surgeon_windows, preferred_rooms=preferred_rooms,
+            maintenance_windows=maintenance_windows, staff_by_surgery=staff_by_surgery, weights=weights,
+            blocked_windows=blocked_windows, staff_windows=staff_windows,
+            equipment_pools=EquipmentCapacityModel(equipment, rooms)
+        )
+        if keep_current:
+            for i, (room_id, start) in enumerate(zip(table.column("room_id"), table.start_minutes)):
+                if room_id is not None and start != MISSING_MINUTE and state.can_place(i, room_id, start):
+                    state.place(i, room_id, start)
+        return state
+
+    @staticmethod
+    def from_repository(repository, horizon_start=None, horizon_days=DEFAULT_HORIZON_DAYS, keep_current=True):
+        """Loads the scheduled surgeries and their resources from a Repository (MongoDB or in-memory)."""
+        projection = {"_id": 0}
+        return ScheduleState.from_documents(
+            repository.surgery_table({"status": "Scheduled"}),
+            repository.find("operating_rooms", None, projection),
+            repository.find("surgeons", None, projection),
+            repository.find("equipment", None, projection),
+            repository.find("surgery_staff_assignments", None, projection),
+            horizon_start=horizon_start, horizon_days=horizon_days, keep_current=keep_current,
+            staff=repository.find("staff", None, projection)
+        )
+
+    # ------------------------------------------------------------------ queries
+
+    @property
+    def unscheduled(self):
+        return len(self.surgeries) - self.scheduled
+
+    def unscheduled_positions(self):
+        return [i for i, room_id in enumerate(self.room_of) if room_id is None]
+
+    def day_of(self, minute):
+        return (minute - self.horizon_start) // MINUTES_PER_DAY
+
+    def window(self, i, day):
+        """Absolute [start, end) minutes the surgeon and staff of surgery i are all available on a horizon day, or None."""
+        weekday = (self.horizon_start // MINUTES_PER_DAY + day + EPOCH_WEEKDAY) % 7
+        window = self.day_windows[i].get(weekday)
+        if window is None:
+            return None
+        day_start = self.horizon_start + day * MINUTES_PER_DAY
+        return day_start + window[0], day_start + window[1]
+
+    def start_domain(self, i, day):
+        """
+        Start minutes of surgery i on a horizon day that the static constraints allow, as
+        sorted, disjoint (first, last) intervals: the surgeon and staff window minus the
+        maintenance windows of its equipment and the blocked windows of its surgeon and staff.
+        Room closures and other surgeries are left to can_place.
+        """
+        domain = self.domains.get((i, day))
+        if domain is None:
+            domain = self.domains[(i, day)] = self._start_domain(i, day)
+        return domain
+
+    def _start_domain(self, i, day):
+        window = self.window(i, day)
+        duration = self.durations[i]
+        if window is None or window[1] - duration < window[0]:
+            return ()
+        domain = [(window[0], window[1] - duration)]
+        for key in self.resources[i]:
+            if key[0] == "equipment":
+                busy = self.maintenance_windows.get(key[1], ())
+            else:
+                index = self.blocked.get(key)
+                busy = zip(index.starts, index.ends) if index is not None else ()
+            for start, end in busy:
+                if end <= window[0] or start >= window[1]:
+                    continue
+                # A start in (start - duration, end) would overlap the busy window
+                domain = [piece for first, last in domain
+                          for piece in ((first, min(last, start - duration)), (max(first, end), last))
+                          if piece[0] <= piece[1]]
+        return tuple(domain)
+
+    def feasible_days(self, i, days=None):
+        """Horizon days (within the range `days`, if given) on which surgery i has a non-empty start domain."""
+        feasible = self.domain_days.get(i)
+        if feasible is None:
+            feasible = self.domain_days[i] = [day for day in range(self.horizon_days) if self.start_domain(i, day)]
+        if days is None or (days.start <= 0 and days.stop >= self.horizon_days):
+            return feasible
+        return [day for day in feasible if days.start <= day < days.stop]
+
+    def reduce_domains(self):
+        """
+        Constraint-propagation pre-pass: computes the start domain of every surgery on every
+        horizon day up front, so the search only tries days and start times the static
+        constraints allow instead of discovering them infeasible one can_place at a time.
+
+        Returns:
+            dict: Number of (surgery, room, day) combinations before the reduction and of those
+            left with a non-empty start domain.
+        """
+        combinations = feasible = 0
+        for i in range(len(self.surgeries)):
+            combinations += len(self.room_ids) * self.horizon_days
+            feasible += len(self.eligible_rooms[i]) * len(self.feasible_days(i))
+        return {"combinations": combinations, "feasible": feasible}
+
+    def can_place(self, i, room_id, start):
+        """True if surgery i (currently unassigned) can start in room_id at `start` without violating a hard constraint."""
+        end = start + self.durations[i]
+        if room_id not in self.eligible_rooms[i]:
+            return False
+        day = self.day_of(start)
+        if day < 0 or day >= self.horizon_days:
+            return False
+        window = self.window(i, day)
+        if window is None or start < window[0] or end > window[1]:
+            return False
+        if self.indexes[("room", room_id)].conflicts(start - SETUP_MINUTES, end + CLEANUP_MINUTES):
+            return False
+        indexes = self.indexes
+        for key in self.resources[i]:
+            index = indexes.get(key)
+            if index is not None and index.conflicts(start, end):
+                return False
+        if self.pool_needs[i] and self.pool_conflict(i, room_id, start):
+            return False
+        if self.blocked:
+            return not self.is_blocked(("room", room_id), start, end) and \
+                not any(self.is_blocked(key, start, end) for key in self.resources[i])
+        return True
+
+    def is_blocked(self, key, start, end):
+        """True if [start, end) overlaps a blocked window of the resource key, e.g. ("room", "OR001")."""
+        index = self.blocked.get(key)
+        return index is not None and index.conflicts(start, end)
+
+    # can_place fuses the checks below for speed; the profiler calls them one by one to time each kind.
+
+    def fits_window(self, i, room_id, start):
+        """True if room_id accepts surgery i and [start, end) lies in the horizon and the surgeon's window."""
+        if room_id not in self.eligible_rooms[i]:
+            return False
+        day = self.day_of(start)
+        if day < 0 or day >= self.horizon_days:
+            return False
+        window = self.window(i, day)
+        return window is not None and window[0] <= start and start + self.durations[i] <= window[1]
+
+    def room_conflict(self, i, room_id, start):
+        """True if surgery i at `start` overlaps another surgery in room_id, turnover buffers included."""
+        end = start + self.durations[i]
+        return self.indexes[("room", room_id)].conflicts(start - SETUP_MINUTES, end + CLEANUP_MINUTES) \
+            or self.is_blocked(("room", room_id), start, end)
+
+    def resource_conflict(self, i, start, kind):
+        """True if one of surgery i's resources of the given kind ("surgeon", "equipment", "staff") is busy."""
+        end = start + self.durations[i]
+        for key in self.resources[i]:
+            if key[0] == kind:
+                index = self.indexes.get(key)
+                if index is not None and index.conflicts(start, end) or self.is_blocked(key, start, end):
+                    return True
+        return False
+
+    def pool_conflict(self, i, room_id, start):
+        """True if an equipment pool surgery i needs has no unit free for its use in room_id, transfers included."""
+        if not self.pool_needs[i]:
+            return False
+        low, high = self.equipment_pools.occupancy(room_id, start, start + self.durations[i])
+        return any(self.pool_indexes[pool_id].conflicts(low, high, units) for pool_id, units in self.pool_needs[i])
+
+    def candidate_starts(self, i, room_id, day):
+        """
+        Start times worth trying for surgery i in a room on a day, in order: the first start of
+        each interval of its start domain and the first turnover-respecting minute after each
+        surgery already in the room, if the domain allows it.
+        """
+        domain = self.start_domain(i, day)
+        if not domain:
+            return []
+        candidates = [first for first, _ in domain]
+        earliest, latest = domain[0][0], domain[-1][1]
+        index = self.indexes[("room", room_id)]
+        low, high = index.span(earliest, latest + self.durations[i])
+        piece = 0
+        for k in range(max(low - 1, 0), high):
+            start = index.ends[k] + SETUP_MINUTES
+            if start <= earliest or start > latest:
+                continue
+            while domain[piece][1] < start:
+                piece += 1
+            if start > domain[piece][0]:  # Starts in a gap of the domain are covered by the next piece's first
+                candidates.append(start)
+        if len(domain) > 1:
+            candidates.sort()
+        return candidates
+
+    def _surgeon_idle(self, surgeon_id, day, extra_start=None, extra_end=None, extra_busy=0):
+        """Idle minutes of a surgeon on a day, optionally with one more interval added."""
+        index = self.indexes.get(("surgeon", surgeon_id))
+        first = last = None
+        if index is not None:
+            day_start = self.horizon_start + day * MINUTES_PER_DAY
+            low, high = index.span(day_start, day_start + MINUTES_PER_DAY)
+            if low < high:
+                first, last = index.starts[low], index.ends[high - 1]
+        if extra_start is not None:
+            first = extra_start if first is None else min(first, extra_start)
+            last = extra_end if last is None else max(last, extra_end)
+        if first is None:
+            return 0
+        return (last - first) - self.surgeon_day_busy.get((surgeon_id, day), 0) - extra_busy
+
+    def placement_delta(self, i, room_id, start):
+        """Change in score if surgery i (currently unassigned) were placed in room_id at `start`."""
+        weights = self.weights
+        duration = self.durations[i]
+        delta = weights["unscheduled"] * self.urgency[i]
+        if room_id == self.preferred_room[i]:
+            delta += weights["preference"]
+        if self.anchors and self.anchors.get(i) == (room_id, start):
+            delta += weights["stability"]
+        delta -= weights["urgency_delay"] * self.urgency[i] * (start - self.horizon_start) / MINUTES_PER_DAY
+
+        rooms = len(self.room_ids)
+        load = self.room_load[room_id]
+        new_squares = self.load_squares + (load + duration) ** 2 - load ** 2
+        new_total = self.total_load + duration
+        old_variance = self.load_squares / rooms - (self.total_load / rooms) ** 2
+        new_variance = new_squares / rooms - (new_total / rooms) ** 2
+        delta -= weights["room_balance"] * (new_variance - old_variance) / 3600  # minutes² -> hours²
+
+        surgeon_id = self.surgeon_ids[i]
+        if surgeon_id:
+            day = self.day_of(start)
+            before = self._surgeon_idle(surgeon_id, day)
+            after = self._surgeon_idle(surgeon_id, day, start, start + duration, duration)
+            delta -= weights["compactness"] * (after - before) / 60
+        return delta
+
+    # ------------------------------------------------------------------ moves
+
+    def place(self, i, room_id, start):
+        """Places unassigned surgery i; the caller is responsible for checking can_place first."""
+        self.score += self.placement_delta(i, room_id, start)
+        duration = self.durations[i]
+        end = start + duration
+        self.indexes[("room", room_id)].add(start - SETUP_MINUTES, end + CLEANUP_MINUTES, i)
+        for key in self.resources[i]:
+            index = self.indexes.get(key)
+            if index is None:
+                index = self.indexes[key] = IntervalIndex()
+            index.add(start, end, i)
+        if self.pool_needs[i]:
+            low, high = self.equipment_pools.occupancy(room_id, start, end)
+            for pool_id, units in self.pool_needs[i]:
+                for _ in range(units):
+                    self.pool_indexes[pool_id].add(low, high, i)
+        self.room_of[i] = room_id
+        self.start_of[i] = start
+        self._update_aggregates(i, room_id, start, duration)
+
+    def unassign(self, i):
+        """Removes surgery i from the schedule; returns its previous (room_id, start) or None."""
+        room_id = self.room_of[i]
+        if room_id is None:
+            return None
+        start = self.start_of[i]
+        self.indexes[("room", room_id)].remove(start - SETUP_MINUTES, i)
+        for key in self.resources[i]:
+            self.indexes[key].remove(start, i)
+        if self.pool_needs[i]:
+            low = self.equipment_pools.occupancy(room_id, start, start)[0]
+            for pool_id, units in self.pool_needs[i]:
+                for _ in range(units):
+                    self.pool_indexes[pool_id].remove(low, i)
+        self.room_of[i] = None
+        self.start_of[i] = MISSING_MINUTE
+        self._update_aggregates(i, room_id, start, -self.durations[i])
+        self.score -= self.placement_delta(i, room_id, start)
+        return room_id, start
+
+    def _update_aggregates(self, i, room_id, start, duration):
+        load = self.room_load[room_id]
+        self.load_squares += (load + duration) ** 2 - load ** 2
+        self.room_load[room_id] = load + duration
+        self.total_load += duration
+        step = 1 if duration > 0 else -1
+        self.scheduled += step
+        if room_id == self.preferred_room[i]:
+            self.preference_hits += step
+        surgeon_id = self.surgeon_ids[i]
+        if surgeon_id:
+            key = (surgeon_id, self.day_of(start))
+            self.surgeon_day_busy[key] = self.surgeon_day_busy.get(key, 0) + duration
+
+    # ------------------------------------------------------------------ snapshots
+
+    def assignment(self, positions=None):
+        """Snapshot of the current placements (of `positions` only, if given), for restore()."""
+        if positions is not None:
+            return {i: (self.room_of[i], self.start_of[i]) for i in positions}
+        return list(self.room_of), list(self.start_of)
+
+    def restore(self, assignment):
+        """
+        Rebuilds the state from an assignment() snapshot. A snapshot of some positions only
+        moves those back; the other surgeries must not have changed since it was taken.
+        """
+        if isinstance(assignment, dict):
+            for i in assignment:
+                self.unassign(i)
+            for i, (room_id, start) in assignment.items():
+                if room_id is not None:
+                    self.place(i, room_id, start)
+            return
+        room_of, start_of = assignment
+        self._reset()
+        for i, room_id in enumerate(room_of):
+            if room_id is not None:
+                self.place(i, room_id, start_of[i])
+
+    def even_out_room_load(self, positions):
+        """
+        Spreads the room load of every surgery but `positions` evenly over the rooms, so the
+        room balance term only measures how `positions` are spread. Lets disjoint groups of
+        surgeries be optimized independently without all correcting the same global imbalance.
+        recompute_score() brings back the true load.
+        """
+        own = dict.fromkeys(self.room_ids, 0)
+        for i in positions:
+            if self.room_of[i] is not None:
+                own[self.room_of[i]] += self.durations[i]
+        others = (self.total_load - sum(own.values())) / len(self.room_ids)
+        self.room_load = {room_id: load + others for room_id, load in own.items()}
+        self.load_squares = sum(load * load for load in self.room_load.values())
+
+    def anchor_current(self):
+        """Makes the current placements the reference of the stability term and rescores."""
+        self.anchors = {i: (room_id, self.start_of[i]) for i, room_id in enumerate(self.room_of) if room_id is not None}
+        return self.recompute_score()
+
+    def recompute_score(self):
+        """Recomputes the score from scratch (clears floating point drift from incremental updates)."""
+        self.restore(self.assignment())
+        return self.score
+
+    def to_room_assignment_documents(self):
+        """Converts the placements into surgery_room_assignments documents, one per placed surgery."""
+        documents = []
+        for i, room_id in enumerate(self.room_of):
+            if room_id is None:
+                continue
+            start = self.start_of[i]
+            documents.append({
+                "assignment_id": room_assignment_id(self.surgery_ids[i]),
+                "surgery_id": self.surgery_ids[i],
+                "room_id": room_id,
+                "start_time": from_epoch_minutes(start),
+                "end_time": from_epoch_minutes(start + self.durations[i]),
+            })
+        return documents
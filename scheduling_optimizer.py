@@ -11,22 +11,24 @@ from scheduling_utils import (
     shift_surgery_time, find_surgeon, is_room_available,
     calculate_room_utilization, check_equipment_availability, is_surgeon_available,
     is_equipment_available, get_least_used_room, create_new_neighbor, evaluate_equipment_availability,
-    assign_surgery_to_room, shift_surgery_time, can_swap_surgeries, evaluate_room_utilization,
-    can_swap_surgeons, find_next_available_time_slot, evaluate_surgeon_preference
+    assign_surgery_to_room, evaluate_room_utilization, can_swap_surgeons, evaluate_surgeon_preference
 )
 
 import random
 import copy
+import time
 from datetime import datetime, timedelta
 
 import logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-from pymongo import MongoClient, errors
-from db_config import db
-from db_config import mongodb_transaction
+from repositories.base import RepositoryError
+from repositories.mongo_repository import MongoRepository
 from tabu_list import TabuList
+from schedule_state import ScheduleState, room_assignment_id
+from exact_solver import optimality_gap
+from services.outbox import Outbox
+from utils.profiling import DISABLED
 
 
 
@@ -34,83 +36,99 @@ from tabu_list import TabuList
 
 class TabuSearchScheduler:
 
-    def __init__(self, db):
-        self.db = db
+    def __init__(self, repository=None, max_tenure=10, min_tenure=5, profiler=None):
+        self.repository = repository if repository is not None else MongoRepository()
+        self.profiler = profiler if profiler is not None else DISABLED
+        self.max_tenure = max_tenure
+        self.min_tenure = min_tenure
+        self.stats = {}
+        self.outbox = Outbox(self.repository)
 
     def find_next_available_time(self, room_id):
-        with mongodb_transaction() as session:
-            try:
-                # Define setup and cleanup times (in minutes)
-                setup_time = 15
-                cleanup_time = 15
-
-                # Find the latest end time for the given room
-                latest_appointment = self.db.surgery_room_assignments.find_one(
-                    {"room_id": room_id},
-                    sort=[("end_time", -1)],
-                    session=session
-                )
-
-                if latest_appointment:
-                    latest_end_time = datetime.strptime(latest_appointment['end_time'], "%Y-%m-%dT%H:%M:%S")
-                    next_available_start = latest_end_time + timedelta(minutes=cleanup_time)
-                else:
-                    next_available_start = datetime.now() + timedelta(minutes=setup_time)
-                
-                return next_available_start.isoformat()
-            except errors.PyMongoError as e:
-                print(f"Database error while finding next available time: {e}")
-                return None
+        try:
+            # Define setup and cleanup times (in minutes)
+            setup_time = 15
+            cleanup_time = 15
+
+            # Find the latest end time for the given room
+            latest_appointment = next(iter(self.repository.find(
+                "surgery_room_assignments",
+                {"room_id": room_id},
+                sort=[("end_time", -1)],
+                limit=1
+            )), None)
+
+            if latest_appointment:
+                latest_end_time = datetime.strptime(latest_appointment['end_time'], "%Y-%m-%dT%H:%M:%S")
+                next_available_start = latest_end_time + timedelta(minutes=cleanup_time)
+            else:
+                next_available_start = datetime.now() + timedelta(minutes=setup_time)
+
+            return next_available_start.isoformat()
+        except RepositoryError as e:
+            print(f"Database error while finding next available time: {e}")
+            return None
 
     def assign_surgery_to_room_and_time(self, surgery_id, room_id, start_time_str):
-        with mongodb_transaction() as session:
-            try:
-                surgery = self.db.surgeries.find_one({"_id": surgery_id}, session=session)
-                if not surgery:
-                    print(f"Surgery with ID {surgery_id} not found.")
-                    return False
-                
-                start_time = datetime.strptime(start_time_str, "%Y-%m-%dT%H:%M:%S")
-                end_time = start_time + timedelta(minutes=surgery['duration'])
-
-                # Create a surgery room assignment document
-                room_assignment = {
-                    "surgery_id": surgery_id,
-                    "room_id": room_id,
-                    "start_time": start_time.isoformat(),
-                    "end_time": end_time.isoformat(),
-                }
-                
-                # Insert the assignment into MongoDB
-                self.db.surgery_room_assignments.insert_one(room_assignment, session=session)
-                print(f"Surgery {surgery_id} assigned to room {room_id} at {start_time_str} successfully.")
-                return True
-            except errors.PyMongoError as e:
-                print(f"Failed to assign surgery due to database error: {e}")
+        try:
+            surgery = self.repository.find_one("surgeries", {"_id": surgery_id})
+            if not surgery:
+                print(f"Surgery with ID {surgery_id} not found.")
                 return False
 
+            start_time = datetime.strptime(start_time_str, "%Y-%m-%dT%H:%M:%S")
+            end_time = start_time + timedelta(minutes=surgery['duration'])
+
+            # Create a surgery room assignment document
+            room_assignment = {
+                "surgery_id": surgery_id,
+                "room_id": room_id,
+                "start_time": start_time.isoformat(),
+                "end_time": end_time.isoformat(),
+            }
+
+            # A single insert is atomic, so no transaction is needed
+            self.repository.insert_one("surgery_room_assignments", room_assignment)
+            print(f"Surgery {surgery_id} assigned to room {room_id} at {start_time_str} successfully.")
+            return True
+        except RepositoryError as e:
+            print(f"Failed to assign surgery due to database error: {e}")
+            return False
+
     def initialize_solution(self):
         """
         Generates an initial feasible solution by assigning surgeries to available times and rooms.
         Ensures no conflicts with surgeon availability, room availability, and equipment availability.
+
+        Returns:
+            ScheduleState: The greedy schedule; its room assignments are also saved to the repository.
         """
-        with mongodb_transaction(self.db) as session:
-            surgeries = list(self.db.surgeries.find({"status": "Scheduled"}, session=session))
-            rooms = list(self.db.operating_rooms.find({}, session=session))
-
-            for surgery in surgeries:
-                for room in rooms:
-                    # Attempt to find the next available time for the surgery in the current room
-                    next_available_time = self.find_next_available_time(room["_id"], surgery["duration"], self.db, session)
-                    if next_available_time:
-                        # Check if the surgeon and required equipment are available at this time
-                        surgeon_available = is_surgeon_available(surgery["surgeon_id"], next_available_time["start_time"], next_available_time["end_time"], self.db, session)
-                        equipment_available = is_equipment_available(surgery["_id"], next_available_time["start_time"], next_available_time["end_time"], self.db, session)
-
-                        if surgeon_available and equipment_available:
-                            # Assign the surgery to this room and time slot
-                            self.assign_surgery_to_room_and_time(surgery["_id"], room["_id"], next_available_time["start_time"], self.db, session)
-                            break
+        with self.profiler.timer("db.load"):
+            state = ScheduleState.from_repository(self.repository)
+        self.build_initial_schedule(state)
+        with self.profiler.timer("db.write"):
+            self.save_room_assignments(state)
+        return state
+
+    def save_room_assignments(self, state):
+        """
+        Replaces the surgery_room_assignments of the state's surgeries with its placements.
+
+        Each surgery's assignment has an id derived from its surgery_id, so it is upserted in
+        place instead of piling up a new row per run, and the assignment of a surgery left
+        unplaced is deleted. Everything happens in one transaction.
+        """
+        documents = state.to_room_assignment_documents()
+        placed = {document["surgery_id"] for document in documents}
+        with self.repository.transaction():
+            if documents:
+                self.repository.bulk_update("surgery_room_assignments", [
+                    ({"assignment_id": document["assignment_id"]}, {"$set": document}, True) for document in documents
+                ])
+            for surgery_id in state.surgery_ids:
+                if surgery_id not in placed:
+                    self.repository.delete_one("surgery_room_assignments",
+                                               {"assignment_id": room_assignment_id(surgery_id)})
 
     def generate_neighbor_solutions(current_schedule, tabu_list, db):
         neighbors = []
@@ -191,12 +209,194 @@ class TabuSearchScheduler:
 
             return True
 
-    def run(self):
-        # The main method to run the Tabu Search optimization ...
-        # This should include the initialization of the first solution, the main optimization loop,
-        # the logic to manage the tabu list, and the logic to update the best solution
-        pass
-    
+    def run(self, state=None, max_iterations=1000, time_limit=None, sample_size=8, days_per_move=3, seed=None,
+            movable=None, days=None, bound=None, gap_tolerance=None):
+        """
+        Runs the Tabu Search on an in-memory ScheduleState.
+
+        Each iteration samples surgeries (unscheduled ones first), evaluates relocating each of
+        them to candidate rooms and start times by incremental score deltas, and applies the
+        best non-tabu move even if it worsens the score. A move back to a recently left room or
+        start time is tabu unless it beats the best score found so far (aspiration).
+
+        Args:
+            state (ScheduleState, optional): Instance to optimize; loaded from self.repository if omitted.
+            max_iterations (int): Maximum number of moves to apply.
+            time_limit (float, optional): Wall-clock limit in seconds.
+            sample_size (int): Surgeries considered per iteration.
+            days_per_move (int): Days tried per sampled surgery, besides its current day.
+            seed (int, optional): Seed for reproducible runs.
+            movable (iterable, optional): Positions of the surgeries that may be placed or moved;
+                the others stay frozen where they are. All surgeries by default.
+            days (range, optional): Horizon days surgeries may be placed in by construction and
+                moves; all by default. Surgeries already placed elsewhere are not moved out.
+            bound (float, optional): Upper bound on the best reachable score, e.g. from
+                exact_solver.ExactScheduler; stats["gap"] then reports the optimality gap.
+            gap_tolerance (float, optional): Stop as soon as the gap to `bound` is at most this
+                fraction, e.g. 0.01 for 1%.
+
+        Returns:
+            ScheduleState: The state restored to the best schedule found. Run statistics
+            (iterations, neighbors_evaluated, time_to_first_feasible, best_score, ...) are
+            stored in self.stats; with an enabled profiler, stats["profile"] holds its report.
+        """
+        rng = random.Random(seed)
+        profiler = self.profiler
+        timer = profiler.timer
+        profiler.reset()
+        if state is None:
+            with timer("db.load"):
+                state = ScheduleState.from_repository(self.repository)
+        started = time.perf_counter()
+        stats = {"iterations": 0, "neighbors_evaluated": 0, "time_to_first_feasible": None}
+        movable = tuple(sorted(movable)) if movable is not None else None
+        days = days if days is not None else range(state.horizon_days)
+
+        with profiler.capture(), profiler.instrument(state):
+            with timer("domains"):
+                stats["domains"] = state.reduce_domains()
+            with timer("construction"):
+                self.build_initial_schedule(state, movable, days)
+            stats["initial_score"] = state.score
+            if state.unscheduled == 0:
+                stats["time_to_first_feasible"] = time.perf_counter() - started
+            best_score = state.score
+            best_assignment = state.assignment(movable)
+            tabu_list = TabuList(max_tenure=self.max_tenure, min_tenure=self.min_tenure)
+            close_enough = bound is not None and gap_tolerance is not None
+
+            for _ in range(max_iterations):
+                if time_limit is not None and time.perf_counter() - started > time_limit:
+                    break
+                if close_enough and optimality_gap(best_score, bound) <= gap_tolerance:
+                    break
+                stats["iterations"] += 1
+                with timer("neighbors"):
+                    move = self.select_move(state, tabu_list, rng, sample_size, days_per_move, best_score, stats,
+                                            movable, days)
+                with timer("tabu"):
+                    tabu_list.decrement_tenure()
+                if move is None:
+                    profiler.count("moves.none_admissible")
+                    continue
+
+                i, room_id, start = move
+                surgery_id = state.surgery_ids[i]
+                with timer("move"):
+                    previous = state.unassign(i)
+                    state.place(i, room_id, start)
+                profiler.count("moves.applied")
+                if previous is not None:
+                    with timer("tabu"):
+                        tenure = rng.randint(self.min_tenure, self.max_tenure)
+                        tabu_list.add(('time_slot', surgery_id, previous[1]), tenure)
+                        if previous[0] != room_id:
+                            tabu_list.add_surgery_room_assignment(surgery_id, previous[0], tenure)
+
+                if stats["time_to_first_feasible"] is None and state.unscheduled == 0:
+                    stats["time_to_first_feasible"] = time.perf_counter() - started
+                if state.score > best_score:
+                    best_score = state.score
+                    with timer("snapshot"):
+                        best_assignment = state.assignment(movable)
+
+            with timer("snapshot"):
+                state.restore(best_assignment)
+        stats["elapsed"] = time.perf_counter() - started
+        stats["best_score"] = state.score
+        stats["unscheduled"] = state.unscheduled
+        if bound is not None:
+            stats["bound"] = bound
+            stats["gap"] = optimality_gap(state.score, bound)
+        if profiler.enabled or profiler.capture_report:
+            stats["profile"] = profiler.report()
+            profiler.dump()
+        self.stats = stats
+        logger.info(f"Tabu Search finished after {stats['iterations']} iterations with score {state.score:.2f}")
+        return state
+
+    def build_initial_schedule(self, state, movable=None, days=None):
+        """
+        Greedy construction: places unscheduled surgeries by urgency, then duration, at the
+        earliest feasible start, trying the surgeon's preferred room first. Each surgeon's
+        search starts from the day of their previous placement to keep construction linear.
+        With `movable`, only those positions are placed; with `days`, only in those days.
+        """
+        days = days if days is not None else range(state.horizon_days)
+        unscheduled = state.unscheduled_positions() if movable is None else \
+            [i for i in movable if state.room_of[i] is None]
+        order = sorted(unscheduled, key=lambda i: (-state.urgency[i], -state.durations[i]))
+        first_days = {}
+        for i in order:
+            surgeon_id = state.surgeon_ids[i]
+            rooms = sorted(state.eligible_rooms[i], key=lambda room_id: room_id != state.preferred_room[i])
+            placed = False
+            for day in range(first_days.get(surgeon_id, days.start), days.stop):
+                if not state.start_domain(i, day):
+                    continue
+                for room_id in rooms:
+                    for start in state.candidate_starts(i, room_id, day):
+                        if state.can_place(i, room_id, start):
+                            state.place(i, room_id, start)
+                            first_days[surgeon_id] = day
+                            placed = True
+                            break
+                    if placed:
+                        break
+                if placed:
+                    break
+        return state
+
+    def select_move(self, state, tabu_list, rng, sample_size, days_per_move, best_score, stats, movable=None,
+                    days=None):
+        """
+        Returns the best admissible relocation (position, room_id, start) among the sampled
+        surgeries, or None. Every move is evaluated by unassigning the surgery once, scoring
+        all candidate placements with placement_delta and putting the surgery back. Only
+        `movable` positions are sampled, and only days in `days` (when given) where the
+        surgery's start domain is not empty are tried.
+        """
+        pool = range(len(state.surgeries)) if movable is None else movable
+        unscheduled = state.unscheduled_positions() if movable is None else \
+            [i for i in movable if state.room_of[i] is None]
+        sampled = rng.sample(unscheduled, min(len(unscheduled), sample_size))
+        if len(sampled) < sample_size:
+            sampled += rng.sample(pool, min(len(pool), sample_size - len(sampled)))
+
+        best_move = None
+        best_delta = None
+        for i in set(sampled):
+            surgery_id = state.surgery_ids[i]
+            score_before = state.score
+            previous = state.unassign(i)
+            removal_delta = state.score - score_before
+            days_pool = state.feasible_days(i, days)
+            candidate_days = rng.sample(days_pool, min(days_per_move, len(days_pool)))
+            if previous is not None:
+                candidate_days.append(state.day_of(previous[1]))
+            for day in set(candidate_days):
+                for room_id in state.eligible_rooms[i]:
+                    for start in state.candidate_starts(i, room_id, day):
+                        if previous is not None and (room_id, start) == previous:
+                            continue
+                        stats["neighbors_evaluated"] += 1
+                        if not state.can_place(i, room_id, start):
+                            continue
+                        delta = removal_delta + state.placement_delta(i, room_id, start)
+                        if best_delta is not None and delta <= best_delta:
+                            continue
+                        tabu = tabu_list.is_time_slot_tabu(surgery_id, start) or \
+                            tabu_list.is_surgery_room_tabu(surgery_id, room_id)
+                        if tabu:
+                            if score_before + delta <= best_score:
+                                self.profiler.count("moves.tabu_rejected")
+                                continue
+                            self.profiler.count("moves.aspiration")
+                        best_move, best_delta = (i, room_id, start), delta
+            if previous is not None:
+                state.place(i, *previous)
+        return best_move
+
     def find_initial_solution(self):
         self.surgeries.sort(key=lambda x: x.urgency_level, reverse=True)  # Sort surgeries by urgency
         
@@ -454,60 +654,77 @@ class TabuSearchScheduler:
 
     def update_related_schedules(self, surgery_id_1, surgery_id_2):
         """
-        Updates related schedules and notifications after surgeons have been swapped.
-        
+        Commits a surgeon swap and queues the calendar updates and notifications it causes.
+
+        Both surgeries are read from the repository and their surgeon ids exchanged; the two
+        updates and the outbox entries are written in one transaction. Each update is
+        conditional on the surgeon read, so a surgery reassigned in the meantime rolls the whole
+        swap back. OutboxProcessor performs the calendar and email work afterwards, so this
+        returns as soon as the commit does and a crash cannot lose the side effects of a
+        committed swap. Rooms, times and equipment stay with the surgeries.
+
         Args:
         - surgery_id_1 (str): The ID of the first surgery involved in the swap.
         - surgery_id_2 (str): The ID of the second surgery involved in the swap.
-        """
-        # Retrieve the surgery and surgeon details
-        surgery_1 = next((s for s in self.surgeries if s.surgery_id == surgery_id_1), None)
-        surgery_2 = next((s for s in self.surgeries if s.surgery_id == surgery_id_2), None)
-        surgeon_1 = next((s for s in self.surgeons if s.staff_id == surgery_1.surgeon_id), None)
-        surgeon_2 = next((s for s in self.surgeons if s.staff_id == surgery_2.surgeon_id), None)
 
-        # Example: Update calendars for the involved surgeons
-        self.update_surgeon_calendar(surgeon_1, surgery_1, surgery_2)
-        self.update_surgeon_calendar(surgeon_2, surgery_2, surgery_1)
-
-        # Notify involved parties of the change
-        self.notify_surgeon_of_swap(surgeon_1, surgery_1, surgery_2)
-        self.notify_surgeon_of_swap(surgeon_2, surgery_2, surgery_1)
-        self.notify_staff_and_patients(surgery_1, surgery_2)
-
-        # Adjust equipment reservations if necessary
-        self.adjust_equipment_reservations(surgery_1, surgery_2)
+        Returns:
+        - bool: True if the swap was committed.
+        """
+        try:
+            documents = {document["surgery_id"]: document for document in self.repository.find(
+                "surgeries", {"surgery_id": {"$in": [surgery_id_1, surgery_id_2]}}, {"_id": 0})}
+            if surgery_id_1 not in documents or surgery_id_2 not in documents:
+                logger.error(f"Surgeon swap failed: surgery {surgery_id_1} or {surgery_id_2} not found.")
+                return False
+            surgery_1 = Surgery.from_document(documents[surgery_id_1])
+            surgery_2 = Surgery.from_document(documents[surgery_id_2])
+            surgeon_id_1, surgeon_id_2 = surgery_1.surgeon_id, surgery_2.surgeon_id
+            if surgeon_id_1 == surgeon_id_2:
+                logger.error(f"Surgeon swap failed: surgeries {surgery_id_1} and {surgery_id_2} have the same surgeon.")
+                return False
+            surgeons = {document["surgeon_id"]: document for document in self.repository.find(
+                "surgeons", {"surgeon_id": {"$in": [surgeon_id_1, surgeon_id_2]}}, {"_id": 0})}
+
+            swap_key = f"swap:{surgery_id_1}:{surgery_id_2}:{surgeon_id_1}:{surgeon_id_2}"
+            with self.repository.transaction():
+                for surgery, old_surgeon_id, new_surgeon_id in ((surgery_1, surgeon_id_1, surgeon_id_2),
+                                                                (surgery_2, surgeon_id_2, surgeon_id_1)):
+                    query = {"surgery_id": surgery.surgery_id, "surgeon_id": old_surgeon_id}
+                    if not self.repository.update_one("surgeries", query, {"$set": {"surgeon_id": new_surgeon_id}}):
+                        raise RepositoryError(f"surgery {surgery.surgery_id} is no longer assigned to {old_surgeon_id}")
+                    surgery.surgeon_id = new_surgeon_id
+                for surgeon_id, original_surgery, new_surgery in ((surgeon_id_1, surgery_1, surgery_2),
+                                                                  (surgeon_id_2, surgery_2, surgery_1)):
+                    surgeon = surgeons.get(surgeon_id, {})
+                    payload = {
+                        "surgeon": {"name": surgeon.get("name"), "contact_info": surgeon.get("contact_info") or {},
+                                    "calendar_id": surgeon.get("calendar_id")},
+                        "original_surgery": original_surgery.to_document(),
+                        "new_surgery": new_surgery.to_document(),
+                    }
+                    # Calendars are updated for the involved surgeons; notifications are coalesced into one digest per person
+                    self.outbox.add("calendar.update_surgeon", payload, f"{swap_key}:calendar:{original_surgery.surgery_id}")
+                    self.outbox.add("notify.surgeon_swap", payload, f"{swap_key}:notify:{original_surgery.surgery_id}")
+                self.outbox.add("notify.staff_and_patients",
+                                {"surgery_1": surgery_1.to_document(), "surgery_2": surgery_2.to_document()},
+                                f"{swap_key}:staff_and_patients")
+        except RepositoryError as e:
+            logger.error(f"Surgeon swap of surgeries {surgery_id_1} and {surgery_id_2} failed: {e}")
+            return False
 
         logger.info(f"Related schedules updated for swapped surgeries {surgery_id_1} and {surgery_id_2}.")
-
-
+        return True
 
     # Additional methods as needed ...
 
 # Entry point to run the optimization if this script is run directly
 if __name__ == "__main__":
-    # Initialize data using the functions from initialize_data.py
-    surgeries = initialize_surgeries()
-    operating_rooms = initialize_operating_rooms()
-    surgeons = initialize_surgeons()
-    patients = initialize_patients()
-    staff_members = initialize_staff_members()
-    surgery_equipments = initialize_surgery_equipments()
-    surgery_equipment_usages = initialize_surgery_equipment_usages()
-    surgery_room_assignments = initialize_surgery_room_assignments()
-    surgery_staff_assignments = initialize_surgery_staff_assignments()
-
-    # Equipment inventory for check_equipment_availability (example structure)
-    equipment_inventory = {eq.equipment_id: eq.availability for eq in surgery_equipments}
-
-    # Instantiate the scheduler with the initialized data
-    scheduler = TabuSearchScheduler(surgeries, surgery_room_assignments, surgeons)
-
-    # Example: Calculate room utilization and equipment availability scores (for demonstration)
-    room_utilization_score = scheduler.calculate_room_utilization(surgery_room_assignments, operating_rooms)
-    equipment_availability_score = scheduler.check_equipment_availability(surgeries, equipment_inventory)
-
-    print(f"Room Utilization Score: {room_utilization_score}")
-    print(f"Equipment Availability Score: {equipment_availability_score}")
-
-    scheduler.run()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    # Optimize the scheduled surgeries stored in MongoDB
+    scheduler = TabuSearchScheduler()
+    best_state = scheduler.run(max_iterations=1000, time_limit=60)
+
+    for name, value in scheduler.stats.items():
+        print(f"{name}: {value}")
+    print(f"Room assignments: {len(best_state.to_room_assignment_documents())}")
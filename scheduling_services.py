@@ -1,9 +1,7 @@
 import logging
 from datetime import datetime, timedelta
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from services.notification_service import NotificationService
+from services.notification_coalescer import get_notification_coalescer
+from services.notification_dispatcher import get_notification_dispatcher
 
 
 # Mock imports for demonstration
@@ -12,59 +10,46 @@ from services.notification_service import NotificationService
 # from twilio.rest import Client as TwilioClient
 # from googleapiclient.discovery import build
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class NotificationService:
+    """
+    Schedule-change notifications for surgeons, staff and patients.
 
-    def __init__(self):
-        # Email setup (customize these with your actual email server details)
-        self.smtp_server = 'smtp.example.com'
-        self.smtp_port = 587  # For SSL, use 465; for TLS, use 587
-        self.smtp_user = 'your_email@example.com'
-        self.smtp_password = 'your_email_password'
+    Swap notifications go through a NotificationCoalescer, so each person gets one digest per
+    window listing every surgery of theirs that changed, however many swaps a run makes.
+    Emails are delivered in the background by the coalescer's NotificationDispatcher. Outbox
+    handlers pass a DigestQueue instead, which keeps the digests in the outbox until they are sent.
 
+    Args:
+        coalescer (NotificationCoalescer or DigestQueue, optional): Defaults to the shared coalescer.
+    """
+
+    def __init__(self, coalescer=None):
+        self.coalescer = coalescer if coalescer is not None else get_notification_coalescer()
+        self._dispatcher = getattr(self.coalescer, "dispatcher", None)
+
+    @property
+    def dispatcher(self):
+        """The coalescer's dispatcher, or the shared one, created only when an email is sent directly."""
+        if self._dispatcher is None:
+            self._dispatcher = get_notification_dispatcher()
+        return self._dispatcher
 
     def notify_surgeon_of_swap(self, surgeon, original_surgery, new_surgery):
         """
-        Send an email notification to the surgeon about the surgery swap.
+        Add the surgery swap to the surgeon's next schedule digest.
         
         Args:
             surgeon (Surgeon): The surgeon object being notified.
             original_surgery (Surgery): The original surgery assignment.
             new_surgery (Surgery): The new surgery assignment.
         """
-        # Construct the email
-        message = MIMEMultipart()
-        message['From'] = self.smtp_user
-        message['To'] = surgeon.contact_info['email']  # Assuming surgeon.contact_info contains an 'email' key
-        message['Subject'] = 'Surgery Schedule Update'
-        
-        body = f"""
-        Dear Dr. {surgeon.name},
-        
-        Please be informed of an update to your upcoming surgery schedule:
-        
-        - The surgery previously scheduled (ID: {original_surgery.surgery_id}) has been replaced with a new assignment.
-        - New Surgery Details: ID {new_surgery.surgery_id}, Type: {new_surgery.surgery_type}, Scheduled Time: {new_surgery.scheduled_time}
-        
-        For more details, please consult the scheduling system or contact the administrative office.
-        
-        Best regards,
-        The Scheduling Team
-        """
-        message.attach(MIMEText(body, 'plain'))
-        
-        # Send the email
-        try:
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()  # Secure the connection
-                server.login(self.smtp_user, self.smtp_password)
-                text = message.as_string()
-                server.sendmail(self.smtp_user, surgeon.contact_info['email'], text)
-                logger.info(f"Notification sent to Dr. {surgeon.name} about surgery swap.")
-        except Exception as e:
-            logger.error(f"Failed to send notification email to Dr. {surgeon.name}: {e}")
+        text = (f"The surgery previously scheduled (ID: {original_surgery.surgery_id}) has been replaced with "
+                f"surgery {new_surgery.surgery_id}, Type: {new_surgery.surgery_type}, "
+                f"Scheduled Time: {new_surgery.scheduled_date}.")
+        # Assuming surgeon.contact_info contains an 'email' key
+        self.coalescer.add(surgeon.contact_info['email'], new_surgery.surgery_id, 'Surgery Schedule Update', text)
     
     def fetch_contacts_for_surgery(self, surgery):
         """
@@ -76,7 +61,7 @@ class NotificationService:
     
     def notify_staff_and_patients(self, surgery_1, surgery_2):
         """
-        Notify staff members and patients involved in the surgeries about the swap.
+        Add the swap to the schedule digests of the staff members and patients involved.
         
         Args:
             surgery_1 (Surgery): The first surgery involved in the swap.
@@ -86,58 +71,28 @@ class NotificationService:
         emails = contacts['staff'] + contacts['patients']
         
         for email in emails:
-            message = MIMEMultipart()
-            message['From'] = self.smtp_user
-            message['To'] = email
-            message['Subject'] = 'Important Surgery Schedule Update'
-            
-            body = f"""
-            Dear valued member of our community,
-            
-            Please be informed of important updates to our surgery schedule affecting surgeries with IDs {surgery_1.surgery_id} and {surgery_2.surgery_id}. We are committed to ensuring the best care and will be in touch with any further details.
-            
-            Should you have any immediate questions or concerns, please do not hesitate to contact our administrative office.
-            
-            Warm regards,
-            The Scheduling Team
-            """
-            message.attach(MIMEText(body, 'plain'))
-            
-            try:
-                with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                    server.starttls()  # Secure the connection
-                    server.login(self.smtp_user, self.smtp_password)
-                    text = message.as_string()
-                    server.sendmail(self.smtp_user, email, text)
-                logger.info(f"Notification sent to {email}.")
-            except Exception as e:
-                logger.error(f"Failed to send notification email to {email}: {e}")
+            for surgery in (surgery_1, surgery_2):
+                self.coalescer.add(email, surgery.surgery_id, 'Important Surgery Schedule Update',
+                                   f"Surgery {surgery.surgery_id} has been rescheduled. "
+                                   "We will be in touch with any further details.")
+
+    def flush(self):
+        """Sends the pending digests now instead of at the end of the window."""
+        return self.coalescer.flush()
     
     def send_notification(self, recipient_email, subject, body):
         """
-        Sends an email notification.
+        Queues an email notification.
         
         Args:
             recipient_email (str): The email address of the recipient.
             subject (str): The subject line of the email.
             body (str): The body content of the email.
+
+        Returns:
+            bool: True if the email was queued for delivery.
         """
-        # Construct the email
-        message = MIMEMultipart()
-        message['From'] = self.smtp_user
-        message['To'] = recipient_email
-        message['Subject'] = subject
-        message.attach(MIMEText(body, 'plain'))
-        
-        # Send the email
-        try:
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()  # Start TLS encryption
-                server.login(self.smtp_user, self.smtp_password)  # Log in to the SMTP server
-                server.sendmail(self.smtp_user, recipient_email, message.as_string())  # Send the email
-                logger.info(f"Email notification sent to {recipient_email}.")
-        except Exception as e:
-            logger.error(f"Failed to send email notification to {recipient_email}: {e}")
+        return self.dispatcher.submit(recipient_email, subject, body)
 
 class EquipmentManagementService:
     def adjust_equipment_reservations(self, surgery_1, surgery_2):
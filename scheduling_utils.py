@@ -1,9 +1,13 @@
 from datetime import datetime, timedelta
-from pymongo.errors import PyMongoError
-from models import Surgery, OperatingRoom, SurgeryRoomAssignment, Surgeon, SurgeryEquipment
+from models import Surgery, OperatingRoom, SurgeryRoomAssignment, Surgeon, SurgeryEquipment, to_epoch_minutes
 from db_config import db
 from db_config import mongodb_transaction
-from bson.objectid import ObjectId
+from utils.lazy_import import lazy_import, optional_exceptions
+from utils.equipment_capacity import EquipmentCapacityModel, peak_usage
+
+# The driver is only imported once a database call actually needs it
+errors = optional_exceptions("pymongo.errors")
+objectid = lazy_import("bson.objectid")
 
 
 
@@ -62,7 +66,7 @@ def is_room_available(room_id, proposed_start, proposed_end, setup_time=15, clea
             # Include logic for equipment availability check if necessary
 
             return count == 0
-    except PyMongoError as e:
+    except errors.PyMongoError as e:
         print(f"Error checking room availability: {e}")
         return False  # Assume room is not available if there's a database error
 
@@ -111,7 +115,7 @@ def calculate_room_utilization(start_date, end_date):
             room_utilizations[room_id] = (room_utilizations[room_id] / (total_operational_hours * days)) * 100
 
         return room_utilizations
-    except PyMongoError as e:
+    except errors.PyMongoError as e:
         print(f"Database error while calculating room utilization: {e}")
         return {}
 
@@ -156,7 +160,7 @@ def check_equipment_availability(surgery_id, proposed_start, proposed_end):
                     return False  # Maintenance period conflicts with proposed surgery times
 
         return True  # All required equipment is available and not under maintenance
-    except PyMongoError as e:
+    except errors.PyMongoError as e:
         print(f"Database error while checking equipment availability: {e}")
         return False  # Assume unavailability in case of database errors
 
@@ -218,40 +222,86 @@ def is_surgeon_available(surgeon_id, proposed_start, proposed_end, db):
 
             # Surgeon is available if no overlapping appointments are found
             return overlapping_appointments == 0
-    except PyMongoError as e:
+    except errors.PyMongoError as e:
         print(f"Error checking surgeon availability: {e}")
         return False  # Assume surgeon is not available if there's a database error
 
-def is_equipment_available(surgery_id, proposed_start, proposed_end):
+def is_equipment_available(equipment_id, proposed_start, proposed_end, database=None, capacity_model=None,
+                           room_id=None):
     """
-    Checks if the required equipment for a surgery is available during the proposed time.
-    
+    Checks if a unit of the required equipment is free during the proposed time.
+
+    The equipment may be a single unit or a pool of interchangeable units (all units of a type,
+    or an equipment document with a quantity; see utils.equipment_capacity). The usages
+    overlapping the proposed time and the units' maintenance windows are swept to find the
+    peak number of units in use, which must stay below the pool's capacity. A unit that
+    belongs to a pool must be free itself and leave its pool within capacity, since uses of
+    the pool may be taking any of its units. Every use, the proposed one included, ties its
+    unit up for the transfer time of its room before and after (capacity_model.occupancy());
+    a usage's room is its own room_id or else that of its surgery's room assignment.
+
     Args:
-    - surgery_id (str): The ID of the surgery requiring equipment.
+    - equipment_id (str): The equipment (unit id, type or pool id) the surgery requires.
     - proposed_start (datetime): The proposed start datetime for the surgery.
     - proposed_end (datetime): The proposed end datetime for the surgery.
+    - database (optional): Database to query instead of the default one.
+    - capacity_model (EquipmentCapacityModel, optional): Pools to check against; built from the
+      equipment and operating_rooms collections if omitted.
+    - room_id (str, optional): Room of the proposed surgery; rooms without a transfer time of
+      their own (or None) use the model's default.
 
     Returns:
-    - bool: True if all required equipment is available, False otherwise.
+    - bool: True if a unit of the equipment is available, False otherwise.
     """
+    database = database if database is not None else db
     try:
-        # Convert proposed_start and proposed_end to the appropriate format if necessary
-        proposed_start_iso = proposed_start.isoformat()
-        proposed_end_iso = proposed_end.isoformat()
-
         with mongodb_transaction() as session:
-            # Query to find any equipment usage that overlaps with the proposed times for the given equipment
-            overlapping_usages = db.surgery_equipment_usage.count_documents({
-                "equipment_id": equipment_id,
-                "$or": [
-                    {"start_time": {"$lt": proposed_end_iso, "$gte": proposed_start_iso}},
-                    {"end_time": {"$gt": proposed_start_iso, "$lte": proposed_end_iso}}
-                ]
-            }, session=session)
-
-            # Equipment is available if no overlapping usages are found
-            return overlapping_usages == 0
-    except PyMongoError as e:
+            if capacity_model is None:
+                capacity_model = EquipmentCapacityModel(database.equipment.find({}, {"_id": 0}, session=session),
+                                                        database.operating_rooms.find({}, {"_id": 0}, session=session))
+            # (equipment ids whose usages count, units, maintenance windows) that must all have a unit free
+            pool_id = capacity_model.pool_of(equipment_id)
+            if pool_id is None:
+                checks = [([equipment_id], 1, capacity_model.unit_maintenance.get(equipment_id, []))]
+                pool_id = capacity_model.unit_pool.get(equipment_id)
+            else:
+                checks = []
+            if pool_id is not None:
+                checks.append(([pool_id] + capacity_model.members[pool_id], capacity_model.capacity[pool_id],
+                               capacity_model.maintenance(pool_id)))
+
+            low, high = capacity_model.occupancy(room_id, to_epoch_minutes(proposed_start),
+                                                 to_epoch_minutes(proposed_end))
+            # A usage overlaps once both sides include their transfers, so widen the query by the longest one
+            margin = timedelta(minutes=max([capacity_model.default_transfer_minutes] +
+                                           list(capacity_model.transfer.values())))
+            overlapping_usages = list(database.surgery_equipment_usage.find({
+                "equipment_id": {"$in": sorted({equipment for ids, _, _ in checks for equipment in ids})},
+                "start_time": {"$lt": (proposed_end + 2 * margin).isoformat()},
+                "end_time": {"$gt": (proposed_start - 2 * margin).isoformat()}
+            }, {"_id": 0, "equipment_id": 1, "surgery_id": 1, "room_id": 1, "start_time": 1, "end_time": 1},
+                session=session))
+            unplaced = {usage.get("surgery_id") for usage in overlapping_usages if usage.get("room_id") is None}
+            rooms = {}
+            if unplaced:
+                rooms = {assignment["surgery_id"]: assignment.get("room_id")
+                         for assignment in database.surgery_room_assignments.find(
+                             {"surgery_id": {"$in": sorted(unplaced, key=str)}},
+                             {"_id": 0, "surgery_id": 1, "room_id": 1}, session=session)}
+
+        usages = [(usage["equipment_id"],
+                   capacity_model.occupancy(usage.get("room_id") or rooms.get(usage.get("surgery_id")),
+                                            to_epoch_minutes(usage["start_time"]), to_epoch_minutes(usage["end_time"])))
+                  for usage in overlapping_usages]
+        # Available if one more use does not exceed the units in service at any time
+        for equipment_ids, capacity, maintenance in checks:
+            counted = set(equipment_ids)
+            intervals = [interval for equipment, interval in usages if equipment in counted]
+            peak, _ = peak_usage(intervals + list(maintenance), low, high)
+            if peak >= capacity:
+                return False
+        return True
+    except errors.PyMongoError as e:
         print(f"Error checking equipment availability: {e}")
         return False  # Assume equipment is not available if there's a database error
 
@@ -303,7 +353,7 @@ def get_least_used_room(start_date, end_date):
         else:
             print("No room assignments found in the specified period.")
             return None
-    except PyMongoError as e:
+    except errors.PyMongoError as e:
         print(f"Database error while identifying the least used room: {e}")
         return None
 
@@ -362,7 +412,7 @@ def assign_surgery_to_room(surgery_id, proposed_start_str, proposed_end_str):
                 return True, f"Surgery assigned to room {room.room_id} successfully."
 
         return False, "No available operating rooms for the proposed times."
-    except PyMongoError as e:
+    except errors.PyMongoError as e:
         return False, f"Database error: {e}"
     
 def find_surgeon(surgeon_id):
@@ -382,7 +432,7 @@ def find_surgeon(surgeon_id):
         else:
             print(f"Surgeon with ID {surgeon_id} not found.")
             return None
-    except PyMongoError as e:
+    except errors.PyMongoError as e:
         print(f"Database error when searching for surgeon: {e}")
         return None
 
@@ -401,8 +451,8 @@ def can_swap_surgeons(surgery_id_1, surgeon_id_2, surgery_id_2, surgeon_id_1):
     """
     try:
         # Convert IDs to ObjectIds for MongoDB
-        surgery_id_1 = ObjectId(surgery_id_1)
-        surgery_id_2 = ObjectId(surgery_id_2)
+        surgery_id_1 = objectid.ObjectId(surgery_id_1)
+        surgery_id_2 = objectid.ObjectId(surgery_id_2)
 
         # Retrieve the surgery documents
         surgery_1 = db.surgeries.find_one({"_id": surgery_id_1})
@@ -430,7 +480,7 @@ def can_swap_surgeons(surgery_id_1, surgeon_id_2, surgery_id_2, surgeon_id_1):
 
         # If both surgeons are available for the respective times, return True
         return True
-    except PyMongoError as e:
+    except errors.PyMongoError as e:
         print(f"Database error: {e}")
         return False
     except Exception as e:
@@ -591,7 +641,7 @@ def create_new_neighbor(surgery_id, new_room_id, new_start_time_str, new_end_tim
             new_end_time = datetime.fromisoformat(new_end_time_str)
 
             # Retrieve the surgery document
-            surgery = db.surgeries.find_one({"_id": ObjectId(surgery_id)}, session=session)
+            surgery = db.surgeries.find_one({"_id": objectid.ObjectId(surgery_id)}, session=session)
             if surgery is None:
                 print(f"No surgery found with ID {surgery_id}")
                 return False
@@ -604,14 +654,14 @@ def create_new_neighbor(surgery_id, new_room_id, new_start_time_str, new_end_tim
                 return False
 
             for equipment_id in surgery.get("equipment_ids", []):
-                if not is_equipment_available(equipment_id, new_start_time, new_end_time, session):
+                if not is_equipment_available(equipment_id, new_start_time, new_end_time, room_id=new_room_id):
                     return False
 
             # Update the surgery's room assignment and time
             update_result = db.surgery_room_assignments.update_one(
-                {"surgery_id": ObjectId(surgery_id)},
+                {"surgery_id": objectid.ObjectId(surgery_id)},
                 {"$set": {
-                        "room_id": ObjectId(new_room_id),
+                        "room_id": objectid.ObjectId(new_room_id),
                         "start_time": new_start_time,
                         "end_time": new_end_time
                 }},
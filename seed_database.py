@@ -1,7 +1,4 @@
 # seed_database.py
-from pymongo import MongoClient
-import os
-from dotenv import load_dotenv
 from initialize_data import (
     initialize_patients,
     initialize_staff_members,
@@ -14,10 +11,7 @@ from initialize_data import (
     initialize_surgery_staff_assignments,
     initialize_surgery_appointments
 )
-from mongodb_transaction_manager import MongoDBClient  # Adjusted import
-
-# Get the database object from MongoDBClient
-db = MongoDBClient.get_db()
+from db_config import db  # Connects on first use rather than at import
 
 def seed_collection(collection_name, data_initializer, unique_field=None):
     """Helper function to seed a collection with data, using upserts for items with a unique identifier."""
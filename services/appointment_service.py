@@ -1,24 +1,60 @@
-from pymongo.errors import PyMongoError
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from db_config import db
+from repositories.base import RepositoryError, BulkWriteError, service_entry_point
+from utils.interval_index import TimeIndex
+from repositories.mongo_repository import MongoRepository
+from services.slot_reservation_service import SlotReservationService, appointment_resources, appointment_times
+from services.outbox import Outbox
 
-from models import SurgeryAppointment, StaffAssignment
+from models import SurgeryAppointment, StaffAssignment, to_epoch_minutes, MISSING_MINUTE
 from datetime import datetime
+import itertools
+
+# Appointment fields that determine which room and staff slots it holds
+RESERVED_FIELDS = {"room_id", "staff_assignments", "start_time", "end_time"}
 
 class AppointmentService:
-    @staticmethod
-    def create_surgery_appointment(appointment_id, surgery_id, patient_id, staff_assignments_info, room_id, start_time, end_time):
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else MongoRepository()
+        self.slots = SlotReservationService(self.repository)
+        self.outbox = Outbox(self.repository)
+
+    @service_entry_point
+    def create_surgery_appointment(self, appointment_id, surgery_id, patient_id, staff_assignments_info, room_id, start_time, end_time):
         """
         Creates a new surgery appointment and saves it to the MongoDB database.
+
+        The room and staff are booked first with one conditional write each (see
+        SlotReservationService), so concurrent bookings cannot double-book them; the
+        reservations are released again if the appointment cannot be saved, and by
+        SlotReservationService.release_orphaned if the process dies before saving it. The staff
+        notification is written to the outbox in the same transaction as the appointment and
+        sent later by OutboxProcessor, so booking never waits on email.
+
+        An appointment_id that is already taken is refused before anything is reserved; the
+        unique index on surgery_appointments.appointment_id catches a concurrent create of the
+        same id, whose reservations cannot overlap the winner's and are released.
         """
+        staff_ids = [sa['staff_id'] for sa in staff_assignments_info]
         try:
-            # Validation placeholder (you'll need to implement the actual validation logic)
-            if not AppointmentService.validate_appointment(room_id, start_time, end_time, staff_assignments_info):
-                print("Validation failed. Appointment cannot be scheduled.")
+            start_time, end_time = appointment_times(start_time, end_time)
+        except ValueError as e:
+            print(f"Validation failed. Invalid appointment times: {e}")
+            return False
+        try:
+            if self.repository.find_one("surgery_appointments", {"appointment_id": appointment_id}, {"_id": 1}):
+                print(f"Validation failed. Appointment {appointment_id} already exists.")
                 return False
+            unavailable = self.slots.reserve_appointment(appointment_id, room_id, staff_ids, start_time, end_time)
+        except RepositoryError as e:
+            print(f"Failed to reserve resources due to database error: {e}")
+            return False
+        if unavailable is not None:
+            print(f"Validation failed. {unavailable[0].capitalize()} {unavailable[1]} is not available.")
+            return False
 
+        try:
             staff_assignments = [StaffAssignment(staff_id=sa['staff_id'], role=sa['role']) for sa in staff_assignments_info]
             
             new_appointment = SurgeryAppointment(
@@ -31,17 +67,152 @@ class AppointmentService:
                 end_time=end_time
             )
             
-            db.surgery_appointments.insert_one(new_appointment.to_document())
+            with self.repository.transaction():
+                self.repository.insert_one("surgery_appointments", new_appointment.to_document())
+                self.outbox.add("appointment.created", {
+                    "appointment_id": appointment_id,
+                    "staff_ids": staff_ids,
+                    "room_id": room_id,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                }, f"appointment.created:{appointment_id}")
             print(f"Surgery appointment {appointment_id} created successfully.")
             return True
-        except PyMongoError as e:
+        except RepositoryError as e:
+            self.slots.release_appointment(appointment_id, room_id, staff_ids, start_time, end_time)
             print(f"Failed to create surgery appointment due to database error: {e}")
             return False
 
-    @staticmethod
-    def validate_appointment(room_id, start_time, end_time, staff_assignments_info):
+    def create_surgery_appointments(self, batch):
+        """
+        Creates many surgery appointments at once, e.g. an elective list imported from the EHR.
+
+        The whole batch is validated in memory against the appointments returned by one range
+        query over the batch's time span, and against the earlier rows of the batch itself.
+        The valid rows then reserve their room and staff with one bulk write and are saved with
+        one unordered insert_many, so a bad row never blocks the others. Rows whose
+        appointment_id already exists, or appears earlier in the batch, are refused.
+
+        Args:
+            batch (list): Dicts with appointment_id, surgery_id, patient_id, staff_assignments
+                (list of {"staff_id", "role"}), room_id, start_time and end_time.
+
+        Returns:
+            list: One {"appointment_id", "created", "error"} dict per row, in batch order.
+        """
+        results = [{"appointment_id": row.get("appointment_id"), "created": False, "error": None} for row in batch]
+        documents = {}  # position -> appointment document
+        for position, row in enumerate(batch):
+            try:
+                document = SurgeryAppointment(
+                    row["appointment_id"], row["surgery_id"], row["patient_id"], row["staff_assignments"],
+                    row["room_id"], *appointment_times(row["start_time"], row["end_time"])
+                ).to_document()
+            except (KeyError, TypeError, ValueError) as e:
+                results[position]["error"] = f"Invalid row: {e!r}"
+                continue
+            documents[position] = document
+        if not documents:
+            return results
+
+        try:
+            taken = {document["appointment_id"] for document in self.repository.find(
+                "surgery_appointments",
+                {"appointment_id": {"$in": [document["appointment_id"] for document in documents.values()]}},
+                {"_id": 0, "appointment_id": 1}
+            )}
+        except RepositoryError as e:
+            print(f"Failed to load existing appointments due to database error: {e}")
+            for position in documents:
+                results[position]["error"] = str(e)
+            return results
+        for position in list(documents):
+            appointment_id = documents[position]["appointment_id"]
+            if appointment_id in taken:
+                results[position]["error"] = f"Appointment {appointment_id} already exists."
+                del documents[position]
+            else:
+                taken.add(appointment_id)
+        if not documents:
+            return results
+
+        try:
+            existing = self.repository.find_overlapping(
+                "surgery_appointments",
+                min(document["start_time"] for document in documents.values()),
+                max(document["end_time"] for document in documents.values())
+            )
+        except RepositoryError as e:
+            print(f"Failed to load existing appointments due to database error: {e}")
+            for position in documents:
+                results[position]["error"] = str(e)
+            return results
+
+        # (kind, resource_id) -> TimeIndex of the intervals booked so far, keyed by a running number
+        booked = {}
+        keys = itertools.count()
+        for document in existing:
+            room_id, staff_ids, start_time, end_time = self._reserved_resources(document)
+            start, end = to_epoch_minutes(start_time), to_epoch_minutes(end_time)
+            if start == MISSING_MINUTE or end == MISSING_MINUTE:
+                continue
+            for resource in appointment_resources(room_id, staff_ids):
+                booked.setdefault(resource, TimeIndex()).add(next(keys), start, end)
+        accepted = []
+        for position, document in documents.items():
+            room_id, staff_ids, start_time, end_time = self._reserved_resources(document)
+            start, end = to_epoch_minutes(start_time), to_epoch_minutes(end_time)
+            needed = appointment_resources(room_id, staff_ids)
+            conflict = next((resource for resource in needed
+                             if resource in booked and booked[resource].overlapping(start, end)), None)
+            if conflict is not None:
+                results[position]["error"] = f"{conflict[0].capitalize()} {conflict[1]} is not available."
+                continue
+            for resource in needed:
+                booked.setdefault(resource, TimeIndex()).add(next(keys), start, end)
+            accepted.append(position)
+
+        reservations = [(documents[position]["appointment_id"],) + self._reserved_resources(documents[position])
+                        for position in accepted]
+        try:
+            unavailable = self.slots.reserve_appointments(reservations)
+        except RepositoryError as e:
+            print(f"Failed to reserve resources due to database error: {e}")
+            for position in accepted:
+                results[position]["error"] = str(e)
+            return results
+        reserved = []
+        for position, reservation, conflict in zip(accepted, reservations, unavailable):
+            if conflict is None:
+                reserved.append((position, reservation))
+            else:
+                results[position]["error"] = f"{conflict[0].capitalize()} {conflict[1]} is not available."
+
+        failures = {}
+        try:
+            self.repository.insert_many(
+                "surgery_appointments", [documents[position] for position, _ in reserved], ordered=False
+            )
+        except BulkWriteError as e:
+            failures = e.failures
+        except RepositoryError as e:
+            failures = {index: str(e) for index in range(len(reserved))}
+        for index, (position, reservation) in enumerate(reserved):
+            if index in failures:
+                self.slots.release_appointment(*reservation)
+                results[position]["error"] = failures[index]
+            else:
+                results[position]["created"] = True
+        print(f"{sum(result['created'] for result in results)} of {len(batch)} surgery appointments created.")
+        return results
+
+    @service_entry_point
+    def validate_appointment(self, room_id, start_time, end_time, staff_assignments_info):
         """
         Validates whether a surgery appointment can be scheduled without conflicts.
+
+        This is a read-only check; it does not hold the slot, so use create_surgery_appointment
+        (which reserves atomically) to actually book.
         """
         try:
             # Convert start and end times to datetime objects if in string format
@@ -50,86 +221,102 @@ class AppointmentService:
             if isinstance(end_time, str):
                 end_time = datetime.strptime(end_time, "%Y-%m-%dT%H:%M:%S")
 
-            if not AppointmentService.is_room_available(room_id, start_time, end_time):
+            if not self.is_room_available(room_id, start_time, end_time):
                 print("Room is not available.")
                 return False
 
             for staff_info in staff_assignments_info:
                 staff_id = staff_info['staff_id']
-                if not AppointmentService.is_staff_available(staff_id, start_time, end_time):
+                if not self.is_staff_available(staff_id, start_time, end_time):
                     print(f"Staff member {staff_id} is not available.")
                     return False
             
             return True
-        except PyMongoError as e:
+        except RepositoryError as e:
             print(f"Database error during validation: {e}")
             return False
 
-    @staticmethod
-    def is_room_available(room_id, start_time, end_time):
+    @service_entry_point
+    def is_room_available(self, room_id, start_time, end_time):
         """Checks if the room is available for the given time slot."""
         try:
-            count = db.surgery_appointments.count_documents({
-                "room_id": room_id,
-                "$or": [
-                    {"start_time": {"$lt": end_time, "$gte": start_time}},
-                    {"end_time": {"$gt": start_time, "$lte": end_time}}
-                ]
-            })
+            count = self.repository.count_overlapping("surgery_appointments", start_time, end_time, "room_id", room_id)
             return count == 0
-        except PyMongoError as e:
+        except RepositoryError as e:
             print(f"Database error checking room availability: {e}")
             return False
 
-    @staticmethod
-    def is_staff_available(staff_id, start_time, end_time):
+    @service_entry_point
+    def is_staff_available(self, staff_id, start_time, end_time):
         """Checks if the staff member is available for the given time slot."""
         try:
-            count = db.surgery_appointments.count_documents({
-                "staff_assignments": {"$elemMatch": {"staff_id": staff_id}},
-                "$or": [
-                    {"start_time": {"$lt": end_time, "$gte": start_time}},
-                    {"end_time": {"$gt": start_time, "$lte": end_time}}
-                ]
-            })
+            count = self.repository.count_overlapping(
+                "surgery_appointments", start_time, end_time, "staff_assignments.staff_id", staff_id
+            )
             return count == 0
-        except PyMongoError as e:
+        except RepositoryError as e:
             print(f"Database error checking staff availability: {e}")
             return False
 
-    @staticmethod
-    def get_appointment_by_id(appointment_id):
+    @service_entry_point
+    def get_appointment_by_id(self, appointment_id):
         """Retrieves a surgery appointment by its ID."""
         try:
-            document = db.surgery_appointments.find_one({"appointment_id": appointment_id})
+            document = self.repository.find_one("surgery_appointments", {"appointment_id": appointment_id})
             return SurgeryAppointment.from_document(document) if document else None
-        except PyMongoError as e:
+        except RepositoryError as e:
             print(f"Error retrieving appointment: {e}")
             return None
         
-    @staticmethod
-    def update_appointment(appointment_id, update_data):
-        """Updates an existing surgery appointment."""
+    @service_entry_point
+    def update_appointment(self, appointment_id, update_data):
+        """
+        Updates an existing surgery appointment.
+
+        When the update changes the room, staff or times, the new reservations are taken
+        before the update is written and the old ones released afterwards; the update is
+        refused if the new slot is not available.
+        """
         try:
-            db.surgery_appointments.update_one(
+            if RESERVED_FIELDS & set(update_data):
+                current = self.repository.find_one("surgery_appointments", {"appointment_id": appointment_id})
+                if current:
+                    updated = dict(current, **update_data)
+                    unavailable = self.slots.move_appointment(
+                        appointment_id, self._reserved_resources(current), self._reserved_resources(updated)
+                    )
+                    if unavailable is not None:
+                        print(f"Update rejected. {unavailable[0].capitalize()} {unavailable[1]} is not available.")
+                        return
+            self.repository.update_one(
+                "surgery_appointments",
                 {"appointment_id": appointment_id},
                 {"$set": update_data}
             )
             print(f"Appointment {appointment_id} updated successfully.")
-        except PyMongoError as e:
+        except RepositoryError as e:
             print(f"Error updating appointment: {e}")
 
     @staticmethod
-    def delete_appointment(appointment_id):
-        """Deletes a surgery appointment."""
+    def _reserved_resources(document):
+        staff_ids = [sa['staff_id'] for sa in document.get("staff_assignments", [])]
+        return document["room_id"], staff_ids, document["start_time"], document["end_time"]
+
+    @service_entry_point
+    def delete_appointment(self, appointment_id):
+        """Deletes a surgery appointment and releases its room and staff reservations."""
         try:
-            db.surgery_appointments.delete_one({"appointment_id": appointment_id})
+            document = self.repository.find_one("surgery_appointments", {"appointment_id": appointment_id})
+            self.repository.delete_one("surgery_appointments", {"appointment_id": appointment_id})
+            if document:
+                self.slots.release_appointment(appointment_id, *self._reserved_resources(document))
             print(f"Appointment {appointment_id} deleted successfully.")
-        except PyMongoError as e:
+        except RepositoryError as e:
             print(f"Error deleting appointment: {e}")
 
 # Example usage
 if __name__ == "__main__":
+    service = AppointmentService()
     # Example to create a new appointment
     new_appointment = SurgeryAppointment(
         "APPT001", "SUR001", "P001", 
@@ -139,9 +326,21 @@ if __name__ == "__main__":
     #AppointmentService.create_surgery_appointment(new_appointment)
     #AppointmentService.create_surgery_appointment("APPT001", "SUR001", "P001", [{"staff_id": "STAFF001", "role": "Lead Surgeon"}], "OR001", "2023-08-01T09:00:00", "2023-08-01T11:00:00")
     # Correct method call based on the provided code snippet
-AppointmentService.create_surgery_appointment(
-    "APPT001", "SUR001", "P001", 
-    [{"staff_id": "STAFF001", "role": "Lead Surgeon"}], 
-    "OR001", "2023-08-01T09:00:00", "2023-08-01T11:00:00"
-)
+    service.create_surgery_appointment(
+        "APPT001", "SUR001", "P001", 
+        [{"staff_id": "STAFF001", "role": "Lead Surgeon"}], 
+        "OR001", "2023-08-01T09:00:00", "2023-08-01T11:00:00"
+    )
+
 
+    # Bulk import, e.g. next week's elective list
+    results = service.create_surgery_appointments([
+        {"appointment_id": "APPT002", "surgery_id": "SUR002", "patient_id": "P002",
+         "staff_assignments": [{"staff_id": "STAFF002", "role": "Lead Surgeon"}],
+         "room_id": "OR002", "start_time": "2023-08-02T09:00:00", "end_time": "2023-08-02T11:00:00"},
+        {"appointment_id": "APPT003", "surgery_id": "SUR003", "patient_id": "P003",
+         "staff_assignments": [{"staff_id": "STAFF002", "role": "Lead Surgeon"}],
+         "room_id": "OR003", "start_time": "2023-08-02T10:00:00", "end_time": "2023-08-02T12:00:00"},
+    ])
+    for result in results:
+        print(result)
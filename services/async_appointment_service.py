@@ -0,0 +1,246 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+import logging
+from repositories.base import RepositoryError, DuplicateKeyError
+from repositories.motor_repository import AsyncMongoRepository
+from services.slot_reservation_service import (
+    SLOTS_COLLECTION, appointment_resources, appointment_times, release_request, reserve_request, slot_days,
+    to_datetime
+)
+from services.outbox import OUTBOX_COLLECTION, add_request
+
+from models import SurgeryAppointment, StaffAssignment
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAppointmentService:
+    """
+    Coroutine version of AppointmentService for serving many bookings from one event loop.
+
+    Takes an AsyncMongoRepository (the default) or any repository wrapped in
+    AsyncRepositoryAdapter. While one booking waits on the database the loop serves the others,
+    and the room and staff checks of a single booking run concurrently. Bookings reserve their
+    room and staff in the same slot documents as SlotReservationService, so sync and async
+    callers can never double-book each other.
+    """
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else AsyncMongoRepository()
+
+    async def create_surgery_appointment(self, appointment_id, surgery_id, patient_id, staff_assignments_info, room_id, start_time, end_time):
+        """
+        Creates a new surgery appointment and saves it to the MongoDB database.
+
+        Like AppointmentService.create_surgery_appointment, it queues an appointment.created
+        outbox entry for the staff notification in the same transaction as the appointment, so
+        a booking is never saved without its notification.
+        """
+        staff_ids = [sa['staff_id'] for sa in staff_assignments_info]
+        try:
+            start_time, end_time = appointment_times(start_time, end_time)
+        except ValueError as e:
+            logger.warning(f"Validation failed. Invalid appointment times: {e}")
+            return False
+        try:
+            if await self.repository.find_one("surgery_appointments", {"appointment_id": appointment_id}, {"_id": 1}):
+                logger.warning(f"Validation failed. Appointment {appointment_id} already exists.")
+                return False
+            unavailable = await self.reserve_appointment(appointment_id, room_id, staff_ids, start_time, end_time)
+        except RepositoryError as e:
+            logger.error(f"Failed to reserve resources due to database error: {e}")
+            return False
+        if unavailable is not None:
+            logger.warning(f"Validation failed. {unavailable[0].capitalize()} {unavailable[1]} is not available.")
+            return False
+
+        try:
+            staff_assignments = [StaffAssignment(staff_id=sa['staff_id'], role=sa['role']) for sa in staff_assignments_info]
+
+            new_appointment = SurgeryAppointment(
+                appointment_id=appointment_id,
+                surgery_id=surgery_id,
+                patient_id=patient_id,
+                staff_assignments=staff_assignments,
+                room_id=room_id,
+                start_time=start_time,
+                end_time=end_time
+            )
+
+            query, update = add_request("appointment.created", {
+                "appointment_id": appointment_id,
+                "staff_ids": staff_ids,
+                "room_id": room_id,
+                "start_time": start_time,
+                "end_time": end_time,
+            }, f"appointment.created:{appointment_id}")
+            async with self.repository.transaction():
+                await self.repository.insert_one("surgery_appointments", new_appointment.to_document())
+                await self.repository.update_one(OUTBOX_COLLECTION, query, update, upsert=True)
+        except RepositoryError as e:
+            await self.release_appointment(appointment_id, room_id, staff_ids, start_time, end_time)
+            logger.error(f"Failed to create surgery appointment due to database error: {e}")
+            return False
+        logger.info(f"Surgery appointment {appointment_id} created successfully.")
+        return True
+
+    async def reserve_appointment(self, appointment_id, room_id, staff_ids, start_time, end_time):
+        """
+        Reserves the room and every staff member, or nothing; see SlotReservationService.reserve_appointment.
+
+        The resources are reserved one after another rather than with gather, so that a
+        failed booking has a well-defined set of reservations to release.
+
+        Returns:
+            tuple: (kind, resource_id) of the first unavailable resource, or None on success.
+        """
+        start_time, end_time = to_datetime(start_time), to_datetime(end_time)
+        reserved = []
+        try:
+            for kind, resource_id in appointment_resources(room_id, staff_ids):
+                if not await self._reserve(kind, resource_id, appointment_id, start_time, end_time):
+                    await self._release_all(reserved, appointment_id, start_time, end_time)
+                    return kind, resource_id
+                reserved.append((kind, resource_id))
+        except RepositoryError:
+            await self._release_all(reserved, appointment_id, start_time, end_time)
+            raise
+        return None
+
+    async def release_appointment(self, appointment_id, room_id, staff_ids, start_time, end_time):
+        await self._release_all(appointment_resources(room_id, staff_ids), appointment_id,
+                                to_datetime(start_time), to_datetime(end_time))
+
+    async def _reserve(self, kind, resource_id, appointment_id, start_time, end_time):
+        reserved_days = []
+        for day in slot_days(start_time, end_time):
+            if not await self._reserve_day(kind, resource_id, day, appointment_id, start_time, end_time):
+                for reserved_day in reserved_days:
+                    await self._release_day(kind, resource_id, reserved_day, appointment_id, start_time, end_time)
+                return False
+            reserved_days.append(day)
+        return True
+
+    async def _reserve_day(self, kind, resource_id, day, appointment_id, start_time, end_time):
+        query, update = reserve_request(kind, resource_id, day, appointment_id, start_time, end_time)
+        for _ in range(2):
+            try:
+                return await self.repository.update_one(SLOTS_COLLECTION, query, update, upsert=True)
+            except DuplicateKeyError:
+                continue
+        return False
+
+    async def _release_day(self, kind, resource_id, day, appointment_id, start_time, end_time):
+        query, update = release_request(kind, resource_id, day, appointment_id, start_time, end_time)
+        await self.repository.update_one(SLOTS_COLLECTION, query, update)
+
+    async def _release_all(self, resources, appointment_id, start_time, end_time):
+        for kind, resource_id in resources:
+            try:
+                for day in slot_days(start_time, end_time):
+                    await self._release_day(kind, resource_id, day, appointment_id, start_time, end_time)
+            except RepositoryError as e:
+                logger.error(f"Failed to release {kind} {resource_id} for appointment {appointment_id}: {e}")
+
+    async def validate_appointment(self, room_id, start_time, end_time, staff_assignments_info):
+        """
+        Validates whether a surgery appointment can be scheduled without conflicts.
+
+        The room query and one query per staff member are issued together with asyncio.gather,
+        so validation costs one round trip of latency instead of one per resource.
+        """
+        if isinstance(start_time, str):
+            start_time = datetime.strptime(start_time, "%Y-%m-%dT%H:%M:%S")
+        if isinstance(end_time, str):
+            end_time = datetime.strptime(end_time, "%Y-%m-%dT%H:%M:%S")
+
+        staff_ids = [staff_info['staff_id'] for staff_info in staff_assignments_info]
+        room_available, *staff_available = await asyncio.gather(
+            self.is_room_available(room_id, start_time, end_time),
+            *(self.is_staff_available(staff_id, start_time, end_time) for staff_id in staff_ids)
+        )
+
+        if not room_available:
+            logger.warning("Room is not available.")
+            return False
+        for staff_id, available in zip(staff_ids, staff_available):
+            if not available:
+                logger.warning(f"Staff member {staff_id} is not available.")
+                return False
+        return True
+
+    async def is_room_available(self, room_id, start_time, end_time):
+        """Checks if the room is available for the given time slot."""
+        try:
+            count = await self.repository.count_overlapping(
+                "surgery_appointments", start_time, end_time, "room_id", room_id
+            )
+            return count == 0
+        except RepositoryError as e:
+            logger.error(f"Database error checking room availability: {e}")
+            return False
+
+    async def is_staff_available(self, staff_id, start_time, end_time):
+        """Checks if the staff member is available for the given time slot."""
+        try:
+            count = await self.repository.count_overlapping(
+                "surgery_appointments", start_time, end_time, "staff_assignments.staff_id", staff_id
+            )
+            return count == 0
+        except RepositoryError as e:
+            logger.error(f"Database error checking staff availability: {e}")
+            return False
+
+    async def get_appointment_by_id(self, appointment_id):
+        """Retrieves a surgery appointment by its ID."""
+        try:
+            document = await self.repository.find_one("surgery_appointments", {"appointment_id": appointment_id})
+            return SurgeryAppointment.from_document(document) if document else None
+        except RepositoryError as e:
+            logger.error(f"Error retrieving appointment: {e}")
+            return None
+
+    async def update_appointment(self, appointment_id, update_data):
+        """Updates an existing surgery appointment; use AppointmentService to move one, which also moves its reservations."""
+        try:
+            await self.repository.update_one(
+                "surgery_appointments",
+                {"appointment_id": appointment_id},
+                {"$set": update_data}
+            )
+            logger.info(f"Appointment {appointment_id} updated successfully.")
+        except RepositoryError as e:
+            logger.error(f"Error updating appointment: {e}")
+
+    async def delete_appointment(self, appointment_id):
+        """Deletes a surgery appointment and releases its room and staff reservations."""
+        try:
+            document = await self.repository.find_one("surgery_appointments", {"appointment_id": appointment_id})
+            await self.repository.delete_one("surgery_appointments", {"appointment_id": appointment_id})
+            if document:
+                staff_ids = [sa['staff_id'] for sa in document.get("staff_assignments", [])]
+                await self.release_appointment(appointment_id, document["room_id"], staff_ids,
+                                               document["start_time"], document["end_time"])
+            logger.info(f"Appointment {appointment_id} deleted successfully.")
+        except RepositoryError as e:
+            logger.error(f"Error deleting appointment: {e}")
+
+
+# Example usage: a morning's booking requests served concurrently on one event loop
+if __name__ == "__main__":
+    async def main():
+        service = AsyncAppointmentService()
+        bookings = [
+            service.create_surgery_appointment(
+                f"APPT{n:03d}", f"SUR{n:03d}", f"P{n:03d}",
+                [{"staff_id": f"STAFF{n:03d}", "role": "Lead Surgeon"}],
+                f"OR{n % 5 + 1:03d}", "2023-08-01T09:00:00", "2023-08-01T11:00:00"
+            )
+            for n in range(1, 21)
+        ]
+        results = await asyncio.gather(*bookings)
+        logger.info(f"{sum(results)} of {len(results)} appointments booked.")
+
+    asyncio.run(main())
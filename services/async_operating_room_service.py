@@ -0,0 +1,65 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+from repositories.base import RepositoryError
+from repositories.motor_repository import AsyncMongoRepository
+from models import OperatingRoom
+
+
+class AsyncOperatingRoomService:
+    """Coroutine version of OperatingRoomService; see AsyncAppointmentService for the repository options."""
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else AsyncMongoRepository()
+
+    async def create_operating_room(self, operating_room_data):
+        """Creates a new operating room record."""
+        try:
+            document = operating_room_data.to_document()
+            await self.repository.insert_one("operating_rooms", document)
+            print(f"Operating room {document['room_id']} created successfully.")
+        except RepositoryError as e:
+            print(f"Error creating operating room: {e}")
+
+    async def get_operating_room(self, room_id):
+        """Retrieves an operating room by room_id and returns an OperatingRoom instance."""
+        try:
+            document = await self.repository.find_one("operating_rooms", {"room_id": room_id})
+            if document:
+                return OperatingRoom.from_document(document)
+            else:
+                print(f"No operating room found with ID {room_id}")
+                return None
+        except RepositoryError as e:
+            print(f"Error retrieving operating room: {e}")
+            return None
+
+    async def create_or_update_room(self, room_data):
+        """Inserts a room or updates the existing one with the same room_id."""
+        try:
+            result = await self.repository.update_one(
+                "operating_rooms",
+                {"room_id": room_data["room_id"]},
+                {"$set": room_data},
+                upsert=True
+            )
+
+            if result:
+                print(f"Room {room_data['room_id']} processed successfully.")
+                return True
+            else:
+                print(f"No changes made for Room {room_data['room_id']}.")
+                return False
+        except RepositoryError as e:
+            print(f"Database operation failed due to error: {e}")
+            return False
+
+
+if __name__ == "__main__":
+    async def main():
+        service = AsyncOperatingRoomService()
+        new_room = OperatingRoom("OR001", "Main Building - Room 101", ["ECG Machine", "Anesthesia Machine"])
+        await service.create_operating_room(new_room)
+        print(await service.get_operating_room("OR001"))
+
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+from repositories.base import RepositoryError
+from repositories.motor_repository import AsyncMongoRepository
+from models import Patient
+
+
+class AsyncPatientService:
+    """Coroutine version of PatientService; see AsyncAppointmentService for the repository options."""
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else AsyncMongoRepository()
+
+    async def create_patient(self, patient_data):
+        """Creates a new patient record."""
+        try:
+            document = patient_data.to_document()
+            await self.repository.insert_one("patients", document)
+            print(f"Patient {document['name']} created successfully.")
+        except RepositoryError as e:
+            print(f"Error creating patient: {e}")
+
+    async def update_patient(self, patient_id, update_fields):
+        """Updates an existing patient record."""
+        try:
+            result = await self.repository.update_one("patients", {"patient_id": patient_id}, {"$set": update_fields})
+            if result:
+                print(f"Patient {patient_id} updated successfully.")
+            else:
+                print(f"No patient found with ID {patient_id} or no new data to update.")
+        except RepositoryError as e:
+            print(f"Error updating patient: {e}")
+
+    async def delete_patient(self, patient_id):
+        """Deletes a patient record."""
+        try:
+            result = await self.repository.delete_one("patients", {"patient_id": patient_id})
+            if result:
+                print(f"Patient {patient_id} deleted successfully.")
+            else:
+                print(f"No patient found with ID {patient_id}.")
+        except RepositoryError as e:
+            print(f"Error deleting patient: {e}")
+
+    async def get_patient(self, patient_id):
+        """Retrieves a patient record by patient_id and returns a Patient instance."""
+        try:
+            document = await self.repository.find_one("patients", {"patient_id": patient_id})
+            if document:
+                return Patient.from_document(document)
+            else:
+                print(f"No patient found with ID {patient_id}")
+                return None
+        except RepositoryError as e:
+            print(f"Error retrieving patient: {e}")
+            return None
+
+
+if __name__ == "__main__":
+    async def main():
+        service = AsyncPatientService()
+        new_patient = Patient("PAT001", "Alice Johnson", "1985-04-12", "555-1234", "No known allergies", True)
+        await service.create_patient(new_patient)
+        print(await service.get_patient("PAT001"))
+
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+from repositories.base import RepositoryError
+from repositories.motor_repository import AsyncMongoRepository
+from models import StaffAssignment
+
+
+class AsyncStaffAssignmentService:
+    """Coroutine version of StaffAssignmentService; see AsyncAppointmentService for the repository options."""
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else AsyncMongoRepository()
+
+    async def add_staff_assignment(self, surgery_appointment_id, staff_id, role):
+        """Adds a new staff assignment to an existing surgery appointment."""
+        try:
+            surgery_appointment_oid = self.repository.document_id(surgery_appointment_id)
+            update_result = await self.repository.update_one(
+                "surgery_appointments",
+                {"_id": surgery_appointment_oid},
+                {"$push": {"staff_assignments": {"staff_id": staff_id, "role": role}}}
+            )
+            if update_result:
+                print("Staff assignment added successfully to the surgery appointment.")
+            else:
+                print("Surgery appointment not found or staff assignment already exists.")
+        except RepositoryError as e:
+            print(f"Error adding staff assignment due to a database issue: {e}")
+
+    async def update_staff_role(self, surgery_appointment_id, staff_id, new_role):
+        """Updates the role of a specific staff assignment within a surgery appointment."""
+        try:
+            surgery_appointment_oid = self.repository.document_id(surgery_appointment_id)
+            update_result = await self.repository.update_one(
+                "surgery_appointments",
+                {"_id": surgery_appointment_oid, "staff_assignments.staff_id": staff_id},
+                {"$set": {"staff_assignments.$.role": new_role}}
+            )
+            if update_result:
+                print("Staff assignment role updated successfully.")
+            else:
+                print("Surgery appointment or staff assignment not found.")
+        except RepositoryError as e:
+            print(f"Error updating staff role due to a database issue: {e}")
+
+    async def remove_staff_assignment(self, surgery_appointment_id, staff_id):
+        """Removes a specific staff assignment from a surgery appointment."""
+        try:
+            surgery_appointment_oid = self.repository.document_id(surgery_appointment_id)
+            update_result = await self.repository.update_one(
+                "surgery_appointments",
+                {"_id": surgery_appointment_oid},
+                {"$pull": {"staff_assignments": {"staff_id": staff_id}}}
+            )
+            if update_result:
+                print("Staff assignment removed successfully from the surgery appointment.")
+            else:
+                print("Surgery appointment or staff assignment not found.")
+        except RepositoryError as e:
+            print(f"Error removing staff assignment due to a database issue: {e}")
+
+    async def get_staff_assignment(self, assignment_id):
+        """Fetches a staff assignment by its ID."""
+        try:
+            document = await self.repository.find_one("staff_assignments", {"assignment_id": assignment_id})
+            if document:
+                return StaffAssignment.from_document(document)
+            else:
+                print("Staff assignment not found.")
+                return None
+        except RepositoryError as e:
+            print(f"Error fetching staff assignment: {e}")
+            return None
+
+
+# Example usage of the AsyncStaffAssignmentService
+if __name__ == "__main__":
+    async def main():
+        service = AsyncStaffAssignmentService()
+        # These IDs are placeholders. Replace them with actual values from your database.
+        surgery_appointment_id = "5f8d0d55b54764421b7156cd"  # Example ObjectID string
+        await service.add_staff_assignment(surgery_appointment_id, "staff123", "Nurse")
+        await service.update_staff_role(surgery_appointment_id, "staff123", "Lead Surgeon")
+        await service.remove_staff_assignment(surgery_appointment_id, "staff123")
+
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+from repositories.base import RepositoryError
+from repositories.motor_repository import AsyncMongoRepository
+from models import Staff
+
+
+class AsyncStaffService:
+    """Coroutine version of StaffService; see AsyncAppointmentService for the repository options."""
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else AsyncMongoRepository()
+
+    async def create_staff(self, staff_data):
+        """Creates a new staff record."""
+        try:
+            document = staff_data.to_document()
+            await self.repository.insert_one("staff", document)
+            print(f"Staff {document['name']} created successfully.")
+        except RepositoryError as e:
+            print(f"Error creating staff: {e}")
+
+    async def get_staff(self, staff_id):
+        """Retrieves a staff by staff_id and returns a Staff instance."""
+        try:
+            document = await self.repository.find_one("staff", {"staff_id": staff_id})
+            if document:
+                return Staff.from_document(document)
+            else:
+                print(f"No staff found with ID {staff_id}")
+                return None
+        except RepositoryError as e:
+            print(f"Error retrieving staff: {e}")
+            return None
+
+    async def update_staff(self, staff_id, update_fields):
+        """Updates an existing staff record."""
+        try:
+            await self.repository.update_one("staff", {"staff_id": staff_id}, {"$set": update_fields})
+            print(f"Staff {staff_id} updated successfully.")
+        except RepositoryError as e:
+            print(f"Error updating staff: {e}")
+
+    async def delete_staff(self, staff_id):
+        """Deletes a staff record."""
+        try:
+            await self.repository.delete_one("staff", {"staff_id": staff_id})
+            print(f"Staff {staff_id} deleted successfully.")
+        except RepositoryError as e:
+            print(f"Error deleting staff: {e}")
+
+
+if __name__ == "__main__":
+    async def main():
+        service = AsyncStaffService()
+        new_staff = Staff("STAFF004", "Jane Doe", "Nurse", "jane.doe@example.com")
+        await service.create_staff(new_staff)
+        await service.update_staff("STAFF004", {"role": "Senior Nurse"})
+        await service.delete_staff("STAFF004")
+
+    asyncio.run(main())
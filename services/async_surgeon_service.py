@@ -0,0 +1,61 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+from repositories.base import RepositoryError
+from repositories.motor_repository import AsyncMongoRepository
+from models import Surgeon
+
+
+class AsyncSurgeonService:
+    """Coroutine version of SurgeonService; see AsyncAppointmentService for the repository options."""
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else AsyncMongoRepository()
+
+    async def create_surgeon(self, surgeon_data):
+        """Creates a new surgeon record."""
+        try:
+            document = surgeon_data.to_document()
+            await self.repository.insert_one("surgeons", document)
+            print(f"Surgeon {document['name']} created successfully.")
+        except RepositoryError as e:
+            print(f"Error creating surgeon: {e}")
+
+    async def get_surgeon(self, staff_id):
+        """Retrieves a surgeon by staff_id and returns a Surgeon instance."""
+        try:
+            document = await self.repository.find_one("surgeons", {"staff_id": staff_id})
+            if document:
+                return Surgeon.from_document(document)
+            else:
+                print(f"No surgeon found with ID {staff_id}")
+                return None
+        except RepositoryError as e:
+            print(f"Error retrieving surgeon: {e}")
+            return None
+
+    async def update_surgeon(self, staff_id, update_fields):
+        """Updates an existing surgeon record."""
+        try:
+            await self.repository.update_one("surgeons", {"staff_id": staff_id}, {"$set": update_fields})
+            print(f"Surgeon {staff_id} updated successfully.")
+        except RepositoryError as e:
+            print(f"Error updating surgeon: {e}")
+
+    async def delete_surgeon(self, staff_id):
+        """Deletes a surgeon record."""
+        try:
+            await self.repository.delete_one("surgeons", {"staff_id": staff_id})
+            print(f"Surgeon {staff_id} deleted successfully.")
+        except RepositoryError as e:
+            print(f"Error deleting surgeon: {e}")
+
+
+if __name__ == "__main__":
+    async def main():
+        service = AsyncSurgeonService()
+        new_surgeon = Surgeon("SURGEON001", "Dr. Alex", "alex@example.com", "Cardiology", ["Board Certified"], [("2023-01-01", "2023-12-31")])
+        await service.create_surgeon(new_surgeon)
+        print(await service.get_surgeon("SURGEON001"))
+
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+from repositories.base import RepositoryError
+from repositories.motor_repository import AsyncMongoRepository
+from models import SurgeryEquipment
+
+
+class AsyncSurgeryEquipmentService:
+    """Coroutine version of SurgeryEquipmentService; see AsyncAppointmentService for the repository options."""
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else AsyncMongoRepository()
+
+    async def create_surgery_equipment(self, equipment_data):
+        """Creates a new surgery equipment record."""
+        try:
+            document = equipment_data.to_document()
+            await self.repository.insert_one("surgery_equipment", document)
+            print(f"Surgery equipment {document['equipment_id']} created successfully.")
+        except RepositoryError as e:
+            print(f"Error creating surgery equipment: {e}")
+
+    async def update_surgery_equipment(self, equipment_id, update_fields):
+        """Updates an existing surgery equipment record."""
+        try:
+            result = await self.repository.update_one(
+                "surgery_equipment",
+                {"equipment_id": equipment_id},
+                {"$set": update_fields}
+            )
+            if result:
+                print(f"Surgery equipment {equipment_id} updated successfully.")
+            else:
+                print(f"No changes made to surgery equipment {equipment_id}.")
+        except RepositoryError as e:
+            print(f"Error updating surgery equipment: {e}")
+
+    async def delete_surgery_equipment(self, equipment_id):
+        """Deletes a surgery equipment record."""
+        try:
+            result = await self.repository.delete_one("surgery_equipment", {"equipment_id": equipment_id})
+            if result:
+                print(f"Surgery equipment {equipment_id} deleted successfully.")
+            else:
+                print(f"Surgery equipment {equipment_id} not found.")
+        except RepositoryError as e:
+            print(f"Error deleting surgery equipment: {e}")
+
+    async def get_equipment(self, equipment_id):
+        """Fetches an equipment by its ID."""
+        try:
+            document = await self.repository.find_one("surgery_equipment", {"equipment_id": equipment_id})
+            if document:
+                return SurgeryEquipment.from_document(document)
+            else:
+                print("Equipment not found.")
+                return None
+        except RepositoryError as e:
+            print(f"Error fetching equipment: {e}")
+            return None
+
+
+if __name__ == "__main__":
+    async def main():
+        service = AsyncSurgeryEquipmentService()
+        new_equipment = SurgeryEquipment("EQUIP003", "Laser Scalpel", "Cutting", True)
+        await service.create_surgery_equipment(new_equipment)
+        await service.update_surgery_equipment("EQUIP003", {"availability": False})
+        await service.delete_surgery_equipment("EQUIP003")
+
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+from repositories.base import RepositoryError
+from repositories.motor_repository import AsyncMongoRepository
+from models import SurgeryEquipmentUsage
+
+
+class AsyncSurgeryEquipmentUsageService:
+    """Coroutine version of SurgeryEquipmentUsageService; see AsyncAppointmentService for the repository options."""
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else AsyncMongoRepository()
+
+    async def create_surgery_equipment_usage(self, usage_data):
+        """Creates a new surgery equipment usage record."""
+        try:
+            document = usage_data.to_document()
+            await self.repository.insert_one("surgery_equipment_usage", document)
+            print(f"Surgery equipment usage {document['usage_id']} created successfully.")
+        except RepositoryError as e:
+            print(f"Error creating surgery equipment usage: {e}")
+
+    async def update_surgery_equipment_usage(self, usage_id, update_fields):
+        """Updates an existing surgery equipment usage record."""
+        try:
+            result = await self.repository.update_one(
+                "surgery_equipment_usage",
+                {"usage_id": usage_id},
+                {"$set": update_fields}
+            )
+            if result:
+                print(f"Surgery equipment usage {usage_id} updated successfully.")
+            else:
+                print(f"No changes made to surgery equipment usage {usage_id}.")
+        except RepositoryError as e:
+            print(f"Error updating surgery equipment usage: {e}")
+
+    async def delete_surgery_equipment_usage(self, usage_id):
+        """Deletes a surgery equipment usage record."""
+        try:
+            result = await self.repository.delete_one("surgery_equipment_usage", {"usage_id": usage_id})
+            if result:
+                print(f"Surgery equipment usage {usage_id} deleted successfully.")
+            else:
+                print(f"Surgery equipment usage {usage_id} not found.")
+        except RepositoryError as e:
+            print(f"Error deleting surgery equipment usage: {e}")
+
+    async def get_usage(self, usage_id):
+        """Fetches an equipment usage by its ID."""
+        try:
+            document = await self.repository.find_one("surgery_equipment_usage", {"usage_id": usage_id})
+            if document:
+                return SurgeryEquipmentUsage.from_document(document)
+            else:
+                print("Equipment usage not found.")
+                return None
+        except RepositoryError as e:
+            print(f"Error fetching equipment usage: {e}")
+            return None
+
+
+if __name__ == "__main__":
+    async def main():
+        service = AsyncSurgeryEquipmentUsageService()
+        new_usage = SurgeryEquipmentUsage("USAGE001", "SURG003", "EQUIP001")
+        await service.create_surgery_equipment_usage(new_usage)
+        await service.update_surgery_equipment_usage("USAGE001", {"equipment_id": "EQUIP002"})
+        await service.delete_surgery_equipment_usage("USAGE001")
+
+    asyncio.run(main())
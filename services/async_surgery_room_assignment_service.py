@@ -0,0 +1,86 @@
+import datetime
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+from repositories.base import RepositoryError
+from repositories.motor_repository import AsyncMongoRepository
+from models import SurgeryRoomAssignment
+
+
+class AsyncSurgeryRoomAssignmentService:
+    """Coroutine version of SurgeryRoomAssignmentService; see AsyncAppointmentService for the repository options."""
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else AsyncMongoRepository()
+
+    def to_datetime(self, time_str):
+        """Converts string to datetime object."""
+        return datetime.datetime.strptime(time_str, "%Y-%m-%dT%H:%M:%S")
+
+    async def create_surgery_room_assignment(self, assignment_data):
+        """Creates a new surgery room assignment."""
+        try:
+            document = assignment_data.to_document()
+            # Ensure start_time and end_time are datetime objects
+            document['start_time'] = self.to_datetime(document['start_time'])
+            document['end_time'] = self.to_datetime(document['end_time'])
+            await self.repository.insert_one("surgery_room_assignments", document)
+            print(f"Surgery room assignment {document['assignment_id']} created successfully.")
+        except RepositoryError as e:
+            print(f"Error creating surgery room assignment: {e}")
+
+    async def update_surgery_room_assignment(self, assignment_id, update_fields):
+        """Updates an existing surgery room assignment."""
+        try:
+            # Convert start_time and end_time to datetime if they are being updated
+            if 'start_time' in update_fields:
+                update_fields['start_time'] = self.to_datetime(update_fields['start_time'])
+            if 'end_time' in update_fields:
+                update_fields['end_time'] = self.to_datetime(update_fields['end_time'])
+
+            result = await self.repository.update_one(
+                "surgery_room_assignments",
+                {"assignment_id": assignment_id},
+                {"$set": update_fields}
+            )
+            if result:
+                print(f"Surgery room assignment {assignment_id} updated successfully.")
+            else:
+                print(f"No changes made to surgery room assignment {assignment_id}.")
+        except RepositoryError as e:
+            print(f"Error updating surgery room assignment: {e}")
+
+    async def delete_surgery_room_assignment(self, assignment_id):
+        """Deletes a surgery room assignment."""
+        try:
+            result = await self.repository.delete_one("surgery_room_assignments", {"assignment_id": assignment_id})
+            if result:
+                print(f"Surgery room assignment {assignment_id} deleted successfully.")
+            else:
+                print(f"Surgery room assignment {assignment_id} not found.")
+        except RepositoryError as e:
+            print(f"Error deleting surgery room assignment: {e}")
+
+    async def get_assignment(self, assignment_id):
+        """Fetches a room assignment by its ID."""
+        try:
+            document = await self.repository.find_one("surgery_room_assignments", {"assignment_id": assignment_id})
+            if document:
+                return SurgeryRoomAssignment.from_document(document)
+            else:
+                print("Room assignment not found.")
+                return None
+        except RepositoryError as e:
+            print(f"Error fetching room assignment: {e}")
+            return None
+
+
+if __name__ == "__main__":
+    async def main():
+        service = AsyncSurgeryRoomAssignmentService()
+        new_assignment = SurgeryRoomAssignment("ASSIGN002", "SURG002", "ROOM001", "2023-01-01T09:00:00", "2023-01-01T11:00:00")
+        await service.create_surgery_room_assignment(new_assignment)
+        await service.update_surgery_room_assignment("ASSIGN002", {"room_id": "ROOM002", "start_time": "2023-01-02T09:00:00"})
+        await service.delete_surgery_room_assignment("ASSIGN002")
+
+    asyncio.run(main())
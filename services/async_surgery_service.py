@@ -0,0 +1,75 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+import logging
+from repositories.base import RepositoryError
+from repositories.motor_repository import AsyncMongoRepository
+from models import Surgery
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSurgeryService:
+    """Coroutine version of SurgeryService; see AsyncAppointmentService for the repository options."""
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else AsyncMongoRepository()
+
+    async def create_surgery(self, surgery_data):
+        """Creates a new surgery record in the database."""
+        try:
+            document = surgery_data.to_document()
+            inserted_id = await self.repository.insert_one("surgeries", document)
+            print(f"Surgery {document['surgery_id']} created successfully with ID {inserted_id}.")
+            return inserted_id
+        except RepositoryError as e:
+            logger.error(f"Error creating surgery: {e}")
+            return None
+
+    async def update_surgery(self, surgery_id, update_fields):
+        """Updates an existing surgery record."""
+        try:
+            result = await self.repository.update_one("surgeries", {"surgery_id": surgery_id}, {"$set": update_fields})
+            if result:
+                logger.info(f"Surgery {surgery_id} updated successfully.")
+            else:
+                logger.warning(f"No changes made to surgery {surgery_id}.")
+        except RepositoryError as e:
+            logger.error(f"Error updating surgery: {e}")
+
+    async def delete_surgery(self, surgery_id):
+        """Deletes a surgery record."""
+        try:
+            result = await self.repository.delete_one("surgeries", {"surgery_id": surgery_id})
+            if result:
+                logger.info(f"Surgery {surgery_id} deleted successfully.")
+            else:
+                logger.warning(f"Surgery {surgery_id} not found.")
+        except RepositoryError as e:
+            logger.error(f"Error deleting surgery: {e}")
+
+    async def get_surgery(self, surgery_id):
+        """Fetches a surgery by its ID."""
+        try:
+            document = await self.repository.find_one("surgeries", {"surgery_id": surgery_id})
+            if document:
+                return Surgery.from_document(document)
+            else:
+                print("Surgery not found.")
+                return None
+        except RepositoryError as e:
+            print(f"Error fetching surgery: {e}")
+            return None
+
+
+if __name__ == "__main__":
+    async def main():
+        service = AsyncSurgeryService()
+        surgery = Surgery("SURG004", "PAT001", "SURGEON001", "OR001", "2023-01-02T09:00:00", "Cardiothoracic", "High",
+                          180, "Scheduled", "2023-01-02T09:00:00", "2023-01-02T12:00:00", [])
+        await service.create_surgery(surgery)
+        await service.update_surgery("SURG004", {"status": "Completed"})
+        print(await service.get_surgery("SURG004"))
+        await service.delete_surgery("SURG004")
+
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+from repositories.base import RepositoryError
+from repositories.motor_repository import AsyncMongoRepository
+from models import SurgeryStaffAssignment
+
+
+class AsyncSurgeryStaffAssignmentService:
+    """Coroutine version of SurgeryStaffAssignmentService; see AsyncAppointmentService for the repository options."""
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else AsyncMongoRepository()
+
+    async def create_surgery_staff_assignment(self, assignment_data):
+        """Creates a new surgery staff assignment."""
+        try:
+            document = assignment_data.to_document()
+            await self.repository.insert_one("surgery_staff_assignments", document)
+            print(f"Surgery staff assignment {document['assignment_id']} created successfully.")
+        except RepositoryError as e:
+            print(f"Error creating surgery staff assignment: {e}")
+
+    async def update_surgery_staff_assignment(self, assignment_id, update_fields):
+        """Updates an existing surgery staff assignment."""
+        try:
+            result = await self.repository.update_one(
+                "surgery_staff_assignments",
+                {"assignment_id": assignment_id},
+                {"$set": update_fields}
+            )
+            if result:
+                print(f"Surgery staff assignment {assignment_id} updated successfully.")
+            else:
+                print(f"No changes made to surgery staff assignment {assignment_id}.")
+        except RepositoryError as e:
+            print(f"Error updating surgery staff assignment: {e}")
+
+    async def delete_surgery_staff_assignment(self, assignment_id):
+        """Deletes a surgery staff assignment."""
+        try:
+            result = await self.repository.delete_one("surgery_staff_assignments", {"assignment_id": assignment_id})
+            if result:
+                print(f"Surgery staff assignment {assignment_id} deleted successfully.")
+            else:
+                print(f"Surgery staff assignment {assignment_id} not found.")
+        except RepositoryError as e:
+            print(f"Error deleting surgery staff assignment: {e}")
+
+    async def get_surgery_staff_assignment_by_id(self, assignment_id):
+        try:
+            document = await self.repository.find_one("surgery_staff_assignments", {"assignment_id": assignment_id})
+            return SurgeryStaffAssignment.from_document(document) if document else None
+        except RepositoryError as e:
+            print(f"Error retrieving surgery staff assignment: {e}")
+
+
+if __name__ == "__main__":
+    async def main():
+        service = AsyncSurgeryStaffAssignmentService()
+        new_assignment = SurgeryStaffAssignment("ASSIGN001", "SURG001", "STAFF001", "Lead Surgeon")
+        await service.create_surgery_staff_assignment(new_assignment)
+        await service.update_surgery_staff_assignment("ASSIGN001", {"role": "Assistant Surgeon"})
+        await service.delete_surgery_staff_assignment("ASSIGN001")
+
+    asyncio.run(main())
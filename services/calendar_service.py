@@ -1,34 +1,58 @@
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from datetime import timedelta
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import logging
+from services.calendar_sync import CalendarSync
 
 logger = logging.getLogger(__name__)
 
 class CalendarService:
-    def __init__(self):
-        # Assumes 'token.json' is obtained after the OAuth flow
-        self.credentials = Credentials.from_authorized_user_file('token.json')
-        self.service = build('calendar', 'v3', credentials=self.credentials)
+    """
+    Surgeon calendar updates on top of CalendarSync.
+
+    All instances share one API client (see calendar_sync.get_calendar_client), and updates
+    only send what differs from the cached calendar events.
+
+    Args:
+        sync (CalendarSync, optional): Defaults to a CalendarSync on the shared client.
+    """
+    def __init__(self, sync=None):
+        self.sync = sync if sync is not None else CalendarSync()
 
     def update_surgeon_calendar(self, surgeon, original_surgery, new_surgery):
-        try:
-            # Step 1: Delete the original surgery event if it exists
-            if hasattr(original_surgery, 'calendar_event_id'):
-                self.service.events().delete(calendarId=surgeon.calendar_id,
-                                             eventId=original_surgery.calendar_event_id).execute()
-                logger.info(f"Original surgery event {original_surgery.surgery_id} deleted.")
-
-            # Step 2: Create a new event for the new surgery
-            event = {
-                'summary': f'Surgery: {new_surgery.surgery_type}',
-                'description': f'Surgery details. Patient ID: {new_surgery.patient_id}',
-                'start': {'dateTime': new_surgery.start_time.isoformat(), 'timeZone': 'America/New_York'},
-                'end': {'dateTime': (new_surgery.start_time + timedelta(hours=new_surgery.duration)).isoformat(), 'timeZone': 'America/New_York'},
-            }
-            created_event = self.service.events().insert(calendarId=surgeon.calendar_id, body=event).execute()
-            logger.info(f"New surgery event {new_surgery.surgery_id} added to calendar.")
+        """
+        Replaces the original surgery's event with the new surgery's on the surgeon's calendar.
 
+        Args:
+            surgeon (Surgeon): Surgeon whose calendar (surgeon.calendar_id) is updated.
+            original_surgery (Surgery, optional): Surgery to take off the calendar.
+            new_surgery (Surgery): Surgery to put on the calendar, patched in place if it is already there.
+        """
+        try:
+            result = self.sync_surgeon_calendar(surgeon, original_surgery, new_surgery)
+            logger.info(f"Calendar of {surgeon.name} updated for surgery {new_surgery.surgery_id}: {result}")
         except Exception as e:
             logger.error(f"Error updating calendar for surgeon {surgeon.name}: {e}")
-            # Consider retry logic or alternative handling here
+
+    def sync_surgeon_calendar(self, surgeon, original_surgery, new_surgery):
+        """
+        Same as update_surgeon_calendar, but errors propagate, for callers that retry.
+
+        Returns:
+            dict: Counts of inserted, patched, deleted and failed events.
+        """
+        removals = [original_surgery.surgery_id] if original_surgery is not None else []
+        changes = self.sync.diff(surgeon.calendar_id, [new_surgery], removals=removals)
+        return self.sync.apply(surgeon.calendar_id, changes)
+
+    def publish_schedule(self, surgeries_by_calendar):
+        """
+        Publishes a whole schedule, e.g. a re-optimized week, in batched calls.
+
+        Args:
+            surgeries_by_calendar (dict): {calendar_id: surgeries that calendar must show}.
+
+        Returns:
+            dict: {calendar_id: counts of inserted, patched, deleted, unchanged and failed events}.
+        """
+        return self.sync.publish(surgeries_by_calendar)
@@ -0,0 +1,315 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from repositories.mongo_repository import MongoRepository
+
+logger = logging.getLogger(__name__)
+
+EVENTS_COLLECTION = "calendar_events"
+TIME_ZONE = "America/New_York"
+# Google accepts up to 1000 calls per batch but recommends at most 50 for the Calendar API
+BATCH_SIZE = 50
+# Statuses worth retrying in a later batch: rate limits and transient server errors
+RETRYABLE_STATUSES = {403, 429, 500, 502, 503, 504}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_calendar_client():
+    """
+    Returns the process-wide Google Calendar API client, building it on first use.
+
+    The client reads its OAuth token from token.json. Setting CALENDAR_API_ENDPOINT points it
+    at another server, e.g. a local fake calendar API, with anonymous credentials.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            # The Google client libraries are heavy; import them only when a calendar is used
+            from googleapiclient.discovery import build
+
+            endpoint = os.getenv("CALENDAR_API_ENDPOINT")
+            if endpoint:
+                from google.auth.credentials import AnonymousCredentials
+                _client = build('calendar', 'v3', credentials=AnonymousCredentials(),
+                                client_options={'api_endpoint': endpoint})
+            else:
+                from google.oauth2.credentials import Credentials
+                # Assumes 'token.json' is obtained after the OAuth flow
+                credentials = Credentials.from_authorized_user_file('token.json')
+                _client = build('calendar', 'v3', credentials=credentials)
+        return _client
+
+
+def _to_datetime(value):
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S") if isinstance(value, str) else value
+
+
+def surgery_event(surgery):
+    """Calendar event body of a Surgery; the surgery id is kept in a private extended property."""
+    start_time = _to_datetime(surgery.start_time)
+    end_time = _to_datetime(surgery.end_time) if surgery.end_time else start_time + timedelta(hours=surgery.duration)
+    return {
+        'summary': f'Surgery: {surgery.surgery_type}',
+        'description': f'Surgery details. Patient ID: {surgery.patient_id}',
+        'start': {'dateTime': start_time.isoformat(), 'timeZone': TIME_ZONE},
+        'end': {'dateTime': end_time.isoformat(), 'timeZone': TIME_ZONE},
+        'extendedProperties': {'private': {'surgery_id': str(surgery.surgery_id)}},
+    }
+
+
+def fingerprint(event):
+    return hashlib.sha1(json.dumps(event, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def changed_fields(event, current):
+    """Top-level fields of `event` whose values `current` (an event read back from the API) does not have."""
+    def differs(ours, theirs):
+        if isinstance(ours, dict):
+            return not isinstance(theirs, dict) or any(differs(value, theirs.get(key)) for key, value in ours.items())
+        return ours != theirs
+    return [key for key, value in event.items() if differs(value, current.get(key))]
+
+
+def error_status(exception):
+    """HTTP status of a googleapiclient HttpError (or anything with resp.status), else None."""
+    response = getattr(exception, "resp", None)
+    status = getattr(response, "status", None)
+    return int(status) if status is not None else None
+
+
+class CalendarSync:
+    """
+    Keeps calendars in line with the schedule using as few API calls as possible.
+
+    A local map in the `calendar_events` collection remembers, per calendar and surgery, the
+    event id, its etag and a fingerprint of the body we last wrote. A sync compares the
+    desired events against that map and only sends the difference: new surgeries are
+    inserted, changed ones patched in place (conditional on the cached etag) and, on a full
+    sync, surgeries that left the calendar are deleted. Unchanged events cost nothing. When
+    someone else edited an event since (412), it is read back and diffed again: only the fields
+    the schedule changed since our last write, and that the edited event does not already show,
+    are patched, conditional on the new etag, so the other fields keep the edit. The
+    calls go out in HTTP batches of up to BATCH_SIZE; rate-limited or failed calls are retried
+    in a later batch with backoff.
+
+    Args:
+        service (optional): Calendar API client; defaults to get_calendar_client(). Any object
+            with the events()/new_batch_http_request() interface works, e.g. a local fake.
+        repository (Repository, optional): Where the event map is kept.
+        batch_size (int): Calls per HTTP batch.
+        max_attempts (int): Batches a call may be sent in before it is given up on.
+        backoff (float): Seconds to wait before the first retry batch; doubles after each.
+    """
+    def __init__(self, service=None, repository=None, batch_size=BATCH_SIZE, max_attempts=4, backoff=1.0):
+        self._service = service
+        self.repository = repository if repository is not None else MongoRepository()
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+    @property
+    def service(self):
+        if self._service is None:
+            self._service = get_calendar_client()
+        return self._service
+
+    def cached_events(self, calendar_id):
+        """Returns {surgery_id: cached entry} of a calendar."""
+        return {entry["surgery_id"]: entry
+                for entry in self.repository.find(EVENTS_COLLECTION, {"calendar_id": calendar_id})}
+
+    def diff(self, calendar_id, surgeries, removals=(), prune=False):
+        """
+        Computes the calls that bring a calendar in line with `surgeries`.
+
+        Args:
+            calendar_id (str): Calendar to update.
+            surgeries (list): Surgery objects that must be on the calendar.
+            removals (iterable): Surgery ids that must no longer be on the calendar.
+            prune (bool): Also remove every cached surgery that is not in `surgeries`.
+
+        Returns:
+            list: (operation, surgery_id, event body or None, cached entry or None) tuples, with
+            operation "insert", "patch" or "delete".
+        """
+        cached = self.cached_events(calendar_id)
+        changes = []
+        desired = set()
+        for surgery in surgeries:
+            surgery_id = str(surgery.surgery_id)
+            desired.add(surgery_id)
+            event = surgery_event(surgery)
+            entry = cached.get(surgery_id)
+            if entry is None:
+                changes.append(("insert", surgery_id, event, None))
+            elif entry.get("fingerprint") != fingerprint(event):
+                changes.append(("patch", surgery_id, event, entry))
+        removed = set(cached) - desired if prune else {str(surgery_id) for surgery_id in removals}
+        for surgery_id in sorted(removed):
+            if surgery_id in cached and surgery_id not in desired:
+                changes.append(("delete", surgery_id, None, cached[surgery_id]))
+        return changes
+
+    def sync(self, calendar_id, surgeries, prune=True):
+        """
+        Makes a calendar show exactly `surgeries` (or at least them, with prune=False).
+
+        Returns:
+            dict: Counts of inserted, patched, deleted, unchanged and failed events, and of
+            patches that met an event edited by someone else (conflicts).
+        """
+        surgeries = list(surgeries)
+        changes = self.diff(calendar_id, surgeries, prune=prune)
+        result = self.apply(calendar_id, changes)
+        result["unchanged"] = len(surgeries) - sum(1 for operation, *_ in changes if operation != "delete")
+        return result
+
+    def publish(self, surgeries_by_calendar, prune=True):
+        """Syncs several calendars, e.g. every surgeon's after a re-optimized week; returns {calendar_id: counts}."""
+        return {calendar_id: self.sync(calendar_id, surgeries, prune)
+                for calendar_id, surgeries in surgeries_by_calendar.items()}
+
+    # ------------------------------------------------------------------ execution
+
+    def apply(self, calendar_id, changes):
+        """Sends the calls of a diff in batches and records the outcome in the event map."""
+        result = {"inserted": 0, "patched": 0, "deleted": 0, "failed": 0, "conflicts": 0}
+        pending = list(changes)
+        for attempt in range(1, self.max_attempts + 1):
+            if not pending:
+                break
+            if attempt > 1:
+                time.sleep(self.backoff * 2 ** (attempt - 2) * random.uniform(0.5, 1.0))
+            retry = []
+            for start in range(0, len(pending), self.batch_size):
+                retry.extend(self._send_batch(calendar_id, pending[start:start + self.batch_size], result))
+            pending = retry
+        for operation, surgery_id, _, _ in pending:
+            logger.error(f"Giving up on {operation} of the event of surgery {surgery_id} in calendar {calendar_id}.")
+            result["failed"] += 1
+        return result
+
+    def _send_batch(self, calendar_id, changes, result):
+        """Executes one HTTP batch; returns the changes to send again."""
+        retry = []
+        by_request = {}
+        answered = set()
+
+        def callback(request_id, response, exception):
+            answered.add(request_id)
+            change = by_request[request_id]
+            if exception is None:
+                self._record(calendar_id, change, response, result)
+                return
+            follow_up = self._handle_error(calendar_id, change, exception, result)
+            if follow_up is not None:
+                retry.append(follow_up)
+
+        batch = self.service.new_batch_http_request(callback=callback)
+        events = self.service.events()
+        for number, change in enumerate(changes):
+            operation, surgery_id, event, entry = change
+            if operation == "insert":
+                request = events.insert(calendarId=calendar_id, body=event)
+            elif operation == "patch":
+                body = {key: event[key] for key in entry["fields"]} if entry.get("fields") else event
+                request = events.patch(calendarId=calendar_id, eventId=entry["event_id"], body=body)
+                if entry.get("etag"):
+                    # Only overwrite the version we wrote; a 412 means someone edited the event
+                    request.headers["If-Match"] = entry["etag"]
+            else:
+                request = events.delete(calendarId=calendar_id, eventId=entry["event_id"])
+            request_id = str(number)
+            by_request[request_id] = change
+            batch.add(request, request_id=request_id)
+        try:
+            batch.execute()
+        except Exception as e:
+            # The batch request itself failed (network, auth); resend every call it did not answer
+            logger.warning(f"Calendar batch for {calendar_id} failed: {e}")
+            retry.extend(change for request_id, change in by_request.items() if request_id not in answered)
+        return retry
+
+    def _record(self, calendar_id, change, response, result):
+        operation, surgery_id, event, entry = change
+        query = {"calendar_id": calendar_id, "surgery_id": surgery_id}
+        if operation == "delete":
+            self.repository.delete_one(EVENTS_COLLECTION, query)
+            result["deleted"] += 1
+            return
+        self.repository.update_one(EVENTS_COLLECTION, query, {"$set": {
+            "event_id": response.get("id"),
+            "etag": response.get("etag"),
+            "fingerprint": fingerprint(event),
+            "field_fingerprints": {key: fingerprint(value) for key, value in event.items()},
+        }}, upsert=True)
+        result["inserted" if operation == "insert" else "patched"] += 1
+
+    def _handle_error(self, calendar_id, change, exception, result):
+        """Decides what to do with a failed call; returns the change to send in the next batch, if any."""
+        operation, surgery_id, event, entry = change
+        status = error_status(exception)
+        if operation == "delete" and status in (404, 410):
+            # Already gone; only the map entry is left to remove
+            self._record(calendar_id, change, None, result)
+            return None
+        if operation == "patch" and status in (404, 410):
+            return ("insert", surgery_id, event, None)
+        if operation == "patch" and status == 412:
+            return self._rediff(calendar_id, change, result)
+        if status in RETRYABLE_STATUSES or status is None:
+            return change
+        logger.error(f"Calendar {operation} of surgery {surgery_id} in {calendar_id} failed: {exception}")
+        result["failed"] += 1
+        return None
+
+    def _rediff(self, calendar_id, change, result):
+        """
+        Handles a patch refused because the event changed since we wrote it (412).
+
+        Reads the event back and merges: a field is patched only if the schedule changed it
+        since our last write (per the map's field fingerprints) and the edited event does not
+        already show the new value. Everything else keeps the edit. With nothing left to patch
+        only the event map is updated; otherwise the patch is conditional on the etag just read,
+        so a further edit in the meantime is never silently overwritten.
+        """
+        operation, surgery_id, event, entry = change
+        try:
+            current = self.service.events().get(calendarId=calendar_id, eventId=entry["event_id"]).execute()
+        except Exception as e:
+            status = error_status(e)
+            if status in (404, 410):
+                return ("insert", surgery_id, event, None)
+            if status in RETRYABLE_STATUSES or status is None:
+                return change
+            logger.error(f"Could not read back the event of surgery {surgery_id} in {calendar_id}: {e}")
+            result["failed"] += 1
+            return None
+        written = entry.get("field_fingerprints") or {}
+        fields = [key for key in changed_fields(event, current) if written.get(key) != fingerprint(event[key])]
+        result["conflicts"] += 1
+        if not fields:
+            self._record(calendar_id, change, current, result)
+            return None
+        logger.warning(f"Event of surgery {surgery_id} was edited in calendar {calendar_id}; "
+                       f"updating {', '.join(fields)} on the edited version.")
+        return ("patch", surgery_id, event, dict(entry, etag=current.get("etag"), fields=fields))
+
+
+if __name__ == "__main__":
+    from models import Surgery
+
+    logging.basicConfig(level=logging.INFO)
+    sync = CalendarSync()
+    surgery = Surgery("SUR001", "P001", "SURG001", "OR001", "2023-08-01", "Cardiothoracic", "High", 2, "Scheduled",
+                      datetime(2023, 8, 1, 9), datetime(2023, 8, 1, 11), [])
+    print(sync.sync("surgeon_calendar_id", [surgery], prune=False))
@@ -0,0 +1,134 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import atexit
+import logging
+import threading
+from services.notification_dispatcher import get_notification_dispatcher
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SUBJECT = "Surgery Schedule Updates"
+
+
+def compose_digest(notifications, subject=DIGEST_SUBJECT):
+    """
+    Builds (subject, body) of a digest from (subject, text) pairs.
+
+    A digest of one notification keeps that notification's subject.
+    """
+    sections = "\n\n".join(f"{item_subject}\n{text.strip()}" for item_subject, text in notifications)
+    body = ("Please be informed of the following updates:\n\n"
+            f"{sections}\n\n"
+            "For more details, please consult the scheduling system or contact the administrative office.\n\n"
+            "Best regards,\nThe Scheduling Team")
+    if len(notifications) == 1:
+        return notifications[0][0], body
+    return f"{subject} ({len(notifications)})", body
+
+
+class NotificationCoalescer:
+    """
+    Collects notifications per recipient and sends them as one digest email.
+
+    Every notification is added under a key (usually the surgery id). A later notification with
+    the same recipient and key replaces the earlier one, so a surgery that moves twice in one
+    run is reported once, with its final state. The first notification starts a window of
+    `window` seconds; when it closes, or on flush(), each recipient with pending notifications
+    gets a single email through the dispatcher.
+
+    Args:
+        dispatcher (NotificationDispatcher, optional): Defaults to the shared dispatcher.
+        window (float): Seconds to collect notifications before sending; 0 or None waits for flush().
+        subject (str): Subject of digests with more than one notification.
+    """
+    def __init__(self, dispatcher=None, window=30.0, subject=DIGEST_SUBJECT):
+        self.dispatcher = dispatcher if dispatcher is not None else get_notification_dispatcher()
+        self.window = window
+        self.subject = subject
+        self.stats = {"added": 0, "duplicates": 0, "digests": 0}
+        self._pending = {}  # recipient -> {key: (subject, text)}, in insertion order
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, recipient, key, subject, text):
+        """
+        Adds a notification to the recipient's next digest.
+
+        Args:
+            recipient (str): Recipient email address.
+            key (str): What the notification is about, e.g. a surgery id; a newer notification
+                with the same key replaces the pending one.
+            subject (str): Subject used if this is the only notification in the digest.
+            text (str): Notification text.
+        """
+        if not recipient:
+            return
+        with self._lock:
+            notifications = self._pending.setdefault(recipient, {})
+            self.stats["added"] += 1
+            if key in notifications:
+                self.stats["duplicates"] += 1
+                del notifications[key]  # Re-insert so the digest lists it at its latest position
+            notifications[key] = (subject, text)
+            if self.window and self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def pending(self):
+        """Number of recipients with notifications waiting for the next digest."""
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """
+        Sends every pending digest now.
+
+        Returns:
+            int: Number of digests handed to the dispatcher.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        sent = 0
+        for recipient, notifications in pending.items():
+            subject, body = self.compose(list(notifications.values()))
+            if self.dispatcher.submit(recipient, subject, body):
+                sent += 1
+        with self._lock:
+            self.stats["digests"] += sent
+        if pending:
+            logger.info(f"Queued {sent} notification digests for {len(pending)} recipients.")
+        return sent
+
+    def compose(self, notifications):
+        """Builds (subject, body) of a digest from (subject, text) pairs; see compose_digest."""
+        return compose_digest(notifications, self.subject)
+
+
+_coalescer = None
+_coalescer_lock = threading.Lock()
+
+
+def get_notification_coalescer():
+    """Returns the process-wide coalescer on the shared dispatcher, creating it on first use."""
+    global _coalescer
+    with _coalescer_lock:
+        if _coalescer is None:
+            _coalescer = NotificationCoalescer()
+            # Registered after the dispatcher's close, so at exit it runs first and its digests still go out
+            atexit.register(_coalescer.flush)
+        return _coalescer
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    coalescer = get_notification_coalescer()
+    for surgery_id in ("SUR001", "SUR002", "SUR001"):
+        coalescer.add("dr.smith@example.com", surgery_id, "Surgery Schedule Update",
+                      f"Surgery {surgery_id} has been moved.")
+    coalescer.flush()
+    print(coalescer.stats)
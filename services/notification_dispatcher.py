@@ -0,0 +1,315 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import atexit
+import logging
+import queue
+import random
+import threading
+import time
+from collections import namedtuple
+from utils.lazy_import import lazy_import
+
+smtplib = lazy_import("smtplib")
+mime_text = lazy_import("email.mime.text")
+
+logger = logging.getLogger(__name__)
+
+Email = namedtuple("Email", ["recipient", "subject", "body"])
+
+# Put on the queue once per worker by close(); a worker exits after finishing its current batch
+_STOP = object()
+
+
+def _parse_bool(value):
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def is_permanent(error):
+    """True for SMTP failures that a retry cannot fix (5xx replies and refused recipients)."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500 \
+        and not isinstance(error, smtplib.SMTPServerDisconnected)
+
+
+class NotificationDispatcher:
+    """
+    Sends emails in the background over a small pool of persistent SMTP connections.
+
+    submit() only puts the message on a bounded queue and returns, so the scheduling flow never
+    waits on the mail server. Each worker thread keeps one connection open (connect, STARTTLS
+    and login happen once, not per email), takes up to `batch_size` queued messages at a time
+    and sends them over that connection. Transient failures (dropped connections, 4xx replies)
+    reconnect and retry with exponential backoff and jitter; permanent ones (5xx) are logged and
+    dropped. A connection idle for `idle_timeout` seconds is closed.
+
+    For tests and development, point it at a local SMTP stand-in without TLS or credentials,
+    e.g. `python -m aiosmtpd -n -l localhost:8025` with host="localhost", port=8025, starttls=False.
+
+    Args:
+        host (str): SMTP server.
+        port (int): SMTP port.
+        username (str, optional): Login user; no login when empty.
+        password (str, optional): Login password.
+        sender (str, optional): From address, defaults to `username`.
+        starttls (bool): Upgrade each connection with STARTTLS before logging in.
+        pool_size (int): Number of worker threads, and thus of open connections.
+        queue_size (int): Maximum number of queued messages.
+        batch_size (int): Maximum messages a worker takes from the queue at once.
+        max_attempts (int): Tries per message before giving up.
+        backoff (float): Delay in seconds before the first retry; doubles on each further retry.
+        max_backoff (float): Upper bound of the retry delay.
+        idle_timeout (float): Seconds after which an unused connection is closed.
+        timeout (float): Socket timeout of the SMTP connections.
+        connection_factory (callable, optional): Builds a connection from (host, port, timeout);
+            defaults to smtplib.SMTP.
+    """
+    def __init__(self, host="localhost", port=587, username=None, password=None, sender=None, starttls=True,
+                 pool_size=2, queue_size=1000, batch_size=20, max_attempts=4, backoff=1.0, max_backoff=30.0,
+                 idle_timeout=60.0, timeout=10.0, connection_factory=None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.starttls = starttls
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.connection_factory = connection_factory or smtplib.SMTP
+        self.stats = {"queued": 0, "sent": 0, "failed": 0, "retries": 0, "rejected": 0, "connections": 0}
+        self._stats_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._workers = []
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self._local = threading.local()  # .connection of send() in the calling thread
+
+    @classmethod
+    def from_env(cls, environ=None, **overrides):
+        """Builds a dispatcher from SMTP_* environment variables (see README)."""
+        environ = os.environ if environ is None else environ
+        settings = {
+            "host": environ.get("SMTP_SERVER") or "localhost",
+            "port": int(environ.get("SMTP_PORT") or 587),
+            "username": environ.get("SMTP_USER") or None,
+            "password": environ.get("SMTP_PASSWORD") or None,
+            "sender": environ.get("SMTP_SENDER") or None,
+            "starttls": _parse_bool(environ.get("SMTP_STARTTLS") or "true"),
+            "pool_size": int(environ.get("SMTP_POOL_SIZE") or 2),
+            "queue_size": int(environ.get("SMTP_QUEUE_SIZE") or 1000),
+        }
+        settings.update(overrides)
+        return cls(**settings)
+
+    # ------------------------------------------------------------------ producer side
+
+    def submit(self, recipient, subject, body, timeout=1.0):
+        """
+        Queues an email for delivery.
+
+        Args:
+            recipient (str): Recipient address.
+            subject (str): Subject line.
+            body (str): Plain-text body.
+            timeout (float): Seconds to wait for room in a full queue.
+
+        Returns:
+            bool: True if queued, False if the queue stayed full or the dispatcher is closed.
+        """
+        if self._closed:
+            logger.error(f"Notification dispatcher is closed; email to {recipient} dropped.")
+            return False
+        self._ensure_workers()
+        try:
+            self._queue.put(Email(recipient, subject, body), timeout=timeout)
+        except queue.Full:
+            self._count("rejected")
+            logger.error(f"Notification queue is full; email to {recipient} dropped.")
+            return False
+        self._count("queued")
+        return True
+
+    def send(self, recipient, subject, body):
+        """
+        Sends an email now, in the calling thread, for callers that must know it was delivered.
+
+        Each calling thread keeps its own connection between calls. There is no retry here:
+        a failure closes the connection and raises, and the caller (e.g. an outbox entry)
+        decides when to try again.
+
+        Raises:
+            Exception: Whatever smtplib raised; the email was not accepted by the server.
+        """
+        connection = getattr(self._local, "connection", None)
+        try:
+            if connection is None:
+                connection = self._connect()
+            connection.sendmail(self.sender, [recipient], self._message(Email(recipient, subject, body)).as_string())
+        except Exception:
+            self._local.connection = self._disconnect(connection)
+            self._count("failed")
+            raise
+        self._local.connection = connection
+        self._count("sent")
+        logger.info(f"Email notification sent to {recipient}.")
+
+    def flush(self, timeout=None):
+        """
+        Waits until every queued email has been sent or given up on.
+
+        Returns:
+            bool: True if the queue drained within `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=30.0):
+        """Delivers what is queued, then stops the workers and closes their connections."""
+        with self._start_lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        for _ in workers:
+            self._queue.put(_STOP)
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+
+    def _ensure_workers(self):
+        if self._workers:
+            return
+        with self._start_lock:
+            if self._workers or self._closed:
+                return
+            for number in range(self.pool_size):
+                worker = threading.Thread(target=self._run, name=f"notification-dispatcher-{number}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    # ------------------------------------------------------------------ workers
+
+    def _run(self):
+        connection = None
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                connection = self._disconnect(connection)
+                continue
+            batch = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            for email in batch:
+                try:
+                    connection = self._deliver(connection, email)
+                finally:
+                    self._queue.task_done()
+        self._disconnect(connection)
+
+    def _deliver(self, connection, email):
+        """Sends one email, reconnecting and retrying as needed; returns the connection to reuse."""
+        message = self._message(email)
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                if connection is None:
+                    connection = self._connect()
+                connection.sendmail(self.sender, [email.recipient], message.as_string())
+                self._count("sent")
+                logger.info(f"Email notification sent to {email.recipient}.")
+                return connection
+            except Exception as e:
+                if is_permanent(e) or attempt == self.max_attempts:
+                    self._count("failed")
+                    logger.error(f"Failed to send email notification to {email.recipient}: {e}")
+                    if not is_permanent(e):  # A rejected message leaves the session usable
+                        connection = self._disconnect(connection)
+                    return connection
+                connection = self._disconnect(connection)
+                self._count("retries")
+                delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+                logger.warning(f"Sending to {email.recipient} failed ({e}); retrying in {delay:.1f}s.")
+                time.sleep(delay * random.uniform(0.5, 1.0))
+        return connection
+
+    def _message(self, email):
+        message = mime_text.MIMEText(email.body, "plain")
+        message["From"] = self.sender
+        message["To"] = email.recipient
+        message["Subject"] = email.subject
+        return message
+
+    def _connect(self):
+        connection = self.connection_factory(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                connection.starttls()
+            if self.username:
+                connection.login(self.username, self.password)
+        except Exception:
+            self._disconnect(connection)
+            raise
+        self._count("connections")
+        return connection
+
+    @staticmethod
+    def _disconnect(connection):
+        if connection is not None:
+            try:
+                connection.quit()
+            except Exception:
+                connection.close()
+        return None
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_notification_dispatcher():
+    """Returns the process-wide dispatcher configured from the environment, creating it on first use."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher.from_env()
+            # Deliver what is still queued when the process exits normally
+            atexit.register(_dispatcher.close)
+        return _dispatcher
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    # Against a local stand-in: python -m aiosmtpd -n -l localhost:8025
+    dispatcher = NotificationDispatcher(host="localhost", port=8025, sender="scheduler@example.com", starttls=False)
+    for n in range(10):
+        dispatcher.submit(f"user{n}@example.com", "Surgery Schedule Update", "Your schedule has changed.")
+    dispatcher.flush(timeout=30)
+    dispatcher.close()
+    print(dispatcher.stats)
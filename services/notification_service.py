@@ -1,4 +1,10 @@
+import sys
 import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import logging
+from services.notification_dispatcher import get_notification_dispatcher
+
+logger = logging.getLogger(__name__)
 
 class SingletonMeta(type):
     _instances = {}
@@ -8,12 +14,41 @@ class SingletonMeta(type):
         return cls._instances[cls]
 
 class NotificationService(metaclass=SingletonMeta):
-    def __init__(self):
-        # Email setup from environment variables for enhanced security
-        self.smtp_server = os.getenv('SMTP_SERVER')
-        self.smtp_port = int(os.getenv('SMTP_PORT', 587))  # Default to 587 if SMTP_PORT is not set
-        self.smtp_user = os.getenv('SMTP_USER')
-        self.smtp_password = os.getenv('SMTP_PASSWORD')
-
-# Usage
-notification_service = NotificationService()
+    """
+    Sends notification emails through the shared NotificationDispatcher.
+
+    Messages are queued and delivered in the background over pooled SMTP connections; the
+    connection settings come from the SMTP_* environment variables (see notification_dispatcher.py).
+    """
+    def __init__(self, dispatcher=None):
+        self._dispatcher = dispatcher
+
+    @property
+    def dispatcher(self):
+        if self._dispatcher is None:
+            self._dispatcher = get_notification_dispatcher()
+        return self._dispatcher
+
+    def send_notification(self, recipient_email, subject, body):
+        """
+        Queues a plain-text email notification.
+
+        Args:
+            recipient_email (str): The email address of the recipient.
+            subject (str): The subject line of the email.
+            body (str): The body content of the email.
+
+        Returns:
+            bool: True if the email was queued for delivery.
+        """
+        return self.dispatcher.submit(recipient_email, subject, body)
+
+def get_notification_service():
+    """Returns the shared NotificationService, creating it on first use."""
+    return NotificationService()
+
+# Usage: `notification_service` is still importable, but only built when first accessed
+def __getattr__(name):
+    if name == "notification_service":
+        return get_notification_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,66 +2,71 @@
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from db_config import db
+from repositories.base import RepositoryError, service_entry_point
+from repositories.mongo_repository import MongoRepository
 from models import OperatingRoom
-from pymongo.errors import PyMongoError
 
 
 class OperatingRoomService:
-    @staticmethod
-    def create_operating_room(operating_room_data):
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else MongoRepository()
+
+    @service_entry_point
+    def create_operating_room(self, operating_room_data):
         """Creates a new operating room record."""
         try:
             document = operating_room_data.to_document()
-            db.operating_rooms.insert_one(document)
+            self.repository.insert_one("operating_rooms", document)
             print(f"Operating room {document['room_id']} created successfully.")
-        except PyMongoError as e:
+        except RepositoryError as e:
             print(f"Error creating operating room: {e}")
 
-    @staticmethod
-    def get_operating_room(room_id):
+    @service_entry_point
+    def get_operating_room(self, room_id):
         """Retrieves an operating room by room_id and returns an OperatingRoom instance."""
         try:
-            document = db.operating_rooms.find_one({"room_id": room_id})
+            document = self.repository.find_one("operating_rooms", {"room_id": room_id})
             if document:
                 return OperatingRoom.from_document(document)
             else:
                 print(f"No operating room found with ID {room_id}")
                 return None
-        except PyMongoError as e:
+        except RepositoryError as e:
             print(f"Error retrieving operating room: {e}")
             return None
 
-from pymongo.errors import PyMongoError, DuplicateKeyError
-from db_config import db  # Ensure you have a way to access your db instance
+    @service_entry_point
+    def create_or_update_room(self, room_data):
+        """Inserts a room or updates the existing one with the same room_id."""
+        try:
+            result = self.repository.update_one(
+                "operating_rooms",
+                {"room_id": room_data["room_id"]},
+                {"$set": room_data},
+                upsert=True
+            )
 
-def create_or_update_room(room_data):
-    try:
-        # Attempt to insert or update room data, handling duplicate room_id
-        result = db.operating_rooms.update_one(
-            {"room_id": room_data["room_id"]},
-            {"$set": room_data},
-            upsert=True
-        )
-        
-        if result.upserted_id or result.modified_count > 0:
-            print(f"Room {room_data['room_id']} processed successfully.")
-            return True
-        else:
-            print(f"No changes made for Room {room_data['room_id']}.")
+            if result:
+                print(f"Room {room_data['room_id']} processed successfully.")
+                return True
+            else:
+                print(f"No changes made for Room {room_data['room_id']}.")
+                return False
+        except RepositoryError as e:
+            print(f"Database operation failed due to error: {e}")
             return False
-    except DuplicateKeyError:
-        print(f"Error: Room ID {room_data['room_id']} already exists. Duplicate entries are not allowed.")
-        return False
-    except PyMongoError as e:
-        print(f"Database operation failed due to error: {e}")
-        return False
+
+
+def create_or_update_room(room_data):
+    """Module-level entry point kept for existing callers; uses the default MongoDB repository."""
+    return OperatingRoomService.create_or_update_room(room_data)
 
 
 # Example usage
 if __name__ == "__main__":
+    service = OperatingRoomService()
     try:
         new_room = OperatingRoom("OR001", "Main Building - Room 101", ["ECG Machine", "Anesthesia Machine"])
-        OperatingRoomService.create_operating_room(new_room)
+        service.create_operating_room(new_room)
     except Exception as e:
         print(f"An error occurred: {e}")
\ No newline at end of file
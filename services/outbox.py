@@ -0,0 +1,405 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from repositories.base import RepositoryError
+from repositories.mongo_repository import MongoRepository
+from services.slot_reservation_service import SlotReservationService
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_COLLECTION = "outbox"
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+DIGEST_KIND = "email.digest"
+DIGEST_WINDOW = 30.0
+
+
+def add_request(kind, payload, idempotency_key):
+    """(query, update) of the upsert that queues an outbox entry; see Outbox.add."""
+    now = datetime.now()
+    # $setOnInsert instead of insert_one: a duplicate key would abort a MongoDB transaction
+    return {"_id": idempotency_key}, {"$setOnInsert": {
+        "kind": kind,
+        "payload": payload,
+        "status": PENDING,
+        "attempts": 0,
+        "available_at": now,
+        "lease_until": None,
+        "created_at": now,
+    }}
+
+
+class Outbox:
+    """
+    Records side effects (emails, calendar updates) next to the schedule writes that cause them.
+
+    add() is meant to be called inside repository.transaction() together with the schedule
+    write, so a crash either loses both or keeps both; OutboxProcessor delivers the entries
+    afterwards. Every entry has an idempotency key, which is its _id: adding the same key again
+    is a no-op, and handlers receive the key so they can tell a redelivery from a new event.
+
+    Args:
+        repository (Repository, optional): Must be the repository the schedule is written with.
+    """
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else MongoRepository()
+
+    def add(self, kind, payload, idempotency_key):
+        """
+        Queues a side effect.
+
+        Args:
+            kind (str): Handler name, e.g. "email" or "calendar.update_surgeon".
+            payload (dict): Handler arguments; must be storable as a document.
+            idempotency_key (str): Identifies the side effect across retries and redeliveries.
+
+        Returns:
+            bool: True if queued, False if an entry with this key already exists.
+        """
+        query, update = add_request(kind, payload, idempotency_key)
+        return self.repository.update_one(OUTBOX_COLLECTION, query, update, upsert=True)
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average, with bursts of up to `burst`."""
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a call is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class OutboxProcessor:
+    """
+    Pool of worker threads that delivers outbox entries to their handlers.
+
+    A worker claims an entry with a conditional update (status and lease must still be what it
+    read), so two workers never run the same entry at once. A claim is a lease: an entry whose
+    worker died is picked up again once the lease expires. Delivery is at least once; handlers
+    get the idempotency key to make redeliveries harmless. A failing entry is retried with
+    exponential backoff and marked failed after `max_attempts`. Calls to each kind of handler
+    can be rate limited.
+
+    Args:
+        repository (Repository, optional): Repository holding the outbox collection.
+        handlers (dict, optional): {kind: callable(payload, idempotency_key)}; defaults to
+            default_handlers().
+        workers (int): Number of worker threads.
+        rate_limits (dict, optional): {kind: calls per second}.
+        batch_size (int): Entries a worker reads per poll.
+        poll_interval (float): Seconds an idle worker waits before polling again.
+        lease (float): Seconds a claimed entry stays reserved for its worker.
+        max_attempts (int): Deliveries before an entry is marked failed.
+        backoff (float): Seconds before the first retry; doubles on each further retry.
+    """
+    def __init__(self, repository=None, handlers=None, workers=4, rate_limits=None, batch_size=20,
+                 poll_interval=1.0, lease=300.0, max_attempts=8, backoff=5.0):
+        self.repository = repository if repository is not None else MongoRepository()
+        self.handlers = handlers if handlers is not None else default_handlers(self.repository)
+        self.workers = workers
+        self.rate_limiters = {kind: TokenBucket(rate) for kind, rate in (rate_limits or {}).items()}
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.stats = {"delivered": 0, "retried": 0, "failed": 0}
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Starts the worker threads."""
+        self._stop.clear()
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"outbox-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=30.0):
+        """Lets every worker finish its current entry, then stops them."""
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def drain(self):
+        """
+        Delivers entries in the calling thread until none is due, e.g. in scripts and tests.
+
+        Returns:
+            int: Number of entries processed.
+        """
+        processed = 0
+        while True:
+            count = self.process_once()
+            if not count:
+                return processed
+            processed += count
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.process_once()
+            except RepositoryError as e:
+                logger.error(f"Outbox worker could not read the outbox: {e}")
+                processed = 0
+            if not processed:
+                self._stop.wait(self.poll_interval)
+
+    def process_once(self):
+        """Claims and runs up to batch_size due entries; returns how many were processed."""
+        now = datetime.now()
+        due = self.repository.find(OUTBOX_COLLECTION, {
+            "kind": {"$in": list(self.handlers)},
+            "$or": [
+                {"status": PENDING, "available_at": {"$lte": now}},
+                {"status": IN_PROGRESS, "lease_until": {"$lte": now}},
+            ],
+        }, sort=[("available_at", 1)], limit=self.batch_size)
+        processed = 0
+        for entry in list(due):
+            if self._stop.is_set() and self._threads:
+                break
+            lease_until = self._claim(entry)
+            if lease_until is None:
+                continue  # Another worker got it first
+            self._deliver(entry, lease_until)
+            processed += 1
+        return processed
+
+    def _claim(self, entry):
+        lease_until = datetime.now() + timedelta(seconds=self.lease)
+        claimed = self.repository.update_one(
+            OUTBOX_COLLECTION,
+            {"_id": entry["_id"], "status": entry["status"], "lease_until": entry["lease_until"]},
+            {"$set": {"status": IN_PROGRESS, "lease_until": lease_until}, "$inc": {"attempts": 1}}
+        )
+        return lease_until if claimed else None
+
+    def _deliver(self, entry, lease_until):
+        key = entry["_id"]
+        limiter = self.rate_limiters.get(entry["kind"])
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            self.handlers[entry["kind"]](entry["payload"], key)
+        except Exception as e:
+            attempts = entry["attempts"] + 1
+            if attempts >= self.max_attempts:
+                update = {"status": FAILED, "last_error": str(e), "lease_until": None}
+                self._count("failed")
+                logger.error(f"Outbox entry {key} ({entry['kind']}) failed {attempts} times, giving up: {e}")
+            else:
+                delay = self.backoff * 2 ** (attempts - 1) * random.uniform(0.5, 1.0)
+                update = {"status": PENDING, "last_error": str(e), "lease_until": None,
+                          "available_at": datetime.now() + timedelta(seconds=delay)}
+                self._count("retried")
+                logger.warning(f"Outbox entry {key} ({entry['kind']}) failed, retrying in {delay:.0f}s: {e}")
+        else:
+            update = {"status": DONE, "completed_at": datetime.now(), "lease_until": None}
+            self._count("delivered")
+        # Only the lease holder may settle the entry; after an expired lease another worker owns it
+        self.repository.update_one(OUTBOX_COLLECTION, {"_id": key, "lease_until": lease_until}, {"$set": update})
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+
+class DigestQueue:
+    """
+    Collects notifications per recipient in digest entries of the outbox.
+
+    Has the add() of NotificationCoalescer, but instead of holding notifications in memory it
+    pushes each one onto the recipient's pending digest entry, one entry per recipient and
+    `window` seconds. The entry becomes due when its window closes, and digest_handler sends it
+    as one email; so a handler that adds a notification has stored it durably once add()
+    returns. Adding only matches a pending entry: once a worker has claimed the digest, the
+    upsert collides on _id and raises DuplicateKeyError, and the calling entry is retried into
+    a later window. Notifications are kept in the entry's `notifications` field, outside the
+    payload, so they can be pushed one at a time.
+
+    Args:
+        repository (Repository, optional): Repository holding the outbox collection.
+        window (float): Seconds a digest collects notifications.
+    """
+    def __init__(self, repository=None, window=DIGEST_WINDOW):
+        self.repository = repository if repository is not None else MongoRepository()
+        self.window = window
+
+    def add(self, recipient, key, subject, text):
+        """
+        Adds a notification to the recipient's next digest.
+
+        Args:
+            recipient (str): Recipient email address.
+            key (str): What the notification is about; a later notification with the same key
+                replaces it in the digest.
+            subject (str): Subject used if this is the only notification in the digest.
+            text (str): Notification text.
+        """
+        if not recipient:
+            return
+        window = int(time.time() // self.window)
+        self.repository.update_one(OUTBOX_COLLECTION, {"_id": f"digest:{recipient}:{window}", "status": PENDING}, {
+            "$push": {"notifications": {"key": key, "subject": subject, "text": text}},
+            "$setOnInsert": {
+                "kind": DIGEST_KIND,
+                "payload": {"recipient": recipient},
+                "attempts": 0,
+                "available_at": datetime.fromtimestamp((window + 1) * self.window),
+                "lease_until": None,
+                "created_at": datetime.now(),
+            },
+        }, upsert=True)
+
+    def flush(self):
+        """
+        Nothing to send: the digests are already stored, and the outbox workers deliver each one
+        when its window closes. Present so a DigestQueue can stand in for a NotificationCoalescer.
+
+        Returns:
+            int: Always 0, the number of digests sent by this call.
+        """
+        return 0
+
+
+# ---------------------------------------------------------------------------
+# Handlers
+#
+# A handler returns only once its side effect happened (or was stored durably, like a
+# notification added to a DigestQueue); anything else must raise, so the entry is retried.
+
+def digest_handler(repository, dispatcher=None):
+    """Handler that sends a DigestQueue entry as one email, raising unless the SMTP server accepted it."""
+    def send_digest(payload, idempotency_key):
+        from services.notification_coalescer import compose_digest
+        from services.notification_dispatcher import get_notification_dispatcher
+        entry = repository.find_one(OUTBOX_COLLECTION, {"_id": idempotency_key}, {"notifications": 1}) or {}
+        latest = {}
+        for notification in entry.get("notifications", ()):
+            latest.pop(notification["key"], None)  # Re-insert so the digest lists it at its latest position
+            latest[notification["key"]] = (notification["subject"], notification["text"])
+        if not latest:
+            return
+        subject, body = compose_digest(list(latest.values()))
+        (dispatcher if dispatcher is not None else get_notification_dispatcher()).send(payload["recipient"], subject, body)
+    return send_digest
+
+
+def email_handler(digests):
+    """Handler that adds an email to the recipient's next digest; the key deduplicates redeliveries."""
+    def send_email(payload, idempotency_key):
+        digests.add(payload["recipient"], payload.get("digest_key", idempotency_key), payload["subject"], payload["body"])
+    return send_email
+
+
+def _surgery(document):
+    from models import Surgery
+    return Surgery.from_document(document)
+
+
+def _person(document):
+    """Lightweight stand-in for a surgeon or staff member rebuilt from an outbox payload."""
+    from types import SimpleNamespace
+    return SimpleNamespace(**document)
+
+
+def update_surgeon_calendar(payload, idempotency_key):
+    """
+    Calendar updates are diffed against the cached events, so a redelivery only sends what
+    failed before. Raises if any event could not be written.
+    """
+    from services.calendar_service import CalendarService
+    surgeon = _person(payload["surgeon"])
+    result = CalendarService().sync_surgeon_calendar(surgeon, _surgery(payload["original_surgery"]),
+                                                     _surgery(payload["new_surgery"]))
+    if result["failed"]:
+        raise RuntimeError(f"{result['failed']} calendar events of {surgeon.calendar_id} were not updated")
+
+
+def surgeon_swap_handler(digests):
+    def notify_surgeon_of_swap(payload, idempotency_key):
+        from scheduling_services import NotificationService
+        NotificationService(digests).notify_surgeon_of_swap(_person(payload["surgeon"]),
+                                                            _surgery(payload["original_surgery"]),
+                                                            _surgery(payload["new_surgery"]))
+    return notify_surgeon_of_swap
+
+
+def staff_and_patients_handler(digests):
+    def notify_staff_and_patients(payload, idempotency_key):
+        from scheduling_services import NotificationService
+        NotificationService(digests).notify_staff_and_patients(_surgery(payload["surgery_1"]),
+                                                               _surgery(payload["surgery_2"]))
+    return notify_staff_and_patients
+
+
+def appointment_created_handler(repository, digests):
+    """Handler that tells the staff of a new appointment about it, looking up their emails in one query."""
+    def notify_staff(payload, idempotency_key):
+        staff = repository.find("staff", {"staff_id": {"$in": payload["staff_ids"]}}, {"contact_info": 1})
+        for member in staff:
+            email = (member.get("contact_info") or {}).get("email")
+            digests.add(email, payload["appointment_id"], "New Surgery Appointment",
+                        f"You have been assigned to appointment {payload['appointment_id']} in room "
+                        f"{payload['room_id']} from {payload['start_time']} to {payload['end_time']}.")
+    return notify_staff
+
+
+def default_handlers(repository, dispatcher=None, digest_window=DIGEST_WINDOW):
+    """
+    Handlers of every outbox kind. Notifications are collected in digest entries of the same
+    outbox and emailed through `dispatcher` (the shared one by default) when their
+    `digest_window` closes.
+    """
+    digests = DigestQueue(repository, digest_window)
+    return {
+        "email": email_handler(digests),
+        "calendar.update_surgeon": update_surgeon_calendar,
+        "notify.surgeon_swap": surgeon_swap_handler(digests),
+        "notify.staff_and_patients": staff_and_patients_handler(digests),
+        "appointment.created": appointment_created_handler(repository, digests),
+        DIGEST_KIND: digest_handler(repository, dispatcher),
+    }
+
+
+if __name__ == "__main__":
+    # Runs the outbox workers until interrupted, sweeping reservations of failed bookings every minute
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    processor = OutboxProcessor(rate_limits={"calendar.update_surgeon": 5.0, DIGEST_KIND: 10.0})
+    slots = SlotReservationService(processor.repository)
+    processor.start()
+    try:
+        while True:
+            time.sleep(60)
+            logger.info(f"Outbox: {processor.stats}")
+            try:
+                slots.release_orphaned()
+            except RepositoryError as e:
+                logger.error(f"Could not release orphaned reservations: {e}")
+    except KeyboardInterrupt:
+        processor.stop()
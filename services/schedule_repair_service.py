@@ -0,0 +1,193 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import logging
+from datetime import datetime
+from models import to_epoch_minutes, from_epoch_minutes, MISSING_MINUTE
+from repositories.mongo_repository import MongoRepository
+from schedule_state import ScheduleState, DEFAULT_HORIZON_DAYS
+from scheduling_optimizer import TabuSearchScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleRepairService:
+    """
+    Repairs the committed schedule after a disruption instead of re-optimizing everything.
+
+    The disruption (a closed room, an absent surgeon, broken equipment, emergency surgeries;
+    the Perturbation classes of services/what_if_service.py) is written to the repository and
+    the schedule is reloaded with every booking that is still feasible kept in place. Only the
+    affected surgeries may move: those the disruption displaced or added, and those booked in
+    the affected days (the disruption's, widened by `margin_days`) on an affected room or
+    with an affected surgeon, equipment item or pool, or staff member. Everything else is frozen. A
+    bounded Tabu Search then runs over those surgeries and days, with a stability term in the
+    score that rewards every surgery left at its booked slot, so the plan changes as few
+    bookings as it can. Surgeries the affected days cannot hold are put in the first free
+    slot after them.
+
+    Args:
+        repository (Repository, optional): Where the schedule is read and, on commit, written.
+        scheduler (TabuSearchScheduler, optional): Search to run; defaults to one on the repository.
+    """
+    def __init__(self, repository=None, scheduler=None):
+        self.repository = repository if repository is not None else MongoRepository()
+        self.scheduler = scheduler if scheduler is not None else TabuSearchScheduler(self.repository)
+
+    def repair(self, disruptions, now=None, horizon_days=DEFAULT_HORIZON_DAYS, margin_days=1, max_iterations=300,
+               time_limit=5.0, stability_weight=None, seed=None, commit=False):
+        """
+        Applies disruptions and computes the smallest schedule change that absorbs them.
+
+        Args:
+            disruptions (list): Perturbation objects describing what happened.
+            now (datetime, optional): Current time; surgeries that already started are frozen
+                and the horizon starts on this day. Defaults to datetime.now().
+            horizon_days (int): Days ahead surgeries may be moved to.
+            margin_days (int): Days around the disruption whose bookings may move too.
+            max_iterations (int): Tabu Search iterations.
+            time_limit (float, optional): Seconds the search may take.
+            stability_weight (float, optional): Score of keeping a booking; defaults to
+                DEFAULT_WEIGHTS["stability"]. Higher values trade schedule quality for fewer changes.
+            seed (int, optional): Seed for a reproducible search.
+            commit (bool): Write the changed bookings to the surgeries collection.
+
+        Returns:
+            dict: changes (list of {surgery_id, from, to} with {room_id, start_time, end_time}
+            or None), unplaced (surgery ids that found no slot), movable (number of surgeries
+            the search could move), days (affected horizon days) and stats.
+        """
+        now = now or datetime.now()
+        for disruption in disruptions:
+            disruption.apply(self.repository)
+        state = ScheduleState.from_repository(self.repository, horizon_start=now, horizon_days=horizon_days)
+        if stability_weight is not None:
+            state.weights["stability"] = stability_weight
+        state.anchor_current()
+
+        movable, days = self.affected(state, disruptions, to_epoch_minutes(now), margin_days)
+        self.scheduler.run(state, max_iterations=max_iterations, time_limit=time_limit, seed=seed,
+                           movable=movable, days=days)
+        # Whatever the affected days cannot hold goes to the first free slot after them
+        leftovers = [i for i in movable if state.room_of[i] is None]
+        if leftovers:
+            self.scheduler.build_initial_schedule(state, leftovers, range(days.stop, state.horizon_days))
+
+        changes = []
+        unplaced = []
+        for i in sorted(movable):
+            surgery = state.surgeries[i]
+            before = self._booking(surgery.room_id, surgery.start_minute, state.durations[i])
+            after = self._booking(state.room_of[i], state.start_of[i], state.durations[i])
+            if after is None:
+                unplaced.append(surgery.surgery_id)
+            if before != after:
+                changes.append({"surgery_id": surgery.surgery_id, "from": before, "to": after})
+        logger.info(f"Repair moved {len(changes)} of {len(movable)} movable surgeries; {len(unplaced)} unplaced.")
+        if commit and changes:
+            self.commit(changes)
+        return {"changes": changes, "unplaced": unplaced, "movable": len(movable), "days": days,
+                "stats": self.scheduler.stats}
+
+    @staticmethod
+    def affected(state, disruptions, now_minute, margin_days):
+        """
+        Positions of the surgeries a repair may move, and the horizon days it searches.
+
+        Returns:
+            tuple: (set of positions, range of days)
+        """
+        added = set()
+        resources = set()
+        days = set()
+        for disruption in disruptions:
+            added |= disruption.surgery_ids()
+            resources |= disruption.resources()
+            window = disruption.window()
+            if window is not None:
+                first = max(0, state.day_of(to_epoch_minutes(window[0])))
+                last = min(state.horizon_days - 1, state.day_of(to_epoch_minutes(window[1]) - 1))
+                days.update(range(first, last + 1))
+        # An equipment unit going down also takes a unit out of its pool
+        pools = state.equipment_pools
+        if pools is not None:
+            resources.update([("pool", pools.unit_pool[key[1]]) for key in resources
+                              if key[0] == "equipment" and key[1] in pools.unit_pool])
+
+        movable = set()
+        for i, surgery in enumerate(state.surgeries):
+            if state.room_of[i] is not None:
+                continue
+            booked = surgery.room_id is not None and surgery.start_minute != MISSING_MINUTE
+            if surgery.surgery_id in added:
+                days.add(0)  # Added surgeries are placed as early as possible
+                resources.update(("room", room_id) for room_id in state.eligible_rooms[i])
+            elif booked and surgery.start_minute >= now_minute and state.day_of(surgery.start_minute) < state.horizon_days:
+                days.add(state.day_of(surgery.start_minute))  # Displaced: its booking is no longer feasible
+                resources.add(("room", surgery.room_id))
+            else:
+                continue  # Waiting list or past surgeries are not this repair's business
+            movable.add(i)
+            resources.update(ScheduleRepairService._resource_keys(state, i))
+
+        if not days:
+            return movable, range(0)
+        first = max(0, min(days) - margin_days)
+        last = min(state.horizon_days - 1, max(days) + margin_days)
+        for i, room_id in enumerate(state.room_of):
+            if room_id is None or state.start_of[i] < now_minute or not first <= state.day_of(state.start_of[i]) <= last:
+                continue
+            if ("room", room_id) in resources or any(key in resources
+                                                     for key in ScheduleRepairService._resource_keys(state, i)):
+                movable.add(i)
+        return movable, range(first, last + 1)
+
+    @staticmethod
+    def _resource_keys(state, i):
+        return state.resources[i] + tuple(("pool", pool_id) for pool_id, _ in state.pool_needs[i])
+
+    @staticmethod
+    def _booking(room_id, start, duration):
+        if room_id is None or start == MISSING_MINUTE:
+            return None
+        return {"room_id": room_id, "start_time": from_epoch_minutes(start),
+                "end_time": from_epoch_minutes(start + duration)}
+
+    def commit(self, changes):
+        """Writes the changed bookings in one transaction; unplaced surgeries lose their room and times."""
+        with self.repository.transaction():
+            for change in changes:
+                booking = change["to"] or {"room_id": None, "start_time": None, "end_time": None}
+                self.repository.update_one("surgeries", {"surgery_id": change["surgery_id"]}, {"$set": booking})
+
+
+if __name__ == "__main__":
+    import time
+    from datetime import timedelta
+    from benchmarks.synthetic_hospital import generate_hospital
+    from repositories.memory_repository import InMemoryRepository
+    from services.what_if_service import CloseRoom, AddSurgeries
+
+    logging.basicConfig(level=logging.INFO)
+    hospital = generate_hospital(500, seed=3)
+    repository = InMemoryRepository({name: hospital[name] for name in ("surgeries", "operating_rooms", "surgeons",
+                                                                      "equipment", "patients")})
+    # Commit an optimized schedule to repair
+    state = ScheduleState.from_repository(repository, horizon_start=hospital["horizon_start"],
+                                          horizon_days=hospital["horizon_days"])
+    TabuSearchScheduler(repository).run(state, max_iterations=300, seed=0)
+    ScheduleRepairService(repository).commit([
+        {"surgery_id": state.surgery_ids[i],
+         "to": ScheduleRepairService._booking(state.room_of[i], state.start_of[i], state.durations[i])}
+        for i in range(len(state.surgeries)) if state.room_of[i] is not None
+    ])
+
+    monday = hospital["horizon_start"] + timedelta(days=7)
+    emergency = dict(hospital["surgeries"][0], surgery_id="SUR-EMERGENCY", urgency_level="High",
+                     room_id=None, start_time=None, end_time=None)
+    started = time.perf_counter()
+    result = ScheduleRepairService(repository).repair(
+        [CloseRoom("OR002", monday, monday + timedelta(days=1)), AddSurgeries([emergency])],
+        now=monday, horizon_days=hospital["horizon_days"] - 7, seed=0, commit=True)
+    print(f"{len(result['changes'])} changes, {len(result['unplaced'])} unplaced, {result['movable']} movable, "
+          f"days {result['days']}, {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,331 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from datetime import datetime, timedelta
+from repositories.base import RepositoryError, DuplicateKeyError, BulkWriteError
+from repositories.mongo_repository import MongoRepository
+
+SLOTS_COLLECTION = "resource_slots"
+# Age after which a reservation without an appointment counts as left behind by a failed booking
+ORPHAN_GRACE = timedelta(minutes=10)
+
+
+def to_datetime(value):
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S") if isinstance(value, str) else value
+
+
+def appointment_times(start_time, end_time):
+    """
+    Normalizes an appointment's start and end (datetimes or "%Y-%m-%dT%H:%M:%S" strings) to datetimes.
+
+    Every booking path stores and reserves the times in this form, so single, batch and async
+    bookings of the same interval are compared and saved alike.
+
+    Raises:
+        ValueError: If a time cannot be parsed or the end is not after the start.
+    """
+    start_time, end_time = to_datetime(start_time), to_datetime(end_time)
+    if not isinstance(start_time, datetime) or not isinstance(end_time, datetime):
+        raise ValueError("start_time and end_time must be datetimes or ISO strings")
+    if end_time <= start_time:
+        raise ValueError("end_time is not after start_time")
+    return start_time, end_time
+
+
+def slot_days(start_time, end_time):
+    """Calendar days (YYYY-MM-DD) touched by [start_time, end_time)."""
+    day = start_time.date()
+    last = (end_time - timedelta(microseconds=1)).date()
+    days = []
+    while day <= last:
+        days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+def slot_id(kind, resource_id, day):
+    return f"{kind}:{resource_id}:{day}"
+
+
+def reserve_request(kind, resource_id, day, appointment_id, start_time, end_time, allow_self=False):
+    """
+    (query, update) that books [start_time, end_time) in one resource's day slot.
+
+    The query only matches the slot document if none of its reservations overlaps the new
+    interval, so the check and the $push happen atomically in a single update. With upsert a
+    missing slot document is created; a slot that exists but conflicts makes the upsert collide
+    on _id, which the caller reads as "unavailable".
+
+    allow_self ignores the appointment's own reservations, which only a move of an existing
+    appointment may do: a new booking reusing an appointment_id must not slip past the
+    reservations already held under that id.
+
+    Each reservation records when it was made, so release_orphaned can tell a booking still in
+    progress from one whose process died before it saved the appointment.
+    """
+    overlapping = {"start_time": {"$lt": end_time}, "end_time": {"$gt": start_time}}
+    if allow_self:
+        overlapping["appointment_id"] = {"$ne": appointment_id}
+    query = {
+        "_id": slot_id(kind, resource_id, day),
+        "kind": kind,
+        "resource_id": resource_id,
+        "day": day,
+        "$nor": [{"reservations": {"$elemMatch": overlapping}}],
+    }
+    update = {
+        "$push": {"reservations": {"appointment_id": appointment_id, "start_time": start_time, "end_time": end_time,
+                                   "reserved_at": datetime.now()}},
+        "$inc": {"version": 1},
+    }
+    return query, update
+
+
+def release_request(kind, resource_id, day, appointment_id, start_time, end_time):
+    """(query, update) that removes one reservation of an appointment from one resource's day slot."""
+    reservation = {"appointment_id": appointment_id, "start_time": start_time, "end_time": end_time}
+    return (
+        {"_id": slot_id(kind, resource_id, day)},
+        {"$pull": {"reservations": reservation}, "$inc": {"version": 1}},
+    )
+
+
+def appointment_resources(room_id, staff_ids):
+    """(kind, resource_id) pairs an appointment occupies, room first, without duplicates."""
+    resources = [("room", room_id)]
+    for staff_id in staff_ids:
+        if ("staff", staff_id) not in resources:
+            resources.append(("staff", staff_id))
+    return resources
+
+
+class SlotReservationService:
+    """
+    Books rooms and staff through per-resource, per-day slot documents in `resource_slots`.
+
+    Each slot document holds the reservations of one room or staff member on one day and a
+    version that every write increments, so a reader doing read-modify-write can detect a
+    concurrent change. Reserving is a single conditional update per resource and day; when
+    a later resource of the same appointment is unavailable, the earlier ones are released.
+    Only when moving an appointment are its own reservations ignored, so it can reserve the
+    new interval before releasing the old one.
+    No multi-document transaction is involved, and two concurrent bookings of overlapping
+    times can never both succeed.
+    """
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else MongoRepository()
+
+    def reserve(self, kind, resource_id, appointment_id, start_time, end_time, allow_self=False):
+        """
+        Reserves a resource for [start_time, end_time).
+
+        Args:
+            allow_self (bool): Ignore the appointment's own reservations (see reserve_request).
+
+        Returns:
+            bool: True if reserved, False if it overlaps an existing reservation.
+        """
+        start_time, end_time = to_datetime(start_time), to_datetime(end_time)
+        reserved_days = []
+        for day in slot_days(start_time, end_time):
+            if not self._reserve_day(kind, resource_id, day, appointment_id, start_time, end_time, allow_self):
+                for reserved_day in reserved_days:
+                    self._release_day(kind, resource_id, reserved_day, appointment_id, start_time, end_time)
+                return False
+            reserved_days.append(day)
+        return True
+
+    def _reserve_day(self, kind, resource_id, day, appointment_id, start_time, end_time, allow_self=False):
+        query, update = reserve_request(kind, resource_id, day, appointment_id, start_time, end_time, allow_self)
+        # A duplicate key means the slot exists and conflicts, or another booking created it
+        # first; the second attempt runs against the stored document and settles which one.
+        for _ in range(2):
+            try:
+                return self.repository.update_one(SLOTS_COLLECTION, query, update, upsert=True)
+            except DuplicateKeyError:
+                continue
+        return False
+
+    def _release_day(self, kind, resource_id, day, appointment_id, start_time, end_time):
+        query, update = release_request(kind, resource_id, day, appointment_id, start_time, end_time)
+        self.repository.update_one(SLOTS_COLLECTION, query, update)
+
+    def release(self, kind, resource_id, appointment_id, start_time, end_time):
+        """Removes an appointment's reservation of a resource for [start_time, end_time)."""
+        start_time, end_time = to_datetime(start_time), to_datetime(end_time)
+        for day in slot_days(start_time, end_time):
+            self._release_day(kind, resource_id, day, appointment_id, start_time, end_time)
+
+    def reserve_appointment(self, appointment_id, room_id, staff_ids, start_time, end_time):
+        """
+        Reserves the room and every staff member of an appointment, or nothing.
+
+        Returns:
+            tuple: (kind, resource_id) of the first unavailable resource, or None on success.
+        """
+        reserved = []
+        try:
+            for kind, resource_id in appointment_resources(room_id, staff_ids):
+                if not self.reserve(kind, resource_id, appointment_id, start_time, end_time):
+                    self._release_all(reserved, appointment_id, start_time, end_time)
+                    return kind, resource_id
+                reserved.append((kind, resource_id))
+        except RepositoryError:
+            self._release_all(reserved, appointment_id, start_time, end_time)
+            raise
+        return None
+
+    def release_appointment(self, appointment_id, room_id, staff_ids, start_time, end_time):
+        self._release_all(appointment_resources(room_id, staff_ids), appointment_id, start_time, end_time)
+
+    def reserve_appointments(self, appointments):
+        """
+        Reserves the resources of many appointments with one bulk write.
+
+        Every resource and day of every appointment is one conditional upsert in a single
+        unordered batch. The operations that fail are retried one by one (an upsert can lose a
+        creation race against another upsert of the same slot); an appointment that still has
+        an unavailable resource gets all of its reservations released again.
+
+        Args:
+            appointments (list): (appointment_id, room_id, staff_ids, start_time, end_time) tuples.
+
+        Returns:
+            list: Per appointment, None if reserved or the (kind, resource_id) that was unavailable.
+        """
+        operations, owners = [], []
+        for position, (appointment_id, room_id, staff_ids, start_time, end_time) in enumerate(appointments):
+            start_time, end_time = to_datetime(start_time), to_datetime(end_time)
+            for kind, resource_id in appointment_resources(room_id, staff_ids):
+                for day in slot_days(start_time, end_time):
+                    query, update = reserve_request(kind, resource_id, day, appointment_id, start_time, end_time)
+                    operations.append((query, update, True))
+                    owners.append((position, kind, resource_id, day))
+
+        failed = set()
+        try:
+            self.repository.bulk_update(SLOTS_COLLECTION, operations)
+        except BulkWriteError as e:
+            failed = set(e.failures)
+        except RepositoryError:
+            for appointment in appointments:
+                self.release_appointment(*appointment)
+            raise
+
+        results = [None] * len(appointments)
+        for index in sorted(failed):
+            position, kind, resource_id, day = owners[index]
+            if results[position] is not None:
+                continue
+            appointment_id, _, _, start_time, end_time = appointments[position]
+            if not self._reserve_day(kind, resource_id, day, appointment_id,
+                                     to_datetime(start_time), to_datetime(end_time)):
+                results[position] = (kind, resource_id)
+        for appointment, unavailable in zip(appointments, results):
+            if unavailable is not None:
+                self.release_appointment(*appointment)
+        return results
+
+    def move_appointment(self, appointment_id, old, new):
+        """
+        Moves an appointment's reservations from `old` to `new`, both (room_id, staff_ids, start_time, end_time).
+
+        The new resources are reserved before the old ones are released, so the appointment
+        never loses its slot to a concurrent booking; only the new reservations may overlap the
+        appointment's own old ones. Resources whose times did not change are left alone.
+
+        Returns:
+            tuple: (kind, resource_id) of the first unavailable resource, or None on success.
+        """
+        old_start, old_end = to_datetime(old[2]), to_datetime(old[3])
+        new_start, new_end = to_datetime(new[2]), to_datetime(new[3])
+        old_resources = appointment_resources(old[0], old[1])
+        new_resources = appointment_resources(new[0], new[1])
+        unchanged = old_start == new_start and old_end == new_end
+        to_reserve = [resource for resource in new_resources if not (unchanged and resource in old_resources)]
+        to_release = [resource for resource in old_resources if not (unchanged and resource in new_resources)]
+
+        reserved = []
+        try:
+            for kind, resource_id in to_reserve:
+                if not self.reserve(kind, resource_id, appointment_id, new_start, new_end, allow_self=True):
+                    self._release_all(reserved, appointment_id, new_start, new_end)
+                    return kind, resource_id
+                reserved.append((kind, resource_id))
+        except RepositoryError:
+            self._release_all(reserved, appointment_id, new_start, new_end)
+            raise
+        self._release_all(to_release, appointment_id, old_start, old_end)
+        return None
+
+    def _release_all(self, resources, appointment_id, start_time, end_time):
+        for kind, resource_id in resources:
+            try:
+                self.release(kind, resource_id, appointment_id, start_time, end_time)
+            except RepositoryError as e:
+                print(f"Failed to release {kind} {resource_id} for appointment {appointment_id}: {e}")
+
+    def release_orphaned(self, grace=ORPHAN_GRACE):
+        """
+        Releases reservations left behind by bookings that never saved their appointment.
+
+        A booking reserves its resources before it inserts the appointment (the reservation
+        cannot join the insert's transaction: a conflicting slot is reported by a duplicate key,
+        which would abort it), so a process dying in between leaves reservations that no
+        appointment owns. Reservations older than `grace` whose appointment_id has no
+        surgery_appointments document are removed; the outbox workers run this periodically.
+
+        Args:
+            grace (timedelta): Minimum age of a reservation before it may be released.
+
+        Returns:
+            int: Number of reservations released.
+        """
+        cutoff = datetime.now() - grace
+        slots = self.repository.find(SLOTS_COLLECTION,
+                                     {"reservations": {"$elemMatch": {"reserved_at": {"$lt": cutoff}}}})
+        stale = [(slot, reservation) for slot in slots for reservation in slot.get("reservations", [])
+                 if reservation.get("reserved_at") is not None and reservation["reserved_at"] < cutoff]
+        appointment_ids = list({reservation["appointment_id"] for _, reservation in stale})
+        if not appointment_ids:
+            return 0
+        saved = {appointment["appointment_id"] for appointment in self.repository.find(
+            "surgery_appointments", {"appointment_id": {"$in": appointment_ids}}, {"appointment_id": 1})}
+        released = 0
+        for slot, reservation in stale:
+            if reservation["appointment_id"] in saved:
+                continue
+            query, update = release_request(slot["kind"], slot["resource_id"], slot["day"], reservation["appointment_id"],
+                                            reservation["start_time"], reservation["end_time"])
+            if self.repository.update_one(SLOTS_COLLECTION, query, update):
+                released += 1
+        if released:
+            print(f"Released {released} reservations of appointments that were never saved.")
+        return released
+
+    def rebuild_from_appointments(self):
+        """
+        Rebuilds the slot documents from surgery_appointments, e.g. once after upgrading or
+        after appointments were written without going through the reservation path.
+
+        Returns:
+            int: Number of appointments whose resources could not all be reserved (already double-booked).
+        """
+        conflicts = 0
+        for appointment in self.repository.find("surgery_appointments"):
+            start_time, end_time = to_datetime(appointment.get("start_time")), to_datetime(appointment.get("end_time"))
+            if start_time is None or end_time is None:
+                continue
+            staff_ids = [assignment.get("staff_id") for assignment in appointment.get("staff_assignments", [])]
+            for kind, resource_id in appointment_resources(appointment.get("room_id"), staff_ids):
+                self.release(kind, resource_id, appointment["appointment_id"], start_time, end_time)
+            if self.reserve_appointment(appointment["appointment_id"], appointment.get("room_id"), staff_ids,
+                                        start_time, end_time) is not None:
+                conflicts += 1
+        return conflicts
+
+
+if __name__ == "__main__":
+    service = SlotReservationService()
+    print(service.reserve_appointment("APPT001", "OR001", ["STAFF001"], "2023-08-01T09:00:00", "2023-08-01T11:00:00"))
+    print(service.reserve_appointment("APPT002", "OR001", ["STAFF002"], "2023-08-01T10:00:00", "2023-08-01T12:00:00"))
@@ -1,74 +1,79 @@
 # surgery_equipment_service.py
 
-from pymongo.errors import PyMongoError
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from db_config import db
+from repositories.base import RepositoryError, service_entry_point
+from repositories.mongo_repository import MongoRepository
 from models import SurgeryEquipment
 
 class SurgeryEquipmentService:
-    @staticmethod
-    def create_surgery_equipment(equipment_data):
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else MongoRepository()
+
+    @service_entry_point
+    def create_surgery_equipment(self, equipment_data):
         """Creates a new surgery equipment record."""
         try:
             document = equipment_data.to_document()
-            db.surgery_equipment.insert_one(document)
+            self.repository.insert_one("surgery_equipment", document)
             print(f"Surgery equipment {document['equipment_id']} created successfully.")
-        except PyMongoError as e:
+        except RepositoryError as e:
             print(f"Error creating surgery equipment: {e}")
 
-    @staticmethod
-    def update_surgery_equipment(equipment_id, update_fields):
+    @service_entry_point
+    def update_surgery_equipment(self, equipment_id, update_fields):
         """Updates an existing surgery equipment record."""
         try:
-            result = db.surgery_equipment.update_one(
+            result = self.repository.update_one(
+                "surgery_equipment",
                 {"equipment_id": equipment_id},
                 {"$set": update_fields}
             )
-            if result.modified_count:
+            if result:
                 print(f"Surgery equipment {equipment_id} updated successfully.")
             else:
                 print(f"No changes made to surgery equipment {equipment_id}.")
-        except PyMongoError as e:
+        except RepositoryError as e:
             print(f"Error updating surgery equipment: {e}")
 
-    @staticmethod
-    def delete_surgery_equipment(equipment_id):
+    @service_entry_point
+    def delete_surgery_equipment(self, equipment_id):
         """Deletes a surgery equipment record."""
         try:
-            result = db.surgery_equipment.delete_one({"equipment_id": equipment_id})
-            if result.deleted_count:
+            result = self.repository.delete_one("surgery_equipment", {"equipment_id": equipment_id})
+            if result:
                 print(f"Surgery equipment {equipment_id} deleted successfully.")
             else:
                 print(f"Surgery equipment {equipment_id} not found.")
-        except PyMongoError as e:
+        except RepositoryError as e:
             print(f"Error deleting surgery equipment: {e}")
 
-    @staticmethod
-    def get_equipment(equipment_id):
+    @service_entry_point
+    def get_equipment(self, equipment_id):
         """Fetches an equipment by its ID."""
         try:
-            document = db.surgery_equipment.find_one({"equipment_id": equipment_id})
+            document = self.repository.find_one("surgery_equipment", {"equipment_id": equipment_id})
             if document:
                 return SurgeryEquipment.from_document(document)
             else:
                 print("Equipment not found.")
                 return None
-        except PyMongoError as e:
+        except RepositoryError as e:
             print(f"Error fetching equipment: {e}")
             return None
 
 # Example usage
 if __name__ == "__main__":
+    service = SurgeryEquipmentService()
     # Example surgery equipment data initialization
     new_equipment = SurgeryEquipment("EQUIP003", "Laser Scalpel", "Cutting", True)
     
     # Create a new equipment record
-    SurgeryEquipmentService.create_surgery_equipment(new_equipment)
+    service.create_surgery_equipment(new_equipment)
     
     # Update an existing equipment record
-    SurgeryEquipmentService.update_surgery_equipment("EQUIP003", {"availability": False})
+    service.update_surgery_equipment("EQUIP003", {"availability": False})
     
     # Delete an equipment record
-    SurgeryEquipmentService.delete_surgery_equipment("EQUIP003")
+    service.delete_surgery_equipment("EQUIP003")
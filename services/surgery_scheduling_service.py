@@ -1,7 +1,6 @@
 # surgery_scheduling_service.py
 
 from datetime import datetime, timedelta
-from pymongo.errors import PyMongoError
 import sys
 import os
 
@@ -10,6 +9,9 @@ from db_config import db
 from models import Surgery, Surgeon, OperatingRoom, SurgeryEquipment, SurgeryRoomAssignment, SurgeryEquipmentUsage, SurgeryStaffAssignment, Patient
 from scheduling_utils import (is_surgeon_available, is_room_available,
                               is_equipment_available, mongodb_transaction)
+from utils.lazy_import import optional_exceptions
+
+errors = optional_exceptions("pymongo.errors")
 
 
 class SurgerySchedulingService:
@@ -50,7 +52,7 @@ class SurgerySchedulingService:
 
         # Check equipment availability
         for equipment_id in equipment_ids:
-            if not is_equipment_available(equipment_id, new_start_time, new_end_time, self.db):
+            if not is_equipment_available(equipment_id, new_start_time, new_end_time, self.db, room_id=new_room_id):
                 print(f"Equipment {equipment_id} is not available.")
                 return False
 
@@ -171,7 +173,7 @@ class SurgerySchedulingService:
 
                 print(f"Surgery with ID {surgery.surgery_id} scheduled successfully.")
                 return True
-        except (PyMongoError, ValueError) as e:
+        except (errors.PyMongoError, ValueError) as e:
             print(f"Failed to schedule surgery due to an error: {e}")
             return False
 
@@ -1,68 +1,69 @@
 # Import necessary modules and services
 from calendar_service import CalendarService
 from notification_service import notification_service
-from pymongo.errors import PyMongoError
 import logging
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from db_config import db
+from repositories.base import RepositoryError, service_entry_point
+from repositories.mongo_repository import MongoRepository
 from models import Surgery
 
 # Initialize logging
 logger = logging.getLogger(__name__)
 
 class SurgeryService:
-    def __init__(self):
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else MongoRepository()
         self.calendar_service = CalendarService()
 
-    @staticmethod
-    def create_surgery(surgery_data):
+    @service_entry_point
+    def create_surgery(self, surgery_data):
         """Creates a new surgery record in the database."""
         try:
             document = surgery_data.to_document()
-            result = db.surgeries.insert_one(document)
-            print(f"Surgery {document['surgery_id']} created successfully with ID {result.inserted_id}.")
-            return result.inserted_id
-        except PyMongoError as e:
+            inserted_id = self.repository.insert_one("surgeries", document)
+            print(f"Surgery {document['surgery_id']} created successfully with ID {inserted_id}.")
+            return inserted_id
+        except RepositoryError as e:
             logger.error(f"Error creating surgery: {e}")
             return None
 
-    @staticmethod
-    def update_surgery(surgery_id, update_fields):
+    @service_entry_point
+    def update_surgery(self, surgery_id, update_fields):
         """Updates an existing surgery record."""
         try:
-            result = db.surgeries.update_one({"surgery_id": surgery_id}, {"$set": update_fields})
-            if result.modified_count:
+            result = self.repository.update_one("surgeries", {"surgery_id": surgery_id}, {"$set": update_fields})
+            if result:
                 logger.info(f"Surgery {surgery_id} updated successfully.")
             else:
                 logger.warning(f"No changes made to surgery {surgery_id}.")
-        except PyMongoError as e:
+        except RepositoryError as e:
             logger.error(f"Error updating surgery: {e}")
 
-    @staticmethod
-    def delete_surgery(surgery_id):
+    @service_entry_point
+    def delete_surgery(self, surgery_id):
         """Deletes a surgery record."""
         try:
-            result = db.surgeries.delete_one({"surgery_id": surgery_id})
-            if result.deleted_count:
+            result = self.repository.delete_one("surgeries", {"surgery_id": surgery_id})
+            if result:
                 logger.info(f"Surgery {surgery_id} deleted successfully.")
             else:
                 logger.warning(f"Surgery {surgery_id} not found.")
-        except PyMongoError as e:
+        except RepositoryError as e:
             logger.error(f"Error deleting surgery: {e}")
 
-    @staticmethod
-    def get_surgery(surgery_id):
+    @service_entry_point
+    def get_surgery(self, surgery_id):
         """Fetches a surgery by its ID."""
         try:
-            document = db.surgeries.find_one({"surgery_id": surgery_id})
+            document = self.repository.find_one("surgeries", {"surgery_id": surgery_id})
             if document:
                 return Surgery.from_document(document)
             else:
                 print("Surgery not found.")
                 return None
-        except PyMongoError as e:
+        except RepositoryError as e:
             print(f"Error fetching surgery: {e}")
             return None
 
@@ -0,0 +1,351 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from models import from_epoch_minutes
+from repositories.memory_repository import InMemoryRepository
+from repositories.mongo_repository import MongoRepository
+from schedule_state import ScheduleState, DEFAULT_HORIZON_DAYS, MINUTES_PER_DAY
+from scheduling_optimizer import TabuSearchScheduler
+from utils.streaming_kpi_calculator import StreamingKPICalculator
+
+logger = logging.getLogger(__name__)
+
+# What ScheduleState.from_repository reads; a what-if run needs nothing else
+SNAPSHOT_COLLECTIONS = ("surgeries", "operating_rooms", "surgeons", "equipment", "staff", "surgery_staff_assignments")
+
+
+class Perturbation:
+    """
+    A change to the schedule's data, e.g. a disruption; subclasses write it in apply().
+
+    window(), resources() and surgery_ids() describe what the change affects, so a repair
+    (see services/schedule_repair_service.py) only reconsiders that part of the schedule.
+    """
+    def apply(self, repository):
+        raise NotImplementedError
+
+    def window(self):
+        """(start_time, end_time) the change applies to, or None."""
+        return None
+
+    def resources(self):
+        """Resource keys such as ("room", "OR001") the change makes less available."""
+        return set()
+
+    def surgery_ids(self):
+        """Surgeries the change adds."""
+        return set()
+
+    def _push_window(self, repository, collection, id_field, resource_id, field, start_time, end_time):
+        window = {"start_time": start_time, "end_time": end_time}
+        if not repository.update_one(collection, {id_field: resource_id}, {"$push": {field: window}}):
+            raise ValueError(f"No {id_field} {resource_id} in {collection}")
+
+
+class CloseRoom(Perturbation):
+    """The room takes no surgeries between start_time and end_time."""
+    def __init__(self, room_id, start_time, end_time):
+        self.room_id = room_id
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def apply(self, repository):
+        self._push_window(repository, "operating_rooms", "room_id", self.room_id, "closures",
+                          self.start_time, self.end_time)
+
+    def window(self):
+        return self.start_time, self.end_time
+
+    def resources(self):
+        return {("room", self.room_id)}
+
+    def __repr__(self):
+        return f"CloseRoom({self.room_id}, {self.start_time} - {self.end_time})"
+
+
+class SurgeonAbsence(Perturbation):
+    """The surgeon operates on nothing between start_time and end_time."""
+    def __init__(self, surgeon_id, start_time, end_time):
+        self.surgeon_id = surgeon_id
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def apply(self, repository):
+        self._push_window(repository, "surgeons", "surgeon_id", self.surgeon_id, "absences",
+                          self.start_time, self.end_time)
+
+    def window(self):
+        return self.start_time, self.end_time
+
+    def resources(self):
+        return {("surgeon", self.surgeon_id)}
+
+    def __repr__(self):
+        return f"SurgeonAbsence({self.surgeon_id}, {self.start_time} - {self.end_time})"
+
+
+class EquipmentDown(Perturbation):
+    """The equipment item is unusable between start_time and end_time, like a maintenance window."""
+    def __init__(self, equipment_id, start_time, end_time):
+        self.equipment_id = equipment_id
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def apply(self, repository):
+        self._push_window(repository, "equipment", "equipment_id", self.equipment_id, "maintenance_windows",
+                          self.start_time, self.end_time)
+
+    def window(self):
+        return self.start_time, self.end_time
+
+    def resources(self):
+        return {("equipment", self.equipment_id)}
+
+    def __repr__(self):
+        return f"EquipmentDown({self.equipment_id}, {self.start_time} - {self.end_time})"
+
+
+class AddSurgeries(Perturbation):
+    """Extra demand: surgery documents (status "Scheduled", no room yet) to fit into the schedule."""
+    def __init__(self, surgeries):
+        self.surgeries = list(surgeries)
+
+    def apply(self, repository):
+        repository.insert_many("surgeries", self.surgeries)
+
+    def surgery_ids(self):
+        return {surgery["surgery_id"] for surgery in self.surgeries}
+
+    def __repr__(self):
+        return f"AddSurgeries({len(self.surgeries)})"
+
+
+class Scenario:
+    """
+    A named set of perturbations, e.g. Scenario("OR-3 closed Thursday", [CloseRoom("OR003", ...)]).
+
+    Perturbations must be picklable to run in a process pool; the classes above are.
+    """
+    def __init__(self, name, perturbations=()):
+        self.name = name
+        self.perturbations = list(perturbations)
+
+    def __repr__(self):
+        return f"Scenario({self.name!r}, {self.perturbations})"
+
+
+def schedule_kpis(state):
+    """
+    KPIs of an optimized ScheduleState.
+
+    Returns:
+        dict: score, scheduled, unscheduled, unscheduled_high_urgency, preference_hits,
+        average_wait_days (days from the horizon start to each surgery), workload_balance,
+        surgeon_schedule_compactness and room_used_hours (room_id -> hours).
+    """
+    score = state.recompute_score()
+    placed = []
+    wait_minutes = 0
+    for i, room_id in enumerate(state.room_of):
+        if room_id is None:
+            continue
+        start = state.start_of[i]
+        wait_minutes += start - state.horizon_start
+        placed.append({
+            "surgeon_id": state.surgeon_ids[i],
+            "room_id": room_id,
+            "start_time": from_epoch_minutes(start),
+            "end_time": from_epoch_minutes(start + state.durations[i]),
+        })
+    placed.sort(key=lambda surgery: (surgery["surgeon_id"] or "", surgery["start_time"]))
+    folded = StreamingKPICalculator(repository=InMemoryRepository()).fold(placed)
+    return {
+        "score": score,
+        "scheduled": state.scheduled,
+        "unscheduled": state.unscheduled,
+        "unscheduled_high_urgency": sum(1 for i in state.unscheduled_positions()
+                                        if state.surgeries[i].urgency_level == "High"),
+        "preference_hits": state.preference_hits,
+        "average_wait_days": wait_minutes / len(placed) / MINUTES_PER_DAY if placed else None,
+        "workload_balance": folded["workload_balance"],
+        "surgeon_schedule_compactness": folded["surgeon_schedule_compactness"],
+        "room_used_hours": {room_id: state.room_load[room_id] / 60 for room_id in state.room_ids},
+    }
+
+
+def kpi_diff(baseline, scenario):
+    """Scenario minus baseline for every numeric KPI; room hours are compared per room."""
+    diff = {}
+    for name, value in scenario.items():
+        before = baseline.get(name)
+        if isinstance(value, dict):
+            rooms = set(value) | set(before or {})
+            diff[name] = {room: value.get(room, 0.0) - (before or {}).get(room, 0.0) for room in sorted(rooms)}
+        elif isinstance(value, (int, float)) and isinstance(before, (int, float)):
+            diff[name] = value - before
+        else:
+            diff[name] = None
+    return diff
+
+
+def run_scenario(base, scenario, settings):
+    """
+    Applies a scenario to a fork of `base`, optimizes it and returns its KPIs and placements.
+
+    Args:
+        base (InMemoryRepository): Snapshot of the schedule; it is not modified.
+        scenario (Scenario): Perturbations to apply.
+        settings (dict): horizon_start, horizon_days, max_iterations, time_limit and seed.
+
+    Returns:
+        dict: name, kpis, stats (optimizer statistics) and placements
+        ({surgery_id: (room_id, start_time) or None}), or name and error.
+    """
+    repository = base.fork()
+    try:
+        for perturbation in scenario.perturbations:
+            perturbation.apply(repository)
+        state = ScheduleState.from_repository(repository, horizon_start=settings["horizon_start"],
+                                              horizon_days=settings["horizon_days"])
+        scheduler = TabuSearchScheduler(repository)
+        scheduler.run(state, max_iterations=settings["max_iterations"], time_limit=settings["time_limit"],
+                      seed=settings["seed"])
+    except Exception as e:
+        logger.error(f"What-if scenario {scenario.name!r} failed: {e}")
+        return {"name": scenario.name, "error": str(e)}
+    placements = {
+        surgery_id: (state.room_of[i], from_epoch_minutes(state.start_of[i])) if state.room_of[i] else None
+        for i, surgery_id in enumerate(state.surgery_ids)
+    }
+    return {"name": scenario.name, "kpis": schedule_kpis(state), "stats": scheduler.stats, "placements": placements}
+
+
+# Snapshot of the process pool's worker, built once per process by _init_worker
+_worker_base = None
+
+
+def _init_worker(collections):
+    global _worker_base
+    _worker_base = InMemoryRepository(collections)
+
+
+def _run_in_worker(scenario, settings):
+    return run_scenario(_worker_base, scenario, settings)
+
+
+class WhatIfService:
+    """
+    Answers "what if" questions by re-optimizing forked copies of the schedule.
+
+    The schedule is read once into an InMemoryRepository snapshot. Each scenario runs on a
+    copy-on-write fork of it, so perturbations and every optimizer write stay in the fork and
+    production data is never touched. A baseline (no perturbation) is optimized with the same
+    horizon, iteration budget and seed, and each scenario is reported as its KPIs and their
+    difference from the baseline. With several processes the scenarios run in a process
+    pool; each worker receives the snapshot once and forks it per scenario.
+
+    Args:
+        repository (Repository, optional): Source of the schedule; an InMemoryRepository is
+            forked directly, anything else is snapshotted.
+        horizon_start (datetime, optional): First day of the horizon; defaults to the earliest
+            scheduled date in the snapshot.
+        horizon_days (int): Days surgeries may be placed in.
+        max_iterations (int): Tabu Search iterations per scenario.
+        time_limit (float, optional): Seconds per scenario.
+        seed (int): Optimizer seed, shared by every scenario so they differ only by their perturbations.
+        processes (int, optional): Worker processes; defaults to one per CPU, 1 runs in this process.
+    """
+    def __init__(self, repository=None, horizon_start=None, horizon_days=DEFAULT_HORIZON_DAYS, max_iterations=500,
+                 time_limit=None, seed=0, processes=None):
+        self.repository = repository if repository is not None else MongoRepository()
+        self.horizon_start = horizon_start
+        self.horizon_days = horizon_days
+        self.max_iterations = max_iterations
+        self.time_limit = time_limit
+        self.seed = seed
+        self.processes = processes
+
+    def snapshot(self):
+        """In-memory copy of the collections the optimizer reads."""
+        if isinstance(self.repository, InMemoryRepository):
+            return self.repository.fork()
+        return InMemoryRepository.from_repository(self.repository, SNAPSHOT_COLLECTIONS)
+
+    def compare(self, scenarios):
+        """
+        Optimizes the baseline and every scenario and compares their KPIs.
+
+        Args:
+            scenarios (list): Scenario objects with distinct names.
+
+        Returns:
+            dict: {"baseline": {kpis, stats}, "scenarios": {name: {kpis, diff, moved,
+            newly_unscheduled, stats}}}. `moved` counts surgeries placed differently than in
+            the baseline; `newly_unscheduled` lists those the baseline placed and the scenario
+            could not. A scenario that failed has only an "error" entry.
+        """
+        base = self.snapshot()
+        settings = {
+            "horizon_start": self.horizon_start if self.horizon_start is not None else self._default_horizon_start(base),
+            "horizon_days": self.horizon_days,
+            "max_iterations": self.max_iterations,
+            "time_limit": self.time_limit,
+            "seed": self.seed,
+        }
+        jobs = [Scenario("baseline")] + list(scenarios)
+        processes = min(self.processes or os.cpu_count() or 1, len(jobs))
+        if processes == 1:
+            results = [run_scenario(base, scenario, settings) for scenario in jobs]
+        else:
+            collections = {name: base.find(name) for name in SNAPSHOT_COLLECTIONS}
+            with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(collections,)) as pool:
+                results = list(pool.map(_run_in_worker, jobs, [settings] * len(jobs)))
+
+        baseline = results[0]
+        if "error" in baseline:
+            raise RuntimeError(f"Baseline optimization failed: {baseline['error']}")
+        report = {"baseline": {"kpis": baseline["kpis"], "stats": baseline["stats"]}, "scenarios": {}}
+        for result in results[1:]:
+            if "error" in result:
+                report["scenarios"][result["name"]] = {"error": result["error"]}
+                continue
+            placements = result["placements"]
+            report["scenarios"][result["name"]] = {
+                "kpis": result["kpis"],
+                "diff": kpi_diff(baseline["kpis"], result["kpis"]),
+                "moved": sum(1 for surgery_id, placement in baseline["placements"].items()
+                             if placement is not None and placements.get(surgery_id) not in (None, placement)),
+                "newly_unscheduled": sorted(surgery_id for surgery_id, placement in baseline["placements"].items()
+                                            if placement is not None and placements.get(surgery_id) is None),
+                "stats": result["stats"],
+            }
+        return report
+
+    @staticmethod
+    def _default_horizon_start(base):
+        # Fixed up front; otherwise a scenario that unschedules the earliest surgery would shift its horizon
+        state = ScheduleState.from_repository(base, keep_current=False)
+        return from_epoch_minutes(state.horizon_start)
+
+
+if __name__ == "__main__":
+    from datetime import timedelta
+    from benchmarks.synthetic_hospital import generate_hospital
+
+    logging.basicConfig(level=logging.WARNING)
+    hospital = generate_hospital(200, seed=1)
+    repository = InMemoryRepository({name: hospital[name] for name in SNAPSHOT_COLLECTIONS if name in hospital})
+    thursday = hospital["horizon_start"] + timedelta(days=3)
+    service = WhatIfService(repository, horizon_start=hospital["horizon_start"],
+                            horizon_days=hospital["horizon_days"], max_iterations=200)
+    report = service.compare([
+        Scenario("OR001 closed Thursday", [CloseRoom("OR001", thursday, thursday + timedelta(days=1))]),
+        Scenario("SG0001 out first week", [SurgeonAbsence("SG0001", hospital["horizon_start"],
+                                                          hospital["horizon_start"] + timedelta(days=7))]),
+    ])
+    print("baseline:", {k: v for k, v in report["baseline"]["kpis"].items() if k != "room_used_hours"})
+    for name, result in report["scenarios"].items():
+        diff = {k: v for k, v in result["diff"].items() if k != "room_used_hours"}
+        print(f"{name}: moved {result['moved']}, newly unscheduled {len(result['newly_unscheduled'])}, diff {diff}")
@@ -2,6 +2,8 @@ from mongodb_transaction_manager import MongoDBClient
 from pymongo.errors import OperationFailure
 import logging
 from manage_duplicates import find_and_handle_all_duplicates
+from repositories.mongo_repository import MongoRepository
+from services.slot_reservation_service import SlotReservationService
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -14,10 +16,22 @@ def create_indexes(db):
         db.operating_rooms.create_index([("room_id", 1)], unique=True, background=True)
         logger.info("Unique index on room_id in operating_rooms ensured.")
 
+        # One appointment per appointment_id; slot reservations are keyed by it
+        db.surgery_appointments.create_index([("appointment_id", 1)], unique=True, background=True)
+        logger.info("Unique index on appointment_id in surgery_appointments ensured.")
+
         # Composite index for Surgery Appointments by Start and End Times, created in the background
         db.surgery_appointments.create_index([("start_time", 1), ("end_time", 1)], background=True)
         logger.info("Composite index on start_time and end_time in surgery_appointments ensured.")
 
+        # One room assignment per surgery, upserted by its assignment_id on every optimizer run
+        db.surgery_room_assignments.create_index([("assignment_id", 1)], unique=True, background=True)
+        logger.info("Unique index on assignment_id in surgery_room_assignments ensured.")
+
+        # Compound index backing the (surgeon_id, start_time) sort of the streaming KPI cursor
+        db.surgeries.create_index([("surgeon_id", 1), ("start_time", 1)], background=True)
+        logger.info("Compound index on surgeon_id and start_time in surgeries ensured.")
+
         # Index for Staff Assignments in the Staff Collection, created in the background
         db.staff.create_index([("staff_assignments.staff_id", 1)], background=True)
         logger.info("Index on staff_assignments.staff_id in staff collection ensured.")
@@ -30,6 +44,11 @@ def create_indexes(db):
         db.patients.create_index([("patient_id", 1)], unique=True, background=True)
         logger.info("Unique index on patient_id in patients collection ensured.")
 
+        # Outbox polling by status and due time; delivered entries expire after a week
+        db.outbox.create_index([("status", 1), ("available_at", 1)], background=True)
+        db.outbox.create_index([("completed_at", 1)], expireAfterSeconds=7 * 24 * 3600, background=True)
+        logger.info("Outbox indexes ensured.")
+
         # Reviewing and adjusting indexes based on application needs
         logger.info("Review existing indexes for optimization opportunities...")
 
@@ -45,10 +64,18 @@ def create_indexes(db):
     except OperationFailure as e:
         logger.error(f"Error creating index: {e}")
 
+def rebuild_resource_slots(db):
+    """Rebuilds the room and staff reservation slots from the existing surgery appointments."""
+    conflicts = SlotReservationService(MongoRepository(db)).rebuild_from_appointments()
+    if conflicts:
+        logger.warning(f"{conflicts} appointments overlap an earlier booking of the same room or staff member.")
+    logger.info("Resource slots rebuilt from surgery_appointments.")
+
 def main():
     logger.info("Starting database index management...")
     db = MongoDBClient.get_db()  # Get the database object from your MongoDB client
     create_indexes(db)  # Pass the database object to the create_indexes function
+    rebuild_resource_slots(db)
     logger.info("Index management completed. Review and manage indexes regularly as your application evolves.")
 
 if __name__ == "__main__":
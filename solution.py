@@ -1,6 +1,6 @@
-from db_config import db
 from datetime import datetime
-from mongodb_transaction_manager import MongoDBClient  # Ensure this import matches your consolidated script name
+from repositories.base import period_query
+from repositories.mongo_repository import MongoRepository
 from utils.equipment_utilization_calculator import EquipmentUtilizationCalculator
 from utils.operational_cost_calculator import OperationalCostCalculator
 from utils.room_utilization_calculator import RoomUtilizationCalculator
@@ -8,82 +8,100 @@ from utils.workload_balance_calculator import WorkloadBalanceCalculator
 from utils.preference_satisfaction_calculator import PreferenceSatisfactionCalculator
 from utils.resource_utilization_efficiency_calculator import ResourceUtilizationEfficiencyCalculator
 from utils.equipment_utilization_efficiency_calculator import EquipmentUtilizationEfficiencyCalculator
-
-
-from scheduling_utils import(is_surgeon_available,
-                            is_equipment_available,
-                            is_room_available,
-                            is_staff_available)
-
-
-from mongodb_transaction_manager import MongoDBClient
+from utils.streaming_kpi_calculator import StreamingKPICalculator
 # Ensure you have imported all calculator classes above
 
 class Solution:
-    def __init__(self):
-        # Establish a database connection
-        self.db = MongoDBClient.get_db()
-        
-        # Fetch initial data needed for calculations
-        self.fetch_initial_data()
-        
-        # Initialize calculator instances for different metrics
-        self.initialize_calculators()
+    # Calculators are built on first access and share the solution's repository
+    CALCULATORS = {
+        "workload_balance_calculator": WorkloadBalanceCalculator,
+        "preference_satisfaction_calculator": PreferenceSatisfactionCalculator,
+        "equipment_utilization_calculator": EquipmentUtilizationCalculator,
+        "operational_cost_calculator": OperationalCostCalculator,
+        "room_utilization_calculator": RoomUtilizationCalculator,
+        "resource_utilization_efficiency_calculator": ResourceUtilizationEfficiencyCalculator,
+        "equipment_utilization_efficiency_calculator": EquipmentUtilizationEfficiencyCalculator,
+        "streaming_kpi_calculator": StreamingKPICalculator,
+    }
+
+    # Reference data loaded by fetch_initial_data() and period KPIs loaded by calculate_streaming_kpis()
+    SNAPSHOT_ATTRIBUTES = ("rooms", "equipment", "surgeons")
+
+    def __init__(self, repository=None, start_date=None, end_date=None):
+        """
+        Creates a solution without touching the database.
 
-        self.start_date = None
-        self.end_date = None
+        The connection, the reference data and the calculators are all resolved on first
+        use, so candidate solutions can be created in bulk during search at almost no cost.
+
+        Args:
+            repository (Repository, optional): Storage to read from; defaults to a MongoRepository on
+                the analytics client.
+            start_date (datetime, optional): Start of the analysis period.
+            end_date (datetime, optional): End of the analysis period.
+        """
+        self._repository = repository
+        self._calculators = {}
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def __getattr__(self, name):
+        # Only reached when normal lookup fails, i.e. for not-yet-loaded lazy attributes
+        if name in Solution.CALCULATORS:
+            calculators = self.__dict__.setdefault("_calculators", {})
+            if name not in calculators:
+                calculators[name] = Solution.CALCULATORS[name](self.repository)
+            return calculators[name]
+        if name in Solution.SNAPSHOT_ATTRIBUTES:
+            self.fetch_initial_data()
+            return self.__dict__[name]
+        if name == "kpis":
+            return self.calculate_streaming_kpis()
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    @property
+    def repository(self):
+        if self._repository is None:
+            self._repository = MongoRepository(role="analytics")
+        return self._repository
 
     def set_analysis_period(self, start_date, end_date):
-        """Sets the analysis period for calculations."""
+        """Sets the analysis period for calculations and drops KPIs computed for the previous one."""
         self.start_date = start_date
-        self.end_date = end_date                
-        
+        self.end_date = end_date
+        self.__dict__.pop("kpis", None)
+
     def fetch_initial_data(self):
-        # Fetch surgeries data
-        self.surgeries = list(self.db.surgeries.find({}))
-        
+        # Surgeries and room assignments grow with history, so they are never loaded in full;
+        # metrics stream them through iter_surgeries() / StreamingKPICalculator instead.
+
         # Fetch rooms data and convert it into a dictionary for easy access
-        self.rooms = {room['room_id']: room for room in self.db.rooms.find({})}
+        self.rooms = {room['room_id']: room for room in self.repository.find("rooms")}
         
         # Fetch equipment data and convert it into a dictionary for easy access
-        self.equipment = {equipment['equipment_id']: equipment for equipment in self.db.equipment.find({})}
+        self.equipment = {equipment['equipment_id']: equipment for equipment in self.repository.find("equipment")}
         
         # Fetch surgeons data
-        self.surgeons = list(self.db.surgeons.find({}))
-        
-        # Fetch room assignments data
-        self.room_assignments = list(self.db.room_assignments.find({}))
-  
-    def initialize_calculators(self):
-        # Initialize the Workload Balance Calculator
-        self.workload_balance_calculator = WorkloadBalanceCalculator()
-        
-        # Initialize the Preference Satisfaction Calculator
-        self.preference_satisfaction_calculator = PreferenceSatisfactionCalculator()
-        
-        # Initialize the Equipment Utilization Efficiency Calculator
-        self.equipment_utilization_calculator = EquipmentUtilizationCalculator()
-        
-        # Initialize the Operational Cost Calculator
-        self.operational_cost_calculator = OperationalCostCalculator()
-        
-        # Initialize the Room Utilization Efficiency Calculator
-        self.room_utilization_calculator = RoomUtilizationCalculator()
-
-        # Initialize each calculator with necessary parameters
-        self.resource_utilization_efficiency_calculator = ResourceUtilizationEfficiencyCalculator()
+        self.surgeons = list(self.repository.find("surgeons"))
 
-        start_date = datetime(2023, 1, 1)
-        end_date = datetime(2023, 12, 31)
-        efficiency = self.resource_utilization_efficiency_calculator.calculate(start_date, end_date)
+    def iter_surgeries(self, projection=None, batch_size=1000):
+        """Returns a batched iterator over the surgeries in the analysis period."""
+        return self.repository.find(
+            "surgeries", period_query(self.start_date, self.end_date), projection, batch_size=batch_size
+        )
 
-        # Display the calculated efficiency
-        print("Resource Utilization Efficiency:")
-        for resource_id, efficiency_percent in efficiency.items():
-            print(f"{resource_id}: {efficiency_percent}%")
+    def calculate_streaming_kpis(self):
+        """
+        Folds all surgery-level KPIs for the analysis period in one streaming pass.
+        The result is kept as the solution's data snapshot until the period changes.
+        """
+        if "kpis" not in self.__dict__:
+            self.kpis = self.streaming_kpi_calculator.calculate(self.start_date, self.end_date)
+        return self.kpis
 
-        # Make sure this line is included for equipment utilization efficiency calculator
-        self.equipment_utilization_efficiency_calculator = EquipmentUtilizationEfficiencyCalculator()
+    def initialize_calculators(self):
+        """Discards built calculators; they are recreated on their next access."""
+        self._calculators = {}
 
     def calculate_score(self):
         # Reset score before recalculating
@@ -99,8 +117,8 @@ class Solution:
         return self.score
 
     def update_metrics(self):
-        self.workload_balance = self.workload_balance_calculator.calculate_workload_balance()
-        self.preference_satisfaction = self.preference_satisfaction_calculator.calculate(self.surgeries)
+        self.workload_balance = self.calculate_streaming_kpis()["workload_balance"]
+        self.preference_satisfaction = self.preference_satisfaction_calculator.calculate(self.iter_surgeries())
         self.resource_utilization_efficiency = self.resource_utilization_efficiency_calculator.calculate(self.start_date, self.end_date)
         self.equipment_utilization_efficiency = self.equipment_utilization_efficiency_calculator.calculate(self.start_date, self.end_date)
         self.room_utilization_efficiency = self.room_utilization_calculator.calculate(self.start_date, self.end_date)
@@ -122,7 +140,7 @@ class Solution:
         Calculates and updates the preference satisfaction metric using the PreferenceSatisfactionCalculator.
         """
         try:
-            self.preference_satisfaction = self.preference_satisfaction_calculator.calculate(self.surgeries)
+            self.preference_satisfaction = self.preference_satisfaction_calculator.calculate(self.iter_surgeries())
         except Exception as e:
             print(f"Error calculating preference satisfaction: {e}")
             self.preference_satisfaction = None
@@ -142,7 +160,7 @@ class Solution:
         Calculates and updates the operational cost using the OperationalCostCalculator.
         """
         try:
-            self.operational_cost_minimization = self.operational_cost_calculator.calculate()
+            self.operational_cost_minimization = self.calculate_streaming_kpis()["operational_cost_minimization"]
         except Exception as e:
             print(f"Error calculating operational cost: {e}")
             self.operational_cost_minimization = None
@@ -159,15 +177,16 @@ class Solution:
 
     def calculate_all_metrics(self):
         """Calculates and updates all metrics for the solution."""
-        # Assuming self.surgeries is already populated
-        self.workload_balance = self.workload_balance_calculator.calculate_workload_balance(self.surgeries)
-        self.preference_satisfaction = self.preference_satisfaction_calculator.calculate(self.surgeries)
+        # Surgeries are streamed: one pass for the folded KPIs, one batched cursor for preferences
+        kpis = self.calculate_streaming_kpis()
+        self.workload_balance = kpis["workload_balance"]
+        self.preference_satisfaction = self.preference_satisfaction_calculator.calculate(self.iter_surgeries())
         self.resource_utilization_efficiency = self.resource_utilization_efficiency_calculator.calculate(self.start_date, self.end_date)
         self.equipment_utilization_efficiency = self.equipment_utilization_efficiency_calculator.calculate(self.start_date, self.end_date)
-        self.operational_cost_minimization = self.operational_cost_calculator.calculate(self.surgeries)
+        self.operational_cost_minimization = kpis["operational_cost_minimization"]
+        self.surgeon_schedule_compactness = kpis["surgeon_schedule_compactness"]
         self.room_utilization_efficiency = self.room_utilization_calculator.calculate(self.start_date, self.end_date)
-        self.resource_utilization_efficiency_calculator = ResourceUtilizationEfficiencyCalculator()
-               
+
         # Update more metrics as needed
 
         # You might want to return the calculated metrics or print them
@@ -186,12 +205,12 @@ class Solution:
 
 
 
-    def get_surgeon_preferences(self, surgeon_id, db):
+    def get_surgeon_preferences(self, surgeon_id):
         """
-        Retrieves a surgeon's preferences from the database, now optimized with db parameter.
+        Retrieves a surgeon's preferences from the solution's repository.
         """
         try:
-            preferences_document = db.surgeon_preferences.find_one({"surgeon_id": surgeon_id})
+            preferences_document = self.repository.find_one("surgeon_preferences", {"surgeon_id": surgeon_id})
             return preferences_document.get('preferences', {}) if preferences_document else {}
         except Exception as e:
             print(f"Error fetching preferences for surgeon {surgeon_id}: {e}")
@@ -210,7 +229,7 @@ class Solution:
             bool: True if the time slot is available, False otherwise.
         """
         # Check surgeon availability
-        surgery_details = self.db.surgeries.find_one({"_id": surgery_id})
+        surgery_details = self.repository.find_one("surgeries", {"_id": surgery_id})
         if not self.is_surgeon_available(surgery_details["surgeon_id"], proposed_start, proposed_end):
             print("Surgeon not available for the proposed time.")
             return False
@@ -229,10 +248,10 @@ class Solution:
 
         return True
         
-    def get_dynamic_room_availability(self, db):
+    def get_dynamic_room_availability(self):
         # Example: Fetching room availability considering dynamic factors
         room_availability = {}
-        rooms = db.rooms.find({})  # Assuming a collection 'rooms' with availability details
+        rooms = self.repository.find("rooms")  # Assuming a collection 'rooms' with availability details
         for room in rooms:
             # Calculate available hours considering maintenance or closures
             available_hours = room['default_available_hours']  # Base hours
@@ -248,29 +267,9 @@ class Solution:
         """
         Calculates the compactness of each surgeon's schedule, aiming to minimize gaps between surgeries.
         """
-        db = MongoDBClient.get_db()  # Ensure consistent database access
-        surgeon_schedules = {}
-        compactness_scores = []
-
         try:
-            # Ideally, fetch surgery times and surgeon_ids directly from the database
-            # For demonstration, assuming self.surgeries is already populated
-            for surgery in self.surgeries:
-                surgeon_id = surgery.get('surgeon_id')
-                if surgeon_id not in surgeon_schedules:
-                    surgeon_schedules[surgeon_id] = []
-                start_time = surgery.get('start_time')
-                end_time = surgery.get('end_time')
-                if start_time and end_time:  # Ensure times are present
-                    surgeon_schedules[surgeon_id].append((start_time, end_time))
-
-            for surgeon_id, times in surgeon_schedules.items():
-                times.sort(key=lambda x: x[0])  # Sort surgeries by start time
-                gaps = [max(0, (times[i][0] - times[i-1][1]).total_seconds() / 3600) for i in range(1, len(times))]
-                compactness = 1 / (1 + sum(gaps)) if gaps else 1  # Higher score for less idle time
-                compactness_scores.append(compactness)
-
-            overall_compactness = sum(compactness_scores) / len(compactness_scores) if compactness_scores else 0
+            # Folded per surgeon from a cursor sorted by (surgeon_id, start_time)
+            overall_compactness = self.calculate_streaming_kpis()["surgeon_schedule_compactness"]
             self.surgeon_schedule_compactness = overall_compactness
             return overall_compactness
         except Exception as e:
@@ -279,12 +278,8 @@ class Solution:
             return None
 
     def calculate_and_set_operational_cost(self):
-        # Create an instance of the calculator with the database connection
-        db = MongoDBClient.get_db()
-        cost_calculator = OperationalCostCalculator(db)
-
-        # Calculate the average surgery duration
-        self.average_surgery_duration = cost_calculator.calculate_operational_cost_minimization()
+        # Calculate the average surgery duration from the shared KPI snapshot
+        self.average_surgery_duration = self.calculate_streaming_kpis()["operational_cost_minimization"]
 
         # Use the average duration as a proxy for operational cost
         # You might want to store it in the instance or use it directly
@@ -292,15 +287,8 @@ class Solution:
         self.operational_cost_minimization = self.average_surgery_duration
 
     def calculate_room_utilization(self):
-        # Instantiate the calculator
-        room_utilization_calculator = RoomUtilizationCalculator()
-        
-        # Define your date range for the calculation
-        start_date = datetime(2023, 1, 1)  # Example start date
-        end_date = datetime(2023, 12, 31)  # Example end date
-        
-        # Perform the calculation
-        self.room_utilization_efficiency = room_utilization_calculator.calculate_room_utilization_efficiency(start_date, end_date)
+        # Perform the calculation for the configured analysis period with the shared calculator
+        self.room_utilization_efficiency = self.room_utilization_calculator.calculate(self.start_date, self.end_date)
         
         # Use or store the calculated efficiencies as needed
         # For example, printing them:
@@ -356,21 +344,7 @@ class Solution:
         """
         Calculates the total used hours for each room based on surgeries.
         """
-        total_used_hours_per_room = {}
-        for surgery in self.surgeries:
-            if 'room_id' in surgery and 'start_time' in surgery and 'end_time' in surgery:
-                room_id = surgery['room_id']
-                # Ensure that 'start_time' and 'end_time' are datetime objects for accurate calculation
-                if isinstance(surgery['start_time'], datetime) and isinstance(surgery['end_time'], datetime):
-                    duration_hours = (surgery['end_time'] - surgery['start_time']).total_seconds() / 3600
-                    if room_id in total_used_hours_per_room:
-                        total_used_hours_per_room[room_id] += duration_hours
-                    else:
-                        total_used_hours_per_room[room_id] = duration_hours
-            else:
-                print(f"Warning: Missing data in surgery {surgery}")
-
-        return total_used_hours_per_room
+        return dict(self.calculate_streaming_kpis()["room_used_hours"])
 
     def evaluate_utilization_rate(self, utilization_rate):
         """
@@ -386,11 +360,8 @@ class Solution:
             return 1 - (utilization_rate - threshold)
 
     def calculate_workload_balance(self):
-        # Instantiate the WorkloadBalanceCalculator
-        workload_calculator = WorkloadBalanceCalculator()
-        
-        # Perform the calculation
-        workload_balance_metric = workload_calculator.calculate_workload_balance()
+        # Standard deviation of surgeries per surgeon, folded into the shared KPI snapshot
+        workload_balance_metric = self.calculate_streaming_kpis()["workload_balance"]
         
         # You might want to store this metric in the instance for later use
         return workload_balance_metric
@@ -425,23 +396,21 @@ def calculate_score(self):
     )
     return self.score
 
-from datetime import datetime
-from solution import Solution
-
-# Initialize the Solution instance
-solution_instance = Solution()
+if __name__ == "__main__":
+    # Initialize the Solution instance
+    solution_instance = Solution()
 
-# Optionally, if your design includes setting an analysis period:
-solution_instance.set_analysis_period(
-    start_date=datetime(2023, 1, 1),
-    end_date=datetime(2023, 12, 31)
-)
+    # Optionally, if your design includes setting an analysis period:
+    solution_instance.set_analysis_period(
+        start_date=datetime(2023, 1, 1),
+        end_date=datetime(2023, 12, 31)
+    )
 
-# Calculate all metrics
-solution_instance.calculate_all_metrics()
+    # Calculate all metrics
+    solution_instance.calculate_all_metrics()
 
-# Access and print some calculated metrics for verification
-print(f"Equipment Utilization Efficiency: {solution_instance.equipment_utilization_efficiency}")
-print(f"Operational Cost Minimization: {solution_instance.operational_cost_minimization}")
-print(f"Room Utilization Efficiency: {solution_instance.room_utilization_efficiency}")
-print(f"Workload Balance: {solution_instance.workload_balance}")
+    # Access and print some calculated metrics for verification
+    print(f"Equipment Utilization Efficiency: {solution_instance.equipment_utilization_efficiency}")
+    print(f"Operational Cost Minimization: {solution_instance.operational_cost_minimization}")
+    print(f"Room Utilization Efficiency: {solution_instance.room_utilization_efficiency}")
+    print(f"Workload Balance: {solution_instance.workload_balance}")
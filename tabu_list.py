@@ -76,17 +76,18 @@ class TabuList:
             self.entries[attribute] = max(self.entries.get(attribute, self.min_tenure) - 1, self.min_tenure)
 
 # Example usage:
-tabu_list = TabuList(max_tenure=10, min_tenure=5)
-tabu_list.add('attribute1')
-tabu_list.add('attribute2', tenure=7)
-# Assuming we have a function that returns the search progress
-progress_calculator = lambda: 0.5  # Example function that returns 50% progress
-tabu_list.update_tenure_based_on_progress(progress_calculator)
-tabu_list.apply_randomized_tenure()
-
-# Assuming we have a frequency dictionary for attributes
-frequency_dict = {'attribute1': 3, 'attribute2': 1}
-tabu_list.adjust_frequency_based_tenure('attribute1', frequency_dict)
-
-# Output the tabu list entries and tenures
-print(tabu_list.entries)
\ No newline at end of file
+if __name__ == "__main__":
+    tabu_list = TabuList(max_tenure=10, min_tenure=5)
+    tabu_list.add('attribute1')
+    tabu_list.add('attribute2', tenure=7)
+    # Assuming we have a function that returns the search progress
+    progress_calculator = lambda: 0.5  # Example function that returns 50% progress
+    tabu_list.update_tenure_based_on_progress(progress_calculator)
+    tabu_list.apply_randomized_tenure()
+
+    # Assuming we have a frequency dictionary for attributes
+    frequency_dict = {'attribute1': 3, 'attribute2': 1}
+    tabu_list.adjust_frequency_based_tenure('attribute1', frequency_dict)
+
+    # Output the tabu list entries and tenures
+    print(tabu_list.entries)
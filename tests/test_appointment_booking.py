@@ -0,0 +1,149 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+import pytest
+from repositories.base import AsyncRepositoryAdapter
+from repositories.memory_repository import InMemoryRepository
+from services.appointment_service import AppointmentService
+from services.async_appointment_service import AsyncAppointmentService
+from services.slot_reservation_service import SlotReservationService
+
+STAFF = [{"staff_id": "ST1", "role": "Surgeon"}]
+
+
+def book(service, appointment_id, room_id, start, end, staff=()):
+    return service.create_surgery_appointment(appointment_id, "S-" + appointment_id, "P1", list(staff), room_id,
+                                              f"2024-01-01T{start}:00", f"2024-01-01T{end}:00")
+
+
+def reservations(repository, slot):
+    document = repository.find_one("resource_slots", {"_id": slot}) or {}
+    return [(item["appointment_id"], item["start_time"].hour, item["end_time"].hour)
+            for item in document.get("reservations", [])]
+
+
+def test_overlapping_booking_is_refused():
+    service = AppointmentService(InMemoryRepository())
+    assert book(service, "A1", "OR1", "09:00", "11:00", STAFF)
+    assert not book(service, "A2", "OR1", "10:00", "12:00")
+    assert not book(service, "A3", "OR2", "10:00", "12:00", STAFF)
+    assert book(service, "A4", "OR1", "11:00", "12:00")
+
+
+def test_reused_appointment_id_cannot_double_book():
+    repository = InMemoryRepository()
+    service = AppointmentService(repository)
+    assert book(service, "A1", "OR1", "09:00", "11:00")
+    assert not book(service, "A2", "OR1", "10:00", "12:00")
+    assert not book(service, "A1", "OR1", "10:00", "12:00")
+    assert reservations(repository, "room:OR1:2024-01-01") == [("A1", 9, 11)]
+    assert repository.count("surgery_appointments", {"appointment_id": "A1"}) == 1
+
+
+def test_reserve_does_not_skip_own_reservations():
+    slots = SlotReservationService(InMemoryRepository())
+    assert slots.reserve("room", "OR1", "A1", "2024-01-01T09:00:00", "2024-01-01T11:00:00")
+    assert not slots.reserve("room", "OR1", "A1", "2024-01-01T10:00:00", "2024-01-01T12:00:00")
+
+
+def test_move_may_overlap_its_own_old_slot():
+    repository = InMemoryRepository()
+    service = AppointmentService(repository)
+    assert book(service, "A1", "OR1", "09:00", "11:00")
+    service.update_appointment("A1", {"start_time": "2024-01-01T10:00:00", "end_time": "2024-01-01T12:00:00"})
+    assert reservations(repository, "room:OR1:2024-01-01") == [("A1", 10, 12)]
+
+
+def test_batch_refuses_existing_and_repeated_ids():
+    service = AppointmentService(InMemoryRepository())
+    assert book(service, "A1", "OR1", "09:00", "10:00")
+    row = {"surgery_id": "S", "patient_id": "P", "staff_assignments": [],
+           "start_time": "2024-01-02T09:00:00", "end_time": "2024-01-02T10:00:00"}
+    results = service.create_surgery_appointments([
+        dict(row, appointment_id="A1", room_id="OR1"),
+        dict(row, appointment_id="B1", room_id="OR2"),
+        dict(row, appointment_id="B1", room_id="OR3"),
+    ])
+    assert [result["created"] for result in results] == [False, True, False]
+
+
+def test_concurrent_bookings_of_one_room_succeed_once():
+    service = AppointmentService(InMemoryRepository())
+    start = threading.Barrier(8)
+    outcomes = []
+
+    def attempt(number):
+        start.wait(5)
+        outcomes.append(book(service, f"A{number}", "OR1", "09:00", "11:00", STAFF))
+
+    threads = [threading.Thread(target=attempt, args=(number,)) for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert sorted(outcomes) == [False] * 7 + [True]
+
+
+class ProcessDied(BaseException):
+    """Stands in for the booking process being killed; not caught by the service."""
+
+
+def test_reservations_of_a_booking_that_died_before_saving_are_swept():
+    repository = InMemoryRepository()
+    service = AppointmentService(repository)
+    assert book(service, "A1", "OR1", "09:00", "10:00", STAFF)
+    insert_one = repository.insert_one
+
+    def die_on_appointment_insert(collection, document):
+        if collection == "surgery_appointments":
+            raise ProcessDied()
+        return insert_one(collection, document)
+
+    repository.insert_one = die_on_appointment_insert
+    with pytest.raises(ProcessDied):
+        book(service, "A2", "OR1", "11:00", "12:00", STAFF)
+    repository.insert_one = insert_one
+    assert reservations(repository, "room:OR1:2024-01-01") == [("A1", 9, 10), ("A2", 11, 12)]
+    assert not book(service, "A3", "OR1", "11:00", "12:00")
+
+    slots = SlotReservationService(repository)
+    assert slots.release_orphaned() == 0  # Too recent: the booking could still be in progress
+    assert slots.release_orphaned(grace=timedelta(0)) == 2  # Room and staff member
+    assert reservations(repository, "room:OR1:2024-01-01") == [("A1", 9, 10)]
+    assert reservations(repository, "staff:ST1:2024-01-01") == [("A1", 9, 10)]
+    assert book(service, "A3", "OR1", "11:00", "12:00")
+
+
+def test_single_batch_and_async_bookings_store_the_same_times():
+    repository = InMemoryRepository()
+    service = AppointmentService(repository)
+    assert book(service, "A1", "OR1", "09:00", "10:00")
+    results = service.create_surgery_appointments([
+        {"appointment_id": "B1", "surgery_id": "S", "patient_id": "P", "staff_assignments": [], "room_id": "OR2",
+         "start_time": datetime(2024, 1, 1, 9), "end_time": "2024-01-01T10:00:00"},
+        {"appointment_id": "B2", "surgery_id": "S", "patient_id": "P", "staff_assignments": [], "room_id": "OR1",
+         "start_time": datetime(2024, 1, 1, 9, 30), "end_time": datetime(2024, 1, 1, 10, 30)},
+    ])
+    assert [result["created"] for result in results] == [True, False]  # B2 overlaps the string-booked A1
+    assert asyncio.run(AsyncAppointmentService(AsyncRepositoryAdapter(repository)).create_surgery_appointment(
+        "C1", "S", "P", [], "OR3", "2024-01-01T09:00:00", "2024-01-01T10:00:00"))
+    for document in repository.find("surgery_appointments"):
+        assert (document["start_time"], document["end_time"]) == (datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 10))
+    created = repository.find_one("outbox", {"kind": "appointment.created", "payload.appointment_id": "A1"})
+    assert created["payload"]["start_time"] == datetime(2024, 1, 1, 9)
+
+
+def test_invalid_times_are_refused_by_every_path():
+    repository = InMemoryRepository()
+    service = AppointmentService(repository)
+    assert not book(service, "A1", "OR1", "10:00", "09:00")
+    assert not service.create_surgery_appointment("A2", "S", "P", [], "OR1", "tomorrow", "2024-01-01T10:00:00")
+    results = service.create_surgery_appointments([
+        {"appointment_id": "B1", "surgery_id": "S", "patient_id": "P", "staff_assignments": [], "room_id": "OR1",
+         "start_time": "2024-01-01T10:00:00", "end_time": "2024-01-01T10:00:00"},
+    ])
+    assert "end_time is not after start_time" in results[0]["error"]
+    assert not asyncio.run(AsyncAppointmentService(AsyncRepositoryAdapter(repository)).create_surgery_appointment(
+        "C1", "S", "P", [], "OR1", "2024-01-01T10:00:00", None))
+    assert repository.count("surgery_appointments") == 0
+    assert repository.count("resource_slots") == 0
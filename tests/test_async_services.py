@@ -0,0 +1,78 @@
+import asyncio
+from repositories.base import AsyncRepositoryAdapter
+from repositories.memory_repository import InMemoryRepository
+from services.async_appointment_service import AsyncAppointmentService
+from services.async_staff_assignment_service import AsyncStaffAssignmentService
+
+STAFF = [{"staff_id": "ST1", "role": "Surgeon"}, {"staff_id": "ST2", "role": "Nurse"}]
+
+
+class SlowRepository(AsyncRepositoryAdapter):
+    """Adds a round trip of latency to count_overlapping and records how many are in flight."""
+    def __init__(self, repository):
+        super().__init__(repository)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def count_overlapping(self, *args, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return self.repository.count_overlapping(*args, **kwargs)
+
+
+def book(service, appointment_id, room_id, start, end, staff=()):
+    return service.create_surgery_appointment(appointment_id, "S-" + appointment_id, "P1", list(staff), room_id,
+                                              f"2024-01-01T{start}:00", f"2024-01-01T{end}:00")
+
+
+def test_validation_queries_for_room_and_staff_run_concurrently():
+    repository = SlowRepository(InMemoryRepository())
+    service = AsyncAppointmentService(repository)
+    assert asyncio.run(service.validate_appointment("OR1", "2024-01-01T09:00:00", "2024-01-01T10:00:00", STAFF))
+    assert repository.max_in_flight == 3
+
+
+def test_validation_reports_a_busy_staff_member():
+    repository = InMemoryRepository()
+    service = AsyncAppointmentService(AsyncRepositoryAdapter(repository))
+    assert asyncio.run(book(service, "A1", "OR1", "09:00", "11:00", STAFF[1:]))
+    assert not asyncio.run(service.validate_appointment("OR2", "2024-01-01T10:00:00", "2024-01-01T12:00:00", STAFF))
+    assert asyncio.run(service.validate_appointment("OR2", "2024-01-01T11:00:00", "2024-01-01T12:00:00", STAFF))
+
+
+def test_concurrent_bookings_on_one_loop_never_double_book():
+    repository = InMemoryRepository()
+    service = AsyncAppointmentService(AsyncRepositoryAdapter(repository))
+
+    async def morning_rush():
+        return await asyncio.gather(
+            book(service, "A1", "OR1", "09:00", "11:00", STAFF[:1]),
+            book(service, "A2", "OR1", "10:00", "12:00"),
+            book(service, "A3", "OR2", "10:00", "12:00", STAFF[:1]),
+            book(service, "A4", "OR2", "08:00", "09:00", STAFF[1:]),
+        )
+
+    assert asyncio.run(morning_rush()) == [True, False, False, True]
+    assert sorted(document["appointment_id"] for document in repository.find("surgery_appointments")) == ["A1", "A4"]
+    appointment = asyncio.run(service.get_appointment_by_id("A1"))
+    assert appointment.room_id == "OR1" and [sa.staff_id for sa in appointment.staff_assignments] == ["ST1"]
+
+
+def test_staff_assignment_service_edits_the_embedded_assignments():
+    repository = InMemoryRepository()
+    service = AsyncAppointmentService(AsyncRepositoryAdapter(repository))
+    assert asyncio.run(book(service, "A1", "OR1", "09:00", "11:00", STAFF[:1]))
+    appointment_id = repository.find_one("surgery_appointments", {"appointment_id": "A1"})["_id"]
+    assignments = AsyncStaffAssignmentService(AsyncRepositoryAdapter(repository))
+
+    def staff():
+        document = repository.find_one("surgery_appointments", {"appointment_id": "A1"})
+        return [(sa["staff_id"], sa["role"]) for sa in document["staff_assignments"]]
+
+    asyncio.run(assignments.add_staff_assignment(appointment_id, "ST2", "Nurse"))
+    asyncio.run(assignments.update_staff_role(appointment_id, "ST2", "Scrub Nurse"))
+    assert staff() == [("ST1", "Surgeon"), ("ST2", "Scrub Nurse")]
+    asyncio.run(assignments.remove_staff_assignment(appointment_id, "ST1"))
+    assert staff() == [("ST2", "Scrub Nurse")]
@@ -0,0 +1,153 @@
+import itertools
+from datetime import datetime
+from types import SimpleNamespace
+from models import Surgery
+from repositories.memory_repository import InMemoryRepository
+from services.calendar_sync import CalendarSync, changed_fields, surgery_event
+
+
+class HttpError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.resp = SimpleNamespace(status=status)
+
+
+class FakeRequest:
+    def __init__(self, action):
+        self.action = action
+        self.headers = {}
+
+    def execute(self):
+        return self.action(self.headers)
+
+
+class FakeBatch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        for request_id, request in self.requests:
+            try:
+                response, exception = request.execute(), None
+            except HttpError as e:
+                response, exception = None, e
+            self.callback(request_id, response, exception)
+
+
+class FakeCalendar:
+    """Calendar API with per-event etags that change on every write and honour If-Match."""
+
+    def __init__(self):
+        self.events_by_id = {}
+        self.calls = []
+        self._ids = itertools.count(1)
+        self._etags = itertools.count(1)
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(callback)
+
+    def events(self):
+        return self
+
+    def _store(self, event_id, event):
+        self.events_by_id[event_id] = dict(event, id=event_id, etag=f'"{next(self._etags)}"')
+        return self.events_by_id[event_id]
+
+    def edit(self, event_id, **fields):
+        """Someone else edits an event in their calendar app."""
+        return self._store(event_id, dict(self.events_by_id[event_id], **fields))
+
+    def insert(self, calendarId, body):
+        def run(headers):
+            self.calls.append(("insert", body))
+            return self._store(f"ev{next(self._ids)}", body)
+        return FakeRequest(run)
+
+    def patch(self, calendarId, eventId, body):
+        def run(headers):
+            self.calls.append(("patch", body))
+            current = self.events_by_id.get(eventId)
+            if current is None:
+                raise HttpError(404)
+            if headers.get("If-Match") not in (None, current["etag"]):
+                raise HttpError(412)
+            return self._store(eventId, dict(current, **body))
+        return FakeRequest(run)
+
+    def delete(self, calendarId, eventId):
+        def run(headers):
+            self.calls.append(("delete", eventId))
+            if self.events_by_id.pop(eventId, None) is None:
+                raise HttpError(404)
+            return {}
+        return FakeRequest(run)
+
+    def get(self, calendarId, eventId):
+        def run(headers):
+            if eventId not in self.events_by_id:
+                raise HttpError(404)
+            return dict(self.events_by_id[eventId])
+        return FakeRequest(run)
+
+
+def surgery(surgery_id, hour, surgery_type="Cardiac"):
+    return Surgery(surgery_id, "P1", "SG1", "OR1", "2024-01-01", surgery_type, "High", 1, "Scheduled",
+                   datetime(2024, 1, 1, hour), datetime(2024, 1, 1, hour + 1), [])
+
+
+def test_diff_only_sends_what_changed():
+    calendar = FakeCalendar()
+    sync = CalendarSync(calendar, InMemoryRepository())
+    assert sync.sync("cal", [surgery("S1", 9), surgery("S2", 11)])["inserted"] == 2
+    changes = sync.diff("cal", [surgery("S1", 9), surgery("S2", 12), surgery("S3", 14)], prune=True)
+    assert [(operation, surgery_id) for operation, surgery_id, _, _ in changes] == [("patch", "S2"), ("insert", "S3")]
+    assert [(operation, surgery_id) for operation, surgery_id, _, _ in sync.diff("cal", [surgery("S1", 9)],
+                                                                               prune=True)] == [("delete", "S2")]
+    result = sync.sync("cal", [surgery("S1", 9), surgery("S2", 12)])
+    assert (result["patched"], result["unchanged"]) == (1, 1)
+
+
+def test_edited_event_is_rediffed_instead_of_overwritten():
+    calendar = FakeCalendar()
+    sync = CalendarSync(calendar, InMemoryRepository())
+    sync.sync("cal", [surgery("S1", 9)])
+    event_id = sync.cached_events("cal")["S1"]["event_id"]
+    calendar.edit(event_id, description="Bring the consent form", location="Wing B")
+
+    result = sync.sync("cal", [surgery("S1", 10)])
+    assert (result["patched"], result["conflicts"], result["failed"]) == (1, 1, 0)
+    stored = calendar.events_by_id[event_id]
+    assert stored["start"] == surgery_event(surgery("S1", 10))["start"]
+    assert stored["location"] == "Wing B"
+    # The retried patch carries only the fields the schedule changed, so the description edit stays
+    assert stored["description"] == "Bring the consent form"
+    assert set(calendar.calls[-1][1]) == {"start", "end"}
+    assert sync.cached_events("cal")["S1"]["etag"] == stored["etag"]
+
+
+def test_edit_that_already_matches_the_schedule_only_updates_the_map():
+    calendar = FakeCalendar()
+    sync = CalendarSync(calendar, InMemoryRepository())
+    sync.sync("cal", [surgery("S1", 9)])
+    event_id = sync.cached_events("cal")["S1"]["event_id"]
+    desired = surgery_event(surgery("S1", 10))
+    calendar.edit(event_id, start=desired["start"], end=desired["end"])
+    calls = len(calendar.calls)
+
+    result = sync.sync("cal", [surgery("S1", 10)])
+    assert (result["conflicts"], result["failed"]) == (1, 0)
+    assert len(calendar.calls) == calls + 1  # The refused patch only
+    assert sync.cached_events("cal")["S1"]["etag"] == calendar.events_by_id[event_id]["etag"]
+    assert sync.sync("cal", [surgery("S1", 10)])["unchanged"] == 1
+
+
+def test_changed_fields_compares_only_the_keys_we_write():
+    event = {"summary": "Surgery", "extendedProperties": {"private": {"surgery_id": "S1"}}}
+    current = {"summary": "Surgery", "id": "ev1",
+               "extendedProperties": {"private": {"surgery_id": "S1", "note": "x"}, "shared": {}}}
+    assert changed_fields(event, current) == []
+    assert changed_fields(dict(event, summary="Other"), current) == ["summary"]
@@ -0,0 +1,60 @@
+import pytest
+from benchmarks.synthetic_hospital import generate_hospital
+from cluster_decomposition import ClusterDecompositionScheduler, pack_clusters, resource_clusters
+from repositories.memory_repository import InMemoryRepository
+from schedule_state import ScheduleState
+
+COLLECTIONS = ("operating_rooms", "surgeons", "equipment", "surgeries")
+
+
+@pytest.fixture(scope="module")
+def wings():
+    """Two wings that share no surgeon, room or equipment item."""
+    return [generate_hospital(60, seed=n, specializations=[specialization], id_prefix=f"W{n}-")
+            for n, specialization in enumerate(["General Surgery", "Orthopedic Surgery"])]
+
+
+def load(wings):
+    repository = InMemoryRepository({name: [document for wing in wings for document in wing[name]]
+                                     for name in COLLECTIONS})
+    state = ScheduleState.from_repository(repository, horizon_start=wings[0]["horizon_start"],
+                                          horizon_days=max(wing["horizon_days"] for wing in wings))
+    return repository, state
+
+
+def wing(state, i):
+    return state.surgery_ids[i].split("-")[0]
+
+
+def test_clusters_partition_the_surgeries_and_never_span_wings(wings):
+    _, state = load(wings)
+    clusters = resource_clusters(state)
+    assert len(clusters) >= 2
+    assert sorted(i for cluster in clusters for i in cluster) == list(range(len(state.surgeries)))
+    assert [len(cluster) for cluster in clusters] == sorted((len(cluster) for cluster in clusters), reverse=True)
+    for cluster in clusters:
+        assert len({wing(state, i) for i in cluster}) == 1
+
+
+def test_pack_clusters_balances_job_sizes():
+    clusters = [list(range(n * 10, n * 10 + size)) for n, size in enumerate([6, 5, 4, 3, 2, 1])]
+    jobs = pack_clusters(clusters, 3)
+    assert sorted(len(job) for job in jobs) == [7, 7, 7]
+    assert sorted(i for job in jobs for i in job) == sorted(i for cluster in clusters for i in cluster)
+    assert pack_clusters(clusters[:2], 4) == clusters[:2]
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_merged_schedule_keeps_each_wing_in_its_own_rooms(wings, processes):
+    repository, state = load(wings)
+    scheduler = ClusterDecompositionScheduler(repository, processes=processes, min_iterations=20)
+    scheduler.run(state, max_iterations=100, seed=0)
+    assert sum(scheduler.stats["clusters"]) == len(state.surgeries)
+    assert scheduler.stats["unscheduled"] == state.unscheduled < len(state.surgeries) // 10
+    for i, room_id in enumerate(state.room_of):
+        if room_id is None:
+            continue
+        assert room_id.startswith(wing(state, i) + "-")
+        placement = state.unassign(i)
+        assert state.can_place(i, *placement)
+        state.place(i, *placement)
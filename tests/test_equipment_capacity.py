@@ -0,0 +1,72 @@
+from datetime import datetime
+from models import to_epoch_minutes
+from schedule_state import ScheduleState
+from utils.equipment_capacity import EquipmentCapacityModel, peak_usage
+
+NINE = to_epoch_minutes(datetime(2024, 1, 1, 9))
+ROOMS = [{"room_id": "OR1", "equipment_transfer_minutes": 10}, {"room_id": "OR2"}]
+
+
+def c_arms(units, maintenance=None):
+    return [{"equipment_id": f"CARM{n}", "type": "C-arm", "availability": True,
+             "maintenance_windows": maintenance if n == 1 and maintenance else []} for n in range(1, units + 1)]
+
+
+def test_peak_usage_sweeps_overlaps_but_not_back_to_back_intervals():
+    assert peak_usage([]) == (0, None)
+    assert peak_usage([(0, 10), (10, 20), (20, 30)]) == (1, 0)
+    assert peak_usage([(0, 10), (5, 15), (8, 9), (14, 20)]) == (3, 8)
+    assert peak_usage([(0, 10), (5, 15)], low=10) == (1, 10)
+    assert peak_usage([(0, 10), (5, 15)], high=5) == (1, 0)
+
+
+def test_units_form_pools_by_type_or_quantity():
+    model = EquipmentCapacityModel(c_arms(3) + [
+        {"equipment_id": "PUMP", "type": "Pump", "quantity": 4},
+        {"equipment_id": "LASER1", "type": None},
+        {"equipment_id": "CARM9", "type": "C-arm", "availability": False},
+    ])
+    assert model.capacity == {"C-arm": 3, "PUMP": 4}
+    assert model.pool_of("C-arm") == "C-arm" and model.pool_of("PUMP") == "PUMP"
+    assert model.pool_of("CARM1") is None and model.pool_of("LASER1") is None
+    assert model.unit_pool["CARM2"] == "C-arm" and "LASER1" not in model.unit_pool
+
+
+def test_violations_count_transfers_and_maintenance():
+    maintenance = [{"start_time": datetime(2024, 1, 1, 8), "end_time": datetime(2024, 1, 1, 10)}]
+    model = EquipmentCapacityModel(c_arms(2, maintenance), ROOMS, default_transfer_minutes=5)
+    assert model.occupancy("OR1", NINE, NINE + 60) == (NINE - 10, NINE + 70)
+    assert model.occupancy("OR2", NINE, NINE + 60) == (NINE - 5, NINE + 65)
+    # One unit is in maintenance until ten, so a single use fits but two at once do not
+    assert model.violations([("C-arm", "OR1", NINE, NINE + 30)]) == []
+    assert model.violations([("C-arm", "OR1", NINE, NINE + 30), ("C-arm", "OR2", NINE + 120, NINE + 180)]) == []
+    overloaded = model.violations([("C-arm", "OR1", NINE, NINE + 30), ("C-arm", "OR2", NINE + 30, NINE + 60)])
+    assert overloaded == [{"pool_id": "C-arm", "peak": 3, "capacity": 2, "at": datetime(2024, 1, 1, 9, 25)}]
+
+
+def test_available_hours_of_a_pool_and_a_unit():
+    maintenance = [{"start_time": datetime(2024, 1, 1, 8), "end_time": datetime(2024, 1, 1, 10)}]
+    model = EquipmentCapacityModel(c_arms(3, maintenance))
+    assert model.available_hours("C-arm", datetime(2024, 1, 1), datetime(2024, 1, 7)) == 3 * 7 * 8 - 2
+    assert model.available_hours("CARM1", datetime(2024, 1, 1), datetime(2024, 1, 1)) == 6
+    assert model.available_hours("CARM2", datetime(2024, 1, 2), datetime(2024, 1, 2)) == 8
+
+
+def surgery(surgery_id, surgeon_id, equipment):
+    return {"surgery_id": surgery_id, "patient_id": "P-" + surgery_id, "surgeon_id": surgeon_id, "room_id": None,
+            "scheduled_date": datetime(2024, 1, 1), "surgery_type": "Cardiac", "urgency_level": "High",
+            "duration": 60, "status": "Scheduled", "start_time": None, "end_time": None,
+            "required_equipment_ids": [equipment]}
+
+
+def test_state_places_pool_surgeries_up_to_the_pool_capacity():
+    surgeries = [surgery("S1", "SG1", "C-arm"), surgery("S2", "SG2", "C-arm"), surgery("S3", "SG3", "CARM1")]
+    state = ScheduleState.from_documents(surgeries, ROOMS + [{"room_id": "OR3"}], equipment=c_arms(2),
+                                         horizon_start=datetime(2024, 1, 1))
+    state.place(0, "OR1", NINE)
+    assert state.can_place(1, "OR2", NINE)
+    state.place(1, "OR2", NINE)
+    # Both units are now taken, the one asked for by id included
+    assert state.pool_conflict(2, "OR3", NINE + 30)
+    assert not state.can_place(2, "OR3", NINE + 30)
+    assert state.can_place(2, "OR3", NINE + 90)
@@ -0,0 +1,71 @@
+import pytest
+
+pytest.importorskip("ortools")
+from benchmarks.synthetic_hospital import generate_hospital  # noqa: E402
+from exact_solver import ExactScheduler, optimality_gap  # noqa: E402
+from repositories.memory_repository import InMemoryRepository  # noqa: E402
+from schedule_state import ScheduleState  # noqa: E402
+from scheduling_optimizer import TabuSearchScheduler  # noqa: E402
+
+COLLECTIONS = ("operating_rooms", "surgeons", "equipment", "surgeries")
+
+
+def load(num_surgeries):
+    hospital = generate_hospital(num_surgeries, seed=0)
+    repository = InMemoryRepository({name: hospital[name] for name in COLLECTIONS})
+    return repository, ScheduleState.from_repository(repository, horizon_start=hospital["horizon_start"],
+                                                     horizon_days=hospital["horizon_days"])
+
+
+def assert_feasible(state):
+    for i in range(len(state.surgeries)):
+        if state.room_of[i] is not None:
+            placement = state.unassign(i)
+            assert state.can_place(i, *placement), state.surgery_ids[i]
+            state.place(i, *placement)
+
+
+def test_optimality_gap():
+    assert optimality_gap(90.0, 100.0) == pytest.approx(10 / 90)
+    assert optimality_gap(100.0, 90.0) == 0.0
+    assert optimality_gap(-200.0, -150.0) == pytest.approx(0.25)
+    assert optimality_gap(0.0, 0.5) == 0.5
+
+
+def test_relaxation_bound_is_above_the_tabu_score_and_leaves_the_state_alone():
+    repository, state = load(50)
+    tabu = TabuSearchScheduler(repository)
+    tabu.run(state, max_iterations=100, seed=0)
+    assignment, score = state.assignment(), state.score
+    bound = ExactScheduler(repository).relaxation_bound(state)
+    assert bound >= score
+    assert state.assignment() == assignment and state.score == score
+
+    tabu.run(state, max_iterations=100, seed=0, bound=bound)
+    assert tabu.stats["bound"] == bound and tabu.stats["gap"] == optimality_gap(state.score, bound)
+    tabu.run(state, max_iterations=100, seed=0, bound=bound, gap_tolerance=float("inf"))
+    assert tabu.stats["iterations"] == 0
+
+
+def test_small_instance_is_solved_to_optimality():
+    repository, state = load(50)
+    first_day = [i for i in range(len(state.surgeries)) if state.day_of(state.scheduled_minutes[i]) <= 0][:6]
+    assert first_day
+    exact = ExactScheduler(repository, time_limit=20.0, workers=4)
+    exact.solve(state, movable=first_day, days=range(0, 1), seed=0)
+    assert exact.stats["optimal"] and exact.stats["movable"] == len(first_day)
+    assert exact.stats["best_score"] == pytest.approx(exact.stats["bound"], abs=1e-3)
+    assert all(state.room_of[i] is not None and state.day_of(state.start_of[i]) == 0 for i in first_day)
+    assert_feasible(state)
+
+
+def test_solve_polishes_a_tabu_schedule_without_making_it_worse():
+    repository, state = load(50)
+    TabuSearchScheduler(repository).run(state, max_iterations=100, seed=0)
+    score = state.score
+    exact = ExactScheduler(repository, time_limit=2.0, workers=4)
+    exact.solve(state, days=range(0, 2), seed=0)
+    assert exact.stats["status"] in ("OPTIMAL", "FEASIBLE")
+    assert state.score >= score - 1e-6 and exact.stats["bound"] >= state.score - 1e-6
+    assert state.recompute_score() == pytest.approx(exact.stats["best_score"])
+    assert_feasible(state)
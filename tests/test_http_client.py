@@ -0,0 +1,126 @@
+import asyncio
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+import pytest
+from utils import http_client
+from utils.http_client import AsyncHttpClient, CircuitBreaker, CircuitOpenError, HttpClient, retry_after
+
+URL = "https://calendar.example.com/events"
+
+
+class HTTPError(Exception):
+    pass
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError(self.status_code)
+
+
+class FakeSession:
+    """Replays the given outcomes: a status code, or an exception to raise."""
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome if isinstance(outcome, FakeResponse) else FakeResponse(outcome)
+
+
+class FakeAsyncClient(FakeSession):
+    async def request(self, method, url, **kwargs):
+        return FakeSession.request(self, method, url, **kwargs)
+
+
+def client(*outcomes, **options):
+    return HttpClient(session=FakeSession(*outcomes), backoff=0.0, **options)
+
+
+def test_transient_failures_are_retried_with_the_default_timeout():
+    http = client(503, http_client.request_errors.RequestException("reset"), 200, timeout=3.0)
+    assert http.get(URL).status_code == 200
+    assert [kwargs["timeout"] for _, _, kwargs in http.session.calls] == [3.0, 3.0, 3.0]
+
+
+def test_client_errors_raise_without_a_retry():
+    http = client(404)
+    with pytest.raises(HTTPError):
+        http.post(URL, json={})
+    assert len(http.session.calls) == 1
+    assert http.policy.breaker(URL).failures == 0
+
+
+def test_last_failure_is_raised_after_max_attempts():
+    http = client(502, 502, 503)
+    with pytest.raises(HTTPError):
+        http.get(URL, max_attempts=2)
+    assert len(http.session.calls) == 2
+    errors = http_client.request_errors.RequestException
+    http = client(errors("refused"), errors("refused"), max_attempts=2)
+    with pytest.raises(errors):
+        http.get(URL)
+
+
+def test_open_circuit_fails_fast_per_host():
+    http = client(500, 500, 200, failure_threshold=2, reset_timeout=60.0)
+    with pytest.raises(HTTPError):
+        http.get(URL, max_attempts=2)
+    with pytest.raises(CircuitOpenError) as raised:
+        http.get(URL)
+    assert raised.value.host == "calendar.example.com" and raised.value.retry_in > 50
+    assert len(http.session.calls) == 2
+    assert http.get("https://sms.example.com/send").status_code == 200
+
+
+def test_half_open_trial_call_closes_or_reopens_the_circuit():
+    breaker = CircuitBreaker("calendar.example.com", failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    breaker.before_call()
+    breaker.record_success()
+    assert (breaker.state, breaker.failures) == (CircuitBreaker.CLOSED, 0)
+
+    breaker = CircuitBreaker("calendar.example.com", failure_threshold=1, reset_timeout=60.0)
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_retry_after_is_honoured_up_to_max_backoff():
+    assert retry_after(FakeResponse(429, {"Retry-After": "7"})) == 7.0
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=120), usegmt=True)
+    assert 100 < retry_after(FakeResponse(503, {"Retry-After": later})) <= 120
+    assert retry_after(FakeResponse(503, {"Retry-After": "soon"})) is None
+    assert retry_after(None) is None
+    http = HttpClient(session=FakeSession(), max_backoff=5.0)
+    assert http.policy.delay(1, 0.5, FakeResponse(429, {"Retry-After": "7"})) == 5.0
+    assert 0 <= http.policy.delay(3, 0.5) <= 2.0
+
+
+def test_async_client_retries_and_opens_the_circuit():
+    async def run():
+        async_client = AsyncHttpClient(client=FakeAsyncClient(429, http_client.httpx_errors.TransportError("reset"),
+                                                               200, 500, 500, 500),
+                                       backoff=0.0, failure_threshold=3)
+        first = await async_client.get(URL)
+        with pytest.raises(HTTPError):
+            await async_client.get(URL, max_attempts=3)
+        with pytest.raises(CircuitOpenError):
+            await async_client.get(URL)
+        return first, async_client.client.calls
+
+    response, calls = asyncio.run(run())
+    assert response.status_code == 200 and len(calls) == 6
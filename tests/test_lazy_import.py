@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+import pytest
+from utils.lazy_import import lazy_import, optional_exceptions
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def imported_modules(statement):
+    """Modules loaded by running `statement` in a fresh interpreter."""
+    output = subprocess.run([sys.executable, "-c", f"import sys; {statement}; print('\\n'.join(sys.modules))"],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return set(output.split())
+
+
+def test_lazy_module_imports_on_first_attribute_access():
+    setup = "from utils.lazy_import import lazy_import; wave = lazy_import('wave')"
+    assert "wave" not in imported_modules(setup)
+    assert "wave" in imported_modules(f"{setup}; wave.open")
+
+
+def test_optional_exceptions_of_missing_module_are_never_raised():
+    errors = optional_exceptions("no_such_driver.errors")
+    with pytest.raises(ValueError):
+        try:
+            raise ValueError("original")
+        except errors.DriverError:
+            pytest.fail("placeholder caught an unrelated error")
+    assert errors.DriverError is errors.DriverError
+
+
+def test_optional_exceptions_of_installed_module_are_the_real_classes():
+    assert optional_exceptions("json").JSONDecodeError is __import__("json").JSONDecodeError
+
+
+@pytest.mark.parametrize("module", ["scheduling_optimizer", "services.notification_dispatcher",
+                                    "repositories.mongo_repository"])
+def test_importing_does_not_load_heavy_dependencies(module):
+    loaded = imported_modules(f"import {module}")
+    assert not {"pymongo", "bson", "googleapiclient", "requests", "email.mime.text"} & loaded
@@ -0,0 +1,84 @@
+import threading
+from datetime import datetime
+import pytest
+from repositories.memory_repository import InMemoryRepository
+
+
+def test_non_unique_id_field_finds_every_document():
+    repository = InMemoryRepository({"surgery_room_assignments": [
+        {"assignment_id": "RA00001", "surgery_id": "S1"},
+        {"assignment_id": "RA00001", "surgery_id": "S2"},
+    ]})
+    found = repository.find("surgery_room_assignments", {"assignment_id": "RA00001"})
+    assert [document["surgery_id"] for document in found] == ["S1", "S2"]
+
+    assert repository.delete_one("surgery_room_assignments", {"assignment_id": "RA00001"})
+    found = repository.find("surgery_room_assignments", {"assignment_id": "RA00001"})
+    assert [document["surgery_id"] for document in found] == ["S2"]
+    assert repository.count("surgery_room_assignments", {"assignment_id": "RA00001"}) == 1
+
+
+def test_fork_does_not_share_id_index():
+    repository = InMemoryRepository({"surgeries": [{"surgery_id": "S1"}]})
+    fork = repository.fork()
+    fork.insert_one("surgeries", {"surgery_id": "S1", "copy": True})
+    assert len(repository.find("surgeries", {"surgery_id": "S1"})) == 1
+    assert len(fork.find("surgeries", {"surgery_id": "S1"})) == 2
+
+
+def test_transaction_rolls_back_on_error():
+    repository = InMemoryRepository({"surgeries": [{"surgery_id": "S1", "status": "Scheduled"}]})
+    with pytest.raises(RuntimeError):
+        with repository.transaction():
+            repository.update_one("surgeries", {"surgery_id": "S1"}, {"$set": {"status": "Cancelled"}})
+            repository.insert_one("surgeries", {"surgery_id": "S2"})
+            raise RuntimeError("abort")
+    assert repository.find("surgeries", None, {"_id": 0}) == [{"surgery_id": "S1", "status": "Scheduled"}]
+
+
+def test_transactions_of_different_threads_are_separate():
+    repository = InMemoryRepository()
+    inside, release = threading.Event(), threading.Event()
+
+    def failing_transaction():
+        try:
+            with repository.transaction():
+                repository.insert_one("surgeries", {"surgery_id": "A"})
+                inside.set()
+                release.wait(5)
+                raise RuntimeError("abort")
+        except RuntimeError:
+            pass
+
+    thread = threading.Thread(target=failing_transaction)
+    thread.start()
+    assert inside.wait(5)
+    with repository.transaction():
+        repository.insert_one("surgeries", {"surgery_id": "B"})
+    release.set()
+    thread.join(5)
+    assert [document["surgery_id"] for document in repository.find("surgeries")] == ["B"]
+
+
+def test_reads_are_safe_during_concurrent_inserts():
+    repository = InMemoryRepository({"surgeries": [{"surgery_id": f"S{i}", "status": "Scheduled"}
+                                                   for i in range(2000)]})
+    done, errors = threading.Event(), []
+
+    def insert():
+        for i in range(20000):
+            repository.insert_one("surgeries", {"surgery_id": f"N{i}", "status": "Scheduled"})
+        done.set()
+
+    thread = threading.Thread(target=insert)
+    thread.start()
+    try:
+        while not done.is_set():
+            repository.find("surgeries", {"status": "Scheduled"})
+            repository.count("surgeries", {"status": "Cancelled"})
+            repository.find_overlapping("surgeries", datetime(2024, 1, 1), datetime(2024, 1, 2))
+    except RuntimeError as e:  # "dictionary changed size during iteration"
+        errors.append(e)
+    thread.join(30)
+    assert not errors
+    assert repository.count("surgeries") == 22000
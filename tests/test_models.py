@@ -0,0 +1,51 @@
+from datetime import datetime, timezone, timedelta
+from models import (SurgeryRecord, SurgeryTable, SurgeryAppointmentRecord, to_epoch_minutes, from_epoch_minutes,
+                    MISSING_MINUTE)
+
+
+def surgery_document(surgery_id, surgeon_id="SG1", room_id="OR1", start=None, duration=60, equipment=()):
+    start = start or datetime(2024, 1, 1, 9)
+    return {"surgery_id": surgery_id, "patient_id": "P-" + surgery_id, "surgeon_id": surgeon_id, "room_id": room_id,
+            "scheduled_date": start, "surgery_type": "Cardiac", "urgency_level": "High", "duration": duration,
+            "status": "Scheduled", "start_time": start, "end_time": start + timedelta(minutes=duration),
+            "required_equipment_ids": list(equipment)}
+
+
+def test_epoch_minutes_accept_datetimes_strings_and_aware_times():
+    minute = to_epoch_minutes(datetime(2024, 1, 1, 9))
+    assert to_epoch_minutes("2024-01-01T09:00:00") == minute
+    assert to_epoch_minutes(datetime(2024, 1, 1, 10, tzinfo=timezone(timedelta(hours=1)))) == minute
+    assert from_epoch_minutes(minute) == datetime(2024, 1, 1, 9)
+    assert to_epoch_minutes(None) == MISSING_MINUTE and from_epoch_minutes(MISSING_MINUTE) is None
+
+
+def test_surgery_record_round_trips_through_a_document():
+    document = surgery_document("S1", equipment=["E1", "E2"])
+    record = SurgeryRecord.from_document(document)
+    assert record.start_time == document["start_time"]
+    assert record.to_document() == document
+    assert not hasattr(record, "__dict__")
+
+
+def test_appointment_record_keeps_staff_as_tuples():
+    record = SurgeryAppointmentRecord.from_document({
+        "appointment_id": "A1", "surgery_id": "S1", "patient_id": "P1", "room_id": "OR1",
+        "staff_assignments": [{"staff_id": "ST1", "role": "Nurse"}],
+        "start_time": datetime(2024, 1, 1, 9), "end_time": datetime(2024, 1, 1, 10)})
+    assert record.staff_ids == ("ST1",)
+    assert record.to_document()["staff_assignments"] == [{"staff_id": "ST1", "role": "Nurse"}]
+
+
+def test_surgery_table_stores_columns_and_reads_rows_back():
+    documents = [surgery_document("S1", equipment=["E1"]),
+                 surgery_document("S2", surgeon_id="SG2", room_id="OR2", start=datetime(2024, 1, 1, 11), duration=90),
+                 surgery_document("S3", start=datetime(2024, 1, 2, 9), equipment=["E1", "E2"])]
+    table = SurgeryTable.from_documents(documents)
+    assert len(table) == 3
+    assert list(table) == [SurgeryRecord.from_document(document) for document in documents]
+    assert len(table.codebooks["room_id"]) == 2
+    assert table.equipment_ids(2) == ("E1", "E2") and table.equipment_ids(1) == ()
+    assert table.row_of("S2") == 1 and table.row_of("S9") is None
+    nine = to_epoch_minutes(datetime(2024, 1, 1, 9))
+    assert table.rows_overlapping(nine + 30, nine + 150) == [0, 1]
+    assert table.minutes_by("surgeon_id") == {"SG1": 120, "SG2": 90}
@@ -0,0 +1,45 @@
+import pytest
+from mongo_settings import ANALYTICS, OLTP, ClientSettings
+
+
+def test_defaults_give_each_role_its_own_pool_and_read_preference():
+    oltp = ClientSettings.from_env(OLTP, environ={}).client_kwargs()
+    analytics = ClientSettings.from_env(ANALYTICS, environ={}).client_kwargs()
+    assert (oltp["appname"], oltp["maxPoolSize"], oltp["readPreference"], oltp["w"]) == \
+        ("surgery-scheduler-oltp", 50, "primary", "majority")
+    assert (analytics["appname"], analytics["maxPoolSize"], analytics["readPreference"]) == \
+        ("surgery-scheduler-analytics", 10, "secondaryPreferred")
+    assert "w" not in analytics and "compressors" not in oltp
+
+
+def test_environment_overrides_are_typed_and_scoped_to_the_role():
+    environ = {
+        "MONGO_URI": "mongodb://db:27017",
+        "MONGO_MAX_POOL_SIZE": "80",
+        "MONGO_RETRY_WRITES": "false",
+        "MONGO_WRITE_CONCERN": "1",
+        "MONGO_COMPRESSORS": "zstd, zlib",
+        "MONGO_ANALYTICS_MAX_POOL_SIZE": "4",
+        "MONGO_ANALYTICS_DATABASE_NAME": "reporting",
+        "MONGO_ANALYTICS_RETRY_READS": "",
+    }
+    oltp = ClientSettings.from_env(OLTP, environ=environ)
+    assert (oltp.uri, oltp.database, oltp.max_pool_size, oltp.retry_writes) == \
+        ("mongodb://db:27017", "myappdb", 80, False)
+    assert oltp.client_kwargs()["w"] == 1 and oltp.client_kwargs()["compressors"] == "zstd,zlib"
+
+    analytics = ClientSettings.from_env(ANALYTICS, environ=environ)
+    # The URI and compressors are shared; pool sizing and write options are not
+    assert (analytics.uri, analytics.database, analytics.compressors) == ("mongodb://db:27017", "reporting", "zstd, zlib")
+    assert (analytics.max_pool_size, analytics.retry_writes, analytics.retry_reads) == (4, True, True)
+    assert analytics.write_concern is None
+
+
+@pytest.mark.parametrize("role, options", [
+    ("batch", {}),
+    (OLTP, {"pool_size": 5}),
+    (OLTP, {"read_preference": "closest"}),
+])
+def test_invalid_settings_are_rejected(role, options):
+    with pytest.raises(ValueError):
+        ClientSettings(role, "mongodb://localhost:27017", "myappdb", **options)
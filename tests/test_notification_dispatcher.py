@@ -0,0 +1,139 @@
+import smtplib
+import threading
+import pytest
+from services.notification_dispatcher import NotificationDispatcher, is_permanent
+
+
+class FakeSMTPServer:
+    """Connection factory standing in for smtplib.SMTP; `failures` are raised by the next sendmail calls."""
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.connections = []
+        self.delivered = []
+        self.lock = threading.Lock()
+        self.connecting = threading.Event()
+        self.accepting = threading.Event()
+        self.accepting.set()
+
+    def __call__(self, host, port, timeout=None):
+        self.connecting.set()
+        self.accepting.wait(5)
+        connection = FakeSMTP(self)
+        with self.lock:
+            self.connections.append(connection)
+        return connection
+
+
+class FakeSMTP:
+    def __init__(self, server):
+        self.server = server
+        self.calls = []
+
+    def starttls(self):
+        self.calls.append("starttls")
+
+    def login(self, username, password):
+        self.calls.append("login")
+
+    def sendmail(self, sender, recipients, message):
+        with self.server.lock:
+            if self.server.failures:
+                raise self.server.failures.pop(0)
+            self.server.delivered.append((sender, recipients[0]))
+
+    def quit(self):
+        self.calls.append("quit")
+
+    def close(self):
+        self.calls.append("close")
+
+
+def dispatcher(server, **options):
+    options = dict({"username": "scheduler@example.com", "password": "secret", "pool_size": 1, "backoff": 0.0},
+                   **options)
+    return NotificationDispatcher(connection_factory=server, **options)
+
+
+def test_queued_emails_share_one_authenticated_connection():
+    server = FakeSMTPServer()
+    mailer = dispatcher(server, batch_size=3)
+    for n in range(7):
+        assert mailer.submit(f"user{n}@example.com", "Schedule", "Changed")
+    assert mailer.flush(timeout=5)
+    mailer.close()
+    assert [recipient for _, recipient in server.delivered] == [f"user{n}@example.com" for n in range(7)]
+    assert len(server.connections) == 1
+    assert server.connections[0].calls == ["starttls", "login", "quit"]
+    assert mailer.stats["sent"] == 7 and mailer.stats["connections"] == 1
+
+
+def test_transient_failure_reconnects_and_retries():
+    server = FakeSMTPServer([smtplib.SMTPServerDisconnected("gone"), smtplib.SMTPResponseException(421, b"busy")])
+    mailer = dispatcher(server)
+    mailer.submit("grey@example.com", "Schedule", "Changed")
+    mailer.flush(timeout=5)
+    mailer.close()
+    assert server.delivered == [("scheduler@example.com", "grey@example.com")]
+    assert (mailer.stats["retries"], mailer.stats["connections"], mailer.stats["failed"]) == (2, 3, 0)
+
+
+def test_permanent_failure_is_dropped_and_keeps_the_connection():
+    server = FakeSMTPServer([smtplib.SMTPRecipientsRefused({"nobody@example.com": (550, b"no such user")})])
+    mailer = dispatcher(server)
+    mailer.submit("nobody@example.com", "Schedule", "Changed")
+    mailer.submit("grey@example.com", "Schedule", "Changed")
+    mailer.flush(timeout=5)
+    mailer.close()
+    assert [recipient for _, recipient in server.delivered] == ["grey@example.com"]
+    assert (mailer.stats["failed"], mailer.stats["retries"], mailer.stats["connections"]) == (1, 0, 1)
+
+
+def test_gives_up_after_max_attempts():
+    server = FakeSMTPServer([smtplib.SMTPServerDisconnected("gone")] * 3)
+    mailer = dispatcher(server, max_attempts=3)
+    mailer.submit("grey@example.com", "Schedule", "Changed")
+    mailer.flush(timeout=5)
+    mailer.close()
+    assert server.delivered == [] and (mailer.stats["failed"], mailer.stats["retries"]) == (1, 2)
+
+
+def test_full_queue_rejects_instead_of_blocking():
+    server = FakeSMTPServer()
+    server.accepting.clear()
+    mailer = dispatcher(server, queue_size=1)
+    assert mailer.submit("a@example.com", "Schedule", "Changed")
+    assert server.connecting.wait(5)  # The worker holds the first email while it connects
+    assert mailer.submit("b@example.com", "Schedule", "Changed")
+    assert not mailer.submit("c@example.com", "Schedule", "Changed", timeout=0.01)
+    server.accepting.set()
+    mailer.close()
+    assert [recipient for _, recipient in server.delivered] == ["a@example.com", "b@example.com"]
+    assert mailer.stats["rejected"] == 1
+    assert not mailer.submit("d@example.com", "Schedule", "Changed")
+
+
+def test_send_reuses_the_callers_connection_and_raises_on_failure():
+    server = FakeSMTPServer()
+    mailer = dispatcher(server)
+    mailer.send("a@example.com", "Schedule", "Changed")
+    mailer.send("b@example.com", "Schedule", "Changed")
+    assert len(server.connections) == 1
+    server.failures.append(smtplib.SMTPServerDisconnected("gone"))
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        mailer.send("c@example.com", "Schedule", "Changed")
+    mailer.send("c@example.com", "Schedule", "Changed")
+    assert len(server.connections) == 2 and mailer.stats["failed"] == 1
+    assert [recipient for _, recipient in server.delivered] == ["a@example.com", "b@example.com", "c@example.com"]
+
+
+def test_is_permanent():
+    assert is_permanent(smtplib.SMTPResponseException(550, b"rejected"))
+    assert not is_permanent(smtplib.SMTPResponseException(451, b"try later"))
+    assert not is_permanent(smtplib.SMTPServerDisconnected("gone"))
+
+
+def test_from_env_reads_the_smtp_settings():
+    mailer = NotificationDispatcher.from_env({"SMTP_SERVER": "mail", "SMTP_PORT": "2525", "SMTP_USER": "bot",
+                                              "SMTP_STARTTLS": "no", "SMTP_POOL_SIZE": "3"}, batch_size=5)
+    assert (mailer.host, mailer.port, mailer.sender, mailer.starttls, mailer.pool_size, mailer.batch_size) == \
+        ("mail", 2525, "bot", False, 3, 5)
@@ -0,0 +1,53 @@
+import pytest
+import scheduling_services
+from datetime import datetime
+from types import SimpleNamespace
+from models import Surgery
+from repositories.memory_repository import InMemoryRepository
+from scheduling_services import NotificationService
+from services.notification_coalescer import NotificationCoalescer
+from services.outbox import DigestQueue, DIGEST_KIND
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, recipient, subject, body):
+        self.submitted.append((recipient, subject, body))
+        return True
+
+
+@pytest.fixture
+def no_shared_dispatcher(monkeypatch):
+    def fail():
+        raise AssertionError("the shared dispatcher was built")
+    monkeypatch.setattr(scheduling_services, "get_notification_dispatcher", fail)
+
+
+def swap(service):
+    surgeon = SimpleNamespace(surgeon_id="SG1", contact_info={"email": "grey@example.com"})
+    original, new = (Surgery(surgery_id, "P1", "SG1", "OR1", datetime(2024, 1, 1), "Cardiac", "High", 60,
+                             "Scheduled", None, None, []) for surgery_id in ("S1", "S2"))
+    service.notify_surgeon_of_swap(surgeon, original, new)
+
+
+def test_digest_queue_service_needs_no_dispatcher(no_shared_dispatcher):
+    repository = InMemoryRepository()
+    service = NotificationService(DigestQueue(repository))
+    swap(service)
+    assert service.flush() == 0  # Delivered by the outbox workers when the window closes
+    digest = repository.find_one("outbox", {"kind": DIGEST_KIND})
+    assert digest["payload"] == {"recipient": "grey@example.com"}
+    assert [notification["key"] for notification in digest["notifications"]] == ["S2"]
+
+
+def test_coalescer_service_flushes_through_its_dispatcher(no_shared_dispatcher):
+    dispatcher = RecordingDispatcher()
+    service = NotificationService(NotificationCoalescer(dispatcher, window=None))
+    swap(service)
+    swap(service)
+    assert service.flush() == 1
+    assert [recipient for recipient, _, _ in dispatcher.submitted] == ["grey@example.com"]
+    assert service.send_notification("ops@example.com", "Subject", "Body")
+    assert service.dispatcher is dispatcher
@@ -0,0 +1,224 @@
+import asyncio
+import smtplib
+import time
+import pytest
+from repositories.memory_repository import InMemoryRepository
+from services import calendar_service
+from services.appointment_service import AppointmentService
+from services.async_appointment_service import AsyncAppointmentService
+from services.notification_dispatcher import NotificationDispatcher
+from services.outbox import (Outbox, OutboxProcessor, DigestQueue, default_handlers, update_surgeon_calendar,
+                             DONE, PENDING, IN_PROGRESS)
+from repositories.base import DuplicateKeyError, RepositoryError, AsyncRepositoryAdapter
+from scheduling_optimizer import TabuSearchScheduler
+
+
+class FakeSMTP:
+    """Stand-in for smtplib.SMTP that records messages and can fail the next `failures` sends."""
+    sent = []
+    failures = 0
+
+    def __init__(self, host, port, timeout=None):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        pass
+
+    def sendmail(self, sender, recipients, message):
+        if FakeSMTP.failures:
+            FakeSMTP.failures -= 1
+            raise smtplib.SMTPServerDisconnected("connection lost")
+        FakeSMTP.sent.append((recipients[0], message))
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def smtp():
+    FakeSMTP.sent, FakeSMTP.failures = [], 0
+    return NotificationDispatcher(starttls=False, connection_factory=FakeSMTP)
+
+
+def status(repository, key):
+    return repository.find_one("outbox", {"_id": key})["status"]
+
+
+def test_entry_is_redelivered_after_its_lease_expires():
+    repository = InMemoryRepository()
+    calls = []
+    processor = OutboxProcessor(repository, {"test": lambda payload, key: calls.append(key)}, lease=0.05)
+    Outbox(repository).add("test", {}, "entry-1")
+
+    # A worker claims the entry and dies before delivering it
+    entry = repository.find_one("outbox", {"_id": "entry-1"})
+    assert processor._claim(entry) is not None
+    assert processor.drain() == 0
+    assert status(repository, "entry-1") == IN_PROGRESS
+
+    time.sleep(0.1)
+    assert processor.drain() == 1
+    assert calls == ["entry-1"]
+    assert status(repository, "entry-1") == DONE
+
+
+def test_failing_handler_is_retried():
+    repository = InMemoryRepository()
+    attempts = []
+
+    def flaky(payload, key):
+        attempts.append(key)
+        if len(attempts) == 1:
+            raise RuntimeError("temporarily down")
+
+    processor = OutboxProcessor(repository, {"test": flaky}, backoff=0.01)
+    Outbox(repository).add("test", {}, "entry-1")
+    processor.drain()
+    assert status(repository, "entry-1") == PENDING
+    time.sleep(0.05)
+    processor.drain()
+    assert len(attempts) == 2
+    assert status(repository, "entry-1") == DONE
+
+
+def test_digest_is_completed_only_after_smtp_accepted_it(smtp):
+    repository = InMemoryRepository({"staff": [{"staff_id": "ST1", "contact_info": {"email": "nurse@example.com"}}]})
+    processor = OutboxProcessor(repository, default_handlers(repository, smtp, digest_window=0.2), backoff=0.01)
+    assert AppointmentService(repository).create_surgery_appointment(
+        "A1", "S1", "P1", [{"staff_id": "ST1", "role": "Nurse"}], "OR1", "2024-01-01T09:00:00", "2024-01-01T10:00:00")
+
+    processor.drain()
+    assert status(repository, "appointment.created:A1") == DONE
+    digest = repository.find_one("outbox", {"kind": "email.digest"})
+    assert digest["status"] == PENDING and FakeSMTP.sent == []
+
+    FakeSMTP.failures = 1
+    time.sleep(0.25)
+    processor.drain()
+    assert status(repository, digest["_id"]) == PENDING
+    assert FakeSMTP.sent == []
+
+    time.sleep(0.05)
+    processor.drain()
+    assert status(repository, digest["_id"]) == DONE
+    assert [recipient for recipient, _ in FakeSMTP.sent] == ["nurse@example.com"]
+    assert "appointment A1" in FakeSMTP.sent[0][1]
+
+
+def test_claimed_digest_takes_no_more_notifications():
+    repository = InMemoryRepository()
+    digests = DigestQueue(repository, window=60)
+    digests.add("dr@example.com", "S1", "Update", "Surgery S1 moved.")
+    key = repository.find_one("outbox", {"kind": "email.digest"})["_id"]
+    repository.update_one("outbox", {"_id": key}, {"$set": {"status": IN_PROGRESS}})
+    with pytest.raises(DuplicateKeyError):
+        digests.add("dr@example.com", "S2", "Update", "Surgery S2 moved.")
+
+
+def test_calendar_handler_raises_on_failed_events(monkeypatch):
+    class FailingSync:
+        def diff(self, calendar_id, surgeries, removals=()):
+            return [("insert", "S1", {}, None)]
+
+        def apply(self, calendar_id, changes):
+            return {"inserted": 0, "patched": 0, "deleted": 0, "failed": 1}
+
+    monkeypatch.setattr(calendar_service, "CalendarSync", FailingSync)
+    surgery = {"surgery_id": "S1", "patient_id": "P1", "surgeon_id": "SG1", "room_id": "OR1", "scheduled_date": None,
+               "surgery_type": "Cardiac", "urgency_level": "High", "duration": 60, "status": "Scheduled",
+               "start_time": None, "end_time": None, "required_equipment_ids": []}
+    payload = {"surgeon": {"name": "Dr. Smith", "calendar_id": "cal-1"},
+               "original_surgery": surgery, "new_surgery": surgery}
+    with pytest.raises(RuntimeError):
+        update_surgeon_calendar(payload, "swap-1:calendar:S1")
+
+
+class FailingOutboxRepository(InMemoryRepository):
+    """Fails every write to the outbox, after the appointment itself was written."""
+    def update_one(self, collection, query, update, upsert=False):
+        if collection == "outbox":
+            raise RepositoryError("outbox unavailable")
+        return super().update_one(collection, query, update, upsert)
+
+
+def held_reservations(repository):
+    return [reservation for slot in repository.find("resource_slots") for reservation in slot["reservations"]]
+
+
+def test_failed_create_rolls_back_and_releases_reservations():
+    repository = FailingOutboxRepository()
+    service = AppointmentService(repository)
+    assert not service.create_surgery_appointment("A1", "S1", "P1", [{"staff_id": "ST1", "role": "Surgeon"}], "OR1",
+                                                  "2024-01-01T09:00:00", "2024-01-01T11:00:00")
+    assert repository.count("surgery_appointments") == 0
+    assert held_reservations(repository) == []
+
+
+def test_async_create_writes_the_appointment_and_its_entry_atomically():
+    repository = InMemoryRepository()
+    service = AsyncAppointmentService(AsyncRepositoryAdapter(repository))
+    assert asyncio.run(service.create_surgery_appointment(
+        "A1", "S1", "P1", [{"staff_id": "ST1", "role": "Surgeon"}], "OR1", "2024-01-01T09:00:00", "2024-01-01T11:00:00"))
+    assert repository.count("outbox", {"kind": "appointment.created"}) == 1
+
+    failing = FailingOutboxRepository()
+    service = AsyncAppointmentService(AsyncRepositoryAdapter(failing))
+    assert not asyncio.run(service.create_surgery_appointment(
+        "A1", "S1", "P1", [{"staff_id": "ST1", "role": "Surgeon"}], "OR1", "2024-01-01T09:00:00", "2024-01-01T11:00:00"))
+    assert failing.count("surgery_appointments") == 0
+    assert held_reservations(failing) == []
+
+
+def swap_repository(repository_class=InMemoryRepository):
+    surgery = {"patient_id": "P1", "room_id": "OR1", "scheduled_date": None, "surgery_type": "Cardiac",
+               "urgency_level": "High", "duration": 60, "status": "Scheduled", "start_time": None, "end_time": None,
+               "required_equipment_ids": []}
+    return repository_class({
+        "surgeries": [dict(surgery, surgery_id="S1", surgeon_id="SG1"), dict(surgery, surgery_id="S2", surgeon_id="SG2")],
+        "surgeons": [{"surgeon_id": "SG1", "name": "Dr. Grey", "contact_info": {"email": "grey@example.com"}},
+                     {"surgeon_id": "SG2", "name": "Dr. Shepherd", "contact_info": {"email": "shepherd@example.com"}}],
+    })
+
+
+def surgeon_of(repository, surgery_id):
+    return repository.find_one("surgeries", {"surgery_id": surgery_id})["surgeon_id"]
+
+
+def test_surgeon_swap_commits_surgeons_and_entries_together():
+    repository = swap_repository()
+    assert TabuSearchScheduler(repository).update_related_schedules("S1", "S2")
+    assert (surgeon_of(repository, "S1"), surgeon_of(repository, "S2")) == ("SG2", "SG1")
+    entries = repository.find("outbox")
+    assert sorted(entry["kind"] for entry in entries) == ["calendar.update_surgeon", "calendar.update_surgeon",
+                                                          "notify.staff_and_patients",
+                                                          "notify.surgeon_swap", "notify.surgeon_swap"]
+    notify = [entry["payload"] for entry in entries if entry["kind"] == "notify.surgeon_swap"]
+    grey = next(payload for payload in notify if payload["surgeon"]["name"] == "Dr. Grey")
+    assert (grey["original_surgery"]["surgery_id"], grey["new_surgery"]["surgery_id"]) == ("S1", "S2")
+    assert grey["new_surgery"]["surgeon_id"] == "SG1"
+
+
+def test_surgeon_swap_rolls_back_when_the_outbox_write_fails():
+    repository = swap_repository(FailingOutboxRepository)
+    assert not TabuSearchScheduler(repository).update_related_schedules("S1", "S2")
+    assert (surgeon_of(repository, "S1"), surgeon_of(repository, "S2")) == ("SG1", "SG2")
+    assert repository.count("outbox") == 0
+
+
+def test_surgeon_swap_rolls_back_when_a_surgery_was_reassigned_meanwhile():
+    class ReassignedRepository(InMemoryRepository):
+        """S2 gets another surgeon between the swap's read and its write."""
+        def transaction(self):
+            super().update_one("surgeries", {"surgery_id": "S2"}, {"$set": {"surgeon_id": "SG3"}})
+            return super().transaction()
+
+    repository = swap_repository(ReassignedRepository)
+    assert not TabuSearchScheduler(repository).update_related_schedules("S1", "S2")
+    assert (surgeon_of(repository, "S1"), surgeon_of(repository, "S2")) == ("SG1", "SG3")
+    assert repository.count("outbox") == 0
@@ -0,0 +1,65 @@
+import json
+import pytest
+from benchmarks.run_benchmarks import make_repository
+from benchmarks.synthetic_hospital import generate_hospital
+from schedule_state import ScheduleState
+from scheduling_optimizer import TabuSearchScheduler
+from utils.profiling import LATENCY_BUCKETS, Histogram, Profiler
+
+
+def run(profiler=None, iterations=30):
+    hospital = generate_hospital(50, seed=0)
+    repository = make_repository(hospital, "memory")
+    state = ScheduleState.from_repository(repository, horizon_start=hospital["horizon_start"],
+                                          horizon_days=hospital["horizon_days"])
+    scheduler = TabuSearchScheduler(repository, profiler=profiler)
+    scheduler.run(state, max_iterations=iterations, seed=0)
+    return scheduler, state
+
+
+def test_histogram_buckets_and_extremes():
+    histogram = Histogram()
+    for seconds in (2e-6, 2e-6, 0.2, 10.0):
+        histogram.observe(seconds)
+    report = histogram.to_dict()
+    assert report["count"] == 4 and report["min"] == 2e-6 and report["max"] == 10.0
+    assert report["buckets"]["5e-06"] == 2 and report["buckets"]["0.5"] == 1 and report["buckets"]["+Inf"] == 1
+    assert sum(report["buckets"].values()) == 4 and len(report["buckets"]) == len(LATENCY_BUCKETS) + 1
+
+
+def test_profiled_run_reports_phases_without_changing_the_result():
+    plain, plain_state = run()
+    profiled, state = run(Profiler())
+    assert "profile" not in plain.stats
+    assert state.score == plain_state.score and profiled.stats["iterations"] == plain.stats["iterations"]
+
+    report = profiled.stats["profile"]
+    for phase in ("construction", "neighbors", "scoring", "feasibility.window", "feasibility.surgeon"):
+        assert report["timers"][phase]["count"] > 0
+    assert report["counters"]["moves.applied"] + report["counters"].get("moves.none_admissible", 0) == 30
+    # The hooks only shadow the class methods for the duration of the run
+    assert not {"can_place", "placement_delta", "candidate_starts"} & set(state.__dict__)
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler(enabled=False)
+    with profiler.timer("phase"):
+        profiler.count("event")
+    assert profiler.report() == {"timers": {}, "counters": {}, "capture": None}
+
+
+def test_cprofile_capture_and_dump(tmp_path):
+    profiler = Profiler(capture="cprofile", json_path=str(tmp_path / "profile.json"),
+                        prometheus_path=str(tmp_path / "profile.prom"))
+    scheduler, _ = run(profiler, iterations=5)
+    assert "build_initial_schedule" in scheduler.stats["profile"]["capture"]
+    assert json.loads((tmp_path / "profile.json").read_text())["counters"] == scheduler.stats["profile"]["counters"]
+    exposition = (tmp_path / "profile.prom").read_text()
+    assert "# TYPE scheduler_phase_seconds histogram" in exposition
+    assert 'scheduler_phase_seconds_bucket{phase="construction",le="+Inf"} 1' in exposition
+    assert 'scheduler_events_total{event="moves.applied"}' in exposition
+
+
+def test_unknown_capture_mode_is_rejected():
+    with pytest.raises(ValueError):
+        Profiler(capture="perf")
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("pymongo")
+from utils.query_monitor import QueryMonitor, documents_returned  # noqa: E402
+
+_request_ids = iter(range(1, 1_000_000))
+
+
+def round_trip(monitor, command_name, collection, reply=None, duration_micros=1000, failed=False):
+    event = SimpleNamespace(command_name=command_name, command={command_name: collection},
+                            connection_id=("localhost", 27017), request_id=next(_request_ids),
+                            duration_micros=duration_micros, reply=reply or {})
+    monitor.started(event)
+    if failed:
+        monitor.failed(event)
+    else:
+        monitor.succeeded(event)
+
+
+def find_one(monitor, collection="equipment"):
+    round_trip(monitor, "find", collection, {"cursor": {"firstBatch": [{"_id": 1}]}})
+
+
+def test_documents_returned_by_reply_kind():
+    assert documents_returned("find", {"cursor": {"firstBatch": [{}, {}]}}) == 2
+    assert documents_returned("getMore", {"cursor": {"nextBatch": [{}]}}) == 1
+    assert documents_returned("count", {"n": 40}) == 1
+    assert documents_returned("insert", {"n": 3}) == 0
+
+
+def test_round_trips_are_aggregated_per_command_and_call_site():
+    monitor = QueryMonitor()
+    for _ in range(3):
+        find_one(monitor)
+    round_trip(monitor, "insert", "equipment", duration_micros=4000, failed=True)
+    report = monitor.report()
+    assert report["round_trips"] == 4 and report["total_ms"] == pytest.approx(7.0)
+    insert, find = report["top_queries"]
+    assert (insert["command"], insert["failures"], insert["documents"]) == ("insert", 1, 0)
+    assert (find["calls"], find["documents"], find["mean_ms"]) == (3, 3, 1.0)
+    assert find["call_site"].startswith("tests/test_query_monitor.py:") and find["call_site"].endswith("(round_trip)")
+
+
+def test_many_small_reads_from_one_site_are_flagged_as_n_plus_one():
+    monitor = QueryMonitor(n_plus_one_threshold=5)
+    for _ in range(5):
+        find_one(monitor)
+    for _ in range(5):
+        round_trip(monitor, "update", "equipment")
+    round_trip(monitor, "find", "surgeries", {"cursor": {"firstBatch": [{}] * 50}})
+    suspects = monitor.report()["n_plus_one"]
+    assert [(query["command"], query["collection"], query["calls"]) for query in suspects] == \
+        [("find", "equipment", 5)]
+    assert "N+1 suspect: 5 x find equipment" in monitor.format_report()
+
+
+def test_reset_drops_stats_and_commands_in_flight():
+    monitor = QueryMonitor()
+    find_one(monitor)
+    event = SimpleNamespace(command_name="find", command={"find": "rooms"}, connection_id=1, request_id=0,
+                            duration_micros=10, reply={})
+    monitor.started(event)
+    monitor.reset()
+    monitor.succeeded(event)
+    assert monitor.report()["round_trips"] == 0
@@ -0,0 +1,65 @@
+import pytest
+from benchmarks.synthetic_hospital import generate_hospital
+from repositories.memory_repository import InMemoryRepository
+from rolling_horizon import RollingHorizonScheduler, release_day
+from schedule_state import ScheduleState
+
+COLLECTIONS = ("operating_rooms", "surgeons", "equipment", "surgeries")
+
+
+@pytest.fixture(scope="module")
+def hospital():
+    return generate_hospital(150, seed=0)
+
+
+def load(hospital):
+    repository = InMemoryRepository({name: hospital[name] for name in COLLECTIONS})
+    return repository, ScheduleState.from_repository(repository, horizon_start=hospital["horizon_start"],
+                                                     horizon_days=hospital["horizon_days"])
+
+
+def assert_feasible(state):
+    """Every placement could be made again with all the others in place."""
+    for i in range(len(state.surgeries)):
+        if state.room_of[i] is None:
+            continue
+        placement = state.unassign(i)
+        assert state.can_place(i, *placement), state.surgery_ids[i]
+        state.place(i, *placement)
+
+
+def test_step_must_fit_in_the_window():
+    with pytest.raises(ValueError):
+        RollingHorizonScheduler(InMemoryRepository(), window_days=3, step_days=5)
+
+
+def test_release_day_is_the_current_or_scheduled_day_within_the_horizon(hospital):
+    _, state = load(hospital)
+    i = next(i for i in range(len(state.surgeries)) if state.room_of[i] is None)
+    assert release_day(state, i) == min(max(state.day_of(state.scheduled_minutes[i]), 0), state.horizon_days - 1)
+    start = state.candidate_starts(i, state.eligible_rooms[i][0], 2)[0]
+    state.place(i, state.eligible_rooms[i][0], start)
+    assert release_day(state, i) == 2
+
+
+def test_sequential_windows_overlap_and_step_through_the_horizon(hospital):
+    repository, state = load(hospital)
+    scheduler = RollingHorizonScheduler(repository, window_days=4, step_days=3, iterations_per_window=40)
+    scheduler.run(state, seed=0)
+    windows = [window["days"] for window in scheduler.stats["windows"]]
+    assert all(stop - start <= 4 for start, stop in windows)
+    assert [start for start, _ in windows] == sorted(start for start, _ in windows)
+    assert windows[:2] == [(0, 4), (3, 7)] and all(start % 3 == 0 for start, _ in windows)
+    assert scheduler.stats["unscheduled"] == state.unscheduled < len(state.surgeries) // 10
+    assert scheduler.stats["best_score"] == state.score
+    assert_feasible(state)
+
+
+def test_parallel_blocks_give_a_feasible_schedule(hospital):
+    repository, state = load(hospital)
+    scheduler = RollingHorizonScheduler(repository, step_days=5, iterations_per_window=40, processes=2)
+    scheduler.run(state, seed=0)
+    blocks = [window["days"] for window in scheduler.stats["windows"]]
+    assert all(stop - start <= 5 for start, stop in blocks[:-1])
+    assert scheduler.stats["unscheduled"] == state.unscheduled < len(state.surgeries) // 10
+    assert_feasible(state)
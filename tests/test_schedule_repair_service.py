@@ -0,0 +1,87 @@
+from datetime import timedelta
+import pytest
+from benchmarks.synthetic_hospital import generate_hospital
+from repositories.memory_repository import InMemoryRepository
+from schedule_state import ScheduleState
+from scheduling_optimizer import TabuSearchScheduler
+from services.schedule_repair_service import ScheduleRepairService
+from services.what_if_service import AddSurgeries, CloseRoom
+
+COLLECTIONS = ("surgeries", "operating_rooms", "surgeons", "equipment", "patients")
+
+
+@pytest.fixture(scope="module")
+def hospital():
+    return generate_hospital(120, seed=3)
+
+
+@pytest.fixture
+def repository(hospital):
+    """The hospital with an optimized schedule committed to its surgeries."""
+    repository = InMemoryRepository({name: hospital[name] for name in COLLECTIONS})
+    state = ScheduleState.from_repository(repository, horizon_start=hospital["horizon_start"],
+                                          horizon_days=hospital["horizon_days"])
+    TabuSearchScheduler(repository).run(state, max_iterations=100, seed=0)
+    ScheduleRepairService(repository).commit([
+        {"surgery_id": state.surgery_ids[i],
+         "to": ScheduleRepairService._booking(state.room_of[i], state.start_of[i], state.durations[i])}
+        for i in range(len(state.surgeries)) if state.room_of[i] is not None
+    ])
+    return repository
+
+
+def bookings(repository):
+    return {surgery["surgery_id"]: (surgery["room_id"], surgery["start_time"])
+            for surgery in repository.find("surgeries") if surgery.get("room_id")}
+
+
+def repair(repository, hospital, disruptions, days_ahead=3, **options):
+    now = hospital["horizon_start"] + timedelta(days=days_ahead)
+    return now, ScheduleRepairService(repository).repair(
+        disruptions, now=now, horizon_days=hospital["horizon_days"] - days_ahead, seed=0, **options)
+
+
+def test_nothing_moves_without_a_disruption(repository, hospital):
+    _, result = repair(repository, hospital, [])
+    assert (result["changes"], result["movable"], result["days"]) == ([], 0, range(0))
+
+
+def test_closed_room_moves_only_its_bookings_and_their_neighbours(repository, hospital):
+    before = bookings(repository)
+    now = hospital["horizon_start"] + timedelta(days=3)
+    closed = CloseRoom("OR002", now, now + timedelta(days=1))
+    displaced = {surgery_id for surgery_id, (room_id, start) in before.items()
+                 if room_id == "OR002" and closed.start_time <= start < closed.end_time}
+    assert displaced
+
+    _, result = repair(repository, hospital, [closed], commit=True)
+    changed = {change["surgery_id"]: change for change in result["changes"]}
+    assert displaced <= set(changed)
+    assert result["movable"] < len(before)
+    for change in changed.values():
+        assert change["from"]["start_time"] >= now  # Nothing that already happened is touched
+        if change["to"] is not None:
+            assert not (change["to"]["room_id"] == "OR002" and change["to"]["start_time"] < closed.end_time)
+    after = bookings(repository)
+    for surgery_id, booking in before.items():
+        if surgery_id not in changed:
+            assert after[surgery_id] == booking
+        elif changed[surgery_id]["to"] is not None:
+            assert after[surgery_id] == (changed[surgery_id]["to"]["room_id"], changed[surgery_id]["to"]["start_time"])
+
+
+def test_without_commit_the_schedule_is_not_written(repository, hospital):
+    before = bookings(repository)
+    now = hospital["horizon_start"] + timedelta(days=3)
+    _, result = repair(repository, hospital, [CloseRoom("OR002", now, now + timedelta(days=1))])
+    assert result["changes"] and bookings(repository) == before
+
+
+def test_emergency_surgery_is_fitted_in(repository, hospital):
+    emergency = dict(hospital["surgeries"][0], surgery_id="SUR-EMERGENCY", urgency_level="High",
+                     room_id=None, start_time=None, end_time=None)
+    emergency.pop("_id", None)
+    now, result = repair(repository, hospital, [AddSurgeries([emergency])], commit=True)
+    change = next(change for change in result["changes"] if change["surgery_id"] == "SUR-EMERGENCY")
+    assert change["from"] is None and change["to"]["start_time"] >= now
+    assert "SUR-EMERGENCY" in bookings(repository) and "SUR-EMERGENCY" not in result["unplaced"]
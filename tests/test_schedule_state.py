@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from models import SurgeryRecord, SurgeryTable
+from repositories.memory_repository import InMemoryRepository
+from schedule_state import ScheduleState
+from utils.bulk_decoder import BulkDecoder
+
+ROOMS = [{"room_id": "OR1"}, {"room_id": "OR2", "surgery_types": ["Orthopedic"]}]
+
+
+def surgery_document(surgery_id, surgeon_id, surgery_type="Cardiac", room_id=None, start=None, duration=60,
+                     equipment=()):
+    return {"surgery_id": surgery_id, "patient_id": "P-" + surgery_id, "surgeon_id": surgeon_id, "room_id": room_id,
+            "scheduled_date": datetime(2024, 1, 1), "surgery_type": surgery_type, "urgency_level": "High",
+            "duration": duration, "status": "Scheduled", "start_time": start,
+            "end_time": start + timedelta(minutes=duration) if start else None,
+            "required_equipment_ids": list(equipment)}
+
+
+DOCUMENTS = [
+    surgery_document("S1", "SG1", room_id="OR1", start=datetime(2024, 1, 1, 9), equipment=["E1"]),
+    surgery_document("S2", "SG2", surgery_type="Orthopedic", duration=90),
+    surgery_document("S3", None, duration=30, equipment=["E1", "E2"]),
+]
+
+
+def test_fill_surgery_table_decodes_fetched_documents():
+    table = BulkDecoder.fill_surgery_table(DOCUMENTS)
+    assert list(table.surgery_ids) == ["S1", "S2", "S3"]
+    assert table.column("surgeon_id") == ["SG1", "SG2", None]
+    assert table.equipment_ids(2) == ("E1", "E2")
+    assert [record.to_document() for record in table] == \
+        [SurgeryRecord.from_document(document).to_document() for document in DOCUMENTS]
+
+
+def test_repository_surgery_table_applies_the_query():
+    repository = InMemoryRepository({"surgeries": DOCUMENTS})
+    table = repository.surgery_table({"surgery_type": "Cardiac"})
+    assert isinstance(table, SurgeryTable)
+    assert list(table.surgery_ids) == ["S1", "S3"]
+
+
+def test_state_from_table_matches_state_from_documents():
+    from_table = ScheduleState.from_documents(SurgeryTable.from_documents(DOCUMENTS), ROOMS)
+    from_documents = ScheduleState.from_documents(DOCUMENTS, ROOMS)
+    for state in (from_table, from_documents):
+        assert state.surgery_ids == ["S1", "S2", "S3"]
+        assert state.surgeon_ids == ["SG1", "SG2", None]
+        assert state.eligible_rooms == [("OR1",), ("OR1", "OR2"), ("OR1",)]
+        assert state.room_of[0] == "OR1"  # keep_current placed the surgery that already had a room
+    assert from_table.resources == from_documents.resources
+    assert from_table.score == from_documents.score
+
+
+def test_state_keeps_the_table_and_materialises_rows_on_demand():
+    table = SurgeryTable.from_documents(DOCUMENTS)
+    state = ScheduleState.from_documents(table, ROOMS)
+    assert state.surgeries is table
+    assert state.surgeries[1].duration == 90
+
+
+def test_state_still_accepts_a_list_of_records():
+    records = [SurgeryRecord.from_document(document) for document in DOCUMENTS]
+    state = ScheduleState(records, ["OR1"], 0)
+    assert state.surgery_ids == ["S1", "S2", "S3"]
+    assert state.durations == [60, 90, 30]
+
+
+def at(hour, minute=0, day=1):
+    return datetime(2024, 1, day, hour, minute)
+
+
+def test_start_domains_exclude_absences_and_maintenance():
+    surgeries = [surgery_document("S1", "SG1"), surgery_document("S2", "SG2", duration=90, equipment=["E1"])]
+    surgeons = [
+        {"surgeon_id": "SG1", "availability": [{"day": "Monday", "start": "09:00", "end": "12:00"}],
+         "absences": [{"start_time": at(9, 30), "end_time": at(10, 30)}]},
+        {"surgeon_id": "SG2"},
+    ]
+    equipment = [{"equipment_id": "E1", "maintenance_windows": [{"start_time": at(10), "end_time": at(11)}]}]
+    state = ScheduleState.from_documents(surgeries, ROOMS, surgeons, equipment, horizon_start=datetime(2024, 1, 1))
+    minute = state.horizon_start
+    assert state.start_domain(0, 0) == ((minute + 10 * 60 + 30, minute + 11 * 60),)
+    assert state.start_domain(1, 0) == ((minute + 8 * 60, minute + 8 * 60 + 30), (minute + 11 * 60, minute + 16 * 60 + 30))
+    assert state.start_domain(0, 1) == ()  # SG1 only works on Mondays
+    assert state.feasible_days(0) == [0, 7] and state.feasible_days(0, range(1, 14)) == [7]
+    assert state.feasible_days(1) == [0, 1, 2, 3, 4, 7, 8, 9, 10, 11]  # The default window skips weekends
+    assert state.candidate_starts(1, "OR1", 0) == [minute + 8 * 60, minute + 11 * 60]
+    assert state.reduce_domains() == {"combinations": 2 * 2 * 14, "feasible": 2 + 10}
@@ -0,0 +1,52 @@
+import pytest
+from models import Patient
+from repositories.base import service_entry_point
+from repositories.memory_repository import InMemoryRepository
+from services import operating_room_service
+from services.operating_room_service import OperatingRoomService
+from services.patient_service import PatientService
+
+
+@pytest.fixture
+def default_repository(monkeypatch):
+    """Stands in for the default MongoDB repository of the services' class-level calls."""
+    repository = InMemoryRepository()
+    for service in (PatientService, OperatingRoomService):
+        monkeypatch.setattr(service, "_default_instance", service(repository), raising=False)
+    return repository
+
+
+def test_class_level_calls_use_the_default_instance(default_repository):
+    PatientService.create_patient(Patient("PAT001", "Alice Johnson", "1985-04-12", "555-1234", "", True))
+    assert PatientService.get_patient("PAT001").name == "Alice Johnson"
+    assert default_repository.count("patients") == 1
+
+
+def test_instance_calls_use_their_own_repository(default_repository):
+    repository = InMemoryRepository()
+    PatientService(repository).create_patient(Patient("PAT002", "Bob Stone", "1990-01-01", "555-0000", "", True))
+    assert repository.count("patients") == 1
+    assert default_repository.count("patients") == 0
+
+
+def test_module_level_create_or_update_room(default_repository):
+    assert operating_room_service.create_or_update_room({"room_id": "OR1", "location": "Building A"})
+    assert not operating_room_service.create_or_update_room({"room_id": "OR1", "location": "Building A"})
+    assert default_repository.find_one("operating_rooms", {"room_id": "OR1"})["location"] == "Building A"
+
+
+def test_default_instance_is_built_once_per_class():
+    class CountingService:
+        built = 0
+
+        def __init__(self):
+            CountingService.built += 1
+
+        @service_entry_point
+        def ping(self):
+            return self
+
+    assert CountingService.ping() is CountingService.ping()
+    assert CountingService.built == 1
+    service = CountingService()
+    assert service.ping() is service
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+import pytest
+from repositories.memory_repository import InMemoryRepository
+from solution import Solution
+
+
+class CountingRepository(InMemoryRepository):
+    """Records the collection of every find()."""
+    def __init__(self, collections=None):
+        super().__init__(collections)
+        self.finds = []
+
+    def find(self, collection, *args, **kwargs):
+        self.finds.append(collection)
+        return super().find(collection, *args, **kwargs)
+
+
+def repository():
+    start = datetime(2024, 1, 1, 8)
+    return CountingRepository({
+        "rooms": [{"room_id": "OR1"}],
+        "equipment": [{"equipment_id": "E1"}],
+        "surgeons": [{"surgeon_id": "SG1"}],
+        "surgeries": [{"surgery_id": "S1", "surgeon_id": "SG1", "room_id": "OR1", "start_time": start,
+                       "end_time": start + timedelta(hours=2)}],
+    })
+
+
+def test_creating_a_solution_touches_nothing():
+    solution = Solution()
+    assert solution._repository is None and solution._calculators == {}
+    repo = repository()
+    Solution(repo)
+    assert repo.finds == []
+
+
+def test_reference_data_is_loaded_once_on_first_access():
+    repo = repository()
+    solution = Solution(repo)
+    assert list(solution.rooms) == ["OR1"]
+    assert list(solution.equipment) == ["E1"] and solution.surgeons[0]["surgeon_id"] == "SG1"
+    assert sorted(repo.finds) == ["equipment", "rooms", "surgeons"]
+
+
+def test_calculators_are_built_on_access_and_share_the_repository():
+    repo = repository()
+    solution = Solution(repo)
+    calculator = solution.streaming_kpi_calculator
+    assert calculator is solution.streaming_kpi_calculator
+    assert calculator.repository is repo
+    assert set(solution._calculators) == {"streaming_kpi_calculator"}
+    solution.initialize_calculators()
+    assert solution.streaming_kpi_calculator is not calculator
+
+
+def test_kpi_snapshot_is_kept_until_the_period_changes():
+    repo = repository()
+    solution = Solution(repo, datetime(2024, 1, 1), datetime(2024, 1, 2))
+    assert solution.kpis["surgery_count"] == 1
+    assert solution.calculate_streaming_kpis() is solution.kpis
+    assert repo.finds == ["surgeries"]
+    solution.set_analysis_period(datetime(2024, 2, 1), datetime(2024, 2, 2))
+    assert solution.kpis["surgery_count"] == 0
+    assert repo.finds == ["surgeries", "surgeries"]
+
+
+def test_unknown_attributes_still_raise():
+    with pytest.raises(AttributeError):
+        Solution(repository()).no_such_metric
@@ -0,0 +1,55 @@
+import random
+import statistics
+from datetime import datetime, timedelta
+import pytest
+from repositories.memory_repository import InMemoryRepository
+from utils.streaming_kpi_calculator import RunningStats, StreamingKPICalculator
+
+
+def surgery(surgery_id, surgeon_id, room_id, start, hours):
+    return {"surgery_id": surgery_id, "surgeon_id": surgeon_id, "room_id": room_id,
+            "start_time": start, "end_time": start + timedelta(hours=hours)}
+
+
+def test_running_stats_match_the_two_pass_formulas():
+    rng = random.Random(1)
+    values = [1e6 + rng.uniform(0, 100) for _ in range(1000)]  # Large offset: naive sum of squares loses precision
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(statistics.mean(values))
+    assert stats.variance == pytest.approx(statistics.pvariance(values))
+
+
+def test_merged_stats_equal_the_stats_of_the_whole_stream():
+    left, right, whole = RunningStats(), RunningStats(), RunningStats()
+    for value in range(10):
+        (left if value < 3 else right).add(value)
+        whole.add(value)
+    merged = left.merge(right)
+    assert (merged.count, merged.mean) == (whole.count, pytest.approx(whole.mean))
+    assert merged.variance == pytest.approx(whole.variance)
+    assert RunningStats().merge(whole).variance == pytest.approx(whole.variance)
+
+
+def test_calculate_folds_the_period_in_one_pass():
+    day = datetime(2024, 1, 1, 8)
+    repository = InMemoryRepository({"surgeries": [
+        surgery("S1", "SG1", "OR1", day, 2),
+        surgery("S2", "SG1", "OR1", day + timedelta(hours=3), 1),  # One idle hour after S1
+        surgery("S3", "SG2", "OR2", day, 3),
+        surgery("S4", "SG2", "OR2", datetime(2024, 2, 1, 8), 1),   # Outside the period
+    ]})
+    kpis = StreamingKPICalculator(repository, batch_size=2).calculate(datetime(2024, 1, 1), datetime(2024, 1, 2))
+    assert kpis["surgery_count"] == 3
+    assert kpis["workload_balance"] == pytest.approx(statistics.pstdev([2, 1]))
+    assert kpis["surgeon_schedule_compactness"] == pytest.approx((1 / 2 + 1) / 2)
+    assert kpis["operational_cost_minimization"] == pytest.approx(6 / 3)
+    assert kpis["room_used_hours"] == {"OR1": pytest.approx(3.0), "OR2": pytest.approx(3.0)}
+
+
+def test_empty_period_has_no_averages():
+    kpis = StreamingKPICalculator(InMemoryRepository()).calculate()
+    assert kpis == {"surgery_count": 0, "workload_balance": None, "surgeon_schedule_compactness": 0,
+                    "operational_cost_minimization": None, "room_used_hours": {}}
@@ -0,0 +1,74 @@
+from datetime import timedelta
+import pytest
+from benchmarks.synthetic_hospital import generate_hospital
+from repositories.memory_repository import InMemoryRepository
+from services.what_if_service import (
+    SNAPSHOT_COLLECTIONS, AddSurgeries, CloseRoom, Scenario, SurgeonAbsence, WhatIfService, kpi_diff, run_scenario
+)
+
+
+@pytest.fixture(scope="module")
+def hospital():
+    return generate_hospital(60, seed=1)
+
+
+def repository(hospital):
+    return InMemoryRepository({name: hospital[name] for name in SNAPSHOT_COLLECTIONS if name in hospital})
+
+
+def service(hospital, processes=1):
+    return WhatIfService(repository(hospital), horizon_start=hospital["horizon_start"],
+                         horizon_days=hospital["horizon_days"], max_iterations=50, processes=processes)
+
+
+def settings(hospital):
+    return {"horizon_start": hospital["horizon_start"], "horizon_days": hospital["horizon_days"],
+            "max_iterations": 50, "time_limit": None, "seed": 0}
+
+
+def test_kpi_diff_subtracts_numbers_and_room_hours():
+    baseline = {"score": 10.0, "unscheduled": 2, "average_wait_days": None, "room_used_hours": {"OR1": 8.0}}
+    scenario = {"score": 7.5, "unscheduled": 3, "average_wait_days": 1.5, "room_used_hours": {"OR2": 2.0}}
+    assert kpi_diff(baseline, scenario) == {"score": -2.5, "unscheduled": 1, "average_wait_days": None,
+                                            "room_used_hours": {"OR1": -8.0, "OR2": 2.0}}
+
+
+def test_closed_room_takes_nothing_in_its_window_and_the_source_is_untouched(hospital):
+    source = repository(hospital)
+    start = hospital["horizon_start"]
+    closed = CloseRoom("OR001", start, start + timedelta(days=2))
+    result = run_scenario(source, Scenario("OR001 closed", [closed]), settings(hospital))
+    in_window = [surgery_id for surgery_id, placement in result["placements"].items()
+                 if placement and placement[0] == "OR001" and placement[1] < closed.end_time]
+    assert in_window == []
+    assert "closures" not in source.find_one("operating_rooms", {"room_id": "OR001"})
+    assert source.count("surgery_room_assignments") == 0
+
+
+def test_compare_reports_each_scenario_against_the_baseline(hospital):
+    start = hospital["horizon_start"]
+    surgery = dict(hospital["surgeries"][0], surgery_id="EXTRA1", room_id=None, start_time=None, end_time=None)
+    surgery.pop("_id", None)
+    report = service(hospital).compare([
+        Scenario("closed", [CloseRoom("OR001", start, start + timedelta(days=hospital["horizon_days"]))]),
+        Scenario("extra", [AddSurgeries([surgery])]),
+        Scenario("unknown surgeon", [SurgeonAbsence("SG-NONE", start, start + timedelta(days=1))]),
+    ])
+    baseline = report["baseline"]["kpis"]
+    closed = report["scenarios"]["closed"]
+    assert closed["kpis"]["room_used_hours"]["OR001"] == 0
+    assert closed["diff"]["room_used_hours"]["OR001"] == -baseline["room_used_hours"]["OR001"] < 0
+    assert closed["moved"] > 0 and closed["diff"]["score"] == closed["kpis"]["score"] - baseline["score"]
+    extra = report["scenarios"]["extra"]
+    assert extra["kpis"]["scheduled"] + extra["kpis"]["unscheduled"] == \
+        baseline["scheduled"] + baseline["unscheduled"] + 1
+    assert "SG-NONE" in report["scenarios"]["unknown surgeon"]["error"]
+
+
+def test_process_pool_gives_the_same_report(hospital):
+    start = hospital["horizon_start"]
+    scenarios = [Scenario("closed", [CloseRoom("OR002", start, start + timedelta(days=1))])]
+    serial = service(hospital).compare(scenarios)
+    pooled = service(hospital, processes=2).compare(scenarios)
+    assert pooled["baseline"]["kpis"] == serial["baseline"]["kpis"]
+    assert pooled["scenarios"]["closed"]["diff"] == serial["scenarios"]["closed"]["diff"]
@@ -0,0 +1,145 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from operator import itemgetter
+from mongodb_transaction_manager import MongoDBClient
+from models import (to_epoch_minutes, SurgeryTable, SurgeryRoomAssignmentRecord, SurgeryEquipmentUsageRecord,
+                    SurgeryStaffAssignmentRecord, SurgeryAppointmentRecord)
+from utils.lazy_import import lazy_import
+
+bson = lazy_import("bson")
+codec_options = lazy_import("bson.codec_options")
+
+
+class FieldExtractor:
+    """
+    Pulls a fixed list of fields out of a document as a tuple.
+
+    The itemgetter is built once per field list; documents missing a field (old data,
+    partial projections) fall back to per-field .get() so the result is always a tuple
+    of the same length with None for the gaps.
+    """
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        getter = itemgetter(*self.fields)
+        self._getter = getter if len(self.fields) > 1 else (lambda document: (getter(document),))
+
+    def __call__(self, document):
+        try:
+            return self._getter(document)
+        except KeyError:
+            return tuple(document.get(field) for field in self.fields)
+
+    def projection(self):
+        """Projection that returns exactly these fields and drops _id."""
+        projection = {field: 1 for field in self.fields}
+        projection["_id"] = 0
+        return projection
+
+
+SURGERY_FIELDS = FieldExtractor(("surgery_id", "patient_id", "surgeon_id", "room_id", "scheduled_date",
+                                 "surgery_type", "urgency_level", "duration", "status", "start_time", "end_time",
+                                 "required_equipment_ids"))
+ROOM_ASSIGNMENT_FIELDS = FieldExtractor(("assignment_id", "surgery_id", "room_id", "start_time", "end_time"))
+EQUIPMENT_USAGE_FIELDS = FieldExtractor(("usage_id", "surgery_id", "equipment_id", "start_time", "end_time"))
+STAFF_ASSIGNMENT_FIELDS = FieldExtractor(("assignment_id", "surgery_id", "staff_id", "role"))
+APPOINTMENT_FIELDS = FieldExtractor(("appointment_id", "surgery_id", "patient_id", "staff_assignments", "room_id",
+                                     "start_time", "end_time"))
+
+
+class BulkDecoder:
+    """
+    Decodes whole collections into compact models in batches.
+
+    Documents are fetched with find_raw_batches and a narrow projection, decoded one batch
+    at a time with bson.decode_all, and turned into records by precompiled extractors.
+    Times stored as BSON dates arrive as native datetimes and are converted to epoch minutes
+    by subtraction; only legacy string times are parsed (with fromisoformat, not strptime).
+    """
+    def __init__(self, db=None, batch_size=1000):
+        self.db = db if db is not None else MongoDBClient.get_db()
+        self.batch_size = batch_size
+
+    def iter_documents(self, collection_name, extractor, query=None, session=None):
+        """
+        Yields the projected documents of a collection, batch by batch.
+
+        Falls back to a regular batched find() for backends without raw batch support
+        (e.g. mongomock). A session puts the reads in its transaction.
+        """
+        collection = self.db[collection_name]
+        projection = extractor.projection()
+        options = {"session": session} if session is not None else {}
+        if not hasattr(collection, "find_raw_batches"):
+            yield from collection.find(query or {}, projection, batch_size=self.batch_size, **options)
+            return
+        codecs = codec_options.CodecOptions(document_class=dict, tz_aware=False)
+        for batch in collection.find_raw_batches(query or {}, projection, batch_size=self.batch_size, **options):
+            yield from bson.decode_all(batch, codecs)
+
+    def decode_surgeries(self, query=None, session=None):
+        """
+        Decodes surgeries into a SurgeryTable.
+
+        Args:
+            query (dict, optional): Filter applied to the surgeries collection.
+            session (ClientSession, optional): Transaction to read in.
+
+        Returns:
+            SurgeryTable: One row per matching surgery.
+        """
+        return self.fill_surgery_table(self.iter_documents("surgeries", SURGERY_FIELDS, query, session))
+
+    @staticmethod
+    def fill_surgery_table(documents, table=None):
+        """Appends already-fetched surgery documents to a SurgeryTable (a new one by default)."""
+        table = table if table is not None else SurgeryTable()
+        append = table.append
+        for (surgery_id, patient_id, surgeon_id, room_id, scheduled_date, surgery_type, urgency_level, duration,
+             status, start_time, end_time, equipment_ids) in map(SURGERY_FIELDS, documents):
+            append(surgery_id, patient_id, surgeon_id, room_id, to_epoch_minutes(scheduled_date), surgery_type,
+                   urgency_level, duration, status, to_epoch_minutes(start_time), to_epoch_minutes(end_time),
+                   equipment_ids or ())
+        return table
+
+    def decode_room_assignments(self, query=None):
+        """Decodes surgery_room_assignments into a list of SurgeryRoomAssignmentRecord."""
+        return [SurgeryRoomAssignmentRecord(assignment_id, surgery_id, room_id,
+                                            to_epoch_minutes(start_time), to_epoch_minutes(end_time))
+                for assignment_id, surgery_id, room_id, start_time, end_time
+                in map(ROOM_ASSIGNMENT_FIELDS,
+                       self.iter_documents("surgery_room_assignments", ROOM_ASSIGNMENT_FIELDS, query))]
+
+    def decode_equipment_usage(self, query=None):
+        """Decodes surgery_equipment_usage into a list of SurgeryEquipmentUsageRecord."""
+        return [SurgeryEquipmentUsageRecord(usage_id, surgery_id, equipment_id,
+                                            to_epoch_minutes(start_time), to_epoch_minutes(end_time))
+                for usage_id, surgery_id, equipment_id, start_time, end_time
+                in map(EQUIPMENT_USAGE_FIELDS,
+                       self.iter_documents("surgery_equipment_usage", EQUIPMENT_USAGE_FIELDS, query))]
+
+    def decode_staff_assignments(self, query=None):
+        """Decodes surgery_staff_assignments into a list of SurgeryStaffAssignmentRecord."""
+        return [SurgeryStaffAssignmentRecord(*fields)
+                for fields in map(STAFF_ASSIGNMENT_FIELDS,
+                                  self.iter_documents("surgery_staff_assignments", STAFF_ASSIGNMENT_FIELDS, query))]
+
+    def decode_appointments(self, query=None):
+        """
+        Decodes surgery_appointments into SurgeryAppointmentRecord objects.
+
+        Nested staff assignments become (staff_id, role) tuples instead of one
+        StaffAssignment object per entry.
+        """
+        return [SurgeryAppointmentRecord(appointment_id, surgery_id, patient_id,
+                                         [(sa.get("staff_id"), sa.get("role")) for sa in staff_assignments or ()],
+                                         room_id, to_epoch_minutes(start_time), to_epoch_minutes(end_time))
+                for appointment_id, surgery_id, patient_id, staff_assignments, room_id, start_time, end_time
+                in map(APPOINTMENT_FIELDS, self.iter_documents("surgery_appointments", APPOINTMENT_FIELDS, query))]
+
+
+if __name__ == "__main__":
+    decoder = BulkDecoder(batch_size=5000)
+    surgeries = decoder.decode_surgeries()
+    print(f"Decoded {len(surgeries)} surgeries into {surgeries.nbytes()} bytes of columns")
+    print(f"Decoded {len(decoder.decode_appointments())} appointments")
@@ -0,0 +1,159 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from models import to_epoch_minutes, from_epoch_minutes
+
+
+def peak_usage(intervals, low=None, high=None):
+    """
+    Largest number of [start, end) intervals in use at the same time, found with a sweep line.
+
+    Sorting the start and end events costs O(n log n). At equal times ends sort before
+    starts, so back-to-back intervals do not count as overlapping.
+
+    Args:
+        intervals (iterable): (start, end) pairs in any comparable unit (minutes, datetimes).
+        low, high (optional): Only count usage within [low, high).
+
+    Returns:
+        tuple: (peak, first time the peak is reached), or (0, None) if nothing is in use.
+    """
+    events = []
+    for start, end in intervals:
+        if low is not None and start < low:
+            start = low
+        if high is not None and end > high:
+            end = high
+        if start < end:
+            events.append((start, 1))
+            events.append((end, -1))
+    events.sort()
+    peak, at, load = 0, None, 0
+    for time, step in events:
+        load += step
+        if load > peak:
+            peak, at = load, time
+    return peak, at
+
+
+class EquipmentCapacityModel:
+    """
+    Equipment as pools of interchangeable units.
+
+    Available units of the same `type` form a pool named after it: three C-arm units make a
+    "C-arm" pool of capacity 3. An equipment document with a `quantity` above one is a pool
+    of its own id. A surgery requiring a pool (by type or pool id) needs any one of its units,
+    while a surgery requiring a unit's id still needs that very unit. A unit's maintenance
+    window takes one unit out of its pool while it lasts. Moving a unit to a room and back
+    takes the room's `equipment_transfer_minutes` (`default_transfer_minutes` if it has none)
+    before and after each use; that is conservative when a unit stays in a room for
+    consecutive surgeries.
+
+    Args:
+        equipment (iterable): Equipment documents with equipment_id, type, availability and
+            optional quantity and maintenance_windows ({start_time, end_time}).
+        operating_rooms (iterable): Room documents with optional equipment_transfer_minutes.
+        default_transfer_minutes (int): Transfer time of the rooms without their own.
+    """
+    def __init__(self, equipment=(), operating_rooms=(), default_transfer_minutes=0):
+        self.capacity = {}  # pool id -> units
+        self.members = {}  # pool id -> equipment ids of its units
+        self.unit_pool = {}  # equipment id -> pool id
+        self.unit_maintenance = {}  # equipment id -> [(start, end)] minutes
+        for item in equipment:
+            if item.get("availability") is False:
+                continue
+            equipment_id = item["equipment_id"]
+            quantity = item.get("quantity") or 1
+            pool_id = equipment_id if quantity > 1 else item.get("type")
+            self.unit_maintenance[equipment_id] = [
+                (to_epoch_minutes(window["start_time"]), to_epoch_minutes(window["end_time"]))
+                for window in item.get("maintenance_windows") or ()
+            ]
+            if pool_id is None:
+                continue
+            self.capacity[pool_id] = self.capacity.get(pool_id, 0) + quantity
+            self.members.setdefault(pool_id, []).append(equipment_id)
+            self.unit_pool[equipment_id] = pool_id
+        self.default_transfer_minutes = default_transfer_minutes
+        self.transfer = {room["room_id"]: room["equipment_transfer_minutes"] for room in operating_rooms
+                         if room.get("equipment_transfer_minutes") is not None}
+
+    @staticmethod
+    def from_repository(repository, default_transfer_minutes=0):
+        projection = {"_id": 0}
+        return EquipmentCapacityModel(repository.find("equipment", None, projection),
+                                      repository.find("operating_rooms", None, projection), default_transfer_minutes)
+
+    def pool_of(self, required_id):
+        """Pool a required equipment id refers to, or None if it names a single unit."""
+        if required_id not in self.capacity:
+            return None
+        owner = self.unit_pool.get(required_id)
+        return required_id if owner is None or owner == required_id else None
+
+    def maintenance(self, pool_id):
+        """Maintenance windows of the pool's units, one unit each."""
+        return [window for equipment_id in self.members.get(pool_id, ())
+                for window in self.unit_maintenance.get(equipment_id, ())]
+
+    def transfer_minutes(self, room_id):
+        return self.transfer.get(room_id, self.default_transfer_minutes)
+
+    def occupancy(self, room_id, start, end):
+        """Minutes [start, end) a unit is tied up by a use in room_id from start to end, transfers included."""
+        transfer = self.transfer_minutes(room_id)
+        return start - transfer, end + transfer
+
+    def violations(self, usages):
+        """
+        Checks peak concurrent usage of every pool against its capacity.
+
+        Args:
+            usages (iterable): (pool_id, room_id, start, end) uses, in epoch minutes.
+
+        Returns:
+            list: {pool_id, peak, capacity, at (datetime)} for each overloaded pool.
+        """
+        by_pool = {}
+        for pool_id, room_id, start, end in usages:
+            by_pool.setdefault(pool_id, []).append(self.occupancy(room_id, start, end))
+        violations = []
+        for pool_id, intervals in by_pool.items():
+            peak, at = peak_usage(intervals + self.maintenance(pool_id))
+            capacity = self.capacity.get(pool_id, 0)
+            if peak > capacity:
+                violations.append({"pool_id": pool_id, "peak": peak, "capacity": capacity,
+                                   "at": from_epoch_minutes(at)})
+        return violations
+
+    def available_hours(self, equipment_id, start_date, end_date, hours_per_day=8):
+        """
+        Hours a unit or pool can be used from start_date through end_date: its units times the
+        operating hours per day, minus the maintenance falling in those days.
+        """
+        if self.pool_of(equipment_id) is not None:
+            units = self.capacity[equipment_id]
+            windows = self.maintenance(equipment_id)
+        else:
+            units = 1
+            windows = self.unit_maintenance.get(equipment_id, ())
+        days = (end_date - start_date).days + 1
+        low = to_epoch_minutes(start_date)
+        high = low + days * 1440  # Through the end of end_date
+        maintenance = sum(max(0, min(end, high) - max(start, low)) for start, end in windows) / 60
+        return max(0.0, units * days * hours_per_day - maintenance)
+
+
+if __name__ == "__main__":
+    from datetime import datetime
+    model = EquipmentCapacityModel(
+        [{"equipment_id": f"CARM{n}", "type": "C-arm", "availability": True,
+          "maintenance_windows": [{"start_time": datetime(2024, 1, 1, 8), "end_time": datetime(2024, 1, 1, 10)}]
+          if n == 1 else []} for n in range(1, 4)],
+        [{"room_id": "OR001", "equipment_transfer_minutes": 10}], default_transfer_minutes=5)
+    nine = to_epoch_minutes(datetime(2024, 1, 1, 9))
+    usages = [("C-arm", "OR001", nine, nine + 60), ("C-arm", "OR002", nine, nine + 90),
+              ("C-arm", "OR003", nine + 30, nine + 120)]
+    print(model.capacity, model.violations(usages))
+    print(model.available_hours("C-arm", datetime(2024, 1, 1), datetime(2024, 1, 7)))
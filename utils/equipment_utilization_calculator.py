@@ -2,14 +2,30 @@ from datetime import datetime
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from mongodb_transaction_manager import MongoDBClient
+from repositories.mongo_repository import MongoRepository
+from utils.equipment_capacity import EquipmentCapacityModel
 class EquipmentUtilizationCalculator:
-    def __init__(self):
-        self.db = MongoDBClient.get_db()
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else MongoRepository(role="analytics")
 
     def calculate_equipment_utilization_efficiency(self, start_date, end_date):
-        equipment_availability = self._calculate_equipment_availability(start_date, end_date)
-        equipment_used_hours = self._calculate_equipment_used_hours(start_date, end_date)
+        """
+        Used hours of every equipment unit and pool as a percentage of the hours it can be used.
+
+        A pool's available hours are its units' operating hours minus their maintenance, and its
+        used hours count the surgeries requiring the pool as well as those requiring one of its
+        units (see utils.equipment_capacity.EquipmentCapacityModel).
+
+        Args:
+            start_date (datetime): First day of the period.
+            end_date (datetime): Last day of the period.
+
+        Returns:
+            dict: {equipment or pool id: utilization percentage}
+        """
+        capacity_model = EquipmentCapacityModel.from_repository(self.repository)
+        equipment_availability = self._calculate_equipment_availability(start_date, end_date, capacity_model)
+        equipment_used_hours = self._calculate_equipment_used_hours(start_date, end_date, capacity_model)
 
         equipment_utilization_efficiency = {}
         for equipment_id, available_hours in equipment_availability.items():
@@ -19,38 +35,34 @@ class EquipmentUtilizationCalculator:
 
         return equipment_utilization_efficiency
 
-    def _calculate_equipment_availability(self, start_date, end_date):
-        total_days = (end_date - start_date).days + 1
+    def _calculate_equipment_availability(self, start_date, end_date, capacity_model=None):
         available_hours_per_day = 8
+        if capacity_model is None:
+            capacity_model = EquipmentCapacityModel.from_repository(self.repository)
 
         equipment_availability = {}
-        equipment_docs = self.db.equipment.find({})
+        equipment_docs = self.repository.find("equipment")
         for equipment in equipment_docs:
             equipment_id = equipment.get('equipment_id')
-            equipment_availability[equipment_id] = available_hours_per_day * total_days
+            if equipment.get('availability') is False:
+                equipment_availability[equipment_id] = 0  # Out of service
+                continue
+            equipment_availability[equipment_id] = capacity_model.available_hours(
+                equipment_id, start_date, end_date, available_hours_per_day)
+        for pool_id in capacity_model.capacity:
+            if pool_id not in equipment_availability:  # A pool of all the units of a type
+                equipment_availability[pool_id] = capacity_model.available_hours(
+                    pool_id, start_date, end_date, available_hours_per_day)
 
         return equipment_availability
 
-    def _calculate_equipment_used_hours(self, start_date, end_date):
-        pipeline = [
-            {"$match": {
-                "start_time": {"$gte": start_date},
-                "end_time": {"$lte": end_date}
-            }},
-            {"$unwind": "$required_equipment_ids"},
-            {"$group": {
-                "_id": "$required_equipment_ids",
-                "total_used_hours": {"$sum": {
-                    "$divide": [{"$subtract": ["$end_time", "$start_time"]}, 3600000]  # Convert milliseconds to hours
-                }}
-            }}
-        ]
-        equipment_used_hours = {}
-        for doc in self.db.surgeries.aggregate(pipeline):
-            equipment_id = doc['_id']
-            total_used_hours = doc['total_used_hours']
-            equipment_used_hours[equipment_id] = total_used_hours
-
+    def _calculate_equipment_used_hours(self, start_date, end_date, capacity_model=None):
+        equipment_used_hours = dict(self.repository.equipment_usage_hours(start_date, end_date))
+        if capacity_model is not None:
+            for pool_id, members in capacity_model.members.items():
+                if pool_id not in members:  # A type's pool is also busy while one of its units is
+                    equipment_used_hours[pool_id] = equipment_used_hours.get(pool_id, 0) + \
+                        sum(equipment_used_hours.get(equipment_id, 0) for equipment_id in members)
         return equipment_used_hours
 
 # Example of how to use EquipmentUtilizationCalculator within your application
@@ -1,31 +1,36 @@
 import sys
 import os
 
-# Ensure the MongoDBClient can be found by adjusting the path.
+# Ensure the repositories package can be found by adjusting the path.
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from mongodb_transaction_manager import MongoDBClient
+from repositories.mongo_repository import MongoRepository
+from utils.equipment_capacity import EquipmentCapacityModel
 
 class EquipmentUtilizationEfficiencyCalculator:
-    def __init__(self):
-        self.db = MongoDBClient.get_db()
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else MongoRepository(role="analytics")
 
     def calculate(self, start_date, end_date):
         # Initialize a dictionary to hold the total available hours for each equipment
         equipment_availability = {}
-        # Assume 8 hours per day of availability for simplicity
+        # 8 operating hours per day for each unit, minus maintenance
         available_hours_per_day = 8
 
         # Calculate total available hours for each equipment over the given period
-        equipments = list(self.db.equipment.find({}))
+        equipments = list(self.repository.find("equipment"))
+        capacity_model = EquipmentCapacityModel(equipments, self.repository.find("operating_rooms"))
         for equipment in equipments:
             equipment_id = equipment['_id']
-            # Calculate the number of days in the period
-            total_days = (end_date - start_date).days + 1
-            equipment_availability[equipment_id] = total_days * available_hours_per_day
+            if equipment.get('availability') is False:
+                equipment_availability[equipment_id] = 0  # Out of service
+                continue
+            # A document with a quantity counts all of its units
+            equipment_availability[equipment_id] = capacity_model.available_hours(
+                equipment.get('equipment_id'), start_date, end_date, available_hours_per_day)
 
         # Initialize a dictionary to hold the total used hours for each equipment
         equipment_used_hours = {}
-        surgeries = list(self.db.surgeries.find({
+        surgeries = list(self.repository.find("surgeries", {
             "date": {"$gte": start_date, "$lte": end_date},
             "equipment_used": {"$exists": True}
         }))
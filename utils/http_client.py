@@ -0,0 +1,330 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+import atexit
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from utils.lazy_import import lazy_import, optional_exceptions
+
+# Both are imported on first use; httpx is only needed by AsyncHttpClient
+requests = lazy_import("requests")
+httpx = lazy_import("httpx")
+# Caught while a call fails, possibly on an injected session without the library installed
+request_errors = optional_exceptions("requests.exceptions")
+httpx_errors = optional_exceptions("httpx")
+
+logger = logging.getLogger(__name__)
+
+# Rate limits and transient server errors; anything else is returned or raised at once
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit breaker is open."""
+    def __init__(self, host, retry_in):
+        super().__init__(f"Circuit for {host} is open; not calling it for another {retry_in:.0f}s.")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a host after repeated failures so a dead integration fails fast.
+
+    After `failure_threshold` consecutive failures the circuit opens and every call is refused
+    for `reset_timeout` seconds. Then a single trial call is let through (half-open): success
+    closes the circuit, failure opens it for another `reset_timeout`.
+
+    Args:
+        host (str): Host the breaker guards, used in messages.
+        failure_threshold (int): Consecutive failures that open the circuit.
+        reset_timeout (float): Seconds the circuit stays open.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, host, failure_threshold=5, reset_timeout=30.0):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raises CircuitOpenError if the call must not be made."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            retry_in = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and retry_in <= 0:
+                self.state = self.HALF_OPEN  # This caller makes the trial call
+                return
+            raise CircuitOpenError(self.host, max(0.0, retry_in))
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Opening circuit for {self.host} after {self.failures} failures.")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+def full_jitter(attempt, backoff, max_backoff):
+    """Delay before retry number `attempt` (1-based): uniform between 0 and the capped exponential delay."""
+    return random.uniform(0, min(max_backoff, backoff * 2 ** (attempt - 1)))
+
+
+def retry_after(response):
+    """Seconds asked for by a Retry-After header (delta or HTTP date), else None."""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _RetryPolicy:
+    """Retry, backoff and circuit breaker settings shared by the sync and async clients."""
+    def __init__(self, max_attempts, backoff, max_backoff, retry_statuses, failure_threshold, reset_timeout):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+
+    def breaker(self, url):
+        host = urlsplit(url).netloc
+        with self._breakers_lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(host, self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def delay(self, attempt, backoff, response=None):
+        """Delay before the next attempt; a server's Retry-After wins over the jittered backoff."""
+        asked = retry_after(response)
+        if asked is not None:
+            return min(asked, self.max_backoff)
+        return full_jitter(attempt, backoff, self.max_backoff)
+
+
+class HttpClient:
+    """
+    Pooled HTTP client for outbound integrations, with retries and per-host circuit breakers.
+
+    One requests.Session is shared by every call, so connections (and their TLS sessions) are
+    kept alive and reused instead of opened per request; `pool_maxsize` bounds the open
+    connections per host. Connection errors, timeouts and RETRY_STATUSES responses are retried
+    with full-jitter exponential backoff, honouring Retry-After. Other 4xx/5xx responses raise
+    requests.HTTPError without a retry. Retries resend the request as is, so non-idempotent
+    calls should carry an idempotency key the receiving API understands.
+
+    Args:
+        pool_connections (int): Number of hosts to keep connection pools for.
+        pool_maxsize (int): Connections kept open per host; set to the number of calling threads.
+        timeout (float or tuple): Default (connect, read) timeout of a call.
+        max_attempts (int): Tries per call, the first one included.
+        backoff (float): Upper bound of the first retry delay; doubles on each further retry.
+        max_backoff (float): Upper bound of any retry delay.
+        retry_statuses (iterable): Response statuses that are retried.
+        failure_threshold (int): Consecutive failures of a host that open its circuit.
+        reset_timeout (float): Seconds an open circuit refuses calls.
+        session (requests.Session, optional): Session to use instead of a new pooled one.
+    """
+    def __init__(self, pool_connections=10, pool_maxsize=10, timeout=10.0, max_attempts=4, backoff=0.5,
+                 max_backoff=30.0, retry_statuses=RETRY_STATUSES, failure_threshold=5, reset_timeout=30.0,
+                 session=None):
+        self.timeout = timeout
+        self.policy = _RetryPolicy(max_attempts, backoff, max_backoff, retry_statuses, failure_threshold,
+                                   reset_timeout)
+        if session is None:
+            session = requests.Session()
+            # Retries are ours; the adapter only pools connections
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                                    max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    def request(self, method, url, max_attempts=None, backoff=None, **kwargs):
+        """
+        Sends a request, retrying transient failures.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Absolute URL.
+            max_attempts (int, optional): Overrides the client's max_attempts for this call.
+            backoff (float, optional): Overrides the client's backoff for this call.
+            **kwargs: Passed to requests.Session.request (headers, json, params, timeout, ...).
+
+        Returns:
+            requests.Response: The successful response.
+
+        Raises:
+            requests.HTTPError: For an error response, after the retries for retryable ones.
+            requests.RequestException: If the last attempt could not connect or timed out.
+            CircuitOpenError: If the host's circuit is open.
+        """
+        max_attempts = max_attempts or self.policy.max_attempts
+        backoff = self.policy.backoff if backoff is None else backoff
+        kwargs.setdefault("timeout", self.timeout)
+        breaker = self.policy.breaker(url)
+        for attempt in range(1, max_attempts + 1):
+            breaker.before_call()
+            response = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except request_errors.RequestException as e:
+                breaker.record_failure()
+                if attempt == max_attempts:
+                    logger.error(f"{method} {url} failed after {attempt} attempts: {e}")
+                    raise
+                failure = e
+            else:
+                if response.status_code not in self.policy.retry_statuses:
+                    breaker.record_success()  # Other 4xx are the caller's fault, not the host's
+                    response.raise_for_status()
+                    return response
+                breaker.record_failure()
+                if attempt == max_attempts:
+                    logger.error(f"{method} {url} failed after {attempt} attempts: HTTP {response.status_code}")
+                    response.raise_for_status()
+                failure = f"HTTP {response.status_code}"
+            delay = self.policy.delay(attempt, backoff, response)
+            logger.warning(f"{method} {url} failed ({failure}); attempt {attempt} of {max_attempts}, "
+                           f"retrying in {delay:.2f}s.")
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHttpClient:
+    """
+    Coroutine version of HttpClient on httpx, for many concurrent outbound calls from one event loop.
+
+    Same retry, backoff and circuit breaker rules as HttpClient. Connections are pooled by one
+    httpx.AsyncClient, limited to `max_connections` in total; calls beyond that wait for a free
+    connection. Failed calls raise httpx.HTTPStatusError or httpx.TransportError. Use it as an
+    async context manager, or call aclose().
+
+    Args:
+        max_connections (int): Open connections across all hosts.
+        max_keepalive_connections (int): Idle connections kept for reuse.
+        timeout (float): Default timeout of a call.
+        max_attempts, backoff, max_backoff, retry_statuses, failure_threshold, reset_timeout:
+            As in HttpClient.
+        client (httpx.AsyncClient, optional): Client to use instead of a new pooled one.
+    """
+    def __init__(self, max_connections=100, max_keepalive_connections=20, timeout=10.0, max_attempts=4, backoff=0.5,
+                 max_backoff=30.0, retry_statuses=RETRY_STATUSES, failure_threshold=5, reset_timeout=30.0,
+                 client=None):
+        self.policy = _RetryPolicy(max_attempts, backoff, max_backoff, retry_statuses, failure_threshold,
+                                   reset_timeout)
+        if client is None:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_keepalive_connections),
+                timeout=timeout)
+        self.client = client
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def request(self, method, url, max_attempts=None, backoff=None, **kwargs):
+        """Sends a request, retrying transient failures; see HttpClient.request."""
+        max_attempts = max_attempts or self.policy.max_attempts
+        backoff = self.policy.backoff if backoff is None else backoff
+        breaker = self.policy.breaker(url)
+        for attempt in range(1, max_attempts + 1):
+            breaker.before_call()
+            response = None
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx_errors.TransportError as e:
+                breaker.record_failure()
+                if attempt == max_attempts:
+                    logger.error(f"{method} {url} failed after {attempt} attempts: {e}")
+                    raise
+                failure = e
+            else:
+                if response.status_code not in self.policy.retry_statuses:
+                    breaker.record_success()
+                    response.raise_for_status()
+                    return response
+                breaker.record_failure()
+                if attempt == max_attempts:
+                    logger.error(f"{method} {url} failed after {attempt} attempts: HTTP {response.status_code}")
+                    response.raise_for_status()
+                failure = f"HTTP {response.status_code}"
+            delay = self.policy.delay(attempt, backoff, response)
+            logger.warning(f"{method} {url} failed ({failure}); attempt {attempt} of {max_attempts}, "
+                           f"retrying in {delay:.2f}s.")
+            await asyncio.sleep(delay)
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Returns the process-wide HttpClient, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+            atexit.register(_client.close)
+        return _client
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    client = get_http_client()
+    print(client.get("https://httpbin.org/status/200").status_code)
+
+    async def fetch_all(urls):
+        async with AsyncHttpClient() as async_client:
+            responses = await asyncio.gather(*(async_client.get(url) for url in urls))
+            return [response.status_code for response in responses]
+
+    print(asyncio.run(fetch_all([f"https://httpbin.org/anything/{n}" for n in range(10)])))
@@ -0,0 +1,75 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+class IntervalIndex:
+    """
+    Busy [start, end) intervals of one resource, kept sorted and non-overlapping.
+
+    Because intervals never overlap, their ends are sorted too, and a conflict check only
+    needs to look at the last interval starting before the candidate's end.
+    """
+    __slots__ = ("starts", "ends", "owners")
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.owners = []
+
+    def conflicts(self, start, end):
+        pos = bisect_left(self.starts, end)
+        return pos > 0 and self.ends[pos - 1] > start
+
+    def add(self, start, end, owner):
+        pos = bisect_right(self.starts, start)
+        self.starts.insert(pos, start)
+        self.ends.insert(pos, end)
+        self.owners.insert(pos, owner)
+
+    def remove(self, start, owner):
+        pos = bisect_left(self.starts, start)
+        while self.owners[pos] != owner:
+            pos += 1
+        del self.starts[pos], self.ends[pos], self.owners[pos]
+
+    def span(self, low, high):
+        """Index range of the intervals starting in [low, high)."""
+        return bisect_left(self.starts, low), bisect_left(self.starts, high)
+
+    def covering(self, low, high):
+        """Index range of the intervals that may overlap [low, high): those starting in it and the one before."""
+        first, last = self.span(low, high)
+        return range(max(first - 1, 0), last)
+
+    def __len__(self):
+        return len(self.starts)
+
+
+class TimeIndex:
+    """
+    Documents of one resource sorted by start minute.
+
+    Intervals may overlap (nothing stops two appointments from being stored in the same
+    room), so an overlap query scans from `start - max_length`, which bounds the earliest
+    start of any interval that can still be running at `start`.
+    """
+    __slots__ = ("entries", "spans", "max_length")
+
+    def __init__(self):
+        self.entries = []
+        self.spans = {}
+        self.max_length = 0
+
+    def add(self, key, start, end):
+        insort(self.entries, (start, key))
+        self.spans[key] = (start, end)
+        self.max_length = max(self.max_length, end - start)
+
+    def remove(self, key):
+        start, _ = self.spans.pop(key)
+        del self.entries[bisect_left(self.entries, (start, key))]
+
+    def overlapping(self, start, end):
+        low = bisect_left(self.entries, (start - self.max_length, -1))
+        high = bisect_left(self.entries, (end, -1))
+        spans = self.spans
+        return [key for _, key in self.entries[low:high] if spans[key][1] > start]
@@ -0,0 +1,68 @@
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Placeholder for a module that is imported on first attribute access.
+
+    Used for heavy optional dependencies (pymongo, bson, googleapiclient, requests) so that
+    importing our own modules stays cheap; the real import cost is paid by the first call
+    that actually needs the dependency.
+    """
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+
+def lazy_import(name):
+    """Returns the module if it is already imported, otherwise a LazyModule for it."""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+class OptionalExceptions:
+    """
+    Exception classes of an optional module, for use in except clauses.
+
+    An except clause naming a LazyModule attribute imports the module while an exception is
+    being handled, and without the dependency installed that raises ModuleNotFoundError in
+    place of the original error. Here each class is resolved once, on first access, behind a
+    guarded import; if the module is missing nothing can raise its exceptions, so every name
+    resolves to a placeholder class that is never raised.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._missing = False
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        if self._module is None and not self._missing:
+            try:
+                self._module = importlib.import_module(self._name)
+            except ImportError:
+                self._missing = True
+        if self._missing:
+            cls = type(attr, (Exception,), {"__module__": f"{self._name} (not installed)"})
+        else:
+            cls = getattr(self._module, attr)
+        setattr(self, attr, cls)
+        return cls
+
+
+def optional_exceptions(name):
+    """Returns an OptionalExceptions for the module; see there."""
+    return OptionalExceptions(name)
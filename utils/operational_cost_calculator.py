@@ -1,13 +1,13 @@
 import sys
 import os
 
-# Add the parent directory to sys.path to find MongoDBClient
+# Add the parent directory to sys.path to find the repositories package
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from mongodb_transaction_manager import MongoDBClient
+from repositories.mongo_repository import MongoRepository
 
 class OperationalCostCalculator:
-    def __init__(self):
-        self.db = MongoDBClient.get_db()
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else MongoRepository(role="analytics")
 
     def calculate(self, surgeries):
         if not surgeries:
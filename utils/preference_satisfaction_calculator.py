@@ -1,15 +1,14 @@
 import sys
 import os
 
-# Adjust the path to ensure the mongodb_transaction_manager is found
+# Adjust the path to ensure the repositories package is found
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from mongodb_transaction_manager import MongoDBClient
+from repositories.mongo_repository import MongoRepository
 
 class PreferenceSatisfactionCalculator:
-    def __init__(self):
-        # Initialize MongoDB client
-        self.db = MongoDBClient.get_db()
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else MongoRepository(role="analytics")
 
     def calculate(self, surgeries):
         # Initialize counters for preferences
@@ -35,7 +34,7 @@ class PreferenceSatisfactionCalculator:
     def get_surgeon_preferences(self, surgeon_id):
         # Fetch surgeon preferences from the database
         try:
-            preferences_document = self.db.surgeon_preferences.find_one({"surgeon_id": surgeon_id})
+            preferences_document = self.repository.find_one("surgeon_preferences", {"surgeon_id": surgeon_id})
             # Return preferences if found, else return an empty dict
             return preferences_document.get('preferences', {}) if preferences_document else {}
         except Exception as e:
@@ -0,0 +1,254 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import time
+from bisect import bisect_left
+from utils.lazy_import import lazy_import
+
+pyinstrument = lazy_import("pyinstrument")
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0)
+RESOURCE_KINDS = ("surgeon", "equipment", "staff")
+
+
+class Histogram:
+    """Count, sum, extremes and bucket counts of the observed durations of one timer."""
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min,
+            "max": self.max,
+            "buckets": {str(bound): n for bound, n in zip(LATENCY_BUCKETS + ("+Inf",), self.buckets)},
+        }
+
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Profiler:
+    """
+    Timers, counters and an optional whole-run profile for a scheduling run.
+
+    Phases are timed with `with profiler.timer("phase"):` and aggregated into latency
+    histograms. A disabled profiler hands out a shared no-op timer and ignores counts, and
+    the per-neighbor hooks (feasibility checks, scoring) are only installed on the state by
+    instrument() when enabled, so the search loop pays nothing for them otherwise.
+
+    Args:
+        enabled (bool): Collect timers and counters.
+        capture (str, optional): "cprofile" or "pyinstrument" to also profile the whole run.
+        json_path (str, optional): File the report is written to by dump().
+        prometheus_path (str, optional): File the Prometheus text exposition is written to by dump().
+    """
+    def __init__(self, enabled=True, capture=None, json_path=None, prometheus_path=None):
+        if capture not in (None, "cprofile", "pyinstrument"):
+            raise ValueError(f"Unknown profiler capture: {capture}")
+        self.enabled = enabled
+        self.capture_mode = capture
+        self.json_path = json_path
+        self.prometheus_path = prometheus_path
+        self.histograms = {}
+        self.counters = {}
+        self.capture_report = None
+
+    def timer(self, name):
+        if not self.enabled:
+            return NULL_TIMER
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return _Timer(histogram)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        self.histograms = {}
+        self.counters = {}
+        self.capture_report = None
+
+    @contextlib.contextmanager
+    def instrument(self, state):
+        """
+        Times the hot ScheduleState methods for the duration of the block.
+
+        Feasibility is split into window, room and per-resource-kind checks; rejected
+        placements are counted by the constraint that rejected them.
+        """
+        if not self.enabled:
+            yield state
+            return
+        timer = self.timer
+        count = self.count
+
+        def can_place(i, room_id, start):
+            with timer("feasibility.window"):
+                feasible = state.fits_window(i, room_id, start)
+            if not feasible:
+                count("feasibility.rejected.window")
+                return False
+            with timer("feasibility.room"):
+                feasible = not state.room_conflict(i, room_id, start)
+            if not feasible:
+                count("feasibility.rejected.room")
+                return False
+            for kind in RESOURCE_KINDS:
+                with timer(f"feasibility.{kind}"):
+                    feasible = not state.resource_conflict(i, start, kind)
+                if not feasible:
+                    count(f"feasibility.rejected.{kind}")
+                    return False
+            with timer("feasibility.pool"):
+                feasible = not state.pool_conflict(i, room_id, start)
+            if not feasible:
+                count("feasibility.rejected.pool")
+                return False
+            return True
+
+        def timed(name, method):
+            def wrapper(*args):
+                with timer(name):
+                    return method(*args)
+            return wrapper
+
+        # Instance attributes shadow the class methods, so removing them restores the fast path
+        hooks = {
+            "can_place": can_place,
+            "placement_delta": timed("scoring", state.placement_delta),
+            "candidate_starts": timed("neighbors.candidates", state.candidate_starts),
+        }
+        state.__dict__.update(hooks)
+        try:
+            yield state
+        finally:
+            for name in hooks:
+                state.__dict__.pop(name, None)
+
+    @contextlib.contextmanager
+    def capture(self):
+        """Profiles the block with cProfile or pyinstrument if a capture mode was requested."""
+        if not self.capture_mode:
+            yield
+            return
+        if self.capture_mode == "cprofile":
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                output = io.StringIO()
+                pstats.Stats(profile, stream=output).sort_stats("cumulative").print_stats(30)
+                self.capture_report = output.getvalue()
+        else:
+            profile = pyinstrument.Profiler()
+            profile.start()
+            try:
+                yield
+            finally:
+                profile.stop()
+                self.capture_report = profile.output_text()
+
+    def report(self):
+        """Returns the timers (as histograms), counters and capture output as a JSON-serializable dict."""
+        return {
+            "timers": {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())},
+            "counters": dict(sorted(self.counters.items())),
+            "capture": self.capture_report,
+        }
+
+    def to_prometheus(self, prefix="scheduler"):
+        """Renders the timers and counters in the Prometheus text exposition format."""
+        lines = []
+        if self.histograms:
+            metric = f"{prefix}_phase_seconds"
+            lines.append(f"# HELP {metric} Time spent per optimizer phase.")
+            lines.append(f"# TYPE {metric} histogram")
+            for name, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS + ("+Inf",), histogram.buckets):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{phase="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{phase="{name}"}} {histogram.total}')
+                lines.append(f'{metric}_count{{phase="{name}"}} {histogram.count}')
+        if self.counters:
+            metric = f"{prefix}_events_total"
+            lines.append(f"# HELP {metric} Optimizer event counts.")
+            lines.append(f"# TYPE {metric} counter")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'{metric}{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self):
+        """Writes the JSON report and the Prometheus exposition to the configured paths, if any."""
+        if self.json_path:
+            with open(self.json_path, "w") as handle:
+                json.dump(self.report(), handle, indent=2)
+        if self.prometheus_path:
+            with open(self.prometheus_path, "w") as handle:
+                handle.write(self.to_prometheus())
+
+
+DISABLED = Profiler(enabled=False)
+
+
+if __name__ == "__main__":
+    profiler = Profiler()
+    for _ in range(1000):
+        with profiler.timer("example"):
+            sum(range(100))
+        profiler.count("example.calls")
+    print(json.dumps(profiler.report()["timers"], indent=2))
+    print(profiler.to_prometheus())
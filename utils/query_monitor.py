@@ -0,0 +1,173 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import threading
+from pymongo import monitoring
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Our own plumbing between the caller and the driver; call sites are attributed past these files
+INFRASTRUCTURE_FILES = {
+    os.path.abspath(__file__),
+    os.path.join(PROJECT_ROOT, "mongodb_transaction_manager.py"),
+    os.path.join(PROJECT_ROOT, "db_config.py"),
+    os.path.join(PROJECT_ROOT, "repositories", "mongo_repository.py"),
+}
+# Commands that return documents; the others are counted but never flagged as N+1
+READ_COMMANDS = {"find", "getMore", "aggregate", "count", "distinct"}
+
+
+def call_site():
+    """Returns "path:line (function)" of the innermost project frame outside the driver and our DB plumbing."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(PROJECT_ROOT) and filename not in INFRASTRUCTURE_FILES \
+                and os.sep + "site-packages" + os.sep not in filename:
+            return f"{os.path.relpath(filename, PROJECT_ROOT)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "<unknown>"
+
+
+def documents_returned(command_name, reply):
+    """Number of documents a successful reply carries (0 for writes and admin commands)."""
+    cursor = reply.get("cursor")
+    if cursor is not None:
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", ())))
+    if command_name in ("count", "distinct"):
+        return 1
+    return 0
+
+
+class QueryStats:
+    """Aggregates of one (command, collection, call site) triple."""
+    __slots__ = ("command", "collection", "call_site", "calls", "failures", "total_ms", "max_ms", "documents")
+
+    def __init__(self, command, collection, site):
+        self.command = command
+        self.collection = collection
+        self.call_site = site
+        self.calls = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.documents = 0
+
+    def to_dict(self):
+        return {
+            "command": self.command,
+            "collection": self.collection,
+            "call_site": self.call_site,
+            "calls": self.calls,
+            "failures": self.failures,
+            "total_ms": self.total_ms,
+            "mean_ms": self.total_ms / self.calls if self.calls else 0.0,
+            "max_ms": self.max_ms,
+            "documents": self.documents,
+        }
+
+
+class QueryMonitor(monitoring.CommandListener):
+    """
+    CommandListener that accounts every MongoDB round trip to the code that issued it.
+
+    Each command is keyed by (command name, collection, call site) and accumulates its call
+    count, latency and documents returned. A call site that issues many small reads against
+    the same collection (e.g. find_one inside a loop) is reported as a likely N+1 pattern.
+
+    Args:
+        n_plus_one_threshold (int): Minimum number of calls from one site to flag it.
+        max_documents_per_call (float): A flagged site returns at most this many documents per call on average.
+    """
+    def __init__(self, n_plus_one_threshold=10, max_documents_per_call=1.0):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.max_documents_per_call = max_documents_per_call
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.stats = {}
+
+    def reset(self):
+        """Starts a new run; commands already in flight are dropped."""
+        with self._lock:
+            self._pending = {}
+            self.stats = {}
+
+    # ------------------------------------------------------------------ listener events
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        key = (event.command_name, collection if isinstance(collection, str) else None, call_site())
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = key
+
+    def succeeded(self, event):
+        self._finish(event, documents_returned(event.command_name, event.reply), failed=False)
+
+    def failed(self, event):
+        self._finish(event, 0, failed=True)
+
+    def _finish(self, event, documents, failed):
+        duration_ms = event.duration_micros / 1000
+        with self._lock:
+            key = self._pending.pop((event.connection_id, event.request_id), None)
+            if key is None:
+                return
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = QueryStats(*key)
+            stats.calls += 1
+            stats.failures += failed
+            stats.total_ms += duration_ms
+            stats.max_ms = max(stats.max_ms, duration_ms)
+            stats.documents += documents
+
+    # ------------------------------------------------------------------ reporting
+
+    def n_plus_one_suspects(self):
+        with self._lock:
+            entries = list(self.stats.values())
+        return [stats for stats in entries
+                if stats.command in READ_COMMANDS and stats.calls >= self.n_plus_one_threshold
+                and stats.documents <= stats.calls * self.max_documents_per_call]
+
+    def report(self, top=10):
+        """
+        Summarizes the run.
+
+        Returns:
+            dict: round_trips, total_ms, top_queries (by total time) and n_plus_one
+            (suspected call sites, most calls first), all JSON-serializable.
+        """
+        with self._lock:
+            entries = list(self.stats.values())
+        by_time = sorted(entries, key=lambda stats: stats.total_ms, reverse=True)
+        suspects = sorted(self.n_plus_one_suspects(), key=lambda stats: stats.calls, reverse=True)
+        return {
+            "round_trips": sum(stats.calls for stats in entries),
+            "total_ms": sum(stats.total_ms for stats in entries),
+            "top_queries": [stats.to_dict() for stats in by_time[:top]],
+            "n_plus_one": [stats.to_dict() for stats in suspects],
+        }
+
+    def format_report(self, top=10):
+        report = self.report(top)
+        lines = [f"{report['round_trips']} round trips, {report['total_ms']:.1f} ms total",
+                 f"{'calls':>7} {'total ms':>10} {'mean ms':>8} {'docs':>7}  command / call site"]
+        for query in report["top_queries"]:
+            lines.append(f"{query['calls']:>7} {query['total_ms']:>10.1f} {query['mean_ms']:>8.2f} "
+                         f"{query['documents']:>7}  {query['command']} {query['collection']} @ {query['call_site']}")
+        for query in report["n_plus_one"]:
+            lines.append(f"N+1 suspect: {query['calls']} x {query['command']} {query['collection']} "
+                         f"@ {query['call_site']}")
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from mongodb_transaction_manager import MongoDBClient
+
+    monitor = MongoDBClient.enable_command_monitoring()
+    db = MongoDBClient.get_db()
+    for equipment in db.equipment.find({}, {"equipment_id": 1}).limit(20):
+        db.equipment.find_one({"equipment_id": equipment.get("equipment_id")})
+    print(monitor.format_report())
@@ -1,11 +1,11 @@
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from mongodb_transaction_manager import MongoDBClient
+from repositories.mongo_repository import MongoRepository
 import datetime
 class ResourceUtilizationEfficiencyCalculator:
-    def __init__(self):
-        self.db = MongoDBClient.get_db()
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else MongoRepository(role="analytics")
 
     def calculate(self, start_date, end_date):
         room_utilization = self._calculate_room_utilization(start_date, end_date)
@@ -17,47 +17,11 @@ class ResourceUtilizationEfficiencyCalculator:
         return overall_utilization
 
     def _calculate_room_utilization(self, start_date, end_date):
-        # Example aggregation pipeline to calculate room usage
-        pipeline = [
-            {"$match": {
-                "start_time": {"$gte": start_date},
-                "end_time": {"$lte": end_date},
-                "status": "Completed"  # Example filter to consider only completed surgeries
-            }},
-            {"$group": {
-                "_id": "$room_id",
-                "used_hours": {"$sum": {
-                    "$divide": [{"$subtract": ["$end_time", "$start_time"]}, 3600]
-                }}
-            }}
-        ]
-        room_usage = {}
-        for usage in self.db.surgeries.aggregate(pipeline):
-            room_id = usage["_id"]
-            room_usage[room_id] = usage["used_hours"]
-        return room_usage   
+        # Only completed surgeries count towards room usage
+        return self.repository.room_usage_hours(start_date, end_date, status="Completed")
 
     def _calculate_equipment_utilization(self, start_date, end_date):
-        # Similar aggregation pipeline for equipment utilization
-        pipeline = [
-            {"$match": {
-                "start_time": {"$gte": start_date},
-                "end_time": {"$lte": end_date},
-                "status": "Completed"
-            }},
-            {"$unwind": "$equipment_used"},
-            {"$group": {
-                "_id": "$equipment_used.equipment_id",
-                "used_hours": {"$sum": {
-                    "$divide": [{"$subtract": ["$end_time", "$start_time"]}, 3600]
-                }}
-            }}
-        ]
-        equipment_usage = {}
-        for usage in self.db.surgeries.aggregate(pipeline):
-            equipment_id = usage["_id"]
-            equipment_usage[equipment_id] = usage["used_hours"]
-        return equipment_usage
+        return self.repository.equipment_usage_hours(start_date, end_date, status="Completed")
 
 # Example use case
 if __name__ == "__main__":
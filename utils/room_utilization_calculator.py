@@ -1,17 +1,17 @@
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from mongodb_transaction_manager import MongoDBClient
+from repositories.mongo_repository import MongoRepository
 from datetime import datetime, timedelta
 
 
 class RoomUtilizationCalculator:
-    def __init__(self):
-        self.db = MongoDBClient.get_db()
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else MongoRepository(role="analytics")
 
     def calculate(self, start_date, end_date):
         # Fetch all room assignments within the given date range
-        room_assignments = self.db.surgery_room_assignments.find({
+        room_assignments = self.repository.find("surgery_room_assignments", {
             "start_time": {"$gte": start_date},
             "end_time": {"$lte": end_date}
         })
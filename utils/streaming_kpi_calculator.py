@@ -0,0 +1,160 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from repositories.base import period_query
+from repositories.mongo_repository import MongoRepository
+from datetime import datetime
+
+
+class RunningStats:
+    """
+    Welford accumulator for the count, mean and population variance of a stream of values.
+    Only three numbers are kept, no matter how many values are added.
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        """Combines another accumulator into this one (Chan et al. parallel update)."""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self._m2 = other.count, other.mean, other._m2
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        return self
+
+    @property
+    def variance(self):
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def std_dev(self):
+        return self.variance ** 0.5
+
+
+def to_datetime(value):
+    """Returns value as a datetime, parsing ISO strings; None if it cannot be interpreted."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+class StreamingKPICalculator:
+    """
+    Computes the surgery-level KPIs in a single pass over a server-side cursor.
+
+    Surgeries are read in batches of `batch_size` with a narrow projection, sorted by
+    surgeon and start time so per-surgeon metrics (workload, schedule compactness) can be
+    folded as each surgeon's run of documents ends. Memory stays proportional to the
+    number of rooms, not to the number of surgeries in the period.
+    """
+    SURGERY_PROJECTION = {"_id": 0, "surgeon_id": 1, "room_id": 1, "start_time": 1, "end_time": 1}
+
+    def __init__(self, repository=None, batch_size=1000):
+        self.repository = repository if repository is not None else MongoRepository(role="analytics")
+        self.batch_size = batch_size
+
+    def iter_surgeries(self, start_date=None, end_date=None):
+        """Yields the projected surgeries for the period ordered by surgeon, then start time."""
+        return self.repository.find(
+            "surgeries",
+            period_query(start_date, end_date),
+            self.SURGERY_PROJECTION,
+            sort=[("surgeon_id", 1), ("start_time", 1)],
+            batch_size=self.batch_size
+        )
+
+    def calculate(self, start_date=None, end_date=None):
+        """
+        Folds the surgeries of the period into running aggregates.
+
+        Args:
+            start_date (datetime, optional): Start of the analysis period.
+            end_date (datetime, optional): End of the analysis period.
+
+        Returns:
+            dict: surgery_count, workload_balance (std dev of surgeries per surgeon),
+            surgeon_schedule_compactness, operational_cost_minimization (average duration
+            in hours) and room_used_hours (room_id -> hours).
+        """
+        return self.fold(self.iter_surgeries(start_date, end_date))
+
+    def fold(self, surgeries):
+        """Folds an iterable of surgery documents sorted by surgeon_id, then start_time."""
+        surgery_count = 0
+        total_duration_hours = 0.0
+        room_used_hours = {}
+        workload = RunningStats()
+        compactness = RunningStats()
+
+        current_surgeon = None
+        run_length = 0
+        run_gap_hours = 0.0
+        previous_end = None
+
+        for surgery in surgeries:
+            surgery_count += 1
+            surgeon_id = surgery.get('surgeon_id')
+            start_time = to_datetime(surgery.get('start_time'))
+            end_time = to_datetime(surgery.get('end_time'))
+
+            if run_length == 0 or surgeon_id != current_surgeon:
+                if run_length:
+                    self._close_run(current_surgeon, run_length, run_gap_hours, workload, compactness)
+                current_surgeon = surgeon_id
+                run_length = 0
+                run_gap_hours = 0.0
+                previous_end = None
+            run_length += 1
+
+            if start_time and end_time:
+                duration_hours = (end_time - start_time).total_seconds() / 3600
+                total_duration_hours += duration_hours
+                room_id = surgery.get('room_id')
+                if room_id is not None:
+                    room_used_hours[room_id] = room_used_hours.get(room_id, 0.0) + duration_hours
+                if previous_end is not None:
+                    run_gap_hours += max(0.0, (start_time - previous_end).total_seconds() / 3600)
+                previous_end = end_time
+
+        if run_length:
+            self._close_run(current_surgeon, run_length, run_gap_hours, workload, compactness)
+
+        return {
+            "surgery_count": surgery_count,
+            "workload_balance": workload.std_dev if workload.count else None,
+            "surgeon_schedule_compactness": compactness.mean if compactness.count else 0,
+            "operational_cost_minimization": total_duration_hours / surgery_count if surgery_count else None,
+            "room_used_hours": room_used_hours,
+        }
+
+    @staticmethod
+    def _close_run(surgeon_id, run_length, run_gap_hours, workload, compactness):
+        if surgeon_id:
+            workload.add(run_length)
+        compactness.add(1 / (1 + run_gap_hours))
+
+
+if __name__ == "__main__":
+    calculator = StreamingKPICalculator()
+    kpis = calculator.calculate(datetime(2023, 1, 1), datetime(2023, 12, 31))
+    for name, value in kpis.items():
+        print(f"{name}: {value}")
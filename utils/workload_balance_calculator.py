@@ -1,11 +1,11 @@
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from mongodb_transaction_manager import MongoDBClient
+from repositories.mongo_repository import MongoRepository
 
 class WorkloadBalanceCalculator:
-    def __init__(self):
-        self.db = MongoDBClient.get_db()
+    def __init__(self, repository=None):
+        self.repository = repository if repository is not None else MongoRepository(role="analytics")
 
     def calculate_workload_balance(self, surgeries):
         # Initialize a dictionary to count surgeries per surgeon
@@ -32,7 +32,7 @@ if __name__ == "__main__":
     # Example usage
     calculator = WorkloadBalanceCalculator()
     # Fetch surgeries from the database
-    surgeries = list(calculator.db.surgeries.find({}))
+    surgeries = list(calculator.repository.find("surgeries"))
     # Calculate workload balance
     workload_balance_metric = calculator.calculate_workload_balance(surgeries)
     print(f"Workload Balance Metric: {workload_balance_metric}")
\ No newline at end of file